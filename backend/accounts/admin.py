@@ -12,6 +12,7 @@ class CompanyAdmin(admin.ModelAdmin):
     list_display = ['name', 'country', 'currency', 'subscription_tier', 'employee_count', 'is_active', 'created_at']
     list_filter = ['country', 'subscription_tier', 'is_active']
     search_fields = ['name', 'email', 'tax_id']
+    list_select_related = ['counters']
     prepopulated_fields = {'slug': ('name',)}
     
     fieldsets = (
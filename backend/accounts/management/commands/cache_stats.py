@@ -0,0 +1,34 @@
+"""
+Management command to report hit/miss rates of the application caches.
+Run with: python manage.py cache_stats [--reset] [--invalidate-company <id>]
+"""
+from django.core.management.base import BaseCommand
+
+from config.cache import cache_metrics, invalidate_company, metrics
+
+
+class Command(BaseCommand):
+    help = 'Show per-namespace cache hit rates, or drop the cached data of a company'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after reporting them')
+        parser.add_argument('--invalidate-company', type=int, help='Drop everything cached for this company')
+
+    def handle(self, *args, **options):
+        if options['invalidate_company']:
+            invalidate_company(options['invalidate_company'])
+            self.stdout.write(self.style.SUCCESS(f"Invalidated cache of company {options['invalidate_company']}"))
+            return
+
+        stats = cache_metrics()
+        if not stats:
+            self.stdout.write(self.style.WARNING('No cache lookups recorded yet'))
+            return
+
+        for namespace, counts in sorted(stats.items()):
+            rate = '-' if counts['hit_rate'] is None else f"{counts['hit_rate']:.1%}"
+            self.stdout.write(f"{namespace:24} {counts['hits']:>9} hits {counts['misses']:>9} misses  {rate:>6}")
+
+        if options['reset']:
+            metrics.reset()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -0,0 +1,34 @@
+"""
+Management command to recount each company's CompanyCounters row.
+Run with: python manage.py reconcile_company_counters [--company <id>]
+
+Can be scheduled with cron or Celery. Repairs drift left by writes that
+skip the counting signals (QuerySet.update, bulk_create, raw SQL).
+"""
+from django.core.management.base import BaseCommand
+
+from accounts.models import Company
+from accounts.services.counter_service import CounterService
+
+
+class Command(BaseCommand):
+    help = 'Recount per-company employee, department, user and storage counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Only reconcile this company (default: all)')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('pk')
+        if options['company']:
+            companies = companies.filter(pk=options['company'])
+
+        checked = drifted = 0
+        for company in companies.iterator():
+            _, drift = CounterService.reconcile(company)
+            checked += 1
+            if drift:
+                drifted += 1
+                changes = ', '.join(f'{name} {stored} -> {actual}' for name, (stored, actual) in drift.items())
+                self.stdout.write(self.style.WARNING(f'{company.name}: {changes}'))
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {checked} companies ({drifted} had drifted)'))
@@ -2,9 +2,13 @@
 Django Rate Limiting Middleware for Security.
 Prevents brute force attacks on login endpoints.
 """
-from django.core.cache import cache
 from django.http import JsonResponse
-import time
+
+from config.cache import TenantCache
+
+
+# Attempts per client IP and path, shared by all workers through the cache
+rate_limits = TenantCache('rate_limit', timeout=60)
 
 class RateLimitMiddleware:
     """
@@ -21,20 +25,14 @@ class RateLimitMiddleware:
         # Check against normalized paths
         if request.method == 'POST' and path in ['/api/auth/login', '/api/auth/register']:
             ip = self.get_client_ip(request)
-            # Use original path in cache key to be safe, or normalized
-            cache_key = f'rate_limit_{ip}_{path}'
-            
-            # Get current attempt count
-            attempts = cache.get(cache_key, 0)
+            # Count this attempt (atomic, so concurrent workers can't both slip through)
+            attempts = rate_limits.incr(None, f'{ip}:{path}')
             
             # Check if rate limit exceeded (10 requests per minute)
-            if attempts >= 10:
+            if attempts > 10:
                 return JsonResponse({
                     'error': 'Too many requests. Please try again in 1 minute.'
                 }, status=429)
-            
-            # Increment counter
-            cache.set(cache_key, attempts + 1, 60)  # 60 seconds TTL
         
         response = self.get_response(request)
         return response
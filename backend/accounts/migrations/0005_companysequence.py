@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_data_consent_user_data_consent_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanySequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='e.g. employee_number, disciplinary_case', max_length=100)),
+                ('last_value', models.PositiveBigIntegerField(default=0, help_text='Last value handed out')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sequences', to='accounts.company')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('company', 'name'), name='unique_sequence_per_company')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_companysequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyCounters',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to='accounts.company')),
+                ('active_employees', models.PositiveIntegerField(default=0)),
+                ('departments', models.PositiveIntegerField(default=0)),
+                ('users', models.PositiveIntegerField(default=0)),
+                ('storage_bytes', models.PositiveBigIntegerField(default=0, help_text='Company and employee document files')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Company counters',
+                'verbose_name_plural': 'Company counters',
+            },
+        ),
+    ]
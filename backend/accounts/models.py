@@ -83,8 +83,9 @@ class Company(models.Model):
     
     @property
     def employee_count(self):
-        """Count active employees in this company"""
-        return self.employees.filter(employment_status='active').count()
+        """Count active employees in this company (kept in CompanyCounters)"""
+        from .services.counter_service import CounterService
+        return CounterService.get(self).active_employees
     
     @property
     def is_subscription_active(self):
@@ -209,3 +210,45 @@ class SecurityLog(models.Model):
 
     def __str__(self):
         return f"{self.user.username if self.user else 'System'} - {self.action} - {self.created_at.date()}"
+
+
+class CompanySequence(models.Model):
+    """
+    Counter behind a company's generated codes (employee numbers, case IDs, ...).
+    Values are handed out by accounts.services.sequence_service.SequenceService.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='sequences')
+    name = models.CharField(max_length=100, help_text="e.g. employee_number, disciplinary_case")
+    last_value = models.PositiveBigIntegerField(default=0, help_text="Last value handed out")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'name'], name='unique_sequence_per_company'),
+        ]
+
+    def __str__(self):
+        return f"{self.company.name} - {self.name} ({self.last_value})"
+
+
+class CompanyCounters(models.Model):
+    """
+    Denormalized per-company totals read by company stats and serializers.
+    Adjusted in the same transaction as the writes they count and
+    recomputed by the reconcile_company_counters command; see
+    accounts.services.counter_service.CounterService.
+    """
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name='counters')
+    active_employees = models.PositiveIntegerField(default=0)
+    departments = models.PositiveIntegerField(default=0)
+    users = models.PositiveIntegerField(default=0)
+    storage_bytes = models.PositiveBigIntegerField(default=0, help_text="Company and employee document files")
+    updated_at = models.DateTimeField(auto_now=True)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Company counters"
+        verbose_name_plural = "Company counters"
+
+    def __str__(self):
+        return f"{self.company.name} counters"
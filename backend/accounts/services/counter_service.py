@@ -0,0 +1,93 @@
+from django.db import transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from ..models import CompanyCounters
+
+
+COUNTERS = ['active_employees', 'departments', 'users', 'storage_bytes']
+
+
+class CounterService:
+    """
+    Per-company totals (active employees, departments, users, storage bytes).
+
+    Writers call adjust() from signal receivers, so each delta is applied in
+    the same transaction as the row it counts and rolls back with it. A
+    company's row is created from a full count the first time it is read;
+    until then adjust() has nothing to update. reconcile() recounts from the
+    source tables and repairs any drift (bulk writes that skip signals).
+    """
+
+    @staticmethod
+    def get(company):
+        """Counters of a company, counted from scratch if it has none yet"""
+        try:
+            return company.counters
+        except CompanyCounters.DoesNotExist:
+            counters, _ = CounterService.reconcile(company)
+            company.counters = counters
+            return counters
+
+    @staticmethod
+    def adjust(company, **deltas):
+        """Add deltas (e.g. active_employees=-1) to a company's counters"""
+        company_id = getattr(company, 'pk', company)
+        changes = {
+            name: Greatest(F(name) + delta, Value(0)) if delta < 0 else F(name) + delta
+            for name, delta in deltas.items() if delta
+        }
+        if company_id is None or not changes:
+            return
+        CompanyCounters.objects.filter(company_id=company_id).update(updated_at=timezone.now(), **changes)
+
+    @staticmethod
+    def count(company):
+        """Counters computed from the source tables"""
+        from documents.models import Document, EmployeeDocument
+        from employees.models import Department, Employee
+        from ..models import User
+
+        company_id = getattr(company, 'pk', company)
+        documents = Document.objects.filter(company_id=company_id).aggregate(total=Sum('file_size'))['total']
+        employee_documents = EmployeeDocument.objects.filter(
+            employee__company_id=company_id
+        ).aggregate(total=Sum('file_size'))['total']
+        return {
+            'active_employees': Employee.objects.filter(company_id=company_id, employment_status='active').count(),
+            'departments': Department.objects.filter(company_id=company_id).count(),
+            'users': User.objects.filter(company_id=company_id).count(),
+            'storage_bytes': (documents or 0) + (employee_documents or 0),
+        }
+
+    @staticmethod
+    def reconcile(company):
+        """
+        Recount a company's counters and store them.
+
+        Returns:
+            Tuple of (CompanyCounters, {counter: (stored, actual)} for the
+            counters that had drifted)
+        """
+        company_id = getattr(company, 'pk', company)
+        with transaction.atomic():
+            # Lock first: writers that commit later then adjust on top of this count
+            counters = CompanyCounters.objects.select_for_update().filter(company_id=company_id).first()
+            actual = CounterService.count(company_id)
+            if counters is None:
+                counters, created = CompanyCounters.objects.get_or_create(
+                    company_id=company_id, defaults={**actual, 'reconciled_at': timezone.now()}
+                )
+                if created:
+                    return counters, {}
+
+            drift = {
+                name: (getattr(counters, name), value)
+                for name, value in actual.items() if getattr(counters, name) != value
+            }
+            for name, value in actual.items():
+                setattr(counters, name, value)
+            counters.reconciled_at = timezone.now()
+            counters.save()
+        return counters, drift
@@ -0,0 +1,81 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import CompanySequence
+
+
+class SequenceService:
+    """
+    Per-company number sequences.
+
+    A block of values is reserved with one atomic UPDATE of the company's
+    CompanySequence row, so concurrent callers never get the same value.
+    Inside a transaction the row stays locked until commit, and a rollback
+    returns the block.
+    """
+
+    @staticmethod
+    def allocate(company, name, count=1, seed=None):
+        """
+        Reserve `count` consecutive values of a sequence.
+
+        Args:
+            company: Company (or its id) owning the sequence
+            name: sequence name, e.g. 'employee_number'
+            count: size of the block
+            seed: callable returning the last value already in use, called
+                once when the sequence is first used (for data created before
+                the sequence existed)
+
+        Returns:
+            range of the reserved values
+        """
+        company_id = getattr(company, 'pk', company)
+
+        last_value = SequenceService._increment(company_id, name, count)
+        if last_value is None:
+            start = seed() if seed else 0
+            try:
+                with transaction.atomic():
+                    CompanySequence.objects.create(company_id=company_id, name=name, last_value=start + count)
+                return range(start + 1, start + count + 1)
+            except IntegrityError:
+                # Created by a concurrent caller in the meantime
+                last_value = SequenceService._increment(company_id, name, count)
+
+        return range(last_value - count + 1, last_value + 1)
+
+    @staticmethod
+    def _can_update_returning():
+        """
+        Whether the database supports UPDATE ... RETURNING: PostgreSQL, and
+        SQLite 3.35+ (where Django's RETURNING flag covers UPDATE too). Not
+        MariaDB, which only supports INSERT/DELETE ... RETURNING.
+        """
+        if connection.vendor == 'postgresql':
+            return True
+        return connection.vendor == 'sqlite' and connection.features.can_return_columns_from_insert
+
+    @staticmethod
+    def _increment(company_id, name, count):
+        """Add count to the sequence and return its new last value (None if it does not exist yet)"""
+        if SequenceService._can_update_returning():
+            # UPDATE ... RETURNING: one statement
+            quote = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {quote(CompanySequence._meta.db_table)} "
+                    f"SET {quote('last_value')} = {quote('last_value')} + %s, {quote('updated_at')} = %s "
+                    f"WHERE {quote('company_id')} = %s AND {quote('name')} = %s "
+                    f"RETURNING {quote('last_value')}",
+                    [count, connection.ops.adapt_datetimefield_value(timezone.now()), company_id, name]
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+
+        with transaction.atomic():
+            sequences = CompanySequence.objects.filter(company_id=company_id, name=name)
+            if not sequences.update(last_value=F('last_value') + count):
+                return None
+            return sequences.values_list('last_value', flat=True).get()
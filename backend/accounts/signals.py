@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User
+from .services.counter_service import CounterService
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def count_user(sender, instance, created=None, **kwargs):
+    """Keep CompanyCounters.users in step (created is None on delete)"""
+    if created is not False:
+        CounterService.adjust(instance.company_id, users=1 if created else -1)
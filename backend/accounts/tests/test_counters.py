@@ -0,0 +1,126 @@
+"""
+Unit tests for the per-company counters behind Company.stats.
+"""
+from datetime import date
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import Company, CompanyCounters, User
+from accounts.services.counter_service import CounterService
+from documents.models import Document, EmployeeDocument
+from employees.models import Department, Employee
+
+
+@override_settings(MEDIA_ROOT='/tmp/lifeline-test-media')
+class CompanyCountersTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Counter Corp", slug="counter-corp")
+        self.admin = User.objects.create_user(
+            'counter_admin', 'admin@counter.test', 'pass1234', company=self.company, role='company_admin'
+        )
+        self.counters = CounterService.get(self.company)
+        self.client = APIClient()
+        # A fresh copy, so requests don't see self.company's in-memory counters
+        self.client.force_authenticate(User.objects.get(pk=self.admin.pk))
+
+    def _employee(self, n, **kwargs):
+        return Employee.objects.create(
+            company=self.company, first_name='Count', last_name=f'Person{n}',
+            date_of_birth=date(1990, 1, 1), gender='other', national_id=f'CNT{n}',
+            email=f'count{n}@counter.test', phone='0700000000', job_title='Clerk', join_date=date(2024, 1, 1),
+            **kwargs
+        )
+
+    def _stored(self):
+        return CompanyCounters.objects.get(company=self.company)
+
+    def test_first_read_counts_from_source_tables(self):
+        self.assertEqual(self.counters.users, 1)
+        self.assertEqual(self.counters.active_employees, 0)
+        self.assertIsNotNone(self.counters.reconciled_at)
+
+    def test_active_employees_follow_status_changes(self):
+        employee = self._employee(1)
+        self._employee(2, employment_status='terminated')
+        self.assertEqual(self._stored().active_employees, 1)
+
+        employee.employment_status = 'suspended'
+        employee.save()
+        self.assertEqual(self._stored().active_employees, 0)
+
+        employee.employment_status = 'active'
+        employee.save()
+        employee.save()
+        self.assertEqual(self._stored().active_employees, 1)
+
+        employee.delete()
+        self.assertEqual(self._stored().active_employees, 0)
+
+    def test_departments_and_users_are_counted(self):
+        department = Department.objects.create(company=self.company, name='Finance')
+        User.objects.create_user('counter_user', 'user@counter.test', 'pass1234', company=self.company)
+        self.assertEqual(self._stored().departments, 1)
+        self.assertEqual(self._stored().users, 2)
+
+        department.delete()
+        self.assertEqual(self._stored().departments, 0)
+
+    def test_storage_bytes_follow_uploads_edits_and_deletes(self):
+        document = Document.objects.create(
+            company=self.company, title='Policy', file=SimpleUploadedFile('policy.pdf', b'x'), file_size=1000
+        )
+        employee_document = EmployeeDocument.objects.create(
+            employee=self._employee(1), title='Contract', file=SimpleUploadedFile('contract.pdf', b'x'), file_size=500
+        )
+        self.assertEqual(self._stored().storage_bytes, 1500)
+
+        document.file_size = 1200
+        document.save()
+        self.assertEqual(self._stored().storage_bytes, 1700)
+
+        employee_document.delete()
+        self.assertEqual(self._stored().storage_bytes, 1200)
+
+        response = self.client.get('/api/documents/company/storage_stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['used_bytes'], 1200)
+
+    def test_rolled_back_writes_are_not_counted(self):
+        with transaction.atomic():
+            self._employee(1)
+            transaction.set_rollback(True)
+        self.assertEqual(self._stored().active_employees, 0)
+
+    def test_stats_endpoint_reads_counters(self):
+        for n in range(3):
+            self._employee(n)
+        Department.objects.create(company=self.company, name='Sales')
+
+        url = f'/api/companies/{self.company.id}/stats/'
+        self.client.get(url)
+        with self.assertNumQueries(1):  # company joined with its counters
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['employee_count'], 3)
+        self.assertEqual(response.data['active_employees'], 3)
+        self.assertEqual(response.data['department_count'], 1)
+        self.assertEqual(response.data['user_count'], 1)
+
+    def test_reconcile_repairs_drift(self):
+        self._employee(1)
+        self._employee(2)
+        Employee.objects.filter(company=self.company).update(employment_status='terminated')
+        self.assertEqual(self._stored().active_employees, 2)
+
+        out = StringIO()
+        call_command('reconcile_company_counters', company=self.company.id, stdout=out)
+        self.assertIn('active_employees 2 -> 0', out.getvalue())
+        self.assertEqual(self._stored().active_employees, 0)
+
+        _, drift = CounterService.reconcile(self.company)
+        self.assertEqual(drift, {})
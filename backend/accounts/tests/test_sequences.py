@@ -0,0 +1,118 @@
+"""
+Unit tests for per-company sequences.
+"""
+from datetime import date
+
+from django.test import TestCase
+
+from accounts.models import Company, CompanySequence
+from accounts.services.sequence_service import SequenceService
+from employees.models import Employee
+
+
+class SequenceServiceTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Sequence Corp", slug="sequence-corp")
+        self.other = Company.objects.create(name="Other Corp", slug="other-corp")
+
+    def _employee(self, company, n, employee_number=''):
+        return Employee.objects.create(
+            company=company, employee_number=employee_number, first_name='Seq', last_name=f'Person{n}',
+            date_of_birth=date(1990, 1, 1), gender='other', national_id=f'SEQ{n}',
+            email=f'seq{n}@example.com', phone='0700000000', job_title='Clerk', join_date=date(2024, 1, 1)
+        )
+
+    def test_blocks_are_consecutive(self):
+        self.assertEqual(list(SequenceService.allocate(self.company, 'things')), [1])
+        self.assertEqual(list(SequenceService.allocate(self.company, 'things', count=500)), list(range(2, 502)))
+        self.assertEqual(list(SequenceService.allocate(self.company, 'things')), [502])
+        self.assertEqual(CompanySequence.objects.get(company=self.company, name='things').last_value, 502)
+
+    def test_sequences_are_per_company_and_name(self):
+        SequenceService.allocate(self.company, 'things', count=10)
+        self.assertEqual(list(SequenceService.allocate(self.other, 'things')), [1])
+        self.assertEqual(list(SequenceService.allocate(self.company.id, 'other_things')), [1])
+
+    def test_seed_only_used_on_first_allocation(self):
+        calls = []
+
+        def seed():
+            calls.append(1)
+            return 41
+
+        self.assertEqual(list(SequenceService.allocate(self.company, 'seeded', seed=seed)), [42])
+        self.assertEqual(list(SequenceService.allocate(self.company, 'seeded', seed=seed)), [43])
+        self.assertEqual(len(calls), 1)
+
+    def test_single_allocation_is_one_query(self):
+        SequenceService.allocate(self.company, 'things')
+        with self.assertNumQueries(1):
+            SequenceService.allocate(self.company, 'things')
+
+    def test_portable_path_without_update_returning(self):
+        from unittest.mock import patch
+        from django.db import connection
+
+        SequenceService.allocate(self.company, 'things')
+        # e.g. MariaDB, which has INSERT ... RETURNING but not UPDATE ... RETURNING
+        with patch.object(connection, 'vendor', 'mysql'), \
+                patch.object(connection.features, 'can_return_columns_from_insert', True):
+            self.assertEqual(list(SequenceService.allocate(self.company, 'things', count=2)), [2, 3])
+            self.assertEqual(list(SequenceService.allocate(self.company, 'new_things')), [1])
+
+    def test_employee_numbers_continue_from_existing_employees(self):
+        self._employee(self.company, 1, employee_number='EMP0041')
+        self.assertEqual(self._employee(self.company, 2).employee_number, 'EMP0042')
+        self.assertEqual(Employee.allocate_employee_numbers(self.company, 3), ['EMP0043', 'EMP0044', 'EMP0045'])
+        self.assertEqual(self._employee(self.company, 3).employee_number, 'EMP0046')
+        self.assertEqual(self._employee(self.other, 4).employee_number, 'EMP0001')
+
+    def test_certificate_numbers_are_unique_across_companies(self):
+        from types import SimpleNamespace
+        from training.utils import generate_certificate_number
+
+        def certificate(company):
+            return generate_certificate_number(SimpleNamespace(
+                employee=SimpleNamespace(company=company),
+                session=SimpleNamespace(program=SimpleNamespace(code='trn001')),
+                completed_at=date(2024, 6, 1)
+            ))
+
+        self.assertEqual(
+            [certificate(self.company), certificate(self.company), certificate(self.other)],
+            [f'CERT-{self.company.id}-TRN001-2024-0001', f'CERT-{self.company.id}-TRN001-2024-0002',
+             f'CERT-{self.other.id}-TRN001-2024-0001']
+        )
+
+    def test_session_codes_use_one_sequence_per_program(self):
+        from datetime import datetime
+        from types import SimpleNamespace
+        from training.utils import generate_session_code
+
+        program = SimpleNamespace(id=7, company_id=self.company.id, code='TRN-001')
+        codes = [
+            generate_session_code(program, datetime(2024, 12, day, 9))
+            for day in (15, 15, 16)
+        ]
+
+        self.assertEqual(codes, ['TRN-001-20241215-01', 'TRN-001-20241215-02', 'TRN-001-20241216-03'])
+        self.assertEqual(
+            list(CompanySequence.objects.filter(company=self.company).values_list('name', flat=True)),
+            ['training_session:7']
+        )
+
+    def test_disciplinary_case_ids(self):
+        from disciplinary.models import DisciplinaryAction
+
+        employee = self._employee(self.company, 1)
+        cases = [
+            DisciplinaryAction.objects.create(
+                company=self.company, employee=employee, reason='Lateness',
+                description='Late', incident_date=date(2024, 5, 1)
+            )
+            for _ in range(2)
+        ]
+        self.assertEqual(
+            [case.case_id for case in cases],
+            [f'DSC-{self.company.id}-00001', f'DSC-{self.company.id}-00002']
+        )
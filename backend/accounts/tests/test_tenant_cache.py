@@ -0,0 +1,103 @@
+"""
+Unit tests for the tenant-aware cache layer (config.cache).
+"""
+import tempfile
+
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIClient
+
+from config.cache import TenantCache, cache_metrics, cache_settings, invalidate_company, metrics
+
+
+class TenantCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.things = TenantCache('things', timeout=60)
+        self.others = TenantCache('others', timeout=60)
+
+    def test_keys_are_scoped_by_company_and_namespace(self):
+        self.things.set(1, 'key', 'one')
+        self.things.set(2, 'key', 'two')
+        self.things.set(None, 'key', 'global')
+        self.others.set(1, 'key', 'other')
+
+        self.assertEqual(self.things.get(1, 'key'), 'one')
+        self.assertEqual(self.things.get(2, 'key'), 'two')
+        self.assertEqual(self.things.get(None, 'key'), 'global')
+        self.assertEqual(self.others.get(1, 'key'), 'other')
+        self.assertIsNone(self.things.get(3, 'key'))
+
+    def test_invalidate_company_drops_every_namespace_of_that_company_only(self):
+        self.things.set(1, 'key', 'one')
+        self.others.set(1, 'key', 'other')
+        self.things.set(2, 'key', 'two')
+
+        invalidate_company(1)
+        self.assertIsNone(self.things.get(1, 'key'))
+        self.assertIsNone(self.others.get(1, 'key'))
+        self.assertEqual(self.things.get(2, 'key'), 'two')
+
+        self.things.set(1, 'key', 'fresh')
+        self.assertEqual(self.things.get(1, 'key'), 'fresh')
+
+    def test_clear_drops_one_namespace_of_one_company(self):
+        self.things.set(1, 'key', 'one')
+        self.things.set(2, 'key', 'two')
+        self.others.set(1, 'key', 'other')
+
+        self.things.clear(1)
+        self.assertIsNone(self.things.get(1, 'key'))
+        self.assertEqual(self.things.get(2, 'key'), 'two')
+        self.assertEqual(self.others.get(1, 'key'), 'other')
+
+    def test_evicted_generation_does_not_revive_old_entries(self):
+        self.things.set(1, 'key', 'one')
+        cache.delete('cache_generation:1')
+        self.assertIsNone(self.things.get(1, 'key'))
+
+    def test_get_or_set_and_incr(self):
+        calls = []
+        self.assertEqual(self.things.get_or_set(1, 'lazy', lambda: calls.append(1) or 'value'), 'value')
+        self.assertEqual(self.things.get_or_set(1, 'lazy', lambda: calls.append(1) or 'value'), 'value')
+        self.assertEqual(len(calls), 1)
+
+        self.assertEqual([self.things.incr(1, 'counter') for _ in range(3)], [1, 2, 3])
+        self.assertEqual(self.things.incr(2, 'counter', delta=5), 5)
+
+    def test_hits_and_misses_are_counted_per_namespace(self):
+        self.things.get(1, 'key')
+        self.things.set(1, 'key', None)  # A cached None is still a hit
+        self.things.get(1, 'key')
+        self.things.get(1, 'key')
+        self.others.get(1, 'key')
+
+        stats = cache_metrics()
+        self.assertEqual(stats['things'], {'hits': 2, 'misses': 1, 'hit_rate': 0.667})
+        self.assertEqual(stats['others'], {'hits': 0, 'misses': 1, 'hit_rate': 0.0})
+
+    def test_file_backend_is_shared_between_cache_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CACHES={'default': cache_settings(f'file://{directory}')}):
+                self.things.set(1, 'key', 'shared')
+                # A second handle on the same location, as another worker would have
+                other_worker = caches.create_connection('default')
+                self.assertEqual(other_worker.get(self.things.key(1, 'key')), 'shared')
+
+
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_login_attempts_are_limited_per_ip(self):
+        client = APIClient()
+        statuses = [
+            client.post('/api/auth/login/', {}, format='json', REMOTE_ADDR='10.0.0.1').status_code
+            for _ in range(11)
+        ]
+        self.assertNotIn(429, statuses[:10])
+        self.assertEqual(statuses[10], 429)
+
+        response = client.post('/api/auth/login/', {}, format='json', REMOTE_ADDR='10.0.0.2')
+        self.assertNotEqual(response.status_code, 429)
@@ -25,6 +25,7 @@ from .serializers import (
     RegisterSerializer, ChangePasswordSerializer
 )
 from .permissions import IsCompanyUser, IsCompanyAdmin, IsOwnerOrAdmin
+from .services.counter_service import CounterService
 from .services.security_service import SecurityService
 from .models import SecurityLog
 import logging
@@ -246,12 +247,15 @@ class CompanyViewSet(viewsets.ModelViewSet):
         """Filter companies based on user role"""
         user = self.request.user
         
+        # Counters are joined so employee_count costs no query per company
+        queryset = Company.objects.select_related('counters')
+
         # Super admins see all companies
         if user.role == 'super_admin':
-            return Company.objects.all()
+            return queryset
         
         # Regular users only see their own company
-        return Company.objects.filter(id=user.company.id)
+        return queryset.filter(id=user.company.id)
     
     def get_serializer_class(self):
         """Use create serializer for POST"""
@@ -267,14 +271,16 @@ class CompanyViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def stats(self, request, pk=None):
-        """Get company statistics"""
+        """Get company statistics (read from CompanyCounters)"""
         company = self.get_object()
+        counters = CounterService.get(company)
         
         stats = {
-            'employee_count': company.employee_count,
-            'department_count': company.departments.count(),
-            'user_count': company.users.count(),
-            'active_employees': company.employees.filter(employment_status='active').count(),
+            'employee_count': counters.active_employees,
+            'department_count': counters.departments,
+            'user_count': counters.users,
+            'active_employees': counters.active_employees,
+            'storage_bytes': counters.storage_bytes,
             'is_subscription_active': company.is_subscription_active,
             'subscription_tier': company.subscription_tier,
         }
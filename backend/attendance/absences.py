@@ -0,0 +1,102 @@
+"""
+Attendance rows for the days nobody clocked in.
+
+Attendance is only written when someone clocks in, so a missing row could
+mean absence, leave or a holiday. materialize_absences() fills in one row
+for every active employee without one, for each working day of a company
+(a weekday of its AttendancePolicy). The row is 'holiday' on a public
+holiday, 'on_leave' under an approved LeaveRequest, and 'absent'
+otherwise. Non-working days get nothing.
+
+Rows that already exist are never touched and inserts ignore conflicts,
+so re-running a day, or running companies in parallel, is safe. The
+number of queries per company does not grow with employees or days.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+
+from employees.models import Employee
+from leave.models import LeaveRequest
+
+from .models import Attendance
+from .policies import company_policy
+from .workdays import holiday_dates, policy_weekdays
+
+
+def date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def working_days(company_id, start, end):
+    """{date: 'work' or 'holiday'} for the company's working weekdays in start..end"""
+    weekdays = policy_weekdays(company_policy(company_id).working_days)
+    holidays = set()
+    for year, month in sorted({(day.year, day.month) for day in date_range(start, end)}):
+        holidays |= holiday_dates(company_id, year, month)
+    return {
+        day: 'holiday' if day in holidays else 'work'
+        for day in date_range(start, end) if day.weekday() in weekdays
+    }
+
+
+def leave_days(company_id, start, end):
+    """Set of (employee_id, date) covered by approved leave in start..end"""
+    leaves = LeaveRequest.objects.filter(
+        employee__company_id=company_id, status='approved', start_date__lte=end, end_date__gte=start
+    ).values_list('employee_id', 'start_date', 'end_date')
+    return {
+        (employee_id, day)
+        for employee_id, leave_start, leave_end in leaves
+        for day in date_range(max(leave_start, start), min(leave_end, end))
+    }
+
+
+def materialize_absences(company_id, start, end=None):
+    """
+    Insert the missing holiday/on_leave/absent Attendance rows of a company.
+
+    Args:
+        start, end: first and last day (default: start only)
+
+    Returns:
+        dict of status -> rows inserted
+    """
+    end = end or start
+    counts = {'absent': 0, 'on_leave': 0, 'holiday': 0}
+    days = working_days(company_id, start, end)
+    if not days:
+        return counts
+
+    employees = list(Employee.objects.filter(
+        company_id=company_id, employment_status='active', join_date__lte=end
+    ).values_list('id', 'join_date'))
+    if not employees:
+        return counts
+
+    on_leave = leave_days(company_id, start, end)
+    recorded = set(Attendance.objects.filter(
+        employee__company_id=company_id, date__gte=start, date__lte=end
+    ).values_list('employee_id', 'date'))
+
+    # One day's rows at a time, so memory follows the headcount, not the period
+    with transaction.atomic():
+        for day, kind in days.items():
+            rows = []
+            for employee_id, join_date in employees:
+                if day < join_date or (employee_id, day) in recorded:
+                    continue
+                if kind == 'holiday':
+                    status = 'holiday'
+                elif (employee_id, day) in on_leave:
+                    status = 'on_leave'
+                else:
+                    status = 'absent'
+                rows.append(Attendance(employee_id=employee_id, date=day, status=status))
+                counts[status] += 1
+            # A clock-in landing meanwhile keeps its row
+            Attendance.objects.bulk_create(rows, batch_size=2000, ignore_conflicts=True)
+    return counts
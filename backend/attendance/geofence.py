@@ -0,0 +1,115 @@
+"""
+Geofence lookups against a company's work locations.
+
+Each process keeps a grid index of the active WorkLocations of the
+companies it has seen. Every location is filed under the grid cells its
+circle's bounding box covers, so a clock-in only looks at the locations
+of the cell it falls in (plus the few "wide" ones whose radius spans too
+many cells), drops those whose bounding box misses the point, and runs the
+exact haversine distance on the nearest few.
+
+Indexes are rebuilt from the database when the company's version stamp
+in the shared cache changes; attendance.signals bumps it on every
+WorkLocation write, so all workers see new locations on the next
+clock-in.
+"""
+import heapq
+import math
+from collections import defaultdict
+
+from config.cache import ProcessCache
+
+from .models import WorkLocation
+from .utils import calculate_distance
+
+
+EARTH_RADIUS_METERS = 6371000
+METERS_PER_DEGREE = EARTH_RADIUS_METERS * math.pi / 180
+
+# ~1.1 km cells; a location is filed under at most MAX_CELLS_PER_LOCATION
+# cells, larger ones are checked on every lookup
+CELL_DEGREES = 0.01
+MAX_CELLS_PER_LOCATION = 64
+# Bounding boxes are widened a little so they never exclude a point the
+# haversine check would accept
+BOX_MARGIN = 1.02
+# Exact distance checks per lookup
+EXACT_CHECKS = 5
+# Company indexes kept per process
+MAX_INDEXES = 500
+
+def cell(degrees):
+    return math.floor(degrees / CELL_DEGREES)
+
+
+class LocationIndex:
+    """Grid index of geofenced locations, given as (id, latitude, longitude, radius_meters)"""
+
+    def __init__(self, locations):
+        self.cells = defaultdict(list)
+        self.wide = []
+        self.size = 0
+
+        for location_id, latitude, longitude, radius in locations:
+            latitude, longitude = float(latitude), float(longitude)
+            half_lat = radius / METERS_PER_DEGREE * BOX_MARGIN
+            half_lng = half_lat / max(math.cos(math.radians(latitude)), 1e-6)
+            entry = (location_id, latitude, longitude, radius, half_lat, half_lng)
+            self.size += 1
+
+            lat_cells = range(cell(latitude - half_lat), cell(latitude + half_lat) + 1)
+            lng_cells = range(cell(longitude - half_lng), cell(longitude + half_lng) + 1)
+            if len(lat_cells) * len(lng_cells) > MAX_CELLS_PER_LOCATION:
+                self.wide.append(entry)
+                continue
+            for lat_cell in lat_cells:
+                for lng_cell in lng_cells:
+                    self.cells[(lat_cell, lng_cell)].append(entry)
+
+    def candidates(self, latitude, longitude):
+        """Locations whose bounding box contains the point, most inside first"""
+        scale = math.cos(math.radians(latitude))
+        found = []
+        for entry in self.cells.get((cell(latitude), cell(longitude)), []) + self.wide:
+            location_id, lat, lng, radius, half_lat, half_lng = entry
+            if abs(latitude - lat) > half_lat or abs(longitude - lng) > half_lng:
+                continue
+            # Equirectangular distance is accurate at geofence scales; rank by
+            # how far inside (negative) or outside each circle the point is
+            approximate = math.hypot(latitude - lat, (longitude - lng) * scale) * METERS_PER_DEGREE
+            found.append((approximate - radius, location_id, lat, lng, radius))
+        return found
+
+    def match(self, latitude, longitude, exact_checks=EXACT_CHECKS):
+        """Id of the location whose radius contains the point (the most central one), or None"""
+        latitude, longitude = float(latitude), float(longitude)
+        for _, location_id, lat, lng, radius in heapq.nsmallest(exact_checks, self.candidates(latitude, longitude)):
+            if calculate_distance(latitude, longitude, lat, lng) <= radius:
+                return location_id
+        return None
+
+
+def build_index(company_id):
+    return LocationIndex(
+        WorkLocation.objects.filter(company_id=company_id, is_active=True)
+        .values_list('id', 'latitude', 'longitude', 'radius_meters')
+        .iterator(chunk_size=2000)
+    )
+
+
+indexes = ProcessCache('work_locations', build_index, max_entries=MAX_INDEXES)
+
+
+def location_index(company_id):
+    """The company's LocationIndex, rebuilt if its locations changed since it was built"""
+    return indexes.get(company_id)
+
+
+def invalidate_locations(company_id):
+    """Make every process rebuild the company's index on its next lookup"""
+    indexes.invalidate(company_id)
+
+
+def match_location(company_id, latitude, longitude):
+    """Id of the active work location of a company containing the point, or None"""
+    return location_index(company_id).match(latitude, longitude)
@@ -0,0 +1,92 @@
+"""
+Management command to benchmark monthly attendance report generation.
+Run with: python manage.py benchmark_attendance_reports --employees 5000
+
+Sample data is created inside a transaction that is rolled back afterwards.
+"""
+import random
+import time
+from datetime import date, datetime, time as clock, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import Company
+from attendance.models import Attendance
+from attendance.reports import generate_monthly_reports
+from attendance.workdays import working_dates
+from employees.models import Employee
+from leave.models import PublicHoliday
+
+
+# Target for a whole company's month
+TARGET_SECONDS = 5
+
+
+class Command(BaseCommand):
+    help = 'Measure monthly attendance report generation over a generated company'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employees',
+            type=int,
+            default=5000,
+            help='Number of employees in the sample company (default: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        year, month = 2026, 10
+
+        with transaction.atomic():
+            company = self._sample_company(options['employees'], year, month)
+
+            for run in ('first run (insert)', 'second run (update)'):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    count = generate_monthly_reports(company, year, month)
+                    elapsed = time.perf_counter() - start
+                self.stdout.write(f'{run}: {count} reports in {elapsed:.2f} s, {len(queries)} queries')
+
+            if elapsed <= TARGET_SECONDS:
+                self.stdout.write(self.style.SUCCESS(f'Report generation under {TARGET_SECONDS} s'))
+            else:
+                self.stdout.write(self.style.WARNING(f'Report generation took {elapsed:.2f} s (target {TARGET_SECONDS} s)'))
+            transaction.set_rollback(True)
+
+    def _sample_company(self, count, year, month):
+        rng = random.Random(42)
+        company = Company.objects.create(name='Report Benchmark', slug=f'report-benchmark-{time.time_ns()}')
+        PublicHoliday.objects.create(company=company, name='Heroes Day', date=date(2000, month, 9))
+
+        start = time.perf_counter()
+        employees = Employee.objects.bulk_create([
+            Employee(
+                company=company, employee_number=f'EMP{i:06d}', first_name='Report', last_name=f'Person{i}',
+                date_of_birth=date(1990, 1, 1), gender='female', national_id=f'RB{i:08d}',
+                email=f'report{i}@example.com', phone='0700000000', job_title='Clerk', join_date=date(2020, 1, 1)
+            )
+            for i in range(count)
+        ], batch_size=1000)
+
+        attendances = []
+        for employee in employees:
+            for day in working_dates(company.id, year, month):
+                status = rng.choices(['present', 'absent', 'on_leave'], weights=[88, 7, 5])[0]
+                clock_in = clock_out = None
+                hours = Decimal('0')
+                if status == 'present':
+                    clock_in = timezone.make_aware(datetime.combine(day, clock(8, rng.randint(30, 59))))
+                    clock_out = clock_in + timedelta(hours=9)
+                    hours = Decimal('8.00')
+                attendances.append(Attendance(
+                    employee=employee, date=day, status=status, clock_in=clock_in, clock_out=clock_out,
+                    is_late=status == 'present' and rng.random() < 0.1, hours_worked=hours
+                ))
+        Attendance.objects.bulk_create(attendances, batch_size=2000)
+        self.stdout.write(
+            f'Created {count} employees and {len(attendances)} attendance records in {time.perf_counter() - start:.1f} s'
+        )
+        return company
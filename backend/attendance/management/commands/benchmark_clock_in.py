@@ -0,0 +1,118 @@
+"""
+Management command to load-test clock-in and clock-out.
+Run with: python manage.py benchmark_clock_in --employees 2000
+
+Sends every employee's clock-in, then clock-out, through the API in one
+process (one worker) with geofencing on, and reports requests per second
+and queries per request (authentication is forced, so loading the user
+is not counted). Sample data is created inside a transaction
+that is rolled back afterwards.
+"""
+import random
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+
+from accounts.models import Company, User
+from attendance.models import AttendancePolicy, WorkLocation
+from employees.models import Employee
+
+
+# Clock-ins per second per worker, including the test client's own
+# overhead (about 1 ms a request)
+TARGET_PER_SECOND = 200
+
+SITE = (Decimal('0.347600'), Decimal('32.582500'))
+# Requests whose queries are counted (not timed)
+SAMPLE = 50
+
+
+class Command(BaseCommand):
+    help = 'Measure clock-in and clock-out throughput of one worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employees',
+            type=int,
+            default=2000,
+            help=f'Number of employees clocking in, more than {SAMPLE} (default: 2000)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            users = self._sample_company(options['employees'])
+            client = APIClient()
+
+            rates = {}
+            for action in ('clock_in', 'clock_out'):
+                # Count queries on a sample, then time the rest without query logging
+                sample, timed = users[:SAMPLE], users[SAMPLE:]
+                queries = []
+
+                def count_query(execute, sql, params, many, context):
+                    queries.append(sql)
+                    return execute(sql, params, many, context)
+
+                with connection.execute_wrapper(count_query):
+                    self._post(client, rng, action, sample)
+                start = time.perf_counter()
+                self._post(client, rng, action, timed)
+                elapsed = time.perf_counter() - start
+
+                rates[action] = len(timed) / elapsed
+                self.stdout.write(
+                    f'{action}: {len(timed)} requests in {elapsed:.2f} s, {rates[action]:.0f}/s, '
+                    f'{len(queries) / len(sample):.1f} queries each'
+                )
+
+            if rates['clock_in'] >= TARGET_PER_SECOND:
+                self.stdout.write(self.style.SUCCESS(f'Clock-ins above {TARGET_PER_SECOND}/s'))
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f'Clock-ins ran at {rates["clock_in"]:.0f}/s (target {TARGET_PER_SECOND}/s)'
+                ))
+            transaction.set_rollback(True)
+
+    def _post(self, client, rng, action, users):
+        for user in users:
+            client.force_authenticate(user=user)
+            response = client.post(f'/api/attendance/records/{action}/', {
+                'latitude': f'{float(SITE[0]) + rng.uniform(-0.0005, 0.0005):.6f}',
+                'longitude': f'{float(SITE[1]) + rng.uniform(-0.0005, 0.0005):.6f}',
+            }, format='json')
+            if response.status_code != 200:
+                raise RuntimeError(f'{action} failed: {response.data}')
+
+    def _sample_company(self, count):
+        company = Company.objects.create(name='Clock-in Benchmark', slug=f'clock-in-benchmark-{time.time_ns()}')
+        policy = AttendancePolicy.objects.get(company=company)
+        policy.enable_geofencing = True
+        policy.save()
+        WorkLocation.objects.create(company=company, name='Head Office', latitude=SITE[0], longitude=SITE[1], radius_meters=200)
+
+        employees = Employee.objects.bulk_create([
+            Employee(
+                company=company, employee_number=f'EMP{i:06d}', first_name='Clock', last_name=f'Person{i}',
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'CB{i:08d}',
+                email=f'clock{i}@example.com', phone='0700000000', job_title='Operator', join_date=date(2020, 1, 1)
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        # Unusable passwords: hashing thousands of them would dominate the run
+        User.objects.bulk_create([
+            User(
+                username=f'clock-benchmark-{company.id}-{i}', email=employee.email, password='!',
+                company=company, role='employee', employee=employee
+            )
+            for i, employee in enumerate(employees)
+        ], batch_size=1000)
+        # Read back, so each request loads its employee as it would in production
+        users = list(User.objects.filter(company=company).order_by('id'))
+        self.stdout.write(f'Created {count} employees with user accounts')
+        return users
@@ -0,0 +1,107 @@
+"""
+Management command to benchmark geofenced clock-in lookups.
+Run with: python manage.py benchmark_geofence --locations 10000
+
+Compares the grid index (attendance.geofence) with checking every location.
+Sample data is created inside a transaction that is rolled back afterwards.
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Company
+from attendance.geofence import location_index, match_location
+from attendance.models import WorkLocation
+from attendance.utils import calculate_distance
+
+
+# Kampala area, roughly 60 x 60 km
+CENTER = (0.3476, 32.5825)
+SPREAD_DEGREES = 0.27
+
+# Target latency of one indexed lookup
+TARGET_MS = 1
+
+
+class Command(BaseCommand):
+    help = 'Measure geofence matching against many work locations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--locations',
+            type=int,
+            default=10000,
+            help='Number of work locations in the sample company (default: 10000)'
+        )
+        parser.add_argument(
+            '--lookups',
+            type=int,
+            default=2000,
+            help='Number of clock-in points to match (default: 2000)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            company = Company.objects.create(name='Geofence Benchmark', slug=f'geofence-benchmark-{time.time_ns()}')
+            locations = WorkLocation.objects.bulk_create([
+                WorkLocation(
+                    company=company, name=f'Site {i}',
+                    latitude=Decimal(f'{CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES):.6f}'),
+                    longitude=Decimal(f'{CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES):.6f}'),
+                    radius_meters=rng.choice([50, 100, 200, 500, 5000 if i % 1000 == 0 else 150]),
+                )
+                for i in range(options['locations'])
+            ], batch_size=2000)
+
+            # Half the points near a site, half anywhere
+            points = []
+            for _ in range(options['lookups']):
+                if rng.random() < 0.5:
+                    site = rng.choice(locations)
+                    points.append((float(site.latitude) + rng.uniform(-0.001, 0.001),
+                                   float(site.longitude) + rng.uniform(-0.001, 0.001)))
+                else:
+                    points.append((CENTER[0] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+                                   CENTER[1] + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES)))
+
+            start = time.perf_counter()
+            index = location_index(company.id)
+            self.stdout.write(
+                f'Indexed {index.size} locations ({len(index.wide)} wide) in {(time.perf_counter() - start) * 1000:.0f} ms'
+            )
+
+            indexed, matches = [], 0
+            for lat, lng in points:
+                start = time.perf_counter()
+                location_id = match_location(company.id, lat, lng)
+                indexed.append((time.perf_counter() - start) * 1000)
+                matches += location_id is not None
+
+            rows = list(WorkLocation.objects.filter(company=company).values_list('id', 'latitude', 'longitude', 'radius_meters'))
+            scanned, disagreements = [], 0
+            for lat, lng in points[:200]:
+                start = time.perf_counter()
+                found = next((pk for pk, la, lo, radius in rows if calculate_distance(lat, lng, la, lo) <= radius), None)
+                scanned.append((time.perf_counter() - start) * 1000)
+                disagreements += (found is None) != (match_location(company.id, lat, lng) is None)
+
+            self.stdout.write(f'{matches}/{len(points)} points inside a work location')
+            self.stdout.write(
+                f'Indexed lookup:  median {statistics.median(indexed):.3f} ms  '
+                f'p99 {statistics.quantiles(indexed, n=100)[98]:.3f} ms (includes the version check)'
+            )
+            self.stdout.write(f'Full scan:       median {statistics.median(scanned):.3f} ms')
+            if disagreements:
+                self.stdout.write(self.style.WARNING(f'{disagreements} points matched differently by the full scan'))
+
+            if statistics.median(indexed) <= TARGET_MS:
+                self.stdout.write(self.style.SUCCESS(f'Indexed lookups under {TARGET_MS} ms'))
+            else:
+                self.stdout.write(self.style.WARNING(f'Indexed lookups took {statistics.median(indexed):.3f} ms (target {TARGET_MS} ms)'))
+            transaction.set_rollback(True)
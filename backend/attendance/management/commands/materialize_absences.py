@@ -0,0 +1,78 @@
+"""
+Management command to record absences, leave and holidays as Attendance rows.
+Run with: python manage.py materialize_absences [--date YYYY-MM-DD] [--days N]
+
+Can be scheduled with cron or Celery, nightly for the day before (the
+default). Every company is handled in its own transaction and re-running
+is safe, so companies can be split between parallel runs with --shard,
+e.g. --shard 0/4 ... --shard 3/4 (or listed with --company).
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.models import Company
+from attendance.absences import materialize_absences
+
+
+class Command(BaseCommand):
+    help = 'Insert absent/on_leave/holiday attendance rows for employees who did not clock in'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            help='Last day to fill in, YYYY-MM-DD (default: yesterday)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='Number of days up to --date to fill in (default: 1)'
+        )
+        parser.add_argument(
+            '--company',
+            type=int,
+            action='append',
+            help='Only this company id (repeatable; default: all active companies)'
+        )
+        parser.add_argument(
+            '--shard',
+            help='Only companies whose id modulo N is I, given as I/N'
+        )
+
+    def handle(self, *args, **options):
+        end = options['date'] or timezone.localdate() - timedelta(days=1)
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        start = end - timedelta(days=options['days'] - 1)
+
+        companies = Company.objects.filter(is_active=True).order_by('pk')
+        if options['company']:
+            companies = companies.filter(pk__in=options['company'])
+        shard = None
+        if options['shard']:
+            try:
+                index, total = (int(part) for part in options['shard'].split('/'))
+            except ValueError:
+                raise CommandError('--shard must look like 0/4')
+            if not 0 <= index < total:
+                raise CommandError('--shard index must be from 0 to N-1')
+            shard = (index, total)
+
+        totals = {'absent': 0, 'on_leave': 0, 'holiday': 0}
+        processed = 0
+        for company_id in companies.values_list('pk', flat=True).iterator():
+            if shard and company_id % shard[1] != shard[0]:
+                continue
+            counts = materialize_absences(company_id, start, end)
+            processed += 1
+            for status, count in counts.items():
+                totals[status] += count
+
+        period = str(start) if start == end else f'{start} to {end}'
+        self.stdout.write(self.style.SUCCESS(
+            f'{period}: {processed} companies, {totals["absent"]} absent, '
+            f'{totals["on_leave"]} on leave, {totals["holiday"]} holiday rows added'
+        ))
@@ -1,9 +1,8 @@
 from django.db import models
 from accounts.models import Company
 from employees.models import Employee
-from django.utils import timezone
-from datetime import datetime, timedelta
 import uuid
+from .utils import hours_and_overtime, late_arrival
 
 class WorkLocation(models.Model):
     """Physical office location for geofenced attendance"""
@@ -141,25 +140,8 @@ class Attendance(models.Model):
             self.overtime_hours = 0
             return
         
-        # Total time
-        duration = self.clock_out - self.clock_in
-        total_hours = duration.total_seconds() / 3600
-        
-        # Subtract break
         policy = self.employee.company.attendance_policy
-        break_hours = policy.break_duration_minutes / 60
-        total_hours -= break_hours
-        
-        # Calculate standard hours
-        standard_hours = 8  # Default 8-hour workday
-        
-        if total_hours <= standard_hours:
-            self.hours_worked = round(total_hours, 2)
-            self.overtime_hours = 0
-        else:
-            self.hours_worked = standard_hours
-            self.overtime_hours = round(total_hours - standard_hours, 2)
-        
+        self.hours_worked, self.overtime_hours = hours_and_overtime(policy, self.clock_in, self.clock_out)
         self.save()
     
     def check_late_arrival(self):
@@ -168,20 +150,7 @@ class Attendance(models.Model):
             return
         
         policy = self.employee.company.attendance_policy
-        expected_time = datetime.combine(self.date, policy.work_start_time)
-        expected_time = timezone.make_aware(expected_time)
-        
-        # Add grace period
-        grace_time = expected_time + timedelta(minutes=policy.grace_period_minutes)
-        
-        if self.clock_in > grace_time:
-            self.is_late = True
-            late_delta = self.clock_in - expected_time
-            self.late_by_minutes = int(late_delta.total_seconds() / 60)
-        else:
-            self.is_late = False
-            self.late_by_minutes = 0
-        
+        self.is_late, self.late_by_minutes = late_arrival(policy, self.date, self.clock_in)
         self.save()
     
     def __str__(self):
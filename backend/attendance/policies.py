@@ -0,0 +1,31 @@
+"""
+Attendance policies, cached per process.
+
+Every clock-in and clock-out needs its company's AttendancePolicy, so each
+worker keeps the policies it has used in memory (config.cache.ProcessCache)
+and only checks their version stamp in the shared cache per request.
+attendance.signals stamps a new version whenever a policy is saved.
+"""
+from config.cache import ProcessCache
+
+from .models import AttendancePolicy
+
+
+def load_policy(company_id):
+    policy, created = AttendancePolicy.objects.get_or_create(company_id=company_id)
+    if created:
+        # Field defaults are strings ('09:00') until read back
+        policy.refresh_from_db()
+    return policy
+
+
+policies = ProcessCache('attendance_policy', load_policy)
+
+
+def company_policy(company_id):
+    """The company's AttendancePolicy (created with defaults if missing); read-only"""
+    return policies.get(company_id)
+
+
+def invalidate_policy(company_id):
+    policies.invalidate(company_id)
@@ -0,0 +1,319 @@
+"""
+Batch ingestion of clock punches from biometric terminals and offline apps.
+
+A punch is one timestamped "in" or "out" event:
+
+    {"employee_number": "EMP001", "type": "in", "timestamp": "2026-10-19T07:58:12+03:00",
+     "latitude": 0.3476, "longitude": 32.5825, "id": "terminal-4:1187"}
+
+(or "employee": <id> instead of the number; self-service callers may omit
+both). Employees and the day's existing Attendance rows are loaded up
+front, so the number of queries does not grow with the batch. Each day's
+clock-in is its earliest in punch and clock-out its latest out punch, so
+sending the same punches again, or in a different order, changes nothing.
+Lateness, hours and overtime are computed from the company policy and
+every touched row is written by one bulk upsert.
+
+Every event gets a result, in input order:
+    recorded    it is now the day's clock-in or clock-out
+    duplicate   the same punch was already recorded (or earlier in the batch)
+    superseded  an earlier in / later out punch is kept for that day
+    failed      invalid; "errors" says why
+"""
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from employees.models import Employee
+
+from .geofence import match_location
+from .models import Attendance, WorkLocation
+from .policies import company_policy
+from .utils import hours_and_overtime, late_arrival
+
+
+PUNCH_TYPES = ('in', 'out')
+# Device clocks may run slightly ahead of the server
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+UPSERT_FIELDS = [
+    'status', 'clock_in', 'clock_out', 'clock_in_lat', 'clock_in_lng', 'clock_out_lat', 'clock_out_lng',
+    'work_location', 'is_late', 'late_by_minutes', 'hours_worked', 'overtime_hours', 'updated_at',
+]
+
+
+def parse_coordinate(value, limit):
+    if value in (None, ''):
+        return None
+    try:
+        coordinate = Decimal(str(value)).quantize(Decimal('0.000001'))
+    except InvalidOperation:
+        raise ValueError("Enter a number.")
+    if abs(coordinate) > limit:
+        raise ValueError(f"Must be between -{limit} and {limit}.")
+    return coordinate
+
+
+class PunchIngester:
+    """
+    Apply a batch of punches to a company's Attendance.
+
+    employee restricts the batch to one employee (self-service sync): punches
+    may omit the employee, and those naming someone else fail. Without it
+    (terminals, HR) every punch names an employee of the company.
+
+    Usage:
+        result = PunchIngester(company).run(events)
+    """
+
+    def __init__(self, company, employee=None):
+        self.company = company
+        self.employee = employee
+        self.policy = company_policy(company.id)
+
+    def load_employees(self, events):
+        """employee_number -> id and the set of valid ids, in one query"""
+        numbers, ids = set(), set()
+        for event in events:
+            if isinstance(event, dict):
+                if event.get('employee_number'):
+                    numbers.add(str(event['employee_number']))
+                if str(event.get('employee', '')).isdigit():
+                    ids.add(int(event['employee']))
+
+        self.employee_numbers, self.employee_ids = {}, set()
+        if numbers or ids:
+            rows = Employee.objects.filter(company=self.company).filter(
+                Q(employee_number__in=numbers) | Q(id__in=ids)
+            ).values_list('id', 'employee_number')
+            for employee_id, number in rows:
+                self.employee_numbers[number] = employee_id
+                self.employee_ids.add(employee_id)
+
+    def load_qr_tokens(self):
+        self.qr_tokens = {
+            str(token): location_id for location_id, token in
+            WorkLocation.objects.filter(company=self.company).values_list('id', 'qr_token')
+        }
+
+    def resolve_employee(self, event):
+        if event.get('employee_number'):
+            employee_id = self.employee_numbers.get(str(event['employee_number']))
+        elif event.get('employee') not in (None, ''):
+            employee_id = int(event['employee']) if str(event['employee']).isdigit() else None
+            if employee_id not in self.employee_ids:
+                employee_id = None
+        elif self.employee:
+            return self.employee.id
+        else:
+            raise ValueError("Give the employee or employee_number.")
+
+        if employee_id is None:
+            raise ValueError("No such employee in your company.")
+        if self.employee and employee_id != self.employee.id:
+            raise ValueError("You can only record your own punches.")
+        return employee_id
+
+    def build(self, event, now):
+        """
+        A validated punch.
+
+        Returns:
+            dict with employee_id, date, type, timestamp, latitude, longitude
+            and work_location_id
+
+        Raises:
+            ValidationError with a field -> messages dict
+        """
+        errors = {}
+
+        def error(field, message):
+            errors.setdefault(field, []).append(message)
+
+        if not isinstance(event, dict):
+            raise ValidationError({'event': ["Each event must be an object."]})
+
+        employee_id = None
+        try:
+            employee_id = self.resolve_employee(event)
+        except ValueError as e:
+            error('employee', str(e))
+
+        punch_type = str(event.get('type', '')).lower()
+        if punch_type not in PUNCH_TYPES:
+            error('type', 'Must be "in" or "out".')
+
+        timestamp = parse_datetime(str(event.get('timestamp', '')))
+        if timestamp is None:
+            error('timestamp', "Enter an ISO 8601 date and time.")
+        else:
+            if timezone.is_naive(timestamp):
+                timestamp = timezone.make_aware(timestamp)
+            if timestamp > now + MAX_CLOCK_SKEW:
+                error('timestamp', "Punches cannot be in the future.")
+
+        coordinates = {}
+        for field, limit in (('latitude', 90), ('longitude', 180)):
+            try:
+                coordinates[field] = parse_coordinate(event.get(field), limit)
+            except ValueError as e:
+                error(field, str(e))
+
+        work_location_id = None
+        if punch_type == 'in' and not errors:
+            work_location_id = self.verify_location(event, coordinates, error)
+
+        if errors:
+            raise ValidationError(errors)
+        return {
+            'employee_id': employee_id,
+            'date': timezone.localdate(timestamp),
+            'type': punch_type,
+            'timestamp': timestamp,
+            'latitude': coordinates['latitude'],
+            'longitude': coordinates['longitude'],
+            'work_location_id': work_location_id,
+        }
+
+    def verify_location(self, event, coordinates, error):
+        """
+        Work location of an in punch. Self-service punches must pass the
+        policy's geofence and QR checks, like a live clock-in; terminals
+        are trusted, their coordinates only tag the location.
+        """
+        latitude, longitude = coordinates['latitude'], coordinates['longitude']
+        location_id = None
+        if latitude is not None and longitude is not None:
+            location_id = match_location(self.company.id, latitude, longitude)
+        if not self.employee:
+            return location_id
+
+        if self.policy.enable_geofencing:
+            if latitude is None or longitude is None:
+                error('latitude', "Location coordinates are required for clock-in.")
+            elif location_id is None:
+                error('latitude', "Outside the allowed work area.")
+        if self.policy.enable_qr_clock_in:
+            location_id = self.qr_tokens.get(str(event.get('qr_token', '')))
+            if location_id is None:
+                error('qr_token', "A valid QR code scan is required for clock-in.")
+        return location_id
+
+    def run(self, events):
+        """
+        Validate all punches, then upsert the attendance days they touch.
+
+        Returns:
+            dict with total/recorded/duplicates/superseded/failed counts and
+            a per-event results list
+        """
+        now = timezone.now()
+        self.load_employees(events)
+        if self.employee and self.policy.enable_qr_clock_in:
+            self.load_qr_tokens()
+
+        results, days, seen = [], {}, set()
+        for index, event in enumerate(events):
+            result = {'index': index}
+            if isinstance(event, dict) and event.get('id') is not None:
+                result['id'] = event['id']
+            results.append(result)
+            try:
+                punch = self.build(event, now)
+            except ValidationError as e:
+                result.update(status='failed', errors=e.message_dict)
+                continue
+
+            result.update(employee=punch['employee_id'], date=punch['date'])
+            key = (punch['employee_id'], punch['type'], punch['timestamp'])
+            if key in seen:
+                result['status'] = 'duplicate'
+                continue
+            seen.add(key)
+            punch['result'] = result
+            days.setdefault((punch['employee_id'], punch['date']), []).append(punch)
+
+        if days:
+            self.apply(days, now)
+
+        counts = {status: 0 for status in ('recorded', 'duplicate', 'superseded', 'failed')}
+        for result in results:
+            counts[result['status']] += 1
+        return {
+            'total': len(events),
+            'recorded': counts['recorded'],
+            'duplicates': counts['duplicate'],
+            'superseded': counts['superseded'],
+            'failed': counts['failed'],
+            'results': results,
+        }
+
+    def apply(self, days, now):
+        """Merge each day's punches into its Attendance row and upsert them all"""
+        employee_ids = {employee_id for employee_id, _ in days}
+        dates = {day for _, day in days}
+
+        with transaction.atomic():
+            existing = {
+                (row.employee_id, row.date): row
+                for row in Attendance.objects.select_for_update().filter(
+                    employee_id__in=employee_ids, date__in=dates
+                ).order_by()
+            }
+
+            rows = []
+            for (employee_id, day), punches in days.items():
+                row = existing.get((employee_id, day)) or Attendance(employee_id=employee_id, date=day)
+                self.merge(row, punches)
+                row.updated_at = now
+                # Upserted on (employee, date), never on the primary key
+                row.pk = None
+                rows.append(row)
+
+            Attendance.objects.bulk_create(
+                rows,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['employee', 'date'],
+                update_fields=UPSERT_FIELDS,
+            )
+
+    def merge(self, row, punches):
+        """Earliest in and latest out win; derived fields follow from them"""
+        first_in = min((p for p in punches if p['type'] == 'in'), key=lambda p: p['timestamp'], default=None)
+        last_out = max((p for p in punches if p['type'] == 'out'), key=lambda p: p['timestamp'], default=None)
+
+        if first_in and (row.clock_in is None or first_in['timestamp'] < row.clock_in):
+            row.clock_in = first_in['timestamp']
+            row.clock_in_lat, row.clock_in_lng = first_in['latitude'], first_in['longitude']
+            if first_in['work_location_id']:
+                row.work_location_id = first_in['work_location_id']
+        else:
+            first_in = None
+        if last_out and (row.clock_out is None or last_out['timestamp'] > row.clock_out):
+            row.clock_out = last_out['timestamp']
+            row.clock_out_lat, row.clock_out_lng = last_out['latitude'], last_out['longitude']
+        else:
+            last_out = None
+
+        for punch in punches:
+            if punch is first_in or punch is last_out:
+                status = 'recorded'
+            elif punch['timestamp'] == (row.clock_in if punch['type'] == 'in' else row.clock_out):
+                status = 'duplicate'
+            else:
+                status = 'superseded'
+            punch['result']['status'] = status
+
+        row.status = 'present'
+        if row.clock_in:
+            row.is_late, row.late_by_minutes = late_arrival(self.policy, row.date, row.clock_in)
+        if row.clock_in and row.clock_out and row.clock_out > row.clock_in:
+            row.hours_worked, row.overtime_hours = hours_and_overtime(self.policy, row.clock_in, row.clock_out)
+        else:
+            row.hours_worked, row.overtime_hours = Decimal('0'), Decimal('0')
@@ -0,0 +1,92 @@
+"""
+Monthly attendance reports.
+
+Every employee's month is summed by one grouped conditional-aggregate
+query over Attendance, working days come from the cached company calendar
+(attendance.workdays) and the reports are upserted in bulk, so the number
+of queries does not grow with the number of employees.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .models import Attendance, AttendanceReport
+from .workdays import working_dates
+
+
+REPORT_FIELDS = [
+    'total_working_days', 'days_present', 'days_absent', 'days_on_leave', 'late_arrivals',
+    'total_hours_worked', 'total_overtime_hours', 'attendance_rate',
+]
+
+
+def month_bounds(year, month):
+    """First day of a month and of the month after it"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def month_totals(employee_ids, year, month):
+    """{employee_id: totals} for the employees' attendance in a month"""
+    start, end = month_bounds(year, month)
+    rows = Attendance.objects.filter(
+        employee_id__in=employee_ids, date__gte=start, date__lt=end
+    ).order_by().values('employee_id').annotate(
+        days_present=Count('id', filter=Q(status='present')),
+        days_absent=Count('id', filter=Q(status='absent')),
+        days_on_leave=Count('id', filter=Q(status='on_leave')),
+        late_arrivals=Count('id', filter=Q(is_late=True)),
+        total_hours_worked=Sum('hours_worked'),
+        total_overtime_hours=Sum('overtime_hours'),
+    )
+    return {row.pop('employee_id'): row for row in rows}
+
+
+def generate_monthly_reports(company, year, month, employees=None):
+    """
+    Create or refresh the AttendanceReport of each employee for a month.
+
+    Args:
+        employees: Employee queryset (default: the company's active employees)
+
+    Returns:
+        Number of reports written
+    """
+    if employees is None:
+        employees = company.employees.filter(employment_status='active')
+    employee_ids = list(employees.values_list('id', flat=True))
+    if not employee_ids:
+        return 0
+
+    working_days = len(working_dates(company.id, year, month))
+    totals = month_totals(employees.values('id'), year, month)
+
+    reports = []
+    for employee_id in employee_ids:
+        row = totals.get(employee_id, {})
+        days_present = row.get('days_present', 0)
+        reports.append(AttendanceReport(
+            employee_id=employee_id,
+            year=year,
+            month=month,
+            total_working_days=working_days,
+            days_present=days_present,
+            days_absent=row.get('days_absent', 0),
+            days_on_leave=row.get('days_on_leave', 0),
+            late_arrivals=row.get('late_arrivals', 0),
+            total_hours_worked=row.get('total_hours_worked') or 0,
+            total_overtime_hours=row.get('total_overtime_hours') or 0,
+            attendance_rate=round((days_present / working_days) * 100, 2) if working_days else 0,
+        ))
+
+    with transaction.atomic():
+        AttendanceReport.objects.bulk_create(
+            reports,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['employee', 'year', 'month'],
+            update_fields=REPORT_FIELDS,
+        )
+    return len(reports)
@@ -37,6 +37,11 @@ class AttendanceSerializer(serializers.ModelSerializer):
             'id', 'is_late', 'late_by_minutes', 'hours_worked',
             'overtime_hours', 'created_at', 'updated_at'
         ]
+        # Columns behind computed fields, for ?fields= (see config.fieldsets)
+        field_columns = {
+            'can_clock_out': ['clock_in', 'clock_out'],
+            'is_clocked_in': ['clock_in', 'clock_out'],
+        }
     
     def get_can_clock_out(self, obj):
         return obj.clock_in is not None and obj.clock_out is None
@@ -55,22 +60,6 @@ class ClockInSerializer(serializers.Serializer):
     latitude = serializers.DecimalField(max_digits=9, decimal_places=6, required=False)
     longitude = serializers.DecimalField(max_digits=9, decimal_places=6, required=False)
     qr_token = serializers.UUIDField(required=False)
-    
-    def validate(self, data):
-        request = self.context['request']
-        today = date.today()
-        
-        # Check if already clocked in today
-        existing = Attendance.objects.filter(
-            employee=request.user.employee,
-            date=today,
-            clock_in__isnull=False
-        ).first()
-        
-        if existing:
-            raise serializers.ValidationError("You have already clocked in today")
-        
-        return data
 
 
 class ClockOutSerializer(serializers.Serializer):
@@ -78,23 +67,6 @@ class ClockOutSerializer(serializers.Serializer):
     notes = serializers.CharField(required=False, allow_blank=True)
     latitude = serializers.DecimalField(max_digits=9, decimal_places=6, required=False)
     longitude = serializers.DecimalField(max_digits=9, decimal_places=6, required=False)
-    
-    def validate(self, data):
-        request = self.context['request']
-        today = date.today()
-        
-        # Check if clocked in
-        attendance = Attendance.objects.filter(
-            employee=request.user.employee,
-            date=today,
-            clock_in__isnull=False,
-            clock_out__isnull=True
-        ).first()
-        
-        if not attendance:
-            raise serializers.ValidationError("You haven't clocked in today or already clocked out")
-        
-        return data
 
 
 class OvertimeRequestSerializer(serializers.ModelSerializer):
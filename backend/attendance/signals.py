@@ -1,9 +1,45 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from accounts.models import Company
-from .models import AttendancePolicy
+from leave.models import PublicHoliday
+from .geofence import invalidate_locations
+from .models import AttendancePolicy, WorkLocation
+from .policies import invalidate_policy
+from .workdays import invalidate_calendar
+
+
+def invalidate_now_and_on_commit(invalidate, company_id):
+    """
+    Invalidate now, and again once the write commits: another worker may
+    rebuild from the pre-commit rows in between, and would otherwise keep
+    that stale copy under the new version.
+    """
+    invalidate(company_id)
+    transaction.on_commit(lambda: invalidate(company_id))
+
 
 @receiver(post_save, sender=Company)
 def create_attendance_policy(sender, instance, created, **kwargs):
     if created:
         AttendancePolicy.objects.create(company=instance)
+
+
+@receiver(post_save, sender=AttendancePolicy)
+@receiver(post_delete, sender=AttendancePolicy)
+def reload_attendance_policy(sender, instance, **kwargs):
+    invalidate_now_and_on_commit(invalidate_policy, instance.company_id)
+
+
+@receiver(post_save, sender=AttendancePolicy)
+@receiver(post_save, sender=PublicHoliday)
+@receiver(post_delete, sender=PublicHoliday)
+def clear_work_calendar(sender, instance, **kwargs):
+    """Working days depend on the policy's weekdays and the holidays"""
+    invalidate_now_and_on_commit(invalidate_calendar, instance.company_id)
+
+
+@receiver(post_save, sender=WorkLocation)
+@receiver(post_delete, sender=WorkLocation)
+def rebuild_location_index(sender, instance, **kwargs):
+    invalidate_now_and_on_commit(invalidate_locations, instance.company_id)
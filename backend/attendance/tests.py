@@ -0,0 +1,410 @@
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import Company, User
+from employees.models import Employee
+from leave.models import LeaveRequest, LeaveType, PublicHoliday
+
+from .absences import materialize_absences
+from .models import Attendance, AttendancePolicy, AttendanceReport, WorkLocation
+from .policies import company_policy
+from .utils import hours_and_overtime, late_arrival
+from .workdays import policy_weekdays, working_dates
+
+
+class AttendanceReportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name="ReportCo", slug="reportco")
+        self.user = User.objects.create_user(
+            username='report_hr', email='hr@reportco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _employee(self, n, status='active'):
+        return Employee.objects.create(
+            company=self.company, first_name=f'Emp{n}', last_name='Report',
+            date_of_birth=date(1990, 1, 1), gender='female', national_id=f'RNID{n}',
+            email=f'emp{n}@reportco.test', phone='0700000000', job_title='Clerk',
+            join_date=date(2020, 1, 1), employment_status=status
+        )
+
+    def test_policy_weekdays(self):
+        self.assertEqual(policy_weekdays('Monday,Tuesday,Wednesday,Thursday,Friday'), {0, 1, 2, 3, 4})
+        self.assertEqual(policy_weekdays('mon, sat ,Sunday'), {0, 5, 6})
+
+    def test_working_days_follow_policy_and_holidays(self):
+        # October 2026 has 22 weekdays; the 9th is a Friday
+        self.assertEqual(len(working_dates(self.company.id, 2026, 10)), 22)
+
+        PublicHoliday.objects.create(company=self.company, name='Independence Day', date=date(1962, 10, 9))
+        PublicHoliday.objects.create(
+            company=self.company, name='One-off', date=date(2026, 10, 12), is_recurring=False
+        )
+        PublicHoliday.objects.create(
+            company=self.company, name='Other year', date=date(2025, 10, 13), is_recurring=False
+        )
+        dates = working_dates(self.company.id, 2026, 10)
+        self.assertEqual(len(dates), 20)
+        self.assertNotIn(date(2026, 10, 9), dates)
+
+        policy = AttendancePolicy.objects.get(company=self.company)
+        policy.working_days = 'Monday,Tuesday,Wednesday,Thursday,Friday,Saturday'
+        policy.save()
+        self.assertEqual(len(working_dates(self.company.id, 2026, 10)), 25)
+
+        with self.assertNumQueries(0):
+            working_dates(self.company.id, 2026, 10)
+
+    def test_generate_reports_in_constant_queries(self):
+        first, second = self._employee(1), self._employee(2)
+        self._employee(3, status='terminated')
+        for day, status, late in [(1, 'present', True), (2, 'present', False), (5, 'absent', False), (6, 'on_leave', False)]:
+            Attendance.objects.create(
+                employee=first, date=date(2026, 10, day), status=status, is_late=late, hours_worked=Decimal('8.00')
+            )
+        Attendance.objects.create(employee=first, date=date(2026, 9, 30), status='present')
+
+        response = self.client.post('/api/attendance/reports/generate/', {'year': 2026, 'month': 10}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+        report = AttendanceReport.objects.get(employee=first, year=2026, month=10)
+        self.assertEqual(
+            (report.total_working_days, report.days_present, report.days_absent, report.days_on_leave, report.late_arrivals),
+            (22, 2, 1, 1, 1)
+        )
+        self.assertEqual(report.total_hours_worked, Decimal('32.00'))
+        self.assertEqual(report.attendance_rate, Decimal('9.09'))
+
+        empty = AttendanceReport.objects.get(employee=second, year=2026, month=10)
+        self.assertEqual((empty.days_present, empty.total_hours_worked), (0, 0))
+
+        # Regenerating updates the same rows, in the same number of queries for more employees
+        for n in range(4, 14):
+            self._employee(n)
+        Attendance.objects.create(employee=second, date=date(2026, 10, 7), status='present')
+        # Employees, grouped totals, savepoint + upsert + release, reports read back
+        with self.assertNumQueries(6):
+            self.client.post('/api/attendance/reports/generate/', {'year': 2026, 'month': 10}, format='json')
+        self.assertEqual(AttendanceReport.objects.filter(year=2026, month=10).count(), 12)
+        self.assertEqual(AttendanceReport.objects.get(pk=empty.pk).days_present, 1)
+
+    def test_generate_single_employee_and_bad_input(self):
+        employee = self._employee(1)
+        response = self.client.post(
+            '/api/attendance/reports/generate/',
+            {'year': '2026', 'month': '10', 'employee_id': employee.id}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['employee'] for row in response.data], [employee.id])
+
+        response = self.client.post('/api/attendance/reports/generate/', {'year': 2026, 'month': 13}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/attendance/reports/generate/', {'employee_id': 999999}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+class GeofenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name="FenceCo", slug="fenceco")
+        AttendancePolicy.objects.filter(company=self.company).update(enable_geofencing=True)
+        self.employee = Employee.objects.create(
+            company=self.company, first_name='Field', last_name='Worker',
+            date_of_birth=date(1990, 1, 1), gender='male', national_id='GEO1',
+            email='field@fenceco.test', phone='0700000000', job_title='Sales', join_date=date(2020, 1, 1)
+        )
+        self.user = User.objects.create_user(
+            username='field', email='field@fenceco.test', password='secret',
+            company=self.company, employee=self.employee
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _location(self, name, latitude, longitude, radius=100, **kwargs):
+        return WorkLocation.objects.create(
+            company=self.company, name=name, latitude=Decimal(latitude), longitude=Decimal(longitude),
+            radius_meters=radius, **kwargs
+        )
+
+    def test_index_matches_the_covering_location(self):
+        from .geofence import LocationIndex
+
+        index = LocationIndex([
+            (1, '0.347600', '32.582500', 100),
+            (2, '0.348000', '32.582500', 100),
+            (3, '0.500000', '32.800000', 20000),  # Wide: checked from every cell
+        ])
+        self.assertEqual(len(index.wide), 1)
+        self.assertEqual(index.match(0.3476, 32.5826), 1)
+        self.assertEqual(index.match(0.3480, 32.5825), 2)
+        self.assertEqual(index.match(0.5500, 32.8000), 3)
+        # About 130 m north of site 2
+        self.assertIsNone(index.match(0.3492, 32.5825))
+
+    def test_clock_in_uses_current_locations(self):
+        url = '/api/attendance/records/clock_in/'
+        outside = {'latitude': '0.400000', 'longitude': '32.600000'}
+        self.assertEqual(self.client.post(url, outside, format='json').status_code, 400)
+
+        # A new site is picked up without restarting anything
+        site = self._location('Branch', '0.400100', '32.600000')
+        response = self.client.post(url, outside, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Attendance.objects.get(employee=self.employee).work_location_id, site.id)
+
+    def test_deactivated_locations_are_dropped(self):
+        from .geofence import match_location
+
+        site = self._location('Depot', '0.300000', '32.500000')
+        self.assertEqual(match_location(self.company.id, 0.3, 32.5), site.id)
+
+        site.is_active = False
+        site.save()
+        self.assertIsNone(match_location(self.company.id, 0.3, 32.5))
+
+
+class ClockInTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name="ClockCo", slug="clockco")
+        self.employee = Employee.objects.create(
+            company=self.company, first_name='Early', last_name='Bird',
+            date_of_birth=date(1990, 1, 1), gender='female', national_id='CLK1',
+            email='early@clockco.test', phone='0700000000', job_title='Nurse', join_date=date(2020, 1, 1)
+        )
+        self.user = User.objects.create_user(
+            username='early', email='early@clockco.test', password='secret',
+            company=self.company, employee=self.employee
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_lateness_and_hours(self):
+        policy = company_policy(self.company.id)
+        day = date(2026, 10, 19)
+        start = timezone.make_aware(datetime.combine(day, time(9, 0)))
+
+        self.assertEqual(late_arrival(policy, day, start + timedelta(minutes=15)), (False, 0))
+        self.assertEqual(late_arrival(policy, day, start + timedelta(minutes=16)), (True, 16))
+        # One hour's break comes off
+        self.assertEqual(hours_and_overtime(policy, start, start + timedelta(hours=7)), (Decimal('6.0'), 0))
+        self.assertEqual(hours_and_overtime(policy, start, start + timedelta(hours=10, minutes=30)), (8, Decimal('1.5')))
+
+    def test_policy_changes_are_picked_up(self):
+        self.assertEqual(company_policy(self.company.id).grace_period_minutes, 15)
+        with self.assertNumQueries(0):
+            company_policy(self.company.id)
+
+        policy = AttendancePolicy.objects.get(company=self.company)
+        policy.grace_period_minutes = 5
+        policy.save()
+        self.assertEqual(company_policy(self.company.id).grace_period_minutes, 5)
+
+    def test_clock_in_and_out_write_once(self):
+        company_policy(self.company.id)
+
+        # Employee, today's record, then savepoint + insert + release
+        with self.assertNumQueries(5):
+            response = self.client.post('/api/attendance/records/clock_in/', {'notes': 'On time'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['attendance']['employee_name'], 'Early Bird')
+
+        attendance = Attendance.objects.get(employee=self.employee)
+        self.assertEqual(attendance.status, 'present')
+        self.assertEqual(
+            (attendance.is_late, attendance.late_by_minutes),
+            late_arrival(company_policy(self.company.id), attendance.date, attendance.clock_in)
+        )
+        response = self.client.post('/api/attendance/records/clock_in/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        # Pretend the shift started ten hours ago
+        Attendance.objects.filter(pk=attendance.pk).update(clock_in=timezone.now() - timedelta(hours=10))
+        # Employee, open record, conditional update
+        with self.assertNumQueries(3):
+            response = self.client.post('/api/attendance/records/clock_out/', {'notes': 'Done'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        attendance.refresh_from_db()
+        self.assertEqual((attendance.hours_worked, attendance.overtime_hours), (Decimal('8.00'), Decimal('1.00')))
+        self.assertEqual(attendance.notes, 'On time\nClock out: Done')
+        self.assertEqual(self.client.post('/api/attendance/records/clock_out/', {}, format='json').status_code, 400)
+
+    def test_clock_in_fills_existing_absent_record(self):
+        Attendance.objects.create(employee=self.employee, date=date.today(), status='absent')
+
+        response = self.client.post('/api/attendance/records/clock_in/', {}, format='json')
+        self.assertEqual(response.status_code, 200)
+        attendance = Attendance.objects.get(employee=self.employee)
+        self.assertEqual(attendance.status, 'present')
+        self.assertIsNotNone(attendance.clock_in)
+
+
+class PunchIngestionTests(TestCase):
+    url = '/api/attendance/records/punches/'
+
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name="PunchCo", slug="punchco")
+        self.employees = [
+            Employee.objects.create(
+                company=self.company, first_name=f'Shift{n}', last_name='Worker',
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'PUN{n}',
+                email=f'shift{n}@punchco.test', phone='0700000000', job_title='Guard', join_date=date(2020, 1, 1)
+            )
+            for n in range(3)
+        ]
+        self.terminal = User.objects.create_user(
+            username='terminal', email='terminal@punchco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.terminal)
+        self.day = date.today() - timedelta(days=3)
+
+    def _at(self, hour, minute=0):
+        return timezone.make_aware(datetime.combine(self.day, time(hour, minute))).isoformat()
+
+    def _punch(self, employee, punch_type, hour, minute=0, **extra):
+        return {'employee_number': employee.employee_number, 'type': punch_type,
+                'timestamp': self._at(hour, minute), **extra}
+
+    def test_batch_is_applied_in_one_pass(self):
+        first, second, third = self.employees
+        events = [
+            self._punch(first, 'in', 9, 30, id='t1:1'),
+            self._punch(first, 'in', 9, 30),              # Same punch twice
+            self._punch(second, 'in', 8, 55),
+            self._punch(first, 'out', 19, 0),
+            self._punch(second, 'out', 16, 0),
+            self._punch(second, 'out', 17, 0),            # The latest out wins
+            {'employee': third.id, 'type': 'in', 'timestamp': self._at(9, 0)},
+            {'employee_number': 'NOPE', 'type': 'in', 'timestamp': self._at(9, 0)},
+            {'employee_number': first.employee_number, 'type': 'lunch', 'timestamp': 'yesterday'},
+        ]
+        company_policy(self.company.id)
+        # Employees, locked attendance rows, savepoint + upsert + release
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, events, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']],
+            ['recorded', 'duplicate', 'recorded', 'recorded', 'superseded', 'recorded', 'recorded', 'failed', 'failed']
+        )
+        self.assertEqual(response.data['results'][0]['id'], 't1:1')
+        self.assertIn('employee', response.data['results'][7]['errors'])
+        self.assertEqual(set(response.data['results'][8]['errors']), {'type', 'timestamp'})
+        self.assertEqual((response.data['recorded'], response.data['failed']), (5, 2))
+
+        attendance = Attendance.objects.get(employee=first, date=self.day)
+        self.assertEqual((attendance.status, attendance.is_late, attendance.late_by_minutes), ('present', True, 30))
+        # 9.5 hours less the hour's break
+        self.assertEqual((attendance.hours_worked, attendance.overtime_hours), (Decimal('8.00'), Decimal('0.50')))
+        attendance = Attendance.objects.get(employee=second, date=self.day)
+        self.assertEqual((attendance.is_late, attendance.hours_worked), (False, Decimal('7.08')))
+        self.assertIsNone(Attendance.objects.get(employee=third, date=self.day).clock_out)
+
+        # Resending changes nothing, except that an earlier punch replaces the clock-in
+        response = self.client.post(self.url, events[:7] + [self._punch(first, 'in', 8, 0)], format='json')
+        self.assertEqual(
+            [r['status'] for r in response.data['results']],
+            ['superseded', 'duplicate', 'duplicate', 'duplicate', 'superseded', 'duplicate', 'duplicate', 'recorded']
+        )
+        attendance = Attendance.objects.get(employee=first, date=self.day)
+        self.assertEqual((attendance.is_late, attendance.overtime_hours), (False, Decimal('2.00')))
+        self.assertEqual(Attendance.objects.filter(date=self.day).count(), 3)
+
+    def test_ndjson_and_self_service(self):
+        first, second, _ = self.employees
+        user = User.objects.create_user(
+            username='shift0', email='shift0@punchco.test', password='secret',
+            company=self.company, employee=first
+        )
+        self.client.force_authenticate(user=user)
+
+        body = '\n'.join(json.dumps(event) for event in [
+            {'type': 'in', 'timestamp': self._at(9, 0)},
+            self._punch(second, 'in', 9, 0),
+        ]) + '\n'
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in response.data['results']], ['recorded', 'failed'])
+        self.assertFalse(Attendance.objects.filter(employee=second).exists())
+
+        response = self.client.post(self.url, '{"type": "in"\n', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, {'type': 'in'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class AbsenceMaterializationTests(TestCase):
+    # A Wednesday, a Friday and the Saturday after
+    WEDNESDAY, FRIDAY, SATURDAY = date(2026, 10, 14), date(2026, 10, 16), date(2026, 10, 17)
+
+    def setUp(self):
+        cache.clear()
+        self.company = Company.objects.create(name="AbsentCo", slug="absentco")
+        self.present, self.away, self.pending, self.idle = [self._employee(n) for n in range(4)]
+        self._employee(4, employment_status='terminated')
+        self._employee(5, join_date=self.FRIDAY)
+
+        leave_type = LeaveType.objects.create(company=self.company, name='Annual Leave', code='AL', days_per_year=21)
+        for employee, status in [(self.away, 'approved'), (self.pending, 'pending')]:
+            LeaveRequest.objects.create(
+                employee=employee, leave_type=leave_type, start_date=date(2026, 10, 13), end_date=self.WEDNESDAY,
+                days_requested=2, reason='Family', status=status
+            )
+        Attendance.objects.create(employee=self.present, date=self.WEDNESDAY, status='present')
+        PublicHoliday.objects.create(company=self.company, name='Founders Day', date=self.FRIDAY, is_recurring=False)
+
+    def _employee(self, n, **kwargs):
+        fields = {'employment_status': 'active', 'join_date': date(2020, 1, 1), **kwargs}
+        return Employee.objects.create(
+            company=self.company, first_name=f'Staff{n}', last_name='Member',
+            date_of_birth=date(1990, 1, 1), gender='female', national_id=f'ABS{n}',
+            email=f'staff{n}@absentco.test', phone='0700000000', job_title='Clerk', **fields
+        )
+
+    def test_missing_days_are_filled_once(self):
+        company_policy(self.company.id)
+        # Holidays, employees, leave, existing rows, then savepoint + an insert
+        # per working day (three) + release
+        with self.assertNumQueries(9):
+            counts = materialize_absences(self.company.id, self.WEDNESDAY, self.SATURDAY)
+        # Wednesday: one clocked in, one on leave; Thursday: everyone; Friday: five on holiday
+        self.assertEqual(counts, {'absent': 6, 'on_leave': 1, 'holiday': 5})
+
+        statuses = dict(Attendance.objects.filter(date=self.WEDNESDAY).values_list('employee_id', 'status'))
+        self.assertEqual(statuses, {
+            self.present.id: 'present', self.away.id: 'on_leave', self.pending.id: 'absent', self.idle.id: 'absent',
+        })
+        self.assertFalse(Attendance.objects.filter(date=self.SATURDAY).exists())
+
+        self.assertEqual(
+            materialize_absences(self.company.id, self.WEDNESDAY, self.SATURDAY),
+            {'absent': 0, 'on_leave': 0, 'holiday': 0}
+        )
+        self.assertEqual(Attendance.objects.filter(employee__company=self.company).count(), 13)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('materialize_absences', '--date', '2026-10-16', '--days', '3', '--company', str(self.company.id), stdout=out)
+        self.assertIn('2026-10-14 to 2026-10-16: 1 companies, 6 absent, 1 on leave, 5 holiday', out.getvalue())
+
+        out = StringIO()
+        call_command('materialize_absences', '--date', '2026-10-14', '--shard', '0/1', stdout=out)
+        self.assertIn('0 absent, 0 on leave, 0 holiday', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('materialize_absences', '--shard', '2/2', stdout=out)
@@ -1,4 +1,11 @@
 import math
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+# Default 8-hour workday
+STANDARD_HOURS = 8
 
 def calculate_distance(lat1, lon1, lat2, lon2):
     """
@@ -16,3 +23,24 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     c = 2 * math.asin(math.sqrt(a)) 
     r = 6371000 # Radius of earth in meters.
     return c * r
+
+
+def late_arrival(policy, day, clock_in):
+    """
+    (is_late, late_by_minutes) of a clock-in under an AttendancePolicy.
+    Late past the grace period, counted from the start of the workday.
+    """
+    expected_time = timezone.make_aware(datetime.combine(day, policy.work_start_time))
+    if clock_in > expected_time + timedelta(minutes=policy.grace_period_minutes):
+        return True, int((clock_in - expected_time).total_seconds() / 60)
+    return False, 0
+
+
+def hours_and_overtime(policy, clock_in, clock_out):
+    """(hours_worked, overtime_hours) between a clock-in and clock-out, less the policy's break"""
+    total_hours = (clock_out - clock_in).total_seconds() / 3600
+    total_hours -= policy.break_duration_minutes / 60
+
+    if total_hours <= STANDARD_HOURS:
+        return Decimal(str(round(total_hours, 2))), Decimal('0')
+    return Decimal(STANDARD_HOURS), Decimal(str(round(total_hours - STANDARD_HOURS, 2)))
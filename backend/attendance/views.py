@@ -1,18 +1,43 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
-from django.db.models import Sum, Count, Q
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q
 from datetime import datetime, date, timedelta
 from .models import AttendancePolicy, Attendance, OvertimeRequest, AttendanceReport, WorkLocation
+from employees.models import Employee
 from .serializers import (
     AttendancePolicySerializer, AttendanceSerializer,
     ClockInSerializer, ClockOutSerializer,
     OvertimeRequestSerializer, AttendanceReportSerializer,
     WorkLocationSerializer
 )
-from .utils import calculate_distance
+from .geofence import match_location
+from .policies import company_policy
+from .reports import generate_monthly_reports
+from .utils import hours_and_overtime, late_arrival
+from config.conditional import ConditionalGetMixin, queryset_version
+from config.fieldsets import SparseFieldsetMixin
+from config.parsers import NDJSONParser
+from config.pagination import OptionalCursorPagination
+
+
+# Clock-in/out responses reuse one serializer: building a ModelSerializer's
+# fields costs more than the rest of the request. It holds no per-request
+# state, so sharing it between threads is safe.
+clock_response = AttendanceSerializer()
+# All that clock-in/out and their response read from the employee row
+CLOCK_EMPLOYEE_FIELDS = ['company_id', 'employee_number', 'first_name', 'middle_name', 'last_name']
+
+
+def clock_employee(user):
+    """The user's employee, loaded with CLOCK_EMPLOYEE_FIELDS only (None if not linked)"""
+    if not user.employee_id:
+        return None
+    return Employee.objects.only(*CLOCK_EMPLOYEE_FIELDS).filter(pk=user.employee_id).first()
 
 
 class AttendancePolicyViewSet(viewsets.ModelViewSet):
@@ -46,9 +71,11 @@ class WorkLocationViewSet(viewsets.ModelViewSet):
         return Response({"qr_token": location.qr_token})
 
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     serializer_class = AttendanceSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('-id',)
     
     def get_queryset(self):
         user = self.request.user
@@ -78,8 +105,15 @@ class AttendanceViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def clock_in(self, request):
-        """Clock in for the day"""
-        if not getattr(request.user, 'employee', None):
+        """
+        Clock in for the day.
+
+        Lateness is computed against the cached company policy (see
+        attendance.policies) before a single write: an insert, or an update
+        of a row already created for the day (e.g. marked absent).
+        """
+        employee = clock_employee(request.user)
+        if not employee:
             return Response(
                 {"error": "User does not have an employee record"},
                 status=status.HTTP_400_BAD_REQUEST
@@ -90,44 +124,35 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         
         today = date.today()
         now = timezone.now()
-        
-        # 1. Get today's attendance record (or create one with default status)
-        attendance, created = Attendance.objects.get_or_create(
-            employee=request.user.employee,
-            date=today,
-            defaults={'status': 'absent'}
+        already_clocked_in = Response(
+            {"error": "Already clocked in today"},
+            status=status.HTTP_400_BAD_REQUEST
         )
         
-        if attendance.clock_in:
-            return Response(
-                {"error": "Already clocked in today"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        # 1. Today's attendance record, if any
+        try:
+            attendance = Attendance.objects.get(employee=employee, date=today)
+        except Attendance.DoesNotExist:
+            attendance = None
+        if attendance and attendance.clock_in:
+            return already_clocked_in
 
         # 2. Verification Logic
-        # Ensure policy exists
-        policy, _ = AttendancePolicy.objects.get_or_create(company=request.user.company)
+        policy = company_policy(employee.company_id)
         
         lat = serializer.validated_data.get('latitude')
         lng = serializer.validated_data.get('longitude')
         qr_token = serializer.validated_data.get('qr_token')
+        work_location_id = attendance.work_location_id if attendance else None
 
         # Geofencing
         if policy.enable_geofencing:
             if not lat or not lng:
                 return Response({"error": "Location coordinates are required for clock-in"}, status=400)
             
-            # Check against all work locations
-            locations = WorkLocation.objects.filter(company=request.user.company, is_active=True)
-            within_range = False
-            for loc in locations:
-                dist = calculate_distance(lat, lng, loc.latitude, loc.longitude)
-                if dist <= loc.radius_meters:
-                    within_range = True
-                    attendance.work_location = loc
-                    break
-            
-            if not within_range:
+            # Nearest work location whose radius covers the point (see attendance.geofence)
+            work_location_id = match_location(employee.company_id, lat, lng)
+            if work_location_id is None:
                 return Response({"error": "You are outside the allowed work area"}, status=400)
 
         # QR Code
@@ -135,32 +160,51 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             if not qr_token:
                 return Response({"error": "QR code scan is required for clock-in"}, status=400)
             
-            loc = WorkLocation.objects.filter(company=request.user.company, qr_token=qr_token).first()
-            if not loc:
+            work_location_id = WorkLocation.objects.filter(
+                company_id=employee.company_id, qr_token=qr_token
+            ).values_list('id', flat=True).first()
+            if not work_location_id:
                 return Response({"error": "Invalid or expired QR code"}, status=400)
-            attendance.work_location = loc
 
-        # 3. Successful verification - Update the record
-        attendance.clock_in = now
-        attendance.clock_in_lat = lat
-        attendance.clock_in_lng = lng
-        attendance.status = 'present'
-        attendance.notes = serializer.validated_data.get('notes', '')
-        attendance.save()
-        
-        # Check if late
-        attendance.check_late_arrival()
-        
-        response_serializer = AttendanceSerializer(attendance)
+        # 3. Successful verification - write the record once
+        is_late, late_by_minutes = late_arrival(policy, today, now)
+        values = {
+            'status': 'present',
+            'clock_in': now,
+            'clock_in_lat': lat,
+            'clock_in_lng': lng,
+            'is_late': is_late,
+            'late_by_minutes': late_by_minutes,
+            'work_location_id': work_location_id,
+            'notes': serializer.validated_data.get('notes', ''),
+            'updated_at': now,
+        }
+        if attendance is None:
+            attendance = Attendance(employee=employee, date=today, **values)
+            try:
+                with transaction.atomic():
+                    attendance.save(force_insert=True)
+            except IntegrityError:
+                # Clocked in by a concurrent request
+                return already_clocked_in
+        else:
+            updated = Attendance.objects.filter(pk=attendance.pk, clock_in__isnull=True).update(**values)
+            if not updated:
+                return already_clocked_in
+            for field, value in values.items():
+                setattr(attendance, field, value)
+            attendance.employee = employee
+        
         return Response({
             "message": "Clocked in successfully",
-            "attendance": response_serializer.data
+            "attendance": clock_response.to_representation(attendance)
         })
     
     @action(detail=False, methods=['post'])
     def clock_out(self, request):
-        """Clock out for the day"""
-        if not hasattr(request.user, 'employee'):
+        """Clock out for the day, with hours and overtime written in the same update"""
+        employee = clock_employee(request.user)
+        if not employee:
             return Response(
                 {"error": "User does not have an employee record"},
                 status=status.HTTP_400_BAD_REQUEST
@@ -171,37 +215,84 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         
         today = date.today()
         now = timezone.now()
+        no_clock_in = Response(
+            {"error": "No active clock-in found"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
         
         try:
             attendance = Attendance.objects.get(
-                employee=request.user.employee,
+                employee=employee,
                 date=today,
                 clock_in__isnull=False,
                 clock_out__isnull=True
             )
         except Attendance.DoesNotExist:
-            return Response(
-                {"error": "No active clock-in found"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        attendance.clock_out = now
-        attendance.clock_out_lat = serializer.validated_data.get('latitude')
-        attendance.clock_out_lng = serializer.validated_data.get('longitude')
+            return no_clock_in
         
+        hours_worked, overtime_hours = hours_and_overtime(
+            company_policy(employee.company_id), attendance.clock_in, now
+        )
+        values = {
+            'clock_out': now,
+            'clock_out_lat': serializer.validated_data.get('latitude'),
+            'clock_out_lng': serializer.validated_data.get('longitude'),
+            'hours_worked': hours_worked,
+            'overtime_hours': overtime_hours,
+            'updated_at': now,
+        }
         if serializer.validated_data.get('notes'):
-            attendance.notes += f"\nClock out: {serializer.validated_data['notes']}"
-        attendance.save()
+            values['notes'] = attendance.notes + f"\nClock out: {serializer.validated_data['notes']}"
         
-        # Calculate hours
-        attendance.calculate_hours()
+        # Conditional, so a concurrent clock-out is not overwritten
+        if not Attendance.objects.filter(pk=attendance.pk, clock_out__isnull=True).update(**values):
+            return no_clock_in
+        for field, value in values.items():
+            setattr(attendance, field, value)
+        attendance.employee = employee
         
-        response_serializer = AttendanceSerializer(attendance)
         return Response({
             "message": "Clocked out successfully",
-            "attendance": response_serializer.data
+            "attendance": clock_response.to_representation(attendance)
         })
     
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def punches(self, request):
+        """
+        Record a batch of clock punches (see attendance.punches).
+
+        The body is a JSON array or an NDJSON stream (application/x-ndjson)
+        of events. HR and admins (e.g. a terminal's account) may punch for
+        anyone in the company; other users only for themselves. Every event
+        gets a result; resending a batch is safe.
+        """
+        from django.conf import settings
+        from .punches import PunchIngester
+
+        user = request.user
+        employee = None
+        if user.role not in ['super_admin', 'company_admin', 'hr_manager']:
+            employee = clock_employee(user)
+            if not employee:
+                return Response(
+                    {"error": "User does not have an employee record"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        events = request.data
+        if not isinstance(events, list):
+            return Response(
+                {"error": "Send a JSON array or NDJSON stream of punch events."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(events) > settings.ATTENDANCE_PUNCH_MAX_EVENTS:
+            return Response(
+                {"error": f"The batch has {len(events)} events; the limit is {settings.ATTENDANCE_PUNCH_MAX_EVENTS}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(PunchIngester(user.company, employee=employee).run(events))
+    
     @action(detail=False, methods=['get'])
     def my_attendance(self, request):
         """Get current user's attendance records"""
@@ -224,6 +315,15 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(attendances, many=True)
         return Response(serializer.data)
     
+    def get_today_status_version(self):
+        employee = getattr(self.request.user, 'employee', None)
+        if employee is None:
+            return None
+        return queryset_version(
+            Attendance.objects.filter(employee=employee, date=date.today()),
+            employee_updated_at=Max('employee__updated_at'),
+        )
+
     @action(detail=False, methods=['get'])
     def today_status(self, request):
         """Get today's attendance status"""
@@ -259,11 +359,10 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         
         today = date.today()
         
-        # Get team members
-        team_members = request.user.employee.subordinates.all()
-        
+        # Everyone reporting to the user, at any level
+        from employees.hierarchy import in_team
         attendances = Attendance.objects.filter(
-            employee__in=team_members,
+            in_team(request.user.employee, include_self=False),
             date=today
         ).select_related('employee')
         
@@ -395,62 +494,29 @@ class AttendanceReportViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['post'])
     def generate(self, request):
         """Generate attendance report for a month"""
-        year = request.data.get('year', date.today().year)
-        month = request.data.get('month', date.today().month)
+        try:
+            year = int(request.data.get('year', date.today().year))
+            month = int(request.data.get('month', date.today().month))
+            date(year, month, 1)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "year and month must form a valid month"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         employee_id = request.data.get('employee_id')
         
+        company = request.user.company
         if employee_id:
-            employees = [request.user.company.employees.get(id=employee_id)]
+            employees = company.employees.filter(id=employee_id)
+            if not employees.exists():
+                return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
         else:
-            employees = request.user.company.employees.filter(employment_status='active')
+            employees = company.employees.filter(employment_status='active')
         
-        reports = []
-        for employee in employees:
-            report, created = AttendanceReport.objects.get_or_create(
-                employee=employee,
-                year=year,
-                month=month
-            )
-            
-            # Calculate statistics
-            attendances = Attendance.objects.filter(
-                employee=employee,
-                date__year=year,
-                date__month=month
-            )
-            
-            report.days_present = attendances.filter(status='present').count()
-            report.days_absent = attendances.filter(status='absent').count()
-            report.days_on_leave = attendances.filter(status='on_leave').count()
-            report.late_arrivals = attendances.filter(is_late=True).count()
-            
-            report.total_hours_worked = attendances.aggregate(
-                total=Sum('hours_worked')
-            )['total'] or 0
-            
-            report.total_overtime_hours = attendances.aggregate(
-                total=Sum('overtime_hours')
-            )['total'] or 0
-            
-            # Calculate working days in month
-            import calendar
-            _, days_in_month = calendar.monthrange(year, month)
-            working_days = 0
-            for day in range(1, days_in_month + 1):
-                dt = date(year, month, day)
-                if dt.weekday() < 5:  # Monday-Friday
-                    working_days += 1
-            
-            report.total_working_days = working_days
-            
-            # Calculate attendance rate
-            if working_days > 0:
-                report.attendance_rate = round(
-                    (report.days_present / working_days) * 100, 2
-                )
-            
-            report.save()
-            reports.append(report)
+        generate_monthly_reports(company, year, month, employees)
         
+        reports = self.get_queryset().filter(
+            employee__in=employees, year=year, month=month
+        ).order_by('employee__first_name', 'employee__last_name')
         serializer = self.get_serializer(reports, many=True)
         return Response(serializer.data)
@@ -0,0 +1,73 @@
+"""
+Company work calendars.
+
+A working day is a weekday listed in the company's AttendancePolicy
+(working_days, e.g. "Monday,Tuesday,...") that is not one of its
+PublicHoliday dates; recurring holidays repeat on the same day every year.
+Months are cached per company; attendance.signals clears a company's
+calendar whenever its policy or holidays change.
+"""
+import calendar
+from datetime import date
+
+from django.db.models import Q
+
+from config.cache import TenantCache
+from leave.models import PublicHoliday
+
+from .models import AttendancePolicy
+
+
+CALENDAR_CACHE_TIMEOUT = 60 * 60 * 24
+DEFAULT_WORKING_DAYS = 'Monday,Tuesday,Wednesday,Thursday,Friday'
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+calendar_cache = TenantCache('work_calendar', timeout=CALENDAR_CACHE_TIMEOUT)
+
+
+def policy_weekdays(working_days):
+    """Weekday numbers (Monday=0) named in AttendancePolicy.working_days"""
+    names = {name.strip().lower()[:3] for name in (working_days or '').split(',') if name.strip()}
+    return {number for number, name in enumerate(WEEKDAYS) if name[:3] in names}
+
+
+def holiday_dates(company_id, year, month):
+    """Public holidays of a company falling in a month"""
+    holidays = PublicHoliday.objects.filter(company_id=company_id).filter(
+        Q(date__year=year, date__month=month) | Q(is_recurring=True, date__month=month)
+    ).values_list('date', 'is_recurring')
+
+    dates = set()
+    for day, is_recurring in holidays:
+        if is_recurring:
+            try:
+                day = day.replace(year=year)
+            except ValueError:
+                continue  # 29 February outside leap years
+        dates.add(day)
+    return dates
+
+
+def compute_working_dates(company_id, year, month):
+    working_days = AttendancePolicy.objects.filter(
+        company_id=company_id
+    ).values_list('working_days', flat=True).first()
+    weekdays = policy_weekdays(working_days or DEFAULT_WORKING_DAYS)
+    holidays = holiday_dates(company_id, year, month)
+
+    _, days_in_month = calendar.monthrange(year, month)
+    return tuple(
+        day for day in (date(year, month, number) for number in range(1, days_in_month + 1))
+        if day.weekday() in weekdays and day not in holidays
+    )
+
+
+def working_dates(company_id, year, month):
+    """Working dates of a company's month, in order (cached)"""
+    return calendar_cache.get_or_set(
+        company_id, f'{year}-{month:02d}', lambda: compute_working_dates(company_id, year, month)
+    )
+
+
+def invalidate_calendar(company_id):
+    calendar_cache.clear(company_id)
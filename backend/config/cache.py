@@ -0,0 +1,263 @@
+"""
+Shared cache layer.
+
+The default cache is picked from CACHE_URL (see cache_settings): redis://
+for a Redis server shared by every worker, file:// or db:// for single-host
+setups without one, locmem:// (one cache per process) otherwise.
+
+Application caches are TenantCache instances, which namespace keys by
+feature and company:
+
+    <namespace>:<company id or "global">:g<company gen>.<namespace gen>:<key>
+
+invalidate_company() bumps a company's generation, dropping everything
+cached for it in every namespace at once; TenantCache.clear() bumps the
+generation of one namespace of a company. Old entries just expire.
+Hits and misses are counted per namespace, buffered in each process and
+added to shared counters every METRICS_FLUSH_EVERY lookups; read them with
+cache_metrics() or the cache_stats command.
+
+ProcessCache keeps per-process copies of values that are too costly to
+rebuild or unpickle on every request (geofence indexes, attendance
+policies), checked against a version stamp in the shared cache.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+from urllib.parse import urlsplit
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.exceptions import ImproperlyConfigured
+
+
+GLOBAL_SCOPE = 'global'
+METRICS_FLUSH_EVERY = 100
+METRICS_INDEX_KEY = 'cache_metrics:namespaces'
+
+_MISSING = object()
+
+
+def cache_settings(url):
+    """CACHES['default'] for a CACHE_URL"""
+    parts = urlsplit(url or 'locmem://')
+    if parts.scheme in ('redis', 'rediss'):
+        backend, location = 'django.core.cache.backends.redis.RedisCache', url
+    elif parts.scheme == 'file':
+        backend, location = 'django.core.cache.backends.filebased.FileBasedCache', parts.path
+    elif parts.scheme == 'db':
+        backend, location = 'django.core.cache.backends.db.DatabaseCache', parts.netloc or 'lifeline_cache'
+    elif parts.scheme == 'locmem':
+        backend, location = 'django.core.cache.backends.locmem.LocMemCache', parts.netloc or 'lifeline'
+    else:
+        raise ImproperlyConfigured(f'Unsupported CACHE_URL scheme: {parts.scheme!r}')
+    return {'BACKEND': backend, 'LOCATION': location, 'KEY_PREFIX': 'lifeline'}
+
+
+def incr(backend, key, delta=1, timeout=None):
+    """Atomically add delta to a counter, creating it (with timeout) if missing"""
+    backend.add(key, 0, timeout)
+    try:
+        return backend.incr(key, delta)
+    except ValueError:
+        # Expired between add() and incr()
+        backend.set(key, delta, timeout)
+        return delta
+
+
+def generation_key(company_id, namespace=None):
+    key = f'cache_generation:{GLOBAL_SCOPE if company_id is None else company_id}'
+    return f'{key}:{namespace}' if namespace else key
+
+
+def generations(*keys, alias='default'):
+    """Current values of generation keys, fetched in one round trip"""
+    backend = caches[alias]
+    values = backend.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        # Start from the clock rather than 1, so a generation that was
+        # evicted never comes back to a number whose entries still exist
+        for key in missing:
+            backend.add(key, time.time_ns() // 1000, None)
+        values.update(backend.get_many(missing))
+    return [values[key] for key in keys]
+
+
+def bump_generation(key, alias='default'):
+    generations(key, alias=alias)
+    incr(caches[alias], key)
+
+
+def invalidate_company(company_id, alias='default'):
+    """Drop everything cached for a company, in every namespace"""
+    bump_generation(generation_key(company_id), alias)
+
+
+class CacheMetrics:
+    """Per-namespace hit/miss counters, buffered in process and summed in the cache"""
+
+    def __init__(self, alias='default', flush_every=METRICS_FLUSH_EVERY):
+        self.alias = alias
+        self.flush_every = flush_every
+        self.pending = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, namespace, hit):
+        with self.lock:
+            self.pending[(namespace, 'hits' if hit else 'misses')] += 1
+            due = sum(self.pending.values()) >= self.flush_every
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+        if not pending:
+            return
+
+        backend = caches[self.alias]
+        for (namespace, outcome), count in pending.items():
+            incr(backend, f'cache_metrics:{namespace}:{outcome}', count)
+
+        # Racing writers may drop a name here; it is added back on their next flush
+        known = set(backend.get(METRICS_INDEX_KEY) or ())
+        namespaces = {namespace for namespace, _ in pending}
+        if not namespaces <= known:
+            backend.set(METRICS_INDEX_KEY, sorted(known | namespaces), None)
+
+    def snapshot(self):
+        """{namespace: {'hits', 'misses', 'hit_rate'}} across all processes"""
+        self.flush()
+        backend = caches[self.alias]
+        namespaces = backend.get(METRICS_INDEX_KEY) or []
+        keys = [f'cache_metrics:{namespace}:{outcome}' for namespace in namespaces for outcome in ('hits', 'misses')]
+        counts = backend.get_many(keys)
+
+        metrics = {}
+        for namespace in namespaces:
+            hits = counts.get(f'cache_metrics:{namespace}:hits', 0)
+            misses = counts.get(f'cache_metrics:{namespace}:misses', 0)
+            lookups = hits + misses
+            metrics[namespace] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / lookups, 3) if lookups else None,
+            }
+        return metrics
+
+    def reset(self):
+        with self.lock:
+            self.pending = Counter()
+        backend = caches[self.alias]
+        namespaces = backend.get(METRICS_INDEX_KEY) or []
+        backend.delete_many(
+            [f'cache_metrics:{namespace}:{outcome}' for namespace in namespaces for outcome in ('hits', 'misses')]
+        )
+
+
+metrics = CacheMetrics()
+
+
+def cache_metrics():
+    """Hit/miss counts of every TenantCache namespace"""
+    return metrics.snapshot()
+
+
+class TenantCache:
+    """
+    Cache of one feature, with keys scoped by company.
+
+    Every method takes the company id first; None is the global scope, for
+    data that belongs to no single company (rate limits, the super admin
+    view).
+    """
+
+    def __init__(self, namespace, timeout=DEFAULT_TIMEOUT, alias='default'):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.alias = alias
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def key(self, company_id, key):
+        scope = GLOBAL_SCOPE if company_id is None else company_id
+        company, namespace = generations(
+            generation_key(company_id), generation_key(company_id, self.namespace), alias=self.alias
+        )
+        return f'{self.namespace}:{scope}:g{company}.{namespace}:{key}'
+
+    def _timeout(self, timeout):
+        return self.timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def get(self, company_id, key, default=None):
+        value = self.backend.get(self.key(company_id, key), _MISSING)
+        metrics.record(self.namespace, value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def set(self, company_id, key, value, timeout=DEFAULT_TIMEOUT):
+        self.backend.set(self.key(company_id, key), value, self._timeout(timeout))
+
+    def get_or_set(self, company_id, key, default, timeout=DEFAULT_TIMEOUT):
+        """Cached value, or default (called if callable) stored and returned"""
+        value = self.get(company_id, key, _MISSING)
+        if value is _MISSING:
+            value = default() if callable(default) else default
+            self.set(company_id, key, value, timeout)
+        return value
+
+    def delete(self, company_id, *keys):
+        self.backend.delete_many([self.key(company_id, key) for key in keys])
+
+    def clear(self, company_id):
+        """Drop every entry of this namespace for a company"""
+        bump_generation(generation_key(company_id, self.namespace), self.alias)
+
+    def incr(self, company_id, key, delta=1, timeout=DEFAULT_TIMEOUT):
+        """Atomic counter; its timeout runs from the first increment"""
+        return incr(self.backend, self.key(company_id, key), delta, self._timeout(timeout))
+
+
+class ProcessCache:
+    """
+    Per-process copies of one value per company, built by build(company_id).
+
+    Each get() reads the company's version stamp from the shared cache and
+    rebuilds the local copy when it changed; invalidate() stamps a new
+    version, so every process rebuilds on its next get(). At most
+    max_entries companies are kept, least recently used dropped first.
+    Values are shared between threads and must be treated as read-only.
+    """
+
+    def __init__(self, namespace, build, max_entries=500, alias='default'):
+        self.versions = TenantCache(namespace, timeout=None, alias=alias)
+        self.build = build
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, company_id):
+        version = self.versions.get(company_id, 'version')
+        if version is None:
+            version = time.time_ns()
+            self.versions.set(company_id, 'version', version)
+
+        with self._lock:
+            cached = self._entries.get(company_id)
+            if cached and cached[0] == version:
+                self._entries.move_to_end(company_id)
+                return cached[1]
+
+        value = self.build(company_id)
+        with self._lock:
+            self._entries[company_id] = (version, value)
+            self._entries.move_to_end(company_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, company_id):
+        """Make every process rebuild the company's value on its next get()"""
+        self.versions.set(company_id, 'version', time.time_ns())
@@ -0,0 +1,113 @@
+"""
+Conditional GET (ETag / Last-Modified) for polled endpoints.
+
+A viewset action opts in by defining get_<action>_version(), which returns
+a (token, last_modified) pair describing the data behind the response:
+usually queryset_version() over the rows it serializes (one aggregate
+query), or the timestamp of a cached payload. The ETag is a hash of that
+token, the requesting user and the URL. A request whose If-None-Match (or
+If-Modified-Since) still matches gets a 304 before the action runs, so
+the full queryset and the serializer are skipped.
+
+Tokens only see the rows they aggregate; include the updated_at of related
+rows a response shows (employee names, leave type names) in the version.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+
+class NotModified(Exception):
+    """Raised once the request's validators match, to skip the action"""
+
+
+def queryset_version(queryset, **aggregates):
+    """
+    Version of the rows of a queryset: their count, highest pk and latest
+    updated_at (when the model has one), plus any extra aggregates such as
+    Max('leave_type__updated_at').
+
+    Returns:
+        Tuple of (token, last_modified), last_modified being the latest
+        datetime among the aggregated values
+    """
+    fields = {'count': Count('pk'), 'last_pk': Max('pk')}
+    if any(field.name == 'updated_at' for field in queryset.model._meta.concrete_fields):
+        fields['updated_at'] = Max('updated_at')
+    fields.update(aggregates)
+
+    values = queryset.order_by().aggregate(**fields)
+    dates = [value for value in values.values() if hasattr(value, 'timestamp')]
+    return tuple(sorted(values.items())), max(dates, default=None)
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin answering If-None-Match / If-Modified-Since with 304.
+
+    Responses of opted-in actions carry ETag, Last-Modified (when known) and
+    Cache-Control: private, no-cache, so browsers revalidate every poll. A
+    version of None means "unknown before running the action" (e.g. a cold
+    cache); it is asked for again afterwards to tag the response.
+    """
+
+    def get_version_method(self):
+        return getattr(self, f'get_{self.action}_version', None)
+
+    def get_version(self):
+        method = self.get_version_method()
+        return method() if method else None
+
+    def get_validators(self):
+        """(ETag, Last-Modified timestamp) of the current request, or None"""
+        version = self.get_version()
+        if version is None:
+            return None
+
+        token, last_modified = version
+        user = self.request.user
+        parts = (token, user.pk, getattr(user, 'role', None), self.request.get_full_path(),
+                 getattr(self.request, 'accepted_media_type', None))
+        etag = 'W/' + quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = None
+        if request.method not in CONDITIONAL_METHODS:
+            return
+
+        self.validators = self.get_validators()
+        if self.validators:
+            etag, last_modified = self.validators
+            conditional = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+            if conditional is not None and conditional.status_code == status.HTTP_304_NOT_MODIFIED:
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in CONDITIONAL_METHODS or self.get_version_method() is None:
+            return response
+        if response.status_code not in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            return response
+
+        validators = getattr(self, 'validators', None) or self.get_validators()
+        if validators:
+            etag, last_modified = validators
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,140 @@
+"""
+Sparse fieldsets for list and detail endpoints.
+
+?fields=id,first_name,department_name limits the response to those
+serializer fields and, where the columns behind them are known, narrows
+the SQL with .only() and drops joins and prefetches nothing asks for.
+
+Columns are worked out from each field's source: model fields, forward
+relations (source='employee.employee_number') and properties of related
+rows (source='employee.full_name' loads that whole row). Fields computed
+on the object itself (SerializerMethodField, model properties) are listed
+in the serializer's Meta.field_columns; when a requested field is not
+covered the response is still trimmed but the query is left as it is.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+FIELDS_PARAM = 'fields'
+
+
+def resolve_source(model, path):
+    """
+    Split a '__' path into (relations, column) for .only().
+
+    column is None when the path ends at a non-field attribute of a related
+    row (the whole row is then needed); returns None when the path cannot
+    be resolved against the model.
+    """
+    parts = path.split('__')
+    relations = []
+    for i, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            # A property or method: fine on a related row, unknown on the model itself
+            return (relations, None) if relations else None
+
+        is_last = i == len(parts) - 1
+        if not field.concrete:
+            return None  # Reverse relations are not joined by .only()
+        if is_last:
+            return relations, path
+        if not (field.many_to_one or field.one_to_one):
+            return None
+        relations.append('__'.join(parts[:i + 1]))
+        model = field.related_model
+    return None
+
+
+def only_columns(serializer, names):
+    """
+    (.only() paths, relations to select_related) covering serializer fields
+    `names`, or None when some field's columns are unknown.
+    """
+    model = serializer.Meta.model
+    declared = getattr(serializer.Meta, 'field_columns', {})
+    columns = {model._meta.pk.name}
+    whole, relations = set(), set()
+
+    for name in names:
+        if name in declared:
+            paths = declared[name]
+        else:
+            field = serializer.fields[name]
+            if field.source == '*':
+                return None
+            paths = ['__'.join(field.source_attrs)]
+
+        for path in paths:
+            resolved = resolve_source(model, path)
+            if resolved is None:
+                return None
+            path_relations, column = resolved
+            relations.update(path_relations)
+            if column is None:
+                whole.add(path_relations[-1])
+            else:
+                columns.add(column)
+
+    # Load the relations themselves; a relation needed whole keeps all its columns
+    columns.update(relations)
+    columns = {
+        column for column in columns
+        if not any(column.startswith(f'{relation}__') for relation in whole)
+    }
+    return sorted(columns), sorted(relations)
+
+
+class SparseFieldsetMixin:
+    """
+    ViewSet mixin answering ?fields= on list and retrieve.
+
+    Unknown field names are rejected with a 400. Columns the pagination
+    needs (the view's cursor_ordering) are always loaded.
+    """
+    sparse_actions = ['list', 'retrieve']
+
+    def get_sparse_fields(self):
+        """Requested field names, or None when ?fields= is absent or not applicable"""
+        if self.action not in self.sparse_actions:
+            return None
+        value = self.request.query_params.get(FIELDS_PARAM)
+        if not value:
+            return None
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def check_sparse_fields(self, names, fields):
+        unknown = [name for name in names if name not in fields]
+        if unknown:
+            raise ValidationError({FIELDS_PARAM: f"Unknown field(s): {', '.join(unknown)}"})
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        names = self.get_sparse_fields()
+        if names is not None:
+            fields = getattr(serializer, 'child', serializer).fields
+            self.check_sparse_fields(names, fields)
+            for name in set(fields) - set(names):
+                fields.pop(name)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        names = self.get_sparse_fields()
+        if names is None:
+            return queryset
+
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        self.check_sparse_fields(names, serializer.fields)
+        narrowed = only_columns(serializer, names)
+        if narrowed is None:
+            return queryset
+
+        columns, relations = narrowed
+        ordering = [field.lstrip('-') for field in getattr(self, 'cursor_ordering', ())]
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        return queryset.only(*columns, *ordering)
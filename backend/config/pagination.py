@@ -0,0 +1,58 @@
+"""
+Pagination for list endpoints.
+
+Page numbers stay the default (?page=, with a total count). Sending
+?cursor= (empty for the first page) switches a request to keyset
+pagination: pages are read with WHERE <key> > <last seen> on the view's
+cursor_ordering instead of COUNT(*) plus an OFFSET scan, so deep pages
+cost the same as the first. Cursor responses carry next/previous links
+but no count. Both modes accept ?page_size= (up to MAX_PAGE_SIZE).
+"""
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+MAX_PAGE_SIZE = 100
+
+
+class KeysetPagination(CursorPagination):
+    """
+    CursorPagination ordered by the view's cursor_ordering.
+
+    The first field should be unique (or close to it) and indexed; the
+    ?ordering= parameter is ignored in cursor mode.
+    """
+    ordering = ('-pk',)
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(getattr(view, 'cursor_ordering', self.ordering))
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """Page numbers unless the request opts into cursor pagination with ?cursor="""
+    cursor_query_param = KeysetPagination.cursor_query_param
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor = KeysetPagination()
+            return self.cursor.paginate_queryset(queryset, request, view)
+        self.cursor = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.cursor is not None:
+            return self.cursor.get_html_context()
+        return super().get_html_context()
+
+    def to_html(self):
+        if self.cursor is not None:
+            return self.cursor.to_html()
+        return super().to_html()
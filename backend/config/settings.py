@@ -302,6 +302,16 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'Lifeline HR <noreply@lifeline.com>')
 
+# Bulk payslip emails: messages sent per SMTP connection, and max messages per second (0 = unthrottled)
+PAYSLIP_EMAIL_BATCH_SIZE = int(os.getenv('PAYSLIP_EMAIL_BATCH_SIZE', 50))
+PAYSLIP_EMAIL_RATE = float(os.getenv('PAYSLIP_EMAIL_RATE', 5))
+
+# Bulk employee import: max data rows per uploaded file
+EMPLOYEE_IMPORT_MAX_ROWS = int(os.getenv('EMPLOYEE_IMPORT_MAX_ROWS', 5000))
+
+# Batch clock punches (terminals, offline apps): max events per request
+ATTENDANCE_PUNCH_MAX_EVENTS = int(os.getenv('ATTENDANCE_PUNCH_MAX_EVENTS', 5000))
+
 
 
 # Validated settings for production compliance - Email Config Updated
@@ -317,10 +327,12 @@ if not DEBUG:
     SECURE_HSTS_INCLUDE_SUBDOMAINS = True
     SECURE_HSTS_PRELOAD = True
 
-# Caching (Required for Rate Limiting)
+# Caching (rate limiting, dashboard stats; see config.cache)
+# CACHE_URL=redis://host:6379/0 shares the cache between workers (needs the
+# redis package); file:///var/tmp/lifeline-cache or db://lifeline_cache (after
+# manage.py createcachetable) suit single-host setups; locmem:// is per process.
+from config.cache import cache_settings
+
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
+    'default': cache_settings(os.getenv('CACHE_URL', 'locmem://')),
 }
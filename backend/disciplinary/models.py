@@ -39,8 +39,10 @@ class DisciplinaryAction(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.case_id:
-            import uuid
-            self.case_id = f"DSC-{uuid.uuid4().hex[:8].upper()}"
+            from accounts.services.sequence_service import SequenceService
+            # Numbered per company; the company id keeps case IDs globally unique
+            number = SequenceService.allocate(self.company_id, 'disciplinary_case')[0]
+            self.case_id = f"DSC-{self.company_id}-{number:05d}"
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -33,10 +33,8 @@ class DisciplinaryActionViewSet(viewsets.ModelViewSet):
                 queryset = queryset.none()
         elif user.role == 'manager':
              if hasattr(user, 'employee') and user.employee:
-                from django.db.models import Q
-                queryset = queryset.filter(
-                    Q(employee=user.employee) | Q(employee__manager=user.employee)
-                )
+                from employees.hierarchy import in_team
+                queryset = queryset.filter(in_team(user.employee))
         
         return queryset
 
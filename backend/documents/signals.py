@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.services.counter_service import CounterService
+from employees.models import Employee
+
+from .models import Document, EmployeeDocument
+
+
+def company_id_of(instance):
+    if isinstance(instance, Document):
+        return instance.company_id
+    return Employee.objects.filter(pk=instance.employee_id).values_list('company_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Document)
+@receiver(pre_save, sender=EmployeeDocument)
+def remember_file_size(sender, instance, **kwargs):
+    """Stored size of an edited document, so only the difference is counted"""
+    if instance.pk is not None and not instance._state.adding:
+        instance._stored_file_size = sender.objects.filter(pk=instance.pk).values_list('file_size', flat=True).first() or 0
+
+
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=EmployeeDocument)
+def count_document_bytes(sender, instance, created, **kwargs):
+    """Keep CompanyCounters.storage_bytes in step with uploads"""
+    previous = 0 if created else getattr(instance, '_stored_file_size', 0)
+    CounterService.adjust(company_id_of(instance), storage_bytes=(instance.file_size or 0) - previous)
+
+
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=EmployeeDocument)
+def uncount_document_bytes(sender, instance, **kwargs):
+    CounterService.adjust(company_id_of(instance), storage_bytes=-(instance.file_size or 0))
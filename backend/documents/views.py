@@ -51,13 +51,10 @@ class DocumentViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def storage_stats(self, request):
-        from django.db.models import Sum
-        user = request.user
-        
-        company_docs_size = Document.objects.filter(company=user.company).aggregate(total=Sum('file_size'))['total'] or 0
-        emp_docs_size = EmployeeDocument.objects.filter(employee__company=user.company).aggregate(total=Sum('file_size'))['total'] or 0
-        
-        total_used = company_docs_size + emp_docs_size
+        from accounts.services.counter_service import CounterService
+
+        # Company and employee document bytes, kept in CompanyCounters
+        total_used = CounterService.get(request.user.company).storage_bytes
         limit = 5 * 1024 * 1024 * 1024 # 5GB Beta Limit
         
         return Response({
@@ -0,0 +1,183 @@
+"""
+Reporting hierarchy (Employee.manager) as a closure table.
+
+EmployeeHierarchy holds one row per (ancestor, descendant) pair, including
+each employee with itself at depth 0, so "everyone under this manager" is
+a single indexed lookup at any depth. Employee.save keeps the table in
+sync when an employee is created or changes manager, and the pre_delete
+receiver in employees.signals detaches a deleted employee's reports.
+Bulk writes (bulk_create, QuerySet.update) must call add_employees /
+move themselves, or rebuild() afterwards.
+"""
+from collections import defaultdict
+
+from django.db.models import F, Q
+
+from .models import Employee, EmployeeHierarchy
+
+
+def team_ids(manager, include_self=True):
+    """Subquery of the ids of everyone reporting to manager, directly or not"""
+    links = EmployeeHierarchy.objects.filter(ancestor=manager)
+    if not include_self:
+        links = links.filter(depth__gt=0)
+    return links.values('descendant_id')
+
+
+def in_team(manager, field='employee', include_self=True):
+    """
+    Q limiting a queryset to manager's team.
+
+    field is the path to the Employee being scoped ('employee' for records
+    that belong to an employee, 'id' for Employee querysets).
+    """
+    return Q(**{f'{field}__in': team_ids(manager, include_self=include_self)})
+
+
+def subtree(manager, include_self=False, max_depth=None):
+    """Employees under manager, annotated with their depth below them"""
+    links = Q(ancestor_links__ancestor=manager)
+    if not include_self:
+        links &= Q(ancestor_links__depth__gt=0)
+    if max_depth is not None:
+        links &= Q(ancestor_links__depth__lte=max_depth)
+    return Employee.objects.filter(links).annotate(depth=F('ancestor_links__depth'))
+
+
+def is_in_team(manager, employee, include_self=True):
+    """Whether employee reports to manager at any level (or is manager)"""
+    links = EmployeeHierarchy.objects.filter(ancestor=manager, descendant=employee)
+    if not include_self:
+        links = links.filter(depth__gt=0)
+    return links.exists()
+
+
+def add_employees(employees):
+    """
+    Links for newly created employees (which have no reports yet).
+
+    Employees are processed in order, so one may report to another created
+    earlier in the same batch.
+    """
+    employees = list(employees)
+    manager_ids = {e.manager_id for e in employees if e.manager_id}
+    ancestors = defaultdict(list)
+    for descendant_id, ancestor_id, depth in EmployeeHierarchy.objects.filter(
+        descendant_id__in=manager_ids
+    ).values_list('descendant_id', 'ancestor_id', 'depth'):
+        ancestors[descendant_id].append((ancestor_id, depth))
+
+    links = []
+    for employee in employees:
+        own = [(employee.pk, 0)]
+        if employee.manager_id:
+            own += [(ancestor_id, depth + 1) for ancestor_id, depth in ancestors[employee.manager_id]]
+        ancestors[employee.pk] = own
+        links += [
+            EmployeeHierarchy(ancestor_id=ancestor_id, descendant_id=employee.pk, depth=depth)
+            for ancestor_id, depth in own
+        ]
+    EmployeeHierarchy.objects.bulk_create(links, batch_size=1000)
+
+
+def detach(employee):
+    """Cut employee's subtree off from everyone above them"""
+    below = EmployeeHierarchy.objects.filter(ancestor=employee).values('descendant_id')
+    EmployeeHierarchy.objects.filter(descendant_id__in=below).exclude(ancestor_id__in=below).delete()
+
+
+def move(employee):
+    """Re-attach employee's subtree under their current manager"""
+    current = EmployeeHierarchy.objects.filter(descendant=employee, depth=1).values_list('ancestor_id', flat=True).first()
+    if current == employee.manager_id:
+        return
+
+    if not EmployeeHierarchy.objects.filter(ancestor=employee, descendant=employee).exists():
+        # Employee created before the hierarchy existed
+        add_employees([employee])
+        return
+
+    detach(employee)
+    if employee.manager_id is None:
+        return
+
+    above = list(EmployeeHierarchy.objects.filter(descendant_id=employee.manager_id).values_list('ancestor_id', 'depth'))
+    below = list(EmployeeHierarchy.objects.filter(ancestor=employee).values_list('descendant_id', 'depth'))
+    EmployeeHierarchy.objects.bulk_create([
+        EmployeeHierarchy(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=up + down + 1)
+        for ancestor_id, up in above
+        for descendant_id, down in below
+    ], batch_size=1000)
+
+
+def closure_links(edges):
+    """
+    (ancestor, descendant, depth) triples for (employee id, manager id) pairs.
+
+    Employees caught in a manager cycle only get their own depth-0 link.
+    """
+    edges = list(edges)
+    children = defaultdict(list)
+    ids = []
+    for employee_id, manager_id in edges:
+        ids.append(employee_id)
+        children[manager_id].append(employee_id)
+
+    known = set(ids)
+    links = [(employee_id, employee_id, 0) for employee_id in ids]
+    # Walk down from the roots, carrying each node's ancestor chain
+    stack = [(root, []) for root in children[None]]
+    stack += [(e, []) for e, m in edges if m is not None and m not in known]
+    while stack:
+        node, chain = stack.pop()
+        links += [(ancestor, node, len(chain) - i) for i, ancestor in enumerate(chain)]
+        stack += [(child, chain + [node]) for child in children[node]]
+    return links
+
+
+def rebuild(company=None):
+    """Recompute the closure table from Employee.manager (for one company or all)"""
+    employees = Employee.objects.all()
+    if company is not None:
+        employees = employees.filter(company=company)
+
+    EmployeeHierarchy.objects.filter(descendant__in=employees.values('id')).delete()
+    links = closure_links(employees.values_list('id', 'manager_id'))
+    EmployeeHierarchy.objects.bulk_create([
+        EmployeeHierarchy(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth)
+        for ancestor_id, descendant_id, depth in links
+    ], batch_size=1000)
+    return len(links)
+
+
+def org_chart(employees, root=None):
+    """
+    Nested org chart of an Employee queryset, read with one query.
+
+    Returns the top-level nodes (employees whose manager is not in the
+    queryset, or root when given); each node lists its reports under
+    "subordinates".
+    """
+    if root is not None:
+        employees = employees.filter(ancestor_links__ancestor=root)
+
+    storage = Employee._meta.get_field('photo').storage
+    nodes = {}
+    for record in employees.order_by('last_name', 'first_name').values(
+        'id', 'employee_number', 'first_name', 'last_name', 'job_title',
+        'photo', 'manager_id', 'department__name', 'employment_status'
+    ):
+        record['department_name'] = record.pop('department__name')
+        record['manager'] = record.pop('manager_id')
+        record['photo'] = storage.url(record['photo']) if record['photo'] else None
+        record['subordinates'] = []
+        nodes[record['id']] = record
+
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['manager'])
+        if parent is None:
+            roots.append(node)
+        else:
+            parent['subordinates'].append(node)
+    return roots
@@ -0,0 +1,549 @@
+"""
+Bulk employee import from CSV or XLSX files.
+
+Every row is validated in memory against sets loaded up front (departments,
+managers, and the emails, national IDs and usernames already taken), so the
+number of queries does not grow with the file. Valid rows are then created
+in one transaction: employee numbers are allocated as a block and employees,
+user accounts and salary structures are each written with one bulk_create
+(plus their reporting-hierarchy links and directory search documents).
+Invalid rows are skipped and reported back with their row number.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from xml.etree.ElementTree import iterparse
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from . import hierarchy, search
+from .models import Department, Employee
+
+
+class ImportFileError(Exception):
+    """Raised when an uploaded file cannot be read"""
+
+
+# Normalized column header -> employee field (headers are lowercased, with
+# everything but letters and digits collapsed to "_", so "First Name*" and
+# "first_name" are the same column)
+COLUMN_ALIASES = {
+    'first_name': ['first_name'],
+    'middle_name': ['middle_name'],
+    'last_name': ['last_name'],
+    'email': ['email', 'email_address'],
+    'phone': ['phone', 'telephone', 'contact'],
+    'date_of_birth': ['date_of_birth', 'dob', 'birth_date'],
+    'gender': ['gender'],
+    'marital_status': ['marital_status'],
+    'job_title': ['job_title', 'designation', 'position'],
+    'department': ['department', 'dept'],
+    'manager_email': ['manager_email'],
+    'employment_type': ['employment_type'],
+    'employment_status': ['employment_status'],
+    'join_date': ['join_date', 'hire_date', 'start_date'],
+    'probation_end_date': ['probation_end_date'],
+    'create_user': ['create_user_account_yes_no', 'create_user'],
+    'username': ['username'],
+    'password': ['password'],
+    'role': ['access_role', 'role'],
+    'national_id': ['national_id', 'nin'],
+    'passport_number': ['passport_number'],
+    'tin_number': ['tin_number', 'tin'],
+    'nssf_number': ['nssf_number', 'nssf'],
+    'bank_name': ['bank_name', 'bank'],
+    'bank_account_number': ['bank_account_number', 'account_number'],
+    'bank_branch': ['bank_branch'],
+    'mobile_money_number': ['mobile_money_number', 'momo'],
+    'address': ['address'],
+    'city': ['city'],
+    'district': ['district'],
+    'emergency_contact_name': ['emergency_contact_name'],
+    'emergency_contact_phone': ['emergency_contact_phone'],
+    'emergency_contact_relationship': ['emergency_contact_relationship'],
+    'notes': ['notes'],
+    'basic_salary': ['basic_salary', 'salary'],
+    'housing_allowance': ['housing_allowance'],
+    'transport_allowance': ['transport_allowance'],
+    'medical_allowance': ['medical_allowance'],
+    'lunch_allowance': ['lunch_allowance'],
+    'other_allowances': ['other_allowances'],
+}
+
+SALARY_FIELDS = [
+    'basic_salary', 'housing_allowance', 'transport_allowance',
+    'medical_allowance', 'lunch_allowance', 'other_allowances',
+]
+
+# Fields copied as-is onto the Employee
+TEXT_FIELDS = [
+    'first_name', 'middle_name', 'last_name', 'phone', 'job_title',
+    'national_id', 'passport_number', 'tin_number', 'nssf_number',
+    'bank_name', 'bank_account_number', 'bank_branch', 'mobile_money_number',
+    'address', 'city', 'district', 'emergency_contact_name',
+    'emergency_contact_phone', 'emergency_contact_relationship', 'notes',
+]
+
+# Free-text values -> choice keys: first keyword contained in the value wins
+CHOICE_KEYWORDS = {
+    'employment_type': ([('full', 'full_time'), ('part', 'part_time'), ('contract', 'contract'),
+                         ('intern', 'intern'), ('casual', 'casual')], 'full_time'),
+    'employment_status': ([('active', 'active'), ('leave', 'on_leave'), ('suspend', 'suspended'),
+                           ('terminat', 'terminated'), ('resign', 'resigned')], 'active'),
+    'marital_status': ([('single', 'single'), ('marri', 'married'), ('divorc', 'divorced'),
+                        ('widow', 'widowed')], 'single'),
+    'role': ([('hr', 'hr_manager'), ('admin', 'hr_manager'), ('manage', 'manager')], 'employee'),
+}
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%m/%d/%Y']
+
+# Day 0 of Excel's serial dates (1899-12-30 accounts for the 1900 leap year bug)
+EXCEL_EPOCH = date(1899, 12, 30)
+
+# Serials are at most five digits (99999 is in 2173); longer numbers are not Excel dates
+EXCEL_SERIAL = re.compile(r'\d{1,5}(\.\d+)?')
+
+_XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+
+
+def normalize_header(header):
+    return re.sub(r'[^a-z0-9]+', '_', str(header or '').lower()).strip('_')
+
+
+def _column_index(ref):
+    """Zero-based column of a cell reference such as "AB12" """
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+def _number_text(value):
+    """Numeric cell text without a trailing .0 (phone numbers are often stored as numbers)"""
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    if number.is_integer():
+        return str(int(number))
+    return value
+
+
+def read_xlsx_rows(data):
+    """Rows (lists of strings) of the first worksheet of an XLSX file"""
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile:
+        raise ImportFileError("The file is not a valid XLSX workbook.")
+
+    with archive:
+        names = set(archive.namelist())
+
+        # Locate the first sheet through the workbook relationships
+        sheet_path = 'xl/worksheets/sheet1.xml'
+        if 'xl/workbook.xml' in names and 'xl/_rels/workbook.xml.rels' in names:
+            with archive.open('xl/workbook.xml') as f:
+                first_sheet = next(
+                    (el for _, el in iterparse(f) if el.tag == f'{_XLSX_NS}sheet'), None
+                )
+            if first_sheet is not None:
+                rel_id = first_sheet.get(f'{_REL_NS}id')
+                with archive.open('xl/_rels/workbook.xml.rels') as f:
+                    for _, el in iterparse(f):
+                        if el.tag.endswith('Relationship') and el.get('Id') == rel_id:
+                            target = el.get('Target').lstrip('/')
+                            sheet_path = target if target.startswith('xl/') else f'xl/{target}'
+        if sheet_path not in names:
+            raise ImportFileError("The workbook has no worksheet.")
+
+        shared_strings = []
+        if 'xl/sharedStrings.xml' in names:
+            with archive.open('xl/sharedStrings.xml') as f:
+                for _, el in iterparse(f):
+                    if el.tag == f'{_XLSX_NS}si':
+                        shared_strings.append(''.join(t.text or '' for t in el.iter(f'{_XLSX_NS}t')))
+                        el.clear()
+
+        rows = []
+        with archive.open(sheet_path) as f:
+            for _, el in iterparse(f):
+                if el.tag != f'{_XLSX_NS}row':
+                    continue
+                row_number = int(el.get('r', len(rows) + 1))
+                while len(rows) < row_number - 1:
+                    rows.append([])  # empty rows are left out of the sheet XML
+
+                row = []
+                for cell in el.iter(f'{_XLSX_NS}c'):
+                    column = _column_index(cell.get('r', '')) if cell.get('r') else len(row)
+                    cell_type = cell.get('t')
+                    if cell_type == 'inlineStr':
+                        value = ''.join(t.text or '' for t in cell.iter(f'{_XLSX_NS}t'))
+                    else:
+                        v = cell.find(f'{_XLSX_NS}v')
+                        value = v.text if v is not None and v.text is not None else ''
+                        if cell_type == 's' and value:
+                            value = shared_strings[int(value)]
+                        elif cell_type in (None, 'n') and value:
+                            value = _number_text(value)
+                    row.extend([''] * (column - len(row)))
+                    row.append(value)
+                rows.append(row)
+                el.clear()
+        return rows
+
+
+def read_csv_rows(data):
+    """Rows (lists of strings) of a CSV file"""
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode('latin-1')
+    return list(csv.reader(io.StringIO(text)))
+
+
+def read_rows(upload):
+    """
+    Data rows of an uploaded file as (row number, {field: value}) pairs.
+
+    The first row holds the headers; blank rows are dropped but keep their
+    place in the numbering so errors point at the right spreadsheet line.
+    """
+    data = upload.read()
+    name = (getattr(upload, 'name', '') or '').lower()
+    if name.endswith('.csv'):
+        rows = read_csv_rows(data)
+    elif name.endswith(('.xlsx', '.xlsm')) or data[:2] == b'PK':
+        rows = read_xlsx_rows(data)
+    else:
+        rows = read_csv_rows(data)
+
+    if not rows:
+        raise ImportFileError("The file is empty.")
+
+    aliases = {alias: field for field, names in COLUMN_ALIASES.items() for alias in names}
+    columns = [aliases.get(normalize_header(header)) for header in rows[0]]
+    if 'email' not in columns:
+        raise ImportFileError("The file has no Email column.")
+
+    records = []
+    for number, row in enumerate(rows[1:], start=2):
+        record = {}
+        for field, value in zip(columns, row):
+            if field and field not in record:
+                record[field] = (value or '').strip()
+        if any(record.values()):
+            records.append((number, record))
+    return records
+
+
+def parse_date(value):
+    """ISO / day-first / YYYYMMDD date or an Excel serial number; None when blank"""
+    if not value:
+        return None
+    if EXCEL_SERIAL.fullmatch(value):
+        return EXCEL_EPOCH + timedelta(days=int(float(value)))
+    date_formats = ['%Y%m%d'] if re.fullmatch(r'\d{8}', value) else DATE_FORMATS
+    for date_format in date_formats:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date '{value}'. Use YYYY-MM-DD.")
+
+
+def parse_amount(value):
+    if not value:
+        return Decimal('0')
+    try:
+        amount = Decimal(value.replace(',', ''))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount '{value}'.")
+    if amount < 0:
+        raise ValueError("Amount cannot be negative.")
+    return amount
+
+
+def choice(field, value):
+    keywords, default = CHOICE_KEYWORDS[field]
+    value = value.lower()
+    for keyword, key in keywords:
+        if keyword in value:
+            return key
+    return default
+
+
+def gender(value):
+    value = value.lower()
+    if value in ('m', 'male'):
+        return 'male'
+    if value in ('f', 'female'):
+        return 'female'
+    return 'other'
+
+
+class EmployeeImporter:
+    """
+    Validates and creates the employees of one import.
+
+    Usage:
+        result = EmployeeImporter(company, created_by=user).run(read_rows(upload))
+    """
+
+    def __init__(self, company, created_by=None, department=None):
+        self.company = company
+        self.created_by = created_by
+        # Department applied to every row (overrides the Department column)
+        self.department = department
+
+    def load_lookups(self, records):
+        """Everything row validation needs, in a fixed number of queries"""
+        from accounts.models import User
+
+        emails = {record.get('email', '').lower() for _, record in records} - {''}
+        national_ids = {record.get('national_id', '') for _, record in records} - {''}
+        usernames = {record.get('username') or record.get('email', '').lower() for _, record in records} - {''}
+        manager_emails = {record.get('manager_email', '').lower() for _, record in records} - {''}
+
+        company_employees = Employee.objects.filter(company=self.company).alias(email_lower=Lower('email'))
+        company_users = User.objects.filter(company=self.company).alias(email_lower=Lower('email'))
+        self.departments = list(Department.objects.filter(company=self.company).only('id', 'name'))
+        self.department_names = {d.name.lower(): d for d in self.departments}
+        # Emails are compared lowercased on both sides
+        self.taken_emails = {
+            e.lower() for e in company_employees.filter(email_lower__in=emails).values_list('email', flat=True)
+        } | {e.lower() for e in company_users.filter(email_lower__in=emails).values_list('email', flat=True)}
+        self.taken_national_ids = set(
+            company_employees.filter(national_id__in=national_ids).values_list('national_id', flat=True)
+        )
+        self.taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        self.managers = {
+            e.email.lower(): e for e in company_employees.filter(email_lower__in=manager_emails).only('id', 'email')
+        }
+
+    def find_department(self, name):
+        """Exact (case-insensitive) department name, else the first partial match"""
+        name = name.lower()
+        if name in self.department_names:
+            return self.department_names[name]
+        return next((d for d in self.departments if name in d.name.lower()), None)
+
+    def build(self, record, index):
+        """
+        Employee, user and salary data for a row.
+
+        Returns:
+            Tuple of (Employee, user fields or None, salary fields or None)
+
+        Raises:
+            ValidationError with a field -> messages dict
+        """
+        errors = {}
+
+        def error(field, message):
+            errors.setdefault(field, []).append(message)
+
+        email = record.get('email', '').lower()
+        if not record.get('first_name'):
+            error('first_name', "First name is required.")
+        if not record.get('last_name'):
+            error('last_name', "Last name is required.")
+        if not email:
+            error('email', "Email is required.")
+        else:
+            try:
+                validate_email(email)
+            except ValidationError:
+                error('email', "Enter a valid email address.")
+            if email in self.taken_emails:
+                error('email', "An employee or user account with this email already exists in your company.")
+
+        national_id = record.get('national_id', '')
+        if national_id and national_id in self.taken_national_ids:
+            error('national_id', "An employee with this national ID already exists in your company.")
+
+        employee = Employee(company=self.company, email=email)
+        for field in TEXT_FIELDS:
+            setattr(employee, field, record.get(field, ''))
+        employee.gender = gender(record.get('gender', ''))
+        for field in ['employment_type', 'employment_status', 'marital_status']:
+            setattr(employee, field, choice(field, record.get(field, '')))
+
+        for field in ['date_of_birth', 'join_date', 'probation_end_date']:
+            try:
+                setattr(employee, field, parse_date(record.get(field, '')))
+            except ValueError as e:
+                error(field, str(e))
+
+        department = self.department
+        if department is None and record.get('department'):
+            department = self.find_department(record['department'])
+            if department is None:
+                available = ', '.join(d.name for d in self.departments) or 'None'
+                error('department', f"Department '{record['department']}' not found. Available departments: {available}")
+        employee.department = department
+
+        manager_email = record.get('manager_email', '').lower()
+        if manager_email:
+            employee.manager = self.managers.get(manager_email)
+            if employee.manager is None:
+                error('manager_email', f"No employee with email '{manager_email}' in your company.")
+
+        # Defaults for optional columns (same as EmployeeCreateSerializer)
+        employee.date_of_birth = employee.date_of_birth or date(1990, 1, 1)
+        employee.national_id = employee.national_id or f"TEMP-{timezone.now().timestamp()}-{index}"
+        employee.phone = employee.phone or '0000000000'
+        employee.job_title = employee.job_title or 'Employee'
+        employee.join_date = employee.join_date or timezone.now().date()
+
+        try:
+            employee.clean_fields(exclude=['company', 'department', 'manager', 'employee_number'])
+        except ValidationError as e:
+            for field, messages in e.message_dict.items():
+                for message in messages:
+                    error(field, message)
+
+        user = None
+        if record.get('create_user', '').lower() in ('y', 'yes', 'true', '1'):
+            username = record.get('username') or email
+            if username in self.taken_usernames:
+                error('username', "This username is already taken.")
+            user = {
+                'username': username,
+                'password': record.get('password') or get_random_string(length=10),
+                'role': choice('role', record.get('role', '')),
+            }
+
+        salary = None
+        try:
+            amounts = {field: parse_amount(record.get(field, '')) for field in SALARY_FIELDS}
+            if amounts['basic_salary'] > 0:
+                salary = amounts
+        except ValueError as e:
+            error('basic_salary', str(e))
+
+        if errors:
+            raise ValidationError(errors)
+
+        # Later rows of the same file may not reuse these
+        self.taken_emails.add(email)
+        if national_id:
+            self.taken_national_ids.add(national_id)
+        if user:
+            self.taken_usernames.add(user['username'])
+        return employee, user, salary
+
+    def run(self, records):
+        """
+        Validate all rows, then create the valid ones in one transaction.
+
+        Returns:
+            dict with total/created/failed counts, the created employees and
+            a per-row error report
+        """
+        self.load_lookups(records)
+
+        valid, errors = [], []
+        for index, (row, record) in enumerate(records):
+            try:
+                valid.append((row, *self.build(record, index)))
+            except ValidationError as e:
+                errors.append({
+                    'row': row,
+                    'name': f"{record.get('first_name', '')} {record.get('last_name', '')}".strip(),
+                    'errors': e.message_dict,
+                })
+
+        created = self.create(valid) if valid else []
+        return {
+            'total': len(records),
+            'created': len(created),
+            'failed': len(errors),
+            'employees': created,
+            'errors': errors,
+        }
+
+    def create(self, valid):
+        from accounts.models import User
+        from accounts.services.counter_service import CounterService
+        from config.cache import invalidate_company
+        from payroll.models import SalaryStructure
+        from .stats import invalidate_stats
+
+        with transaction.atomic():
+            numbers = Employee.allocate_employee_numbers(self.company, len(valid))
+            employees = []
+            for number, (_, employee, _, _) in zip(numbers, valid):
+                employee.employee_number = number
+                employee.update_month_days()
+                employees.append(employee)
+            Employee.objects.bulk_create(employees, batch_size=500)
+            hierarchy.add_employees(employees)
+            search.index_employees([employee.pk for employee in employees])
+
+            users, welcome = [], []
+            for _, employee, user, _ in valid:
+                if user is None:
+                    continue
+                users.append(User(
+                    username=user['username'],
+                    email=employee.email,
+                    password=make_password(user['password']),
+                    company=self.company,
+                    role=user['role'],
+                    first_name=employee.first_name,
+                    last_name=employee.last_name,
+                    employee=employee,
+                    phone=employee.phone,
+                ))
+                welcome.append((employee, user['password'], user['username']))
+            User.objects.bulk_create(users, batch_size=500)
+
+            salaries = []
+            for _, employee, _, salary in valid:
+                if salary is None:
+                    continue
+                salaries.append(SalaryStructure(
+                    employee=employee,
+                    company=self.company,
+                    gross_salary=sum(salary.values()),
+                    effective_date=employee.join_date,
+                    created_by=self.created_by,
+                    **salary
+                ))
+            SalaryStructure.objects.bulk_create(salaries, batch_size=500)
+
+            # bulk_create skips the post_save signals that keep counters and caches current
+            CounterService.adjust(
+                self.company,
+                active_employees=sum(employee.employment_status == 'active' for employee in employees),
+                users=len(users),
+            )
+            transaction.on_commit(lambda: invalidate_company(self.company.id))
+            transaction.on_commit(lambda: invalidate_stats(None))
+            transaction.on_commit(lambda: self.send_welcome_emails(welcome))
+
+        return [
+            {'row': row, 'id': employee.id, 'employee_number': employee.employee_number, 'name': employee.full_name}
+            for row, employee, _, _ in valid
+        ]
+
+    @staticmethod
+    def send_welcome_emails(welcome):
+        """Welcome emails with login credentials, as (employee, password, username) tuples"""
+        from .utils import send_welcome_email
+
+        for employee, password, username in welcome:
+            send_welcome_email(employee, password, username=username)
@@ -0,0 +1,94 @@
+"""
+Management command to benchmark the employee directory typeahead.
+Run with: python manage.py benchmark_directory_search --employees 50000
+
+Sample data is created inside a transaction that is rolled back afterwards.
+"""
+import random
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Company
+from employees import search
+from employees.models import Department, Employee
+
+
+FIRST_NAMES = ['Aisha', 'Brian', 'Catherine', 'David', 'Esther', 'Francis', 'Grace', 'Hassan', 'Irene', 'Joseph',
+               'Kevin', 'Lydia', 'Moses', 'Naomi', 'Oscar', 'Patience', 'Ronald', 'Sarah', 'Timothy', 'Winnie']
+LAST_NAMES = ['Okello', 'Namubiru', 'Mugisha', 'Atim', 'Kato', 'Nakato', 'Ssempala', 'Achieng', 'Byaruhanga',
+              'Nansubuga', 'Odongo', 'Kyomuhendo', 'Wasswa', 'Akello', 'Tumusiime']
+JOB_TITLES = ['Accountant', 'Engineer', 'Sales Officer', 'Driver', 'Nurse', 'Teacher', 'Cashier', 'Analyst']
+
+QUERIES = ['a', 'jo', 'sar', 'grace', 'okel', 'nak', 'eng', 'sales off', 'emp0123', 'finance ka', 'zzz']
+
+# Target latency of one typeahead request (database part)
+TARGET_MS = 50
+
+
+class Command(BaseCommand):
+    help = 'Measure directory typeahead latency over a generated company'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employees',
+            type=int,
+            default=50000,
+            help='Number of employees in the sample company (default: 50000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Timed runs per query (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            company = self._sample_company(options['employees'])
+            employees = Employee.objects.filter(company=company)
+
+            worst = 0
+            for query in QUERIES:
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    results = search.typeahead(employees, query)
+                    timings.append((time.perf_counter() - start) * 1000)
+                worst = max(worst, max(timings))
+                self.stdout.write(
+                    f'{query!r:14} {len(results):3} results  '
+                    f'median {statistics.median(timings):6.1f} ms  max {max(timings):6.1f} ms'
+                )
+
+            if worst <= TARGET_MS:
+                self.stdout.write(self.style.SUCCESS(f'All typeahead queries under {TARGET_MS} ms'))
+            else:
+                self.stdout.write(self.style.WARNING(f'Slowest typeahead query took {worst:.1f} ms (target {TARGET_MS} ms)'))
+            transaction.set_rollback(True)
+
+    def _sample_company(self, count):
+        rng = random.Random(42)
+        company = Company.objects.create(name='Directory Benchmark', slug=f'directory-benchmark-{time.time_ns()}')
+        departments = [
+            Department.objects.create(company=company, name=name)
+            for name in ['Finance', 'Operations', 'Sales', 'Human Resources', 'Engineering', 'Kampala Branch']
+        ]
+
+        start = time.perf_counter()
+        employees = Employee.objects.bulk_create([
+            Employee(
+                company=company, employee_number=f'EMP{i:06d}',
+                first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                department=rng.choice(departments), job_title=rng.choice(JOB_TITLES),
+                date_of_birth=date(1990, 1, 1), gender='female', national_id=f'CM{i:08d}',
+                email=f'employee{i}@example.com', phone='0700000000', join_date=date(2020, 1, 1)
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        search.index_employees([employee.pk for employee in employees])
+        self.stdout.write(f'Created and indexed {count} employees in {time.perf_counter() - start:.1f} s')
+        return company
@@ -0,0 +1,83 @@
+"""
+Management command to benchmark org chart and team queries.
+Run with: python manage.py benchmark_org_chart --employees 10000
+
+Sample data is created inside a transaction that is rolled back afterwards.
+"""
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Company
+from employees import hierarchy
+from employees.models import Employee
+
+
+class Command(BaseCommand):
+    help = 'Measure org chart rendering and subtree queries over a generated hierarchy'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employees',
+            type=int,
+            default=10000,
+            help='Number of employees in the sample company (default: 10000)'
+        )
+        parser.add_argument(
+            '--span',
+            type=int,
+            default=8,
+            help='Direct reports per manager (default: 8)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            company, ceo = self._sample_company(options['employees'], options['span'])
+            employees = Employee.objects.filter(company=company)
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                roots = hierarchy.org_chart(employees)
+                elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'Org chart: {options["employees"]} nodes under {len(roots)} root(s) in '
+                f'{elapsed * 1000:.0f} ms, {len(queries)} query'
+            )
+
+            start = time.perf_counter()
+            team = employees.filter(hierarchy.in_team(ceo, field='id', include_self=False)).count()
+            self.stdout.write(f'Team of the top manager: {team} employees in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+            middle = Employee.objects.filter(company=company).order_by('id')[options['span'] + 1]
+            start = time.perf_counter()
+            team = len(hierarchy.subtree(middle))
+            self.stdout.write(f'Subtree of a second-level manager: {team} employees in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+            if len(queries) == 1:
+                self.stdout.write(self.style.SUCCESS('Org chart rendered in one query'))
+            transaction.set_rollback(True)
+
+    def _sample_company(self, count, span):
+        company = Company.objects.create(name='Org Chart Benchmark', slug=f'org-chart-benchmark-{time.time_ns()}')
+        employees = Employee.objects.bulk_create([
+            Employee(
+                company=company, employee_number=f'BENCH{i:06d}', first_name='Bench', last_name=f'Employee{i}',
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'BENCH{i}',
+                email=f'bench{i}@example.com', phone='0700000000', job_title='Engineer',
+                join_date=date(2020, 1, 1)
+            )
+            for i in range(count)
+        ], batch_size=1000)
+
+        # Balanced tree: employee i reports to employee (i - 1) // span
+        for i, employee in enumerate(employees[1:], start=1):
+            employee.manager_id = employees[(i - 1) // span].id
+        Employee.objects.bulk_update(employees[1:], ['manager'], batch_size=1000)
+
+        start = time.perf_counter()
+        links = hierarchy.rebuild(company)
+        self.stdout.write(f'Built {links} hierarchy links in {(time.perf_counter() - start) * 1000:.0f} ms')
+        return company, employees[0]
@@ -0,0 +1,30 @@
+"""
+Management command to recompute the reporting hierarchy closure table.
+Run with: python manage.py rebuild_org_chart [--company <id>]
+
+Needed only after bulk changes to Employee.manager that bypass
+Employee.save (QuerySet.update, raw SQL, fixtures).
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Company
+from employees import hierarchy
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the employee reporting hierarchy (closure table) from Employee.manager'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Only rebuild this company (default: all)')
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            company = Company.objects.get(pk=options['company'])
+
+        with transaction.atomic():
+            links = hierarchy.rebuild(company)
+
+        scope = company.name if company else 'all companies'
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {links} hierarchy links for {scope}'))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:27
+
+from django.db import migrations, models
+
+
+def backfill_month_days(apps, schema_editor):
+    Employee = apps.get_model('employees', 'Employee')
+    employees = []
+    for employee in Employee.objects.only('id', 'date_of_birth', 'join_date').iterator(chunk_size=2000):
+        employee.birth_month_day = employee.date_of_birth.month * 100 + employee.date_of_birth.day
+        employee.join_month_day = employee.join_date.month * 100 + employee.join_date.day
+        employees.append(employee)
+    Employee.objects.bulk_update(employees, ['birth_month_day', 'join_month_day'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_data_consent_user_data_consent_at_and_more'),
+        ('employees', '0002_employee_employees_e_company_8e5f43_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='birth_month_day',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='join_month_day',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['company', 'birth_month_day'], name='employees_e_company_378b68_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['company', 'join_month_day'], name='employees_e_company_67af46_idx'),
+        ),
+        migrations.RunPython(backfill_month_days, migrations.RunPython.noop),
+    ]
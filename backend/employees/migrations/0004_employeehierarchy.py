@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:36
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def build_hierarchy(apps, schema_editor):
+    Employee = apps.get_model('employees', 'Employee')
+    EmployeeHierarchy = apps.get_model('employees', 'EmployeeHierarchy')
+
+    edges = list(Employee.objects.values_list('id', 'manager_id'))
+    children = defaultdict(list)
+    for employee_id, manager_id in edges:
+        children[manager_id].append(employee_id)
+
+    links = [EmployeeHierarchy(ancestor_id=e, descendant_id=e, depth=0) for e, _ in edges]
+    stack = [(root, []) for root in children[None]]
+    while stack:
+        node, chain = stack.pop()
+        links += [
+            EmployeeHierarchy(ancestor_id=ancestor, descendant_id=node, depth=len(chain) - i)
+            for i, ancestor in enumerate(chain)
+        ]
+        stack += [(child, chain + [node]) for child in children[node]]
+    EmployeeHierarchy.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0003_employee_month_day_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeHierarchy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField(help_text='Levels between ancestor and descendant (0 = same employee)')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='employees.employee')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='employees.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='employees_e_descend_4a8e83_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_employee_hierarchy_link')],
+            },
+        ),
+        migrations.RunPython(build_hierarchy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:45
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+SQLITE_FTS = [
+    """
+    CREATE VIRTUAL TABLE employees_search_fts USING fts5(
+        document,
+        content='employees_employeesearchdocument',
+        content_rowid='employee_id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='1 2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER employees_search_fts_insert AFTER INSERT ON employees_employeesearchdocument BEGIN
+        INSERT INTO employees_search_fts(rowid, document) VALUES (new.employee_id, new.document);
+    END
+    """,
+    """
+    CREATE TRIGGER employees_search_fts_delete AFTER DELETE ON employees_employeesearchdocument BEGIN
+        INSERT INTO employees_search_fts(employees_search_fts, rowid, document) VALUES ('delete', old.employee_id, old.document);
+    END
+    """,
+    """
+    CREATE TRIGGER employees_search_fts_update AFTER UPDATE ON employees_employeesearchdocument BEGIN
+        INSERT INTO employees_search_fts(employees_search_fts, rowid, document) VALUES ('delete', old.employee_id, old.document);
+        INSERT INTO employees_search_fts(rowid, document) VALUES (new.employee_id, new.document);
+    END
+    """,
+]
+
+SQLITE_FTS_DROP = [
+    'DROP TRIGGER IF EXISTS employees_search_fts_update',
+    'DROP TRIGGER IF EXISTS employees_search_fts_delete',
+    'DROP TRIGGER IF EXISTS employees_search_fts_insert',
+    'DROP TABLE IF EXISTS employees_search_fts',
+]
+
+POSTGRES_INDEX = (
+    "CREATE INDEX employees_search_document_fts ON employees_employeesearchdocument "
+    "USING GIN (to_tsvector('simple', document))"
+)
+
+DOCUMENT_FIELDS = [
+    'employee_number', 'first_name', 'middle_name', 'last_name',
+    'email', 'national_id', 'job_title', 'department__name',
+]
+
+
+def words(text):
+    text = unicodedata.normalize('NFKD', str(text or '').lower())
+    return re.findall(r'\w+', ''.join(char for char in text if not unicodedata.combining(char)))
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return  # employees.search falls back to a LIKE scan
+        for statement in SQLITE_FTS:
+            schema_editor.execute(statement)
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        for statement in SQLITE_FTS_DROP:
+            schema_editor.execute(statement)
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS employees_search_document_fts')
+
+
+def build_documents(apps, schema_editor):
+    Employee = apps.get_model('employees', 'Employee')
+    EmployeeSearchDocument = apps.get_model('employees', 'EmployeeSearchDocument')
+
+    documents = [
+        EmployeeSearchDocument(
+            employee_id=pk, company_id=company_id,
+            document=' '.join(word for value in values for word in words(value))
+        )
+        for pk, company_id, *values in Employee.objects.values_list('pk', 'company_id', *DOCUMENT_FIELDS).iterator(chunk_size=2000)
+    ]
+    EmployeeSearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_companysequence'),
+        ('employees', '0004_employeehierarchy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeSearchDocument',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='employees.employee')),
+                ('document', models.TextField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='employee_search_documents', to='accounts.company')),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+    ]
@@ -6,6 +6,13 @@ from django.db import models
 from accounts.models import Company
 
 
+def month_day(value):
+    """MMDD integer for a date (e.g. 14 March -> 314), None for no date"""
+    if value is None:
+        return None
+    return value.month * 100 + value.day
+
+
 class Department(models.Model):
     """
     Department within a company.
@@ -49,6 +56,13 @@ class Department(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.company.name}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Name as loaded, so a rename can be told apart from other edits
+        instance._loaded_name = instance.__dict__.get('name')
+        return instance
     
     @property
     def employee_count(self):
@@ -158,6 +172,11 @@ class Employee(models.Model):
     confirmation_date = models.DateField(null=True, blank=True)
     resignation_date = models.DateField(null=True, blank=True)
     last_working_date = models.DateField(null=True, blank=True)
+
+    # Day-of-year index (MMDD) of date_of_birth / join_date, kept in sync by save().
+    # Lets upcoming birthday/anniversary windows be queried in SQL.
+    birth_month_day = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    join_month_day = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
     
     # Bank Details (for payroll)
     bank_name = models.CharField(max_length=100, blank=True)
@@ -211,6 +230,8 @@ class Employee(models.Model):
             models.Index(fields=['company', 'join_date']),  # For recent hires queries
             models.Index(fields=['company', 'email']),  # For login/lookup queries
             models.Index(fields=['company', 'employee_number']),  # For employee number search
+            models.Index(fields=['company', 'birth_month_day']),  # For upcoming birthdays
+            models.Index(fields=['company', 'join_month_day']),  # For upcoming work anniversaries
         ]
     
     def __str__(self):
@@ -246,17 +267,97 @@ class Employee(models.Model):
     def save(self, *args, **kwargs):
         """Auto-generate employee number if not provided"""
         if not self.employee_number:
-            # Get the last employee number for this company
-            last_employee = Employee.objects.filter(company=self.company).order_by('-id').first()
-            if last_employee and last_employee.employee_number.startswith('EMP'):
-                try:
-                    last_number = int(last_employee.employee_number[3:])
-                    new_number = last_number + 1
-                except ValueError:
-                    new_number = 1
-            else:
-                new_number = 1
-            
-            self.employee_number = f"EMP{new_number:04d}"  # EMP0001, EMP0002, etc.
+            self.employee_number = Employee.allocate_employee_numbers(self.company, 1)[0]
+
+        self.update_month_days()
+        adding = self._state.adding
+        manager_changed = not adding and self.manager_id != getattr(self, '_loaded_manager_id', None)
+        if manager_changed and self.manager_id is not None:
+            if EmployeeHierarchy.objects.filter(ancestor_id=self.pk, descendant_id=self.manager_id).exists():
+                from django.core.exceptions import ValidationError
+                raise ValidationError({'manager': 'An employee cannot report to someone in their own reporting line.'})
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'date_of_birth' in update_fields:
+                update_fields.add('birth_month_day')
+            if 'join_date' in update_fields:
+                update_fields.add('join_month_day')
+            kwargs['update_fields'] = update_fields
         
         super().save(*args, **kwargs)
+
+        # Keep the reporting hierarchy in sync
+        from . import hierarchy
+        if adding:
+            hierarchy.add_employees([self])
+        elif manager_changed and (update_fields is None or 'manager' in update_fields):
+            hierarchy.move(self)
+        self._loaded_manager_id = self.manager_id
+        if update_fields is None or 'employment_status' in update_fields:
+            self._loaded_employment_status = self.employment_status
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Manager and status as loaded, to tell on save whether they changed
+        instance._loaded_manager_id = instance.__dict__.get('manager_id')
+        instance._loaded_employment_status = instance.__dict__.get('employment_status')
+        return instance
+
+    @staticmethod
+    def allocate_employee_numbers(company, count):
+        """Reserve the next `count` employee numbers of a company (EMP0001, EMP0002, etc.)"""
+        from accounts.services.sequence_service import SequenceService
+
+        def last_number():
+            # Continue after numbers issued before the sequence existed
+            numbers = Employee.objects.filter(
+                company=company, employee_number__startswith='EMP'
+            ).values_list('employee_number', flat=True)
+            return max((int(n[3:]) for n in numbers if n[3:].isdigit()), default=0)
+
+        block = SequenceService.allocate(company, 'employee_number', count, seed=last_number)
+        return [f"EMP{number:04d}" for number in block]
+
+    def update_month_days(self):
+        """Refresh the MMDD index columns (call before bulk_create/bulk_update)"""
+        self.birth_month_day = month_day(self._meta.get_field('date_of_birth').to_python(self.date_of_birth))
+        self.join_month_day = month_day(self._meta.get_field('join_date').to_python(self.join_date))
+
+
+class EmployeeHierarchy(models.Model):
+    """
+    Closure table of the reporting hierarchy (Employee.manager).
+    One row per (ancestor, descendant) pair, each employee included as its
+    own ancestor at depth 0. Maintained by employees.hierarchy.
+    """
+    ancestor = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveSmallIntegerField(help_text="Levels between ancestor and descendant (0 = same employee)")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_employee_hierarchy_link'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth']),  # For ancestor / direct manager lookups
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+
+class EmployeeSearchDocument(models.Model):
+    """
+    Normalized directory search text of an employee (names, number, email,
+    national ID, job title, department), indexed for full-text prefix
+    search. Maintained by employees.search.
+    """
+    employee = models.OneToOneField(Employee, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='employee_search_documents')
+    document = models.TextField()
+
+    def __str__(self):
+        return f"{self.employee_id}: {self.document}"
@@ -0,0 +1,145 @@
+"""
+Employee directory search.
+
+Every employee has an EmployeeSearchDocument: their names, number, email,
+national ID, job title and department folded into one lowercase,
+accent-free line of words. Queries match each word as a prefix against
+a full-text index of those documents instead of running icontains over
+six Employee columns:
+
+- SQLite: the employees_search_fts FTS5 table (external content, kept in
+  step by triggers on the document table, prefix indexes for 1-3 chars)
+- PostgreSQL: a GIN index on to_tsvector('simple', document) and
+  to_tsquery prefix terms
+- anything else: a substring match on the document column
+
+Documents are rewritten by the signals in employees.signals when an
+employee or a department name changes. Bulk writes must call
+index_employees themselves.
+"""
+import re
+import unicodedata
+
+from django.db import connections, transaction
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .models import Employee, EmployeeSearchDocument
+
+
+FTS_TABLE = 'employees_search_fts'
+DOCUMENT_TABLE = EmployeeSearchDocument._meta.db_table
+
+# Employee values that make up a document, in order
+DOCUMENT_FIELDS = [
+    'employee_number', 'first_name', 'middle_name', 'last_name',
+    'email', 'national_id', 'job_title', 'department__name',
+]
+
+# Fields whose change requires a new document
+INDEXED_FIELDS = {'employee_number', 'first_name', 'middle_name', 'last_name', 'email', 'national_id', 'job_title', 'department'}
+
+TYPEAHEAD_LIMIT = 10
+MAX_TERMS = 8
+
+WORD = re.compile(r'\w+')
+
+# Whether the FTS5 table exists, per database alias
+_fts_available = {}
+
+
+def words(text):
+    """Lowercase, accent-free words of text"""
+    text = unicodedata.normalize('NFKD', str(text or '').lower())
+    return WORD.findall(''.join(char for char in text if not unicodedata.combining(char)))
+
+
+def build_document(values):
+    """Search document for a sequence of field values"""
+    return ' '.join(word for value in values for word in words(value))
+
+
+def index_employees(employee_ids, batch_size=1000):
+    """(Re)write the search documents of the given employees"""
+    employee_ids = list(employee_ids)
+    for start in range(0, len(employee_ids), batch_size):
+        batch = employee_ids[start:start + batch_size]
+        documents = [
+            EmployeeSearchDocument(employee_id=pk, company_id=company_id, document=build_document(values))
+            for pk, company_id, *values in Employee.objects.filter(pk__in=batch).values_list(
+                'pk', 'company_id', *DOCUMENT_FIELDS
+            )
+        ]
+        with transaction.atomic():
+            EmployeeSearchDocument.objects.filter(employee_id__in=batch).delete()
+            EmployeeSearchDocument.objects.bulk_create(documents)
+
+
+def has_fts(connection):
+    """Whether the SQLite FTS5 index was created (SQLite without FTS5 falls back to LIKE)"""
+    if connection.alias not in _fts_available:
+        with connection.cursor() as cursor:
+            _fts_available[connection.alias] = FTS_TABLE in connection.introspection.table_names(cursor)
+    return _fts_available[connection.alias]
+
+
+def matching_ids(query, using='default'):
+    """
+    Expression of the ids of employees matching every word of query as a
+    prefix, for use in an id__in filter. None when query has no words.
+    """
+    terms = words(query)[:MAX_TERMS]
+    if not terms:
+        return None
+
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and has_fts(connection):
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return RawSQL(
+            f"SELECT employee_id FROM {DOCUMENT_TABLE} "
+            f"WHERE to_tsvector('simple', document) @@ to_tsquery('simple', %s)",
+            [tsquery]
+        )
+
+    documents = EmployeeSearchDocument.objects.using(using)
+    for term in terms:
+        documents = documents.filter(document__contains=term)
+    return documents.values('employee_id')
+
+
+def search_employees(queryset, query):
+    """Narrow an Employee queryset to directory matches of query"""
+    ids = matching_ids(query, using=queryset.db)
+    if ids is None:
+        return queryset
+    return queryset.filter(id__in=ids)
+
+
+def typeahead(queryset, query, limit=TYPEAHEAD_LIMIT):
+    """Top directory matches of query as plain dicts (one query)"""
+    if not words(query):
+        return []
+
+    storage = Employee._meta.get_field('photo').storage
+    results = []
+    for record in search_employees(queryset, query).order_by('first_name', 'last_name', 'id').values(
+        'id', 'employee_number', 'first_name', 'middle_name', 'last_name', 'email',
+        'job_title', 'department__name', 'photo'
+    )[:limit]:
+        names = [record['first_name'], record.pop('middle_name'), record['last_name']]
+        record['full_name'] = ' '.join(name for name in names if name)
+        record['department_name'] = record.pop('department__name')
+        record['photo'] = storage.url(record['photo']) if record['photo'] else None
+        results.append(record)
+    return results
+
+
+class DirectorySearchFilter(filters.SearchFilter):
+    """SearchFilter (?search=) answered from the directory search index"""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        return search_employees(queryset, query)
@@ -2,6 +2,8 @@
 Serializers for employees app (Department, Employee).
 Converts Django models to/from JSON for REST API.
 """
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 from .models import Department, Employee
 from accounts.models import Company
@@ -23,6 +25,13 @@ class DepartmentSerializer(serializers.ModelSerializer):
             'manager', 'manager_name', 'employee_count', 'is_active', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Join the company and manager and count active employees in the same query"""
+        return queryset.select_related('company', 'manager').annotate(
+            active_employee_count=Count('employees', filter=Q(employees__employment_status='active'))
+        )
     
     def get_manager_name(self, obj):
         """Get manager's full name"""
@@ -32,6 +41,8 @@ class DepartmentSerializer(serializers.ModelSerializer):
 
     def get_employee_count(self, obj):
         """Get employee count safely"""
+        if hasattr(obj, 'active_employee_count'):
+            return obj.active_employee_count
         try:
             return obj.employee_count
         except Exception:
@@ -114,12 +125,24 @@ class EmployeeSerializer(serializers.ModelSerializer):
             'notes', 'years_of_service', 'is_on_probation',
             'created_at', 'updated_at', 'salary_structure', 'user_details'
         ]
+        # Columns behind computed fields, for ?fields= (see config.fieldsets)
+        field_columns = {
+            'full_name': ['first_name', 'middle_name', 'last_name'],
+            'manager_name': ['manager__first_name', 'manager__middle_name', 'manager__last_name'],
+            'years_of_service': ['join_date', 'last_working_date'],
+            'is_on_probation': ['probation_end_date'],
+        }
         read_only_fields = [
             'id', 'employee_number', 'full_name', 'years_of_service', 
             'is_on_probation', 'created_at', 'updated_at', 'salary_structure',
             'user_details'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Join every related row the serializer reads (including the reverse one-to-ones)"""
+        return queryset.select_related('company', 'department', 'manager', 'user_account', 'salary_structure')
+
     def get_user_details(self, obj):
         """Get associated user account details"""
         if hasattr(obj, 'user_account'):
@@ -408,14 +431,41 @@ class EmployeeListSerializer(serializers.ModelSerializer):
             'department_name', 'job_title', 'employment_status',
             'join_date', 'subordinates_count', 'subordinates'
         ]
+        # Columns behind computed fields, for ?fields= (see config.fieldsets)
+        field_columns = {
+            'full_name': ['first_name', 'middle_name', 'last_name'],
+            'department_name': ['department__name'],
+        }
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Count and prefetch active direct reports up front, so a page costs
+        the same number of queries whatever its size.
+        """
+        active_reports = Employee.objects.filter(
+            manager=OuterRef('pk'), employment_status='active'
+        ).order_by().values('manager').annotate(count=Count('id')).values('count')
+        return queryset.select_related('department').annotate(
+            active_subordinates_count=Coalesce(Subquery(active_reports), 0)
+        ).prefetch_related(Prefetch(
+            'subordinates',
+            queryset=Employee.objects.filter(employment_status='active').select_related('department'),
+            to_attr='active_subordinates'
+        ))
 
     def get_subordinates_count(self, obj):
         """Get count of direct subordinates"""
+        if hasattr(obj, 'active_subordinates_count'):
+            return obj.active_subordinates_count
         return obj.subordinates.filter(employment_status='active').count()
 
     def get_subordinates(self, obj):
         """Get list of direct subordinates (only basic info for performance)"""
-        subordinates = obj.subordinates.filter(employment_status='active')
+        if hasattr(obj, 'active_subordinates'):
+            subordinates = obj.active_subordinates
+        else:
+            subordinates = obj.subordinates.filter(employment_status='active').select_related('department')
         return EmployeeBasicSerializer(subordinates, many=True, context=self.context).data
 
 
@@ -465,6 +515,14 @@ class EmployeeUpdateSerializer(serializers.ModelSerializer):
             'create_user', 'username', 'password', 'role'
         ]
 
+    def validate_manager(self, value):
+        """An employee cannot report to themselves or to anyone below them"""
+        from .hierarchy import is_in_team
+
+        if value and self.instance and is_in_team(self.instance, value):
+            raise serializers.ValidationError("An employee cannot report to someone in their own reporting line.")
+        return value
+
     def update(self, instance, validated_data):
         """Update employee and handle associated user account"""
         # Extract user account data
@@ -0,0 +1,64 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from accounts.services.counter_service import CounterService
+
+from . import hierarchy, search
+from .models import Department, Employee
+from .stats import invalidate_stats
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_employee_stats(sender, instance, **kwargs):
+    """Cached dashboard stats are stale once an employee or department changes"""
+    invalidate_stats(instance.company_id)
+
+
+@receiver(pre_delete, sender=Employee)
+def detach_from_hierarchy(sender, instance, **kwargs):
+    """The employee's reports lose their manager (SET_NULL) and everyone above"""
+    hierarchy.detach(instance)
+
+
+@receiver(post_save, sender=Employee)
+def index_employee(sender, instance, update_fields=None, **kwargs):
+    """Rewrite the directory search document when a searchable field changes"""
+    if update_fields is None or search.INDEXED_FIELDS.intersection(update_fields):
+        search.index_employees([instance.pk])
+
+
+@receiver(post_save, sender=Department)
+def index_department_employees(sender, instance, created, update_fields=None, **kwargs):
+    """Department names are part of their employees' search documents"""
+    if created or getattr(instance, '_loaded_name', None) == instance.name:
+        return
+    search.index_employees(instance.employees.values_list('pk', flat=True))
+    instance._loaded_name = instance.name
+
+
+@receiver(post_save, sender=Employee)
+def count_active_employee(sender, instance, created, update_fields=None, **kwargs):
+    """Keep CompanyCounters.active_employees in step with status changes"""
+    if not created and update_fields is not None and 'employment_status' not in update_fields:
+        return
+    was_active = not created and getattr(instance, '_loaded_employment_status', None) == 'active'
+    is_active = instance.employment_status == 'active'
+    if was_active != is_active:
+        CounterService.adjust(instance.company_id, active_employees=1 if is_active else -1)
+
+
+@receiver(post_delete, sender=Employee)
+def uncount_active_employee(sender, instance, **kwargs):
+    if getattr(instance, '_loaded_employment_status', instance.employment_status) == 'active':
+        CounterService.adjust(instance.company_id, active_employees=-1)
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def count_department(sender, instance, created=None, **kwargs):
+    """Keep CompanyCounters.departments in step (created is None on delete)"""
+    if created is not False:
+        CounterService.adjust(instance.company_id, departments=1 if created else -1)
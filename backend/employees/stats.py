@@ -0,0 +1,164 @@
+"""
+Employee dashboard statistics.
+
+Status counts come from one conditional aggregate query. Upcoming birthdays
+and work anniversaries are found through the MMDD index columns
+(Employee.birth_month_day / join_month_day), so the window is a range query
+in SQL. The payload is cached per company; employees.signals drops it
+whenever an employee or department is written. The time it was computed
+doubles as its version for conditional GETs.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from config.cache import TenantCache
+
+from .models import Department, month_day
+
+
+STATS_CACHE_TIMEOUT = 60 * 15
+EVENT_WINDOW_DAYS = 30
+EVENT_LIMIT = 5
+
+STATUSES = ['active', 'on_leave', 'suspended', 'terminated', 'resigned']
+
+# Per company; the global scope holds the all-companies view of super admins
+stats_cache = TenantCache('employee_stats', timeout=STATS_CACHE_TIMEOUT)
+STATS_KEY = 'dashboard'
+
+
+def invalidate_stats(company_id):
+    """Drop the cached stats of a company and of the all-companies view"""
+    stats_cache.delete(company_id, STATS_KEY)
+    stats_cache.delete(None, STATS_KEY)
+
+
+def month_day_window(field, start, end):
+    """Q matching MMDD values of `field` between two dates, wrapping over the year end"""
+    first, last = month_day(start), month_day(end)
+    if first <= last:
+        return Q(**{f'{field}__gte': first, f'{field}__lte': last})
+    return Q(**{f'{field}__gte': first}) | Q(**{f'{field}__lte': last})
+
+
+def next_occurrence(value, today):
+    """Next date on or after today with value's month and day (None for 29 Feb in other years)"""
+    try:
+        occurrence = value.replace(year=today.year)
+        if occurrence < today:
+            occurrence = occurrence.replace(year=today.year + 1)
+    except ValueError:
+        return None
+    return occurrence
+
+
+def status_counts(queryset, since):
+    """Total, per-status and new-hire counts in one aggregate query"""
+    counts = {status: Count('id', filter=Q(employment_status=status)) for status in STATUSES}
+    return queryset.order_by().aggregate(
+        total=Count('id'),
+        new_hires=Count('id', filter=Q(join_date__gte=since)),
+        **counts
+    )
+
+
+def upcoming_events(queryset, today, days=EVENT_WINDOW_DAYS, limit=EVENT_LIMIT):
+    """Birthdays and work anniversaries of active employees in the next `days` days"""
+    end = today + timedelta(days=days)
+    records = queryset.filter(
+        month_day_window('birth_month_day', today, end) | month_day_window('join_month_day', today, end),
+        employment_status='active',
+    ).order_by().values('id', 'first_name', 'middle_name', 'last_name', 'date_of_birth', 'join_date')
+
+    events = []
+    for record in records:
+        if record['middle_name']:
+            name = f"{record['first_name']} {record['middle_name']} {record['last_name']}"
+        else:
+            name = f"{record['first_name']} {record['last_name']}"
+
+        birthday = next_occurrence(record['date_of_birth'], today)
+        if birthday and birthday <= end:
+            events.append({
+                'id': record['id'],
+                'name': name,
+                'date': birthday,
+                'type': 'Birthday',
+                'original_date': record['date_of_birth']
+            })
+
+        anniversary = next_occurrence(record['join_date'], today)
+        if anniversary and anniversary <= end:
+            years = anniversary.year - record['join_date'].year
+            if years > 0:
+                events.append({
+                    'id': record['id'],
+                    'name': name,
+                    'date': anniversary,
+                    'type': 'Work Anniversary',
+                    'years': years
+                })
+
+    return sorted(events, key=lambda event: event['date'])[:limit]
+
+
+def compute_stats(queryset, company, request):
+    """Dashboard stats payload for an employee queryset"""
+    from .serializers import EmployeeListSerializer
+
+    today = timezone.now().date()
+    counts = status_counts(queryset, today - timedelta(days=30))
+
+    prev_month_count = counts['total'] - counts['new_hires']
+    growth_percentage = 0
+    if prev_month_count > 0:
+        growth_percentage = round((counts['new_hires'] / prev_month_count) * 100, 1)
+
+    recent_hires_list = EmployeeListSerializer.setup_eager_loading(queryset).order_by('-join_date')[:5]
+
+    return {
+        'total': counts['total'],
+        'active': counts['active'],
+        'active_now': counts['active'],
+        'working_today': counts['active'] - counts['on_leave'],
+        'on_leave': counts['on_leave'],
+        'suspended': counts['suspended'],
+        'terminated': counts['terminated'],
+        'resigned': counts['resigned'],
+        'new_hires': counts['new_hires'],
+        'growth_percentage': growth_percentage,
+        'departments_count': Department.objects.filter(company=company).count(),
+        # Plain list: ReturnList keeps a reference to its serializer and cannot be cached
+        'recent_hires_list': list(EmployeeListSerializer(recent_hires_list, many=True, context={'request': request}).data),
+        'upcoming_events': upcoming_events(queryset, today),
+        'next_events': [],  # Simplified for now
+    }
+
+
+def cached_stats_version(company_id):
+    """(token, last_modified) of today's cached stats, or None when not cached"""
+    cached = stats_cache.get(company_id, STATS_KEY)
+    if not cached or cached['date'] != timezone.now().date().isoformat():
+        return None
+    return cached['computed_at'].isoformat(), cached['computed_at']
+
+
+def get_dashboard_stats(queryset, company, request, company_id):
+    """
+    Cached dashboard stats.
+
+    company_id is the cache scope (None for the all-companies view). A cached
+    payload is only reused on the day it was computed, since the event
+    window and new-hire counts move with the date.
+    """
+    today = timezone.now().date().isoformat()
+
+    cached = stats_cache.get(company_id, STATS_KEY)
+    if cached and cached['date'] == today:
+        return cached['stats']
+
+    stats = compute_stats(queryset, company, request)
+    stats_cache.set(company_id, STATS_KEY, {'date': today, 'computed_at': timezone.now(), 'stats': stats})
+    return stats
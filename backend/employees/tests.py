@@ -102,3 +102,625 @@ class EmployeeManagersEndpointTests(TestCase):
         # Should include the newly promoted employee (job_title contains 'Manager')
         self.assertTrue(any(int(m.get('id')) == self.employee.id for m in mgrs), msg=f"Managers list missing promoted employee: {mgrs}")
 
+
+
+class EmployeeStatsTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from accounts.models import User
+
+        cache.clear()
+        self.company = Company.objects.create(name="StatsCo", slug="statsco")
+        self.user = User.objects.create_user(
+            username='stats_hr', email='hr@statsco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _create_employee(self, n, date_of_birth=date(1990, 6, 15), join_date=date(2020, 6, 15), status='active'):
+        return Employee.objects.create(
+            company=self.company, first_name=f'Emp{n}', last_name='Stats',
+            date_of_birth=date_of_birth, gender='male', national_id=f'SNID{n}',
+            email=f'emp{n}@statsco.test', phone='0700000000', job_title='Clerk',
+            join_date=join_date, employment_status=status
+        )
+
+    def test_month_day_index_follows_dates(self):
+        employee = self._create_employee(1, date_of_birth=date(1991, 12, 31), join_date=date(2019, 3, 4))
+        self.assertEqual((employee.birth_month_day, employee.join_month_day), (1231, 304))
+
+        employee.date_of_birth = date(1991, 2, 1)
+        employee.save(update_fields=['date_of_birth'])
+        employee.refresh_from_db()
+        self.assertEqual(employee.birth_month_day, 201)
+
+    def test_upcoming_events_wrap_over_year_end(self):
+        from .stats import upcoming_events
+
+        self._create_employee(1, date_of_birth=date(1990, 1, 5), join_date=date(2020, 12, 28))
+        self._create_employee(2, date_of_birth=date(1990, 6, 1), join_date=date(2021, 6, 1))
+        self._create_employee(3, date_of_birth=date(1990, 12, 25), join_date=date(2022, 1, 1), status='terminated')
+
+        events = upcoming_events(Employee.objects.filter(company=self.company), today=date(2026, 12, 20))
+        self.assertEqual(
+            [(event['type'], event['date']) for event in events],
+            [('Work Anniversary', date(2026, 12, 28)), ('Birthday', date(2027, 1, 5))]
+        )
+        self.assertEqual(events[0]['years'], 6)
+
+    def test_stats_counts_cached_and_invalidated(self):
+        self._create_employee(1)
+        self._create_employee(2, status='on_leave')
+        self._create_employee(3, status='terminated')
+
+        from .stats import status_counts
+
+        with self.assertNumQueries(1):
+            counts = status_counts(Employee.objects.filter(company=self.company), date(2000, 1, 1))
+        self.assertEqual((counts['total'], counts['active'], counts['new_hires']), (3, 1, 3))
+
+        response = self.client.get('/api/employees/stats/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['total'], data['active'], data['on_leave'], data['terminated']), (3, 1, 1, 1))
+        self.assertEqual(len(data['recent_hires_list']), 3)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/employees/stats/').json(), data)
+
+        self._create_employee(4)
+        self.assertEqual(self.client.get('/api/employees/stats/').json()['total'], 4)
+
+    def test_stats_answer_conditional_get(self):
+        self._create_employee(1)
+        response = self.client.get('/api/employees/stats/')
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/employees/stats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # A write drops the cached stats, so the old tag no longer matches
+        self._create_employee(2)
+        response = self.client.get('/api/employees/stats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class EmployeeBulkImportTests(TestCase):
+    HEADER = 'First Name*,Last Name*,Email*,Department,Join Date,National ID*,Create User Account? (Yes/No),Username,Password,Basic Salary\n'
+
+    def setUp(self):
+        from accounts.models import User
+        from .models import Department
+
+        self.company = Company.objects.create(name="ImportCo", slug="importco")
+        self.user = User.objects.create_user(
+            username='import_hr', email='hr@importco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        self.department = Department.objects.create(company=self.company, name='Finance', code='FIN')
+        Employee.objects.create(
+            company=self.company, first_name='Existing', last_name='Person',
+            date_of_birth=date(1985, 1, 1), gender='female', national_id='NIN-EXIST',
+            email='existing@importco.test', phone='0700000000', job_title='Clerk',
+            join_date=date(2020, 1, 1)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _upload(self, content, name='employees.csv'):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        if isinstance(content, str):
+            content = content.encode()
+        return self.client.post(
+            '/api/employees/bulk_import/', {'file': SimpleUploadedFile(name, content)}, format='multipart'
+        )
+
+    def _csv(self, count, start=0):
+        lines = [
+            f'First{n},Last{n},person{n}@importco.test,Finance,2024-02-01,NIN-{n},No,,,0\n'
+            for n in range(start, start + count)
+        ]
+        return self.HEADER + ''.join(lines)
+
+    def test_import_creates_valid_rows_and_reports_errors(self):
+        from accounts.models import User
+        from payroll.models import SalaryStructure
+
+        content = self.HEADER + (
+            'Ann,Okello,ANN@importco.test,finance,2024-03-01,NIN-1,Yes,ann,Passw0rd!,1500000\n'
+            'Ben,Mugisha,ben@importco.test,,01/04/2024,NIN-2,No,,,\n'
+            ',Nameless,nameless@importco.test,,,NIN-3,No,,,\n'
+            'Dup,Email,existing@importco.test,,,NIN-4,No,,,\n'
+            'Bad,Dept,baddept@importco.test,Marketing,,NIN-5,No,,,\n'
+            'Twice,Ann,ann@importco.test,,,NIN-6,No,,,\n'
+            'Bad,Date,baddate@importco.test,,2024-13-45,NIN-7,No,,,\n'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._upload(content)
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual((data['total'], data['created'], data['failed']), (7, 2, 5))
+        self.assertEqual(
+            {error['row']: sorted(error['errors']) for error in data['errors']},
+            {4: ['first_name'], 5: ['email'], 6: ['department'], 7: ['email'], 8: ['join_date']}
+        )
+        self.assertEqual([e['employee_number'] for e in data['employees']], ['EMP0002', 'EMP0003'])
+
+        ann = Employee.objects.get(company=self.company, email='ann@importco.test')
+        self.assertEqual((ann.department, ann.join_date, ann.join_month_day), (self.department, date(2024, 3, 1), 301))
+        self.assertEqual(Employee.objects.get(email='ben@importco.test').join_date, date(2024, 4, 1))
+
+        account = User.objects.get(username='ann')
+        self.assertEqual((account.employee, account.company), (ann, self.company))
+        self.assertTrue(account.check_password('Passw0rd!'))
+        self.assertEqual(SalaryStructure.objects.get(employee=ann).gross_salary, 1500000)
+
+        from django.core import mail
+        self.assertEqual([message.to for message in mail.outbox], [['ann@importco.test']])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self._upload(self._csv(2)).json()['created'], 2)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self._upload(self._csv(20, start=100)).json()['created'], 20)
+        self.assertEqual(len(small), len(large))
+
+    def test_import_xlsx(self):
+        from payroll.services.streaming import stream_xlsx_rows
+
+        rows = [
+            ['First Name', 'Last Name', 'Email', 'Phone', 'Join Date'],
+            ['Cate', 'Nankya', 'cate@importco.test', 256772000000, 45658],
+        ]
+        response = self._upload(b''.join(stream_xlsx_rows(rows)), name='employees.xlsx')
+
+        self.assertEqual(response.status_code, 201, response.json())
+        cate = Employee.objects.get(email='cate@importco.test')
+        self.assertEqual((cate.phone, cate.join_date), ('256772000000', date(2025, 1, 1)))
+
+    def test_existing_emails_match_case_insensitively(self):
+        Employee.objects.create(
+            company=self.company, first_name='Mixed', last_name='Case', date_of_birth=date(1990, 1, 1),
+            gender='female', national_id='NIN-MIXED', email='Mixed.Case@ImportCo.test', phone='0700000000',
+            job_title='Lead', join_date=date(2020, 1, 1)
+        )
+        content = self.HEADER.replace('\n', ',Manager Email\n') + (
+            'Again,Case,mixed.case@importco.test,,,NIN-1,No,,,,\n'
+            'New,Report,report@importco.test,,,NIN-2,No,,,,MIXED.CASE@importco.test\n'
+        )
+        response = self._upload(content)
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (1, 1))
+        self.assertEqual(data['errors'][0]['row'], 2)
+        self.assertEqual(sorted(data['errors'][0]['errors']), ['email'])
+        self.assertEqual(Employee.objects.get(email='report@importco.test').manager.first_name, 'Mixed')
+
+    def test_parse_date_formats(self):
+        from .importer import parse_date
+
+        self.assertEqual(parse_date('20240115'), date(2024, 1, 15))
+        self.assertEqual(parse_date('45658'), date(2025, 1, 1))
+        self.assertEqual(parse_date('15/01/2024'), date(2024, 1, 15))
+        for value in ('20241345', '99999999999', '123456'):
+            with self.assertRaises(ValueError):
+                parse_date(value)
+
+    def test_long_numeric_date_is_a_row_error(self):
+        content = self.HEADER + (
+            'Dan,Ssali,dan@importco.test,,20240115,NIN-1,No,,,\n'
+            'Eve,Akello,eve@importco.test,,99999999999,NIN-2,No,,,\n'
+        )
+        response = self._upload(content)
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (1, 1))
+        self.assertEqual(data['errors'][0]['row'], 3)
+        self.assertEqual(Employee.objects.get(email='dan@importco.test').join_date, date(2024, 1, 15))
+
+    def test_rejects_file_without_email_column(self):
+        response = self._upload('Name,Phone\nSomeone,0700\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Employee.objects.filter(company=self.company).count(), 1)
+
+
+class EmployeeHierarchyTests(TestCase):
+    def setUp(self):
+        from accounts.models import User
+
+        self.company = Company.objects.create(name="TreeCo", slug="treeco")
+        self.ceo = self._create_employee('ceo')
+        self.cto = self._create_employee('cto', manager=self.ceo)
+        self.lead = self._create_employee('lead', manager=self.cto)
+        self.dev = self._create_employee('dev', manager=self.lead)
+        self.cfo = self._create_employee('cfo', manager=self.ceo)
+
+        self.user = User.objects.create_user(
+            username='tree_hr', email='hr@treeco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _create_employee(self, name, manager=None):
+        return Employee.objects.create(
+            company=self.company, first_name=name.title(), last_name='Tree', manager=manager,
+            date_of_birth=date(1990, 1, 1), gender='male', national_id=f'TNID-{name}',
+            email=f'{name}@treeco.test', phone='0700000000', job_title=name.upper(),
+            join_date=date(2020, 1, 1)
+        )
+
+    def _team(self, manager):
+        from .hierarchy import subtree
+        return {e.first_name: e.depth for e in subtree(manager)}
+
+    def test_links_follow_creation(self):
+        self.assertEqual(self._team(self.ceo), {'Cto': 1, 'Lead': 2, 'Dev': 3, 'Cfo': 1})
+        self.assertEqual(self._team(self.lead), {'Dev': 1})
+
+    def test_manager_change_moves_subtree(self):
+        self.lead.manager = self.cfo
+        self.lead.save()
+
+        self.assertEqual(self._team(self.cto), {})
+        self.assertEqual(self._team(self.cfo), {'Lead': 1, 'Dev': 2})
+        self.assertEqual(self._team(self.ceo), {'Cto': 1, 'Cfo': 1, 'Lead': 2, 'Dev': 3})
+
+    def test_delete_detaches_reports(self):
+        self.cto.delete()
+        self.lead.refresh_from_db()
+
+        self.assertIsNone(self.lead.manager)
+        self.assertEqual(self._team(self.ceo), {'Cfo': 1})
+        self.assertEqual(self._team(self.lead), {'Dev': 1})
+
+    def test_cycle_rejected(self):
+        from django.core.exceptions import ValidationError
+
+        self.cto.manager = self.dev
+        with self.assertRaises(ValidationError):
+            self.cto.save()
+
+        response = self.client.patch(f'/api/employees/{self.ceo.id}/', {'manager': self.lead.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_matches_incremental_links(self):
+        from .hierarchy import rebuild
+        from .models import EmployeeHierarchy
+
+        before = set(EmployeeHierarchy.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+        self.assertEqual(rebuild(self.company), len(before))
+        self.assertEqual(set(EmployeeHierarchy.objects.values_list('ancestor_id', 'descendant_id', 'depth')), before)
+
+    def test_manager_sees_indirect_reports(self):
+        from accounts.models import User
+
+        manager = User.objects.create_user(
+            username='tree_cto', email='cto-user@treeco.test', password='secret',
+            company=self.company, role='manager'
+        )
+        manager.employee = self.cto
+        manager.save()
+        self.client.force_authenticate(user=manager)
+
+        response = self.client.get('/api/employees/', {'page_size': 100})
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual({e['first_name'] for e in results}, {'Cto', 'Lead', 'Dev'})
+
+    def test_skip_level_manager_can_approve_leave(self):
+        from accounts.models import User
+        from leave.models import LeaveBalance, LeaveRequest, LeaveType
+
+        leave_type = LeaveType.objects.create(company=self.company, name='Annual Leave', code='AL', days_per_year=21)
+        LeaveBalance.objects.create(
+            employee=self.dev, leave_type=leave_type, year=2026, total_days=21, pending_days=2
+        )
+        requests = [
+            LeaveRequest.objects.create(
+                employee=self.dev, leave_type=leave_type, start_date=date(2026, 3, day),
+                end_date=date(2026, 3, day), days_requested=1, reason='Rest'
+            )
+            for day in (2, 3)
+        ]
+
+        def login(employee):
+            user = User.objects.create_user(
+                username=f'tree_{employee.job_title.lower()}', email=f'{employee.job_title.lower()}-user@treeco.test',
+                password='secret', company=self.company, role='manager'
+            )
+            user.employee = employee
+            user.save()
+            self.client.force_authenticate(user=user)
+
+        # Outside the dev's reporting line
+        login(self.cfo)
+        response = self.client.post(f'/api/leave/requests/{requests[0].id}/approve/')
+        self.assertIn(response.status_code, (403, 404))
+
+        # Two levels above the dev: listed, approvable and allowed to approve/reject
+        login(self.cto)
+        listed = self.client.get('/api/leave/requests/pending_approvals/')
+        self.assertEqual({(r['id'], r['can_approve']) for r in listed.data}, {(r.id, True) for r in requests})
+
+        self.assertEqual(self.client.post(f'/api/leave/requests/{requests[0].id}/approve/').status_code, 200)
+        self.assertEqual(self.client.post(f'/api/leave/requests/{requests[1].id}/reject/').status_code, 200)
+        self.assertEqual(
+            [r.status for r in LeaveRequest.objects.filter(pk__in=[r.id for r in requests]).order_by('start_date')],
+            ['approved', 'rejected']
+        )
+
+    def test_subordinates_all_levels(self):
+        direct = self.client.get(f'/api/employees/{self.cto.id}/subordinates/')
+        everyone = self.client.get(f'/api/employees/{self.cto.id}/subordinates/', {'all': 'true'})
+
+        self.assertEqual([e['first_name'] for e in direct.data], ['Lead'])
+        self.assertEqual({e['first_name'] for e in everyone.data}, {'Lead', 'Dev'})
+
+    def test_org_chart_nested_in_one_query(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/api/employees/org_chart/')
+        for n in range(10):
+            self._create_employee(f'dev{n}', manager=self.lead)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get('/api/employees/org_chart/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(large), len(small))
+        [ceo] = response.data
+        self.assertEqual([node['first_name'] for node in ceo['subordinates']], ['Cfo', 'Cto'])
+        lead = ceo['subordinates'][1]['subordinates'][0]
+        self.assertEqual(len(lead['subordinates']), 11)
+
+        response = self.client.get('/api/employees/org_chart/', {'root': self.lead.id})
+        self.assertEqual([node['first_name'] for node in response.data], ['Lead'])
+
+
+class QueryBudgetMixin:
+    """
+    Query-count harness for API endpoints.
+
+    assertQueryBudget requests the URL and fails when it runs more than
+    max_queries queries. Endpoints that serialize rows must be checked
+    against a page full of data so per-row queries break the budget.
+    """
+
+    def assertQueryBudget(self, url, max_queries, params=None):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200, msg=f'GET {url}')
+        self.assertLessEqual(
+            len(queries), max_queries,
+            msg=f'GET {url} ran {len(queries)} queries (budget {max_queries}):\n'
+                + '\n'.join(query['sql'] for query in queries.captured_queries)
+        )
+        return response
+
+
+class EmployeeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """A full page (20 rows) of each list endpoint costs a fixed number of queries"""
+
+    def setUp(self):
+        from decimal import Decimal
+        from accounts.models import User
+        from payroll.models import SalaryStructure
+        from .models import Department
+
+        self.company = Company.objects.create(name="BudgetCo", slug="budgetco")
+        self.departments = [
+            Department.objects.create(company=self.company, name=f'Dept {n}', code=f'D{n}')
+            for n in range(20)
+        ]
+        self.boss = self._create_employee(0, 'Director - Manager')
+        self.managers = [self._create_employee(n, 'Team Manager', manager=self.boss) for n in range(1, 21)]
+        for manager in self.managers:
+            for n in range(2):
+                self._create_employee(manager.id * 100 + n, 'Engineer', manager=manager)
+            SalaryStructure.objects.create(
+                employee=manager, company=self.company, basic_salary=Decimal('1000000'),
+                effective_date=date(2024, 1, 1)
+            )
+
+        self.user = User.objects.create_user(
+            username='budget_hr', email='hr@budgetco.test', password='secret',
+            company=self.company, role='hr_manager', employee=self.boss
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _create_employee(self, n, job_title, manager=None):
+        return Employee.objects.create(
+            company=self.company, first_name=f'Emp{n}', last_name='Budget', manager=manager,
+            department=self.departments[n % len(self.departments)],
+            date_of_birth=date(1990, 1, 1), gender='female', national_id=f'BNID{n}',
+            email=f'emp{n}@budgetco.test', phone='0700000000', job_title=job_title,
+            join_date=date(2020, 1, 1), probation_end_date=date(2099, 1, 1)
+        )
+
+    def test_employee_list_endpoints(self):
+        department = self.departments[1]
+        budgets = [
+            ('/api/employees/', 3),
+            ('/api/employees/active/', 2),
+            ('/api/employees/on_probation/', 2),
+            ('/api/employees/managers/', 2),
+            (f'/api/employees/{self.boss.id}/subordinates/', 3),
+            (f'/api/departments/{department.id}/employees/', 3),
+        ]
+        for url, budget in budgets:
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, budget)
+
+    def test_department_list(self):
+        response = self.assertQueryBudget('/api/departments/', 2)
+        counts = {d['id']: d['employee_count'] for d in response.json()['results']}
+        for department in self.departments:
+            self.assertEqual(counts[department.id], department.employees.filter(employment_status='active').count())
+
+    def test_employee_detail(self):
+        response = self.assertQueryBudget(f'/api/employees/{self.managers[0].id}/', 1)
+        data = response.json()
+        self.assertEqual(float(data['salary_structure']['basic_salary']), 1000000)
+        self.assertEqual(data['manager_name'], self.boss.full_name)
+
+    def test_annotated_counts_match_related_rows(self):
+        response = self.client.get('/api/employees/', {'page_size': 100})
+        row = next(e for e in response.json()['results'] if e['id'] == self.managers[0].id)
+        self.assertEqual(row['subordinates_count'], 2)
+        self.assertEqual(len(row['subordinates']), 2)
+
+
+class EmployeeDirectorySearchTests(TestCase):
+    def setUp(self):
+        from accounts.models import User
+        from .models import Department
+
+        self.company = Company.objects.create(name="SearchCo", slug="searchco")
+        self.finance = Department.objects.create(company=self.company, name='Finance')
+        self.jose = self._create_employee(1, 'José', 'Okello', 'Accountant', department=self.finance)
+        self.joan = self._create_employee(2, 'Joan', 'Nakato', 'Sales Officer')
+        self.peter = self._create_employee(3, 'Peter', 'Jones', 'Engineer')
+
+        other = Company.objects.create(name="OtherCo", slug="otherco")
+        Employee.objects.create(
+            company=other, first_name='Joseph', last_name='Other', date_of_birth=date(1990, 1, 1),
+            gender='male', national_id='ONID1', email='joseph@otherco.test', phone='0700000000',
+            job_title='Driver', join_date=date(2020, 1, 1)
+        )
+
+        self.user = User.objects.create_user(
+            username='search_hr', email='hr@searchco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _create_employee(self, n, first_name, last_name, job_title, department=None):
+        return Employee.objects.create(
+            company=self.company, first_name=first_name, last_name=last_name, department=department,
+            date_of_birth=date(1990, 1, 1), gender='male', national_id=f'CM-{n:04d}',
+            email=f'emp{n}@searchco.test', phone='0700000000', job_title=job_title,
+            join_date=date(2020, 1, 1)
+        )
+
+    def _search(self, query):
+        response = self.client.get('/api/employees/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return {e['id'] for e in response.json()['results']}
+
+    def test_search_matches_word_prefixes_across_fields(self):
+        self.assertEqual(self._search('jo'), {self.jose.id, self.joan.id, self.peter.id})
+        self.assertEqual(self._search('jose'), {self.jose.id})
+        self.assertEqual(self._search('JO nak'), {self.joan.id})
+        self.assertEqual(self._search('sales off'), {self.joan.id})
+        self.assertEqual(self._search('finance'), {self.jose.id})
+        self.assertEqual(self._search('0003'), {self.peter.id})
+        self.assertEqual(self._search('searchco'), {self.jose.id, self.joan.id, self.peter.id})
+        self.assertEqual(self._search('"*) OR'), set())
+
+    def test_documents_follow_changes(self):
+        self.peter.last_name = 'Mugisha'
+        self.peter.save()
+        self.assertEqual(self._search('jones'), set())
+        self.assertEqual(self._search('mugi'), {self.peter.id})
+
+        self.finance.name = 'Treasury'
+        self.finance.save()
+        self.assertEqual(self._search('finance'), set())
+        self.assertEqual(self._search('treas'), {self.jose.id})
+
+        self.joan.delete()
+        self.assertEqual(self._search('nakato'), set())
+
+    def test_typeahead(self):
+        response = self.client.get('/api/employees/typeahead/', {'q': 'jo'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([e['full_name'] for e in response.json()], ['Joan Nakato', 'José Okello', 'Peter Jones'])
+        self.assertEqual(response.json()[1]['department_name'], 'Finance')
+
+        self.assertEqual(len(self.client.get('/api/employees/typeahead/', {'q': 'jo', 'limit': 1}).json()), 1)
+        self.assertEqual(self.client.get('/api/employees/typeahead/', {'q': ''}).json(), [])
+        self.assertEqual(self.client.get('/api/employees/typeahead/', {'q': 'jo', 'limit': 'x'}).status_code, 400)
+
+
+class EmployeeListPaginationTests(TestCase):
+    def setUp(self):
+        from accounts.models import User
+
+        self.company = Company.objects.create(name="PageCo", slug="pageco")
+        self.manager = None
+        for n in range(7):
+            employee = Employee.objects.create(
+                company=self.company, first_name=f'Emp{n}', last_name='Page', manager=self.manager,
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'PNID{n}',
+                email=f'emp{n}@pageco.test', phone='0700000000', job_title='Clerk',
+                join_date=date(2020, 1, 1)
+            )
+            self.manager = self.manager or employee
+        self.user = User.objects.create_user(
+            username='page_hr', email='hr@pageco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_page_numbers_by_default(self):
+        response = self.client.get('/api/employees/', {'page_size': 3})
+        self.assertEqual(response.json()['count'], 7)
+        self.assertEqual(len(response.json()['results']), 3)
+
+    def test_cursor_walks_every_employee_once(self):
+        response = self.client.get('/api/employees/', {'cursor': '', 'page_size': 3, 'fields': 'id,employee_number'})
+        self.assertNotIn('count', response.json())
+
+        numbers, pages = [], 0
+        while True:
+            data = response.json()
+            numbers += [row['employee_number'] for row in data['results']]
+            pages += 1
+            if not data['next']:
+                break
+            response = self.client.get(data['next'])
+        self.assertEqual(pages, 3)
+        self.assertEqual(numbers, sorted(Employee.objects.filter(company=self.company).values_list('employee_number', flat=True)))
+
+    def test_sparse_fields(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/employees/', {'fields': 'id,full_name,department_name'})
+        self.assertEqual(response.status_code, 200)
+        row = response.json()['results'][0]
+        self.assertEqual(set(row), {'id', 'full_name', 'department_name'})
+        self.assertEqual(row['full_name'], 'Emp0 Page')
+        # No prefetch of subordinates and none of the unused columns
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('national_id', queries.captured_queries[-1]['sql'])
+
+        response = self.client.get('/api/employees/', {'fields': 'id,subordinates_count'})
+        self.assertEqual(response.json()['results'][0]['subordinates_count'], 6)
+
+        detail = self.client.get(f'/api/employees/{self.manager.id}/', {'fields': 'id,manager_name,years_of_service'})
+        self.assertEqual(set(detail.json()), {'id', 'manager_name', 'years_of_service'})
+
+        self.assertEqual(self.client.get('/api/employees/', {'fields': 'id,salary'}).status_code, 400)
@@ -9,13 +9,18 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
 
+from .hierarchy import in_team, org_chart, subtree
 from .models import Department, Employee
+from .search import DirectorySearchFilter, TYPEAHEAD_LIMIT, typeahead
 from .serializers import (
     DepartmentSerializer, DepartmentCreateSerializer,
     EmployeeSerializer, EmployeeCreateSerializer,
     EmployeeListSerializer, EmployeeUpdateSerializer
 )
 from accounts.permissions import IsCompanyUser, IsHRManagerOrAdmin
+from config.conditional import ConditionalGetMixin
+from config.fieldsets import SparseFieldsetMixin
+from config.pagination import OptionalCursorPagination
 
 
 class DepartmentViewSet(viewsets.ModelViewSet):
@@ -41,17 +46,15 @@ class DepartmentViewSet(viewsets.ModelViewSet):
         """Filter departments by company"""
         user = self.request.user
         
-        from django.db.models import Count, Q
-        
-        # Base queryset - employee_count is handled by the model property
-        queryset = Department.objects.all()
+        # Base queryset - employee_count is annotated, not counted per row
+        queryset = DepartmentSerializer.setup_eager_loading(Department.objects.all())
         
         # Super admins see all departments
         if user.role == 'super_admin':
-            return queryset.select_related('company', 'manager')
+            return queryset
         
         # Regular users only see departments from their company
-        return queryset.filter(company=user.company).select_related('company', 'manager')
+        return queryset.filter(company=user.company)
     
     def get_serializer_class(self):
         """Use create serializer for POST"""
@@ -92,7 +95,9 @@ class DepartmentViewSet(viewsets.ModelViewSet):
     def employees(self, request, pk=None):
         """Get all employees in this department"""
         department = self.get_object()
-        employees = department.employees.filter(employment_status='active')
+        employees = EmployeeListSerializer.setup_eager_loading(
+            department.employees.filter(employment_status='active')
+        )
         serializer = EmployeeListSerializer(employees, many=True)
         return Response(serializer.data)
     
@@ -111,7 +116,7 @@ class DepartmentViewSet(viewsets.ModelViewSet):
         return Response(stats)
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     API endpoints for Employee management.
     
@@ -122,13 +127,19 @@ class EmployeeViewSet(viewsets.ModelViewSet):
     DELETE /api/employees/:id/      - Delete employee
     GET    /api/employees/active/   - List active employees
     GET    /api/employees/search/   - Search employees
+    GET    /api/employees/typeahead/ - Directory typeahead (?q=)
+
+    Lists accept ?fields= (sparse fieldsets) and ?cursor= (keyset pagination).
+    /stats/ answers If-None-Match with 304 (see config.conditional).
     """
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
     permission_classes = [IsAuthenticated, IsCompanyUser]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('employee_number',)
+    # ?search= goes through the directory search index (see employees.search)
+    filter_backends = [DjangoFilterBackend, DirectorySearchFilter, filters.OrderingFilter]
     filterset_fields = ['department', 'employment_status', 'employment_type', 'gender']
-    search_fields = ['employee_number', 'first_name', 'last_name', 'email', 'national_id', 'job_title']
     ordering_fields = ['employee_number', 'first_name', 'last_name', 'join_date', 'created_at']
     ordering = ['employee_number']
     
@@ -149,11 +160,9 @@ class EmployeeViewSet(viewsets.ModelViewSet):
                 pass
             
             elif user.role == 'manager':
-                # See themselves AND their subordinates
+                # See themselves AND everyone reporting to them (at any level)
                 if hasattr(user, 'employee') and user.employee:
-                    queryset = queryset.filter(
-                        Q(id=user.employee.id) | Q(manager=user.employee)
-                    )
+                    queryset = queryset.filter(in_team(user.employee, field='id'))
                 else:
                     queryset = queryset.none()
             
@@ -172,6 +181,10 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         if status_param:
             queryset = queryset.filter(employment_status=status_param)
 
+        # Load everything the serializer reads up front (no per-row queries)
+        if self.action in ['list', 'retrieve']:
+            queryset = self.get_serializer_class().setup_eager_loading(queryset)
+
         return queryset
     
     def get_serializer_class(self):
@@ -281,6 +294,47 @@ class EmployeeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST # Return 400 for data issues even if caught as Exception
             )
     
+    @action(detail=False, methods=['post'])
+    def bulk_import(self, request):
+        """
+        Import employees from a CSV or XLSX file (multipart field "file").
+
+        Optional "department" (id) assigns every row to one department.
+        Valid rows are created in one go; invalid rows are reported by row
+        number and skipped.
+        """
+        if request.user.role not in ['hr_manager', 'company_admin', 'super_admin']:
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'Upload a CSV or XLSX file in the "file" field.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        from django.conf import settings
+        from .importer import EmployeeImporter, ImportFileError, read_rows
+
+        department = None
+        department_id = str(request.data.get('department') or '')
+        if department_id:
+            if department_id.isdigit():
+                department = Department.objects.filter(id=department_id, company=request.user.company).first()
+            if department is None:
+                return Response({'department': 'Department not found.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            records = read_rows(upload)
+        except ImportFileError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(records) > settings.EMPLOYEE_IMPORT_MAX_ROWS:
+            return Response(
+                {'error': f'The file has {len(records)} rows; the limit is {settings.EMPLOYEE_IMPORT_MAX_ROWS}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result = EmployeeImporter(request.user.company, created_by=request.user, department=department).run(records)
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST)
+    
     def perform_create(self, serializer):
         """Legacy method - now handled in create()"""
         # This method is kept for compatibility but create() handles everything
@@ -334,7 +388,9 @@ class EmployeeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Get all active employees"""
-        employees = self.get_queryset().filter(employment_status='active')
+        employees = EmployeeListSerializer.setup_eager_loading(
+            self.get_queryset().filter(employment_status='active')
+        )
         serializer = EmployeeListSerializer(employees, many=True)
         return Response(serializer.data)
     
@@ -346,17 +402,54 @@ class EmployeeViewSet(viewsets.ModelViewSet):
             employment_status='active',
             probation_end_date__gte=timezone.now().date()
         )
-        serializer = EmployeeListSerializer(employees, many=True)
+        serializer = EmployeeListSerializer(EmployeeListSerializer.setup_eager_loading(employees), many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def subordinates(self, request, pk=None):
-        """Get all subordinates of this employee (if they're a manager)"""
+        """
+        Get the direct reports of this employee (if they're a manager).
+        ?all=true returns everyone below them, at any level.
+        """
         employee = self.get_object()
-        subordinates = employee.subordinates.all()
-        serializer = EmployeeListSerializer(subordinates, many=True)
+        if request.query_params.get('all', 'false').lower() == 'true':
+            subordinates = subtree(employee)
+        else:
+            subordinates = employee.subordinates.all()
+        serializer = EmployeeListSerializer(EmployeeListSerializer.setup_eager_loading(subordinates), many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def org_chart(self, request):
+        """
+        Whole reporting hierarchy as a nested tree, read with one query.
+        ?root=<id> limits it to one employee and everyone below them;
+        ?include_inactive=true keeps terminated/resigned employees.
+        """
+        employees = self.get_queryset()
+        if request.query_params.get('include_inactive', 'false').lower() != 'true':
+            employees = employees.exclude(employment_status__in=['terminated', 'resigned'])
+
+        root = request.query_params.get('root')
+        if root is not None and not root.isdigit():
+            return Response({'root': 'Must be an employee id.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(org_chart(employees, root=root))
     
+    @action(detail=False, methods=['get'])
+    def typeahead(self, request):
+        """
+        Directory typeahead: the first matches of ?q= (every word a prefix of
+        a name, number, email, national ID, job title or department).
+        ?limit= caps the results (default 10, at most 50).
+        """
+        limit = request.query_params.get('limit', str(TYPEAHEAD_LIMIT))
+        if not limit.isdigit() or not 0 < int(limit) <= 50:
+            return Response({'limit': 'Must be a number from 1 to 50.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        employees = self.get_queryset().exclude(employment_status__in=['terminated', 'resigned'])
+        return Response(typeahead(employees, request.query_params.get('q', ''), limit=int(limit)))
+
     @action(detail=False, methods=['get'])
     def by_department(self, request):
         """Get employee count grouped by department"""
@@ -388,7 +481,8 @@ class EmployeeViewSet(viewsets.ModelViewSet):
             employment_status='active'
         ).filter(
             Q(subordinates__isnull=False) | Q(managed_departments__isnull=False) | Q(job_title__icontains='manager')
-        ).distinct().prefetch_related('subordinates', 'department', 'managed_departments')
+        ).distinct()
+        managers = EmployeeListSerializer.setup_eager_loading(managers)
 
         # Serialize with subordinates data using EmployeeListSerializer
         # which includes subordinates field for frontend compatibility
@@ -416,10 +510,10 @@ class EmployeeViewSet(viewsets.ModelViewSet):
             )
 
         # Get employees to promote
-        employees = self.get_queryset().filter(
+        employees = EmployeeListSerializer.setup_eager_loading(self.get_queryset().filter(
             id__in=employee_ids,
             employment_status='active'
-        )
+        ))
 
         if len(employees) != len(employee_ids):
             return Response(
@@ -472,6 +566,14 @@ class EmployeeViewSet(viewsets.ModelViewSet):
             "promoted_employees": serializer.data
         })
 
+    def get_stats_version(self):
+        from .stats import cached_stats_version
+
+        if self.request.user.role not in ['company_admin', 'hr_manager', 'super_admin']:
+            return 'limited', None
+        company_id = None if self.request.user.role == 'super_admin' else self.request.user.company_id
+        return cached_stats_version(company_id)
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get employee statistics - Restricted to dashboard view mostly"""
@@ -489,94 +591,11 @@ class EmployeeViewSet(viewsets.ModelViewSet):
                  'next_events': []
              })
 
-        queryset = self.get_queryset()
-        
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        thirty_days_ago = timezone.now().date() - timedelta(days=30)
-        
-        # Recent Hires (Last 5)
-        recent_hires_list = queryset.order_by('-join_date')[:5]
-        
-        # Upcoming Events (Next 30 days)
-        today = timezone.now().date()
-        next_30_days = today + timedelta(days=30)
-        
-        # Python filter for MVP:
-        active_employees = queryset.filter(employment_status='active')
-        upcoming_birthdays = []
-        upcoming_anniversaries = []
-        
-        for emp in active_employees:
-            # Birthday check
-            if emp.date_of_birth:
-                try:
-                    bday_this_year = emp.date_of_birth.replace(year=today.year)
-                    if bday_this_year < today:
-                        bday_this_year = bday_this_year.replace(year=today.year + 1)
-
-                    if today <= bday_this_year <= next_30_days:
-                        upcoming_birthdays.append({
-                            'id': emp.id,
-                            'name': emp.full_name,
-                            'date': bday_this_year,
-                            'type': 'Birthday',
-                            'original_date': emp.date_of_birth
-                        })
-                except ValueError:
-                    pass
-
-            # Anniversary check
-            if emp.join_date:
-                try:
-                    anniv_this_year = emp.join_date.replace(year=today.year)
-                    if anniv_this_year < today:
-                        anniv_this_year = anniv_this_year.replace(year=today.year + 1)
-
-                    if today <= anniv_this_year <= next_30_days:
-                        years = anniv_this_year.year - emp.join_date.year
-                        if years > 0:
-                            upcoming_anniversaries.append({
-                                'id': emp.id,
-                                'name': emp.full_name,
-                                'date': anniv_this_year,
-                                'type': 'Work Anniversary',
-                                'years': years
-                            })
-                except ValueError:
-                    pass
-        
-        # Sort events by date
-        upcoming_events = sorted(upcoming_birthdays + upcoming_anniversaries, key=lambda x: x['date'])[:5]
-        next_events = [] # Simplified for now
-
-        total_count = queryset.count()
-        new_hires_count = queryset.filter(join_date__gte=thirty_days_ago).count()
-        prev_month_count = total_count - new_hires_count
-        growth_percentage = 0
-        if prev_month_count > 0:
-            growth_percentage = round((new_hires_count / prev_month_count) * 100, 1)
+        from .stats import get_dashboard_stats
 
-        active_count = queryset.filter(employment_status='active').count()
-        on_leave_count = queryset.filter(employment_status='on_leave').count()
-
-        stats = {
-            'total': total_count,
-            'active': active_count,
-            'active_now': active_count,
-            'working_today': active_count - on_leave_count,
-            'on_leave': on_leave_count,
-            'suspended': queryset.filter(employment_status='suspended').count(),
-            'terminated': queryset.filter(employment_status='terminated').count(),
-            'resigned': queryset.filter(employment_status='resigned').count(),
-            'new_hires': new_hires_count,
-            'growth_percentage': growth_percentage,
-            'departments_count': Department.objects.filter(company=request.user.company).count(),
-            'recent_hires_list': EmployeeListSerializer(recent_hires_list, many=True, context={'request': request}).data,
-            'upcoming_events': upcoming_events,
-            'next_events': next_events,
-        }
+        # Super admins see every company's employees
+        company_id = None if request.user.role == 'super_admin' else request.user.company_id
+        stats = get_dashboard_stats(self.get_queryset(), request.user.company, request, company_id)
         
         return Response(stats)
     
@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
+from employees.hierarchy import in_team
 from .models import ExpenseCategory, ExpenseClaim, ExpenseReimbursement
 from .serializers import (
     ExpenseCategorySerializer,
@@ -50,7 +51,7 @@ class ExpenseClaimViewSet(viewsets.ModelViewSet):
             if hasattr(user, 'employee') and user.employee:
                 # Get claims from employees I manage
                 queryset = queryset.filter(
-                    employee__manager=user.employee,
+                    in_team(user.employee, include_self=False),
                     status='submitted'
                 )
         
@@ -169,8 +170,8 @@ class ExpenseClaimViewSet(viewsets.ModelViewSet):
             )
         
         claims = ExpenseClaim.objects.filter(
+            in_team(request.user.employee, include_self=False),
             company=request.user.company,
-            employee__manager=request.user.employee,
             status='submitted'
         ).select_related('employee', 'category')
         
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave', '0003_leaverequest_reliever_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leavetype',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import LeaveType, LeaveBalance, LeaveRequest, PublicHoliday
+from employees.hierarchy import team_ids
 from employees.models import Employee
 from datetime import datetime, timedelta
 
@@ -61,6 +62,12 @@ class LeaveRequestSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'reliever': {'required': False, 'allow_null': True}
         }
+        # Columns behind computed fields, for ?fields= (see config.fieldsets)
+        field_columns = {
+            'approved_by_name': ['approved_by__first_name', 'approved_by__last_name'],
+            'can_approve': ['status', 'employee'],
+            'can_cancel': ['status', 'employee'],
+        }
         
     def get_approved_by_name(self, obj):
         if obj.approved_by:
@@ -71,11 +78,18 @@ class LeaveRequestSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or not request.user:
             return False
-        # Manager or HR can approve
-        return obj.status == 'pending' and (
-            request.user.role in ['super_admin', 'company_admin', 'hr_manager'] or
-            (hasattr(request.user, 'employee') and obj.employee.manager == request.user.employee)
-        )
+        # HR, or a manager of the employee at any level, can approve
+        if obj.status != 'pending':
+            return False
+        if request.user.role in ['super_admin', 'company_admin', 'hr_manager']:
+            return True
+        # Team looked up once per response, not once per request row
+        if 'approver_team_ids' not in self.context:
+            employee = getattr(request.user, 'employee', None)
+            self.context['approver_team_ids'] = set(
+                team_ids(employee, include_self=False).values_list('descendant_id', flat=True)
+            ) if employee else set()
+        return obj.employee_id in self.context['approver_team_ids']
     
     def get_can_cancel(self, obj):
         request = self.context.get('request')
@@ -3,8 +3,12 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Max, Q
 from datetime import datetime
+from config.conditional import ConditionalGetMixin, queryset_version
+from config.fieldsets import SparseFieldsetMixin
+from config.pagination import OptionalCursorPagination
+from employees.hierarchy import in_team, is_in_team
 from .models import LeaveType, LeaveBalance, LeaveRequest, PublicHoliday
 from .serializers import (
     LeaveTypeSerializer, LeaveBalanceSerializer,
@@ -23,7 +27,7 @@ class LeaveTypeViewSet(viewsets.ModelViewSet):
         )
 
 
-class LeaveBalanceViewSet(viewsets.ModelViewSet):
+class LeaveBalanceViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = LeaveBalanceSerializer
     permission_classes = [IsAuthenticated]
     
@@ -43,6 +47,30 @@ class LeaveBalanceViewSet(viewsets.ModelViewSet):
         queryset = queryset.filter(year=year)
         
         return queryset.order_by('employee__first_name', 'leave_type__name')
+
+    @staticmethod
+    def balances_version(balances):
+        # Balances show employee and leave type names
+        return queryset_version(
+            balances,
+            employee_updated_at=Max('employee__updated_at'),
+            leave_type_updated_at=Max('leave_type__updated_at'),
+        )
+
+    def get_list_version(self):
+        return self.balances_version(self.filter_queryset(self.get_queryset()))
+
+    def get_my_balances_version(self):
+        employee = getattr(self.request.user, 'employee', None)
+        if employee is None:
+            return 'none', None
+        return self.balances_version(self.get_my_balances(employee))
+
+    def get_my_balances(self, employee):
+        return LeaveBalance.objects.filter(
+            employee=employee,
+            year=datetime.now().year
+        ).select_related('leave_type')
     
     @action(detail=False, methods=['get'])
     def my_balances(self, request):
@@ -50,18 +78,17 @@ class LeaveBalanceViewSet(viewsets.ModelViewSet):
         if not hasattr(request.user, 'employee') or not request.user.employee:
             return Response([])
         
-        balances = LeaveBalance.objects.filter(
-            employee=request.user.employee,
-            year=datetime.now().year
-        ).select_related('leave_type')
+        balances = self.get_my_balances(request.user.employee)
         
         serializer = self.get_serializer(balances, many=True)
         return Response(serializer.data)
 
 
-class LeaveRequestViewSet(viewsets.ModelViewSet):
+class LeaveRequestViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     serializer_class = LeaveRequestSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('-id',)
     
     def get_queryset(self):
         user = self.request.user
@@ -72,9 +99,7 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
         # Role-based filtering
         if user.role not in ['super_admin', 'company_admin', 'hr_manager']:
             if hasattr(user, 'employee') and user.employee:
-                queryset = queryset.filter(
-                    Q(employee=user.employee) | Q(employee__manager=user.employee)
-                )
+                queryset = queryset.filter(in_team(user.employee))
             else:
                 queryset = queryset.filter(employee__user_account=user)
 
@@ -118,7 +143,7 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
                 employee__company=user.company,
                 status='pending'
             ).filter(
-                Q(employee__manager=user.employee) |
+                in_team(user.employee, include_self=False) |
                 Q(employee__company=user.company, employee__department__isnull=False)
             ).select_related('employee', 'leave_type')
         else:
@@ -149,8 +174,8 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
         is_authorized = user.role in ['super_admin', 'company_admin', 'hr_manager']
         
         if not is_authorized:
-            if hasattr(user, 'employee') and leave_request.employee.manager == user.employee:
-                is_authorized = True
+            if hasattr(user, 'employee') and user.employee:
+                is_authorized = is_in_team(user.employee, leave_request.employee, include_self=False)
         
         if not is_authorized:
             return Response(
@@ -208,8 +233,8 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
         is_authorized = user.role in ['super_admin', 'company_admin', 'hr_manager']
         
         if not is_authorized:
-            if hasattr(user, 'employee') and leave_request.employee.manager == user.employee:
-                is_authorized = True
+            if hasattr(user, 'employee') and user.employee:
+                is_authorized = is_in_team(user.employee, leave_request.employee, include_self=False)
         
         if not is_authorized:
             return Response(
@@ -35,6 +35,7 @@ class Notification(models.Model):
     is_public = models.BooleanField(default=False)
     notification_type = models.CharField(max_length=20, choices=TYPES, default='info')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -1,22 +1,31 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.utils import timezone
 from .models import Notification, Announcement
 from .serializers import NotificationSerializer, AnnouncementSerializer
 from accounts.permissions import IsCompanyUser, IsCompanyAdmin
+from config.conditional import ConditionalGetMixin, queryset_version
+from config.fieldsets import SparseFieldsetMixin
+from config.pagination import OptionalCursorPagination
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('-id',)
     
     def get_queryset(self):
         # Return user's notifications + public ones
         return Notification.objects.filter(recipient=self.request.user) | \
                Notification.objects.filter(is_public=True)
+
+    def get_list_version(self):
+        return queryset_version(self.filter_queryset(self.get_queryset()))
     
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        request.user.notifications.filter(is_read=False).update(is_read=True)
+        request.user.notifications.filter(is_read=False).update(is_read=True, updated_at=timezone.now())
         return Response({'status': 'success'})
 
 class AnnouncementViewSet(viewsets.ModelViewSet):
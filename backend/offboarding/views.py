@@ -17,8 +17,8 @@ class ResignationViewSet(viewsets.ModelViewSet):
         elif user.role == 'manager':
              # Managers see their own and their subordinates
              if hasattr(user, 'employee'):
-                from django.db.models import Q
-                queryset = queryset.filter(Q(employee=user.employee) | Q(employee__manager=user.employee))
+                from employees.hierarchy import in_team
+                queryset = queryset.filter(in_team(user.employee))
              else:
                 queryset = queryset.none()
                 
@@ -0,0 +1,224 @@
+"""
+Batch payroll calculator.
+
+Applies the compiled PAYE band table (tax_tables), NSSF (with ceiling),
+reliefs and Local Service Tax to a whole column of gross salaries at once. Amounts are converted to integer
+cents up front so each step is plain integer arithmetic over lists; rounding
+reproduces the ROUND_HALF_UP quantization of the scalar functions in
+utils.py, so results match calculate_net_salary to the cent.
+
+Amounts are expected to be cent-precise (as stored in the 2-decimal-place
+DecimalFields on SalaryStructure and Payslip).
+"""
+from bisect import bisect_left
+from decimal import Decimal, ROUND_HALF_UP
+
+from .tax_tables import DEFAULT_COUNTRY, get_tax_table
+
+
+DEDUCTION_KEYS = ['loan_deduction', 'advance_deduction', 'other_deductions']
+
+
+def to_cents(amount) -> int:
+    """Convert a money amount to integer cents"""
+    if not isinstance(amount, Decimal):
+        amount = Decimal(amount)
+    return int((amount * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: int) -> Decimal:
+    """Convert integer cents back to a 2-decimal-place Decimal"""
+    return Decimal(cents).scaleb(-2)
+
+
+def _rate_ratio(rate):
+    """Exact (numerator, denominator) of a Decimal rate"""
+    return Decimal(rate).as_integer_ratio()
+
+
+def _apply_rate(cents, num, den):
+    """cents * num / den rounded half away from zero (Decimal ROUND_HALF_UP)"""
+    if cents < 0:
+        return -((-2 * cents * num + den) // (2 * den))
+    return (2 * cents * num + den) // (2 * den)
+
+
+def compile_paye_columns(table):
+    """
+    Integer-cent copy of a compiled TaxTable's lookup columns.
+
+    Returns:
+        Tuple of (upper_bounds, lower_bounds, base_tax, rate_ratios) in cents
+    """
+    return (
+        [to_cents(v) for v in table.upper_bounds],
+        [to_cents(v) for v in table.lower_bounds],
+        [to_cents(v) for v in table.base_tax],
+        [_rate_ratio(rate) for rate in table.rates],
+    )
+
+
+class BatchTaxCalculator:
+    """
+    Column-wise equivalent of utils.calculate_net_salary.
+
+    Usage:
+        calculator = BatchTaxCalculator(tax_config)
+        results = calculator.calculate(gross_salaries, deductions)
+    """
+
+    def __init__(self, tax_config: dict = None):
+        if tax_config is None:
+            tax_config = {}
+
+        self.nssf_employee_rate = _rate_ratio(tax_config.get('nssf_employee_rate', Decimal('0.05')))
+        self.nssf_employer_rate = _rate_ratio(tax_config.get('nssf_employer_rate', Decimal('0.10')))
+        self.nssf_ceiling = to_cents(tax_config.get('nssf_ceiling', Decimal('0')))
+
+        self.total_reliefs = to_cents(
+            tax_config.get('personal_relief', Decimal('0')) +
+            tax_config.get('insurance_relief', Decimal('0')) +
+            tax_config.get('pension_fund_relief', Decimal('0'))
+        )
+
+        self.lst_enabled = tax_config.get('local_service_tax_enabled', False)
+        self.lst_rate = _rate_ratio(tax_config.get('local_service_tax_rate', Decimal('0.05')))
+
+        self.tax_table = get_tax_table(
+            tax_config.get('country', DEFAULT_COUNTRY),
+            tax_config.get('tax_year')
+        )
+        self.upper_bounds, self.lower_bounds, self.base_tax, self.rate_ratios = compile_paye_columns(self.tax_table)
+
+    def _nssf(self, gross_cents, rate):
+        num, den = rate
+        column = [_apply_rate(g, num, den) for g in gross_cents]
+        if self.nssf_ceiling > 0:
+            ceiling = self.nssf_ceiling
+            column = [min(c, ceiling) for c in column]
+        return column
+
+    def paye_cents(self, taxable_cents):
+        """PAYE before reliefs for a column of taxable incomes (cents)"""
+        upper_bounds = self.upper_bounds
+        lower_bounds = self.lower_bounds
+        base_tax = self.base_tax
+        rate_ratios = self.rate_ratios
+
+        column = []
+        for t in taxable_cents:
+            band = bisect_left(upper_bounds, t)
+            num, den = rate_ratios[band]
+            if num == 0:
+                column.append(base_tax[band])
+            else:
+                column.append(base_tax[band] + _apply_rate(t - lower_bounds[band], num, den))
+        return column
+
+    def calculate_cents(self, gross_cents, deduction_cents=None):
+        """
+        Run the full calculation over integer-cent columns.
+
+        Args:
+            gross_cents: list of gross salaries in cents
+            deduction_cents: optional dict of DEDUCTION_KEYS -> list of cents
+
+        Returns:
+            Dictionary of result columns (lists of cents)
+        """
+        size = len(gross_cents)
+        if deduction_cents is None:
+            deduction_cents = {}
+        zeros = [0] * size
+        loans = deduction_cents.get('loan_deduction') or zeros
+        advances = deduction_cents.get('advance_deduction') or zeros
+        others = deduction_cents.get('other_deductions') or zeros
+
+        if self.lst_enabled:
+            num, den = self.lst_rate
+            lst = [_apply_rate(g, num, den) for g in gross_cents]
+        else:
+            lst = zeros
+
+        nssf_employee = self._nssf(gross_cents, self.nssf_employee_rate)
+        nssf_employer = self._nssf(gross_cents, self.nssf_employer_rate)
+
+        taxable = [g - n for g, n in zip(gross_cents, nssf_employee)]
+        reliefs = self.total_reliefs
+        paye = [max(0, p - reliefs) for p in self.paye_cents(taxable)]
+
+        total_deductions = [
+            sum(parts) for parts in zip(paye, nssf_employee, lst, loans, advances, others)
+        ]
+        net = [g - d for g, d in zip(gross_cents, total_deductions)]
+
+        return {
+            'gross_salary': list(gross_cents),
+            'taxable_income': taxable,
+            'paye_tax': paye,
+            'nssf_employee': nssf_employee,
+            'nssf_employer': nssf_employer,
+            'local_service_tax': lst,
+            'loan_deduction': loans,
+            'advance_deduction': advances,
+            'other_deductions': others,
+            'total_deductions': total_deductions,
+            'net_salary': net,
+        }
+
+    def calculate(self, gross_salaries, deductions=None):
+        """
+        Calculate net salaries for a list of gross salaries.
+
+        Args:
+            gross_salaries: list of Decimal gross salaries
+            deductions: optional list (parallel to gross_salaries) of
+                deduction dicts as accepted by calculate_net_salary
+
+        Returns:
+            List of result dictionaries with the same keys and Decimal values
+            as calculate_net_salary
+        """
+        gross_cents = [to_cents(g) for g in gross_salaries]
+
+        deduction_cents = None
+        if deductions is not None:
+            deductions = [d or {} for d in deductions]
+            deduction_cents = {
+                key: [to_cents(d[key]) if d.get(key) else 0 for d in deductions]
+                for key in DEDUCTION_KEYS
+                if any(d.get(key) for d in deductions)
+            }
+
+        columns = self.calculate_cents(gross_cents, deduction_cents)
+
+        # Inputs are passed through untouched (as calculate_net_salary does);
+        # only computed columns are converted back to Decimal
+        zero = Decimal('0')
+        decimal_columns = {'gross_salary': list(gross_salaries)}
+        for key in DEDUCTION_KEYS:
+            if deductions is None:
+                decimal_columns[key] = [zero] * len(gross_cents)
+            else:
+                decimal_columns[key] = [d.get(key, zero) for d in deductions]
+        for key, column in columns.items():
+            if key not in decimal_columns:
+                decimal_columns[key] = [from_cents(c) for c in column]
+
+        keys = list(columns.keys())
+        return [dict(zip(keys, row)) for row in zip(*(decimal_columns[key] for key in keys))]
+
+
+def calculate_net_salaries(gross_salaries, deductions=None, tax_config: dict = None) -> list:
+    """
+    Batch version of utils.calculate_net_salary.
+
+    Args:
+        gross_salaries: list of monthly gross salaries
+        deductions: optional list of per-employee deduction dicts
+        tax_config: Key-value pairs for tax settings (rates, ceilings)
+
+    Returns:
+        List of breakdown dictionaries, one per gross salary
+    """
+    return BatchTaxCalculator(tax_config).calculate(gross_salaries, deductions)
@@ -0,0 +1,166 @@
+"""
+Payroll computation engine.
+
+Builds every payslip of a payroll run in memory from a single joined
+Employee/SalaryStructure query, writes them with chunked bulk inserts and
+derives the run totals from the computed rows (no second aggregate pass).
+"""
+import logging
+from decimal import Decimal
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import F
+
+from .calculator import BatchTaxCalculator
+from .models import PayrollRun, Payslip
+from .utils import get_tax_config
+
+logger = logging.getLogger(__name__)
+
+
+# Payslip amount field -> PayrollRun total field
+RUN_TOTAL_FIELDS = {
+    'gross_salary': 'total_gross',
+    'paye_tax': 'total_paye',
+    'nssf_employee': 'total_nssf_employee',
+    'nssf_employer': 'total_nssf_employer',
+    'local_service_tax': 'total_lst',
+    'total_deductions': 'total_deductions',
+    'net_salary': 'total_net',
+}
+
+# Earnings copied verbatim from the SalaryStructure onto the Payslip
+STRUCTURE_FIELDS = [
+    'basic_salary', 'housing_allowance', 'transport_allowance',
+    'medical_allowance', 'lunch_allowance', 'other_allowances',
+]
+
+
+class PayrollEngine:
+    """
+    Computes and stores the payslips of one payroll run.
+
+    Usage:
+        processed = PayrollEngine(payroll_run).process(employees)
+    """
+
+    # Rows per INSERT statement
+    CHUNK_SIZE = 500
+
+    def __init__(self, payroll_run):
+        self.payroll_run = payroll_run
+        self.tax_config = get_tax_config(payroll_run.company)
+        self.calculator = BatchTaxCalculator(self.tax_config)
+
+    def build_payslips(self, employees):
+        """
+        Compute unsaved Payslip instances for the given employees.
+
+        Employees without a SalaryStructure are skipped.
+
+        Returns:
+            Tuple of (payslips, skipped_count)
+        """
+        rows = []
+        skipped = 0
+
+        for employee in employees.select_related('salary_structure'):
+            try:
+                rows.append((employee, employee.salary_structure))
+            except ObjectDoesNotExist:
+                skipped += 1
+
+        results = self.calculator.calculate([structure.gross_salary for _, structure in rows])
+
+        payslips = []
+        for (employee, structure), calculations in zip(rows, results):
+            payslip = Payslip(
+                payroll_run=self.payroll_run,
+                employee=employee,
+                gross_salary=structure.gross_salary,
+                paye_tax=calculations['paye_tax'],
+                nssf_employee=calculations['nssf_employee'],
+                nssf_employer=calculations['nssf_employer'],
+                local_service_tax=calculations['local_service_tax'],
+                total_deductions=calculations['total_deductions'],
+                net_salary=calculations['net_salary'],
+                payment_status='pending'
+            )
+            for field in STRUCTURE_FIELDS:
+                setattr(payslip, field, getattr(structure, field))
+            payslips.append(payslip)
+
+        return payslips, skipped
+
+    @staticmethod
+    def compute_totals(payslips):
+        """Sum the run total fields over in-memory payslips"""
+        totals = {total_field: Decimal('0.00') for total_field in RUN_TOTAL_FIELDS.values()}
+        for payslip in payslips:
+            for field, total_field in RUN_TOTAL_FIELDS.items():
+                totals[total_field] += getattr(payslip, field)
+        return totals
+
+    def reset(self):
+        """Delete the run's payslips and zero its totals"""
+        payroll_run = self.payroll_run
+        with transaction.atomic():
+            payroll_run.payslips.all().delete()
+            for total_field in RUN_TOTAL_FIELDS.values():
+                setattr(payroll_run, total_field, Decimal('0.00'))
+            payroll_run.save(update_fields=list(RUN_TOTAL_FIELDS.values()) + ['updated_at'])
+
+    def process_chunk(self, employees):
+        """
+        Add payslips for one chunk of employees to the run.
+
+        Payslips are inserted and the run totals incremented in the same
+        transaction, so a chunk is either fully applied or not at all.
+
+        Returns:
+            Tuple of (created_count, skipped_count)
+        """
+        payslips, skipped = self.build_payslips(employees)
+        totals = self.compute_totals(payslips)
+
+        with transaction.atomic():
+            Payslip.objects.bulk_create(payslips, batch_size=self.CHUNK_SIZE)
+            PayrollRun.objects.filter(pk=self.payroll_run.pk).update(
+                **{total_field: F(total_field) + value for total_field, value in totals.items()}
+            )
+
+        return len(payslips), skipped
+
+    def process(self, employees):
+        """
+        Replace the run's payslips with freshly computed ones for `employees`
+        and update the run totals, all in one transaction.
+
+        Args:
+            employees: Employee queryset to include in the run
+
+        Returns:
+            Number of payslips created
+        """
+        payroll_run = self.payroll_run
+        payslips, skipped = self.build_payslips(employees)
+
+        if skipped:
+            logger.warning(
+                f"Payroll Run {payroll_run.id}: Skipped {skipped} employees due to missing SalaryStructure."
+            )
+
+        with transaction.atomic():
+            payroll_run.payslips.all().delete()
+            Payslip.objects.bulk_create(payslips, batch_size=self.CHUNK_SIZE)
+
+            for total_field, value in self.compute_totals(payslips).items():
+                setattr(payroll_run, total_field, value)
+
+            if payroll_run.status == 'draft' and payslips:
+                payroll_run.status = 'processing'
+
+            payroll_run.save()
+
+        return len(payslips)
@@ -246,3 +246,33 @@ class WageAccessRequest(models.Model):
         self.save()
         
         return earned_to_date
+
+    def calculate_max_allowed(self):
+        """
+        Maximum amount the employee may draw: the configured percentage of
+        gross salary (optionally capped at a fixed amount), limited to what
+        has been earned so far.
+        """
+        config = self.company.ewa_config
+        salary_structure = self.employee.salary_structure
+        if not salary_structure:
+            return Decimal('0.00')
+
+        max_allowed = (salary_structure.gross_salary * config.max_percentage_of_salary) / 100
+        if config.max_fixed_amount:
+            max_allowed = min(max_allowed, config.max_fixed_amount)
+
+        # Cannot exceed earned amount
+        return min(max_allowed, self.earned_to_date)
+
+    def calculate_net_salary(self):
+        """Month's take-home pay after PAYE, NSSF and LST, from the batch tax calculator"""
+        from .calculator import BatchTaxCalculator
+        from .utils import get_tax_config
+
+        salary_structure = self.employee.salary_structure
+        if not salary_structure:
+            return Decimal('0.00')
+
+        results = BatchTaxCalculator(get_tax_config(self.company)).calculate([salary_structure.gross_salary])
+        return results[0]['net_salary']
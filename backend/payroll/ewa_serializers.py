@@ -56,25 +56,7 @@ class WageAccessRequestSerializer(serializers.ModelSerializer):
     def get_max_allowed_amount(self, obj):
         """Calculate maximum allowed EWA amount for this employee"""
         try:
-            config = obj.company.ewa_config
-            salary_structure = obj.employee.salary_structure
-            
-            if not salary_structure:
-                return Decimal('0.00')
-            
-            # Calculate based on percentage
-            max_by_percentage = (salary_structure.gross_salary * config.max_percentage_of_salary) / 100
-            
-            # Apply fixed cap if set
-            if config.max_fixed_amount:
-                max_allowed = min(max_by_percentage, config.max_fixed_amount)
-            else:
-                max_allowed = max_by_percentage
-            
-            # Cannot exceed earned amount
-            max_allowed = min(max_allowed, obj.earned_to_date)
-            
-            return max_allowed
+            return obj.calculate_max_allowed()
         except:
             return Decimal('0.00')
     
@@ -153,6 +135,7 @@ class EmployeeEWAEligibilitySerializer(serializers.Serializer):
     eligibility_notes = serializers.CharField()
     earned_to_date = serializers.DecimalField(max_digits=15, decimal_places=2)
     max_allowed_amount = serializers.DecimalField(max_digits=15, decimal_places=2)
+    net_salary = serializers.DecimalField(max_digits=15, decimal_places=2)
     days_worked = serializers.IntegerField()
     working_days_in_month = serializers.IntegerField()
     requests_this_month = serializers.IntegerField()
@@ -83,15 +83,8 @@ class WageAccessRequestViewSet(viewsets.ModelViewSet):
             is_eligible = temp_request.check_eligibility()
             
             # Calculate max allowed
-            salary_structure = employee.salary_structure
-            max_by_percentage = (salary_structure.gross_salary * config.max_percentage_of_salary) / 100 if salary_structure else 0
-            
-            if config.max_fixed_amount:
-                max_allowed = min(max_by_percentage, config.max_fixed_amount)
-            else:
-                max_allowed = max_by_percentage
-            
-            max_allowed = min(max_allowed, earned_to_date)
+            max_allowed = temp_request.calculate_max_allowed()
+            net_salary = temp_request.calculate_net_salary()
             
             # Count requests this month
             requests_this_month = WageAccessRequest.objects.filter(
@@ -106,6 +99,7 @@ created_at__month=timezone.now().month,
                 'eligibility_notes': temp_request.eligibility_notes,
                 'earned_to_date': earned_to_date,
                 'max_allowed_amount': max_allowed,
+                'net_salary': net_salary,
                 'days_worked': temp_request.days_worked,
                 'working_days_in_month': temp_request.working_days_in_month,
                 'requests_this_month': requests_this_month,
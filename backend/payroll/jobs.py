@@ -0,0 +1,255 @@
+"""
+Database-backed payroll job queue.
+
+The payroll run endpoints enqueue a PayrollJob and return immediately; the
+run_payroll_worker management command claims queued jobs and computes the
+payslips chunk by chunk through PayrollEngine (or, for 'email' and 'pdf'
+jobs, sends the payslip emails or renders the payslip PDFs chunk by chunk).
+
+Each chunk's payslips, run-total increments and job progress are committed
+in one transaction, so a job picked up again after a worker died resumes
+from its last committed chunk without duplicating payslips or totals.
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from employees.models import Employee
+from .engine import PayrollEngine
+from .models import PayrollJob, PayrollRun
+
+logger = logging.getLogger(__name__)
+
+
+# Employees per committed chunk (also the progress reporting granularity)
+CHUNK_SIZE = 250
+
+# A running job whose heartbeat is older than this is considered abandoned
+STALE_AFTER = timedelta(minutes=5)
+
+# Give up on a job after this many claims
+MAX_ATTEMPTS = 3
+
+
+class JobLost(Exception):
+    """Raised when another worker has taken over the job being processed"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def get_active_job(payroll_run):
+    """Queued or running job for a payroll run, if any"""
+    return payroll_run.jobs.filter(status__in=['queued', 'running']).first()
+
+
+def latest_compute_job(payroll_run):
+    """Most recent job that (re)computed the run's payslips, if any"""
+    return payroll_run.jobs.filter(job_type__in=['initialize', 'process']).order_by('-created_at', '-pk').first()
+
+
+def enqueue_payroll_job(payroll_run, employees, user=None, job_type='process'):
+    """
+    Queue payslip computation for `employees` on `payroll_run`.
+
+    If the run already has an active job, that job is returned instead of
+    queuing a second one. The run row is locked while checking, and the
+    one-active-job constraint catches any request that slips past it.
+    """
+    employee_ids = list(employees.order_by('id').values_list('id', flat=True))
+    try:
+        with transaction.atomic():
+            PayrollRun.objects.select_for_update().filter(pk=payroll_run.pk).exists()
+            active = get_active_job(payroll_run)
+            if active:
+                return active
+            return PayrollJob.objects.create(
+                company=payroll_run.company,
+                payroll_run=payroll_run,
+                job_type=job_type,
+                employee_ids=employee_ids,
+                total=len(employee_ids),
+                created_by=user
+            )
+    except IntegrityError:
+        return get_active_job(payroll_run)
+
+
+def _claimable(now):
+    return Q(status='queued') | Q(status='running', heartbeat_at__lt=now - STALE_AFTER)
+
+
+def claim_next_job(worker_id):
+    """
+    Atomically claim the oldest queued (or abandoned) job.
+
+    Claiming is a conditional UPDATE, so two workers can never own the same
+    job; no row locks or broker are required.
+    """
+    now = timezone.now()
+
+    # Abandoned jobs that already used up their attempts are failed, not retried
+    PayrollJob.objects.filter(
+        status='running', heartbeat_at__lt=now - STALE_AFTER, attempts__gte=MAX_ATTEMPTS
+    ).update(status='failed', error='Worker stopped responding too many times', finished_at=now)
+
+    candidates = PayrollJob.objects.filter(_claimable(now)).order_by('created_at').values_list('id', flat=True)[:10]
+    for job_id in candidates:
+        claimed = PayrollJob.objects.filter(_claimable(now), pk=job_id).update(
+            status='running',
+            worker_id=worker_id,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1
+        )
+        if claimed:
+            job = PayrollJob.objects.select_related('payroll_run', 'payroll_run__company').get(pk=job_id)
+            if not job.started_at:
+                job.started_at = now
+                job.save(update_fields=['started_at'])
+            return job
+    return None
+
+
+def run_job(job, worker_id):
+    """Process a claimed job to completion (resuming from job.processed)"""
+    payroll_run = job.payroll_run
+
+    try:
+        if job.job_type == 'email':
+            _send_emails(job, payroll_run, worker_id)
+        elif job.job_type == 'pdf':
+            _generate_pdfs(job, payroll_run, worker_id)
+        else:
+            _compute_payslips(job, payroll_run, worker_id)
+
+        _finish(job, payroll_run, worker_id)
+        logger.info(f"Payroll job {job.pk} completed: {job.processed} employees, {job.skipped} skipped.")
+
+    except JobLost as e:
+        logger.warning(str(e))
+    except Exception as e:
+        logger.error(f"Payroll job {job.pk} failed: {str(e)}")
+        PayrollJob.objects.filter(pk=job.pk, worker_id=worker_id).update(
+            status='failed', error=str(e), finished_at=timezone.now()
+        )
+
+
+def _record_progress(job, worker_id, count, skipped):
+    owned = PayrollJob.objects.filter(pk=job.pk, worker_id=worker_id, status='running').update(
+        processed=F('processed') + count,
+        skipped=F('skipped') + skipped,
+        heartbeat_at=timezone.now()
+    )
+    if not owned:
+        raise JobLost(f"Payroll job {job.pk} was taken over by another worker")
+
+
+def _compute_payslips(job, payroll_run, worker_id):
+    engine = PayrollEngine(payroll_run)
+
+    if job.processed == 0:
+        # Fresh start (or a retry that never committed a chunk)
+        engine.reset()
+
+    employee_ids = job.employee_ids
+    while job.processed < len(employee_ids):
+        chunk = employee_ids[job.processed:job.processed + CHUNK_SIZE]
+        employees = Employee.objects.filter(company=payroll_run.company, id__in=chunk)
+
+        with transaction.atomic():
+            _, skipped = engine.process_chunk(employees)
+            _record_progress(job, worker_id, len(chunk), skipped)
+
+        job.processed += len(chunk)
+        job.skipped += skipped
+
+
+def _send_emails(job, payroll_run, worker_id):
+    """
+    Email the payslips of the job's employees. Delivery status is stored on
+    each payslip, so a resumed or repeated job only sends what has not
+    been sent yet; failures are counted as skipped.
+    """
+    from .services.payroll_email_service import PayrollEmailService
+    from .services.payslip_generator import PayslipGenerator
+
+    employee_ids = job.employee_ids
+    while job.processed < len(employee_ids):
+        chunk = employee_ids[job.processed:job.processed + CHUNK_SIZE]
+        # Render the chunk's missing PDFs first; rendering a whole large run up
+        # front would outlast STALE_AFTER and let a second worker resend emails
+        PayslipGenerator.generate_run_pdfs(payroll_run, only_missing=True, employee_ids=chunk)
+
+        payslips = payroll_run.payslips.filter(
+            employee_id__in=chunk
+        ).exclude(email_status='sent').select_related('employee', 'payroll_run__company')
+
+        _, failed = PayrollEmailService.send_bulk_emails(payslips)
+        _record_progress(job, worker_id, len(chunk), failed)
+
+        job.processed += len(chunk)
+        job.skipped += failed
+
+
+def _generate_pdfs(job, payroll_run, worker_id):
+    """
+    Render the PDFs of the job's employees' payslips. A resumed job
+    continues from its last chunk; employees without a payslip are skipped.
+    """
+    from .services.payslip_generator import PayslipGenerator
+
+    employee_ids = job.employee_ids
+    while job.processed < len(employee_ids):
+        chunk = employee_ids[job.processed:job.processed + CHUNK_SIZE]
+        generated = PayslipGenerator.generate_run_pdfs(payroll_run, employee_ids=chunk)
+        _record_progress(job, worker_id, len(chunk), len(chunk) - generated)
+
+        job.processed += len(chunk)
+        job.skipped += len(chunk) - generated
+
+
+def _finish(job, payroll_run, worker_id):
+    now = timezone.now()
+    with transaction.atomic():
+        owned = PayrollJob.objects.filter(pk=job.pk, worker_id=worker_id, status='running').update(
+            status='completed', finished_at=now, heartbeat_at=now
+        )
+        if not owned:
+            raise JobLost(f"Payroll job {job.pk} was taken over by another worker")
+        job.status = 'completed'
+
+        if job.job_type in ('email', 'pdf'):
+            return
+
+        payroll_run.refresh_from_db()
+        if job.job_type == 'process':
+            payroll_run.status = 'processing'
+            payroll_run.processed_at = now
+            payroll_run.processed_by = job.created_by
+        elif payroll_run.status == 'draft' and job.processed > job.skipped:
+            payroll_run.status = 'processing'
+        payroll_run.save()
+
+
+def run_pending_jobs(worker_id=None, limit=None):
+    """
+    Claim and run jobs until the queue is empty (or `limit` jobs ran).
+
+    Returns:
+        Number of jobs run
+    """
+    worker_id = worker_id or default_worker_id()
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job(worker_id)
+        if job is None:
+            break
+        run_job(job, worker_id)
+        count += 1
+    return count
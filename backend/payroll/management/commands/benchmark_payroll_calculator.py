@@ -0,0 +1,78 @@
+"""
+Management command to benchmark the batch payroll calculator.
+Run with: python manage.py benchmark_payroll_calculator --count 100000
+"""
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from payroll.calculator import BatchTaxCalculator, calculate_net_salaries, to_cents
+from payroll.utils import calculate_net_salary
+
+
+# Default Uganda TaxSettings, as produced by utils.get_tax_config
+DEFAULT_TAX_CONFIG = {
+    'nssf_employee_rate': Decimal('0.05'),
+    'nssf_employer_rate': Decimal('0.10'),
+    'nssf_ceiling': Decimal('0.00'),
+    'personal_relief': Decimal('240000.00'),
+    'insurance_relief': Decimal('50000.00'),
+    'pension_fund_relief': Decimal('200000.00'),
+    'local_service_tax_enabled': True,
+    'local_service_tax_rate': Decimal('0.05'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare the batch payroll calculator against the per-employee Decimal calculation'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=100000,
+            help='Number of gross salaries to calculate (default: 100000)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed for generated salaries (default: 42)'
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        rng = random.Random(options['seed'])
+        salaries = [Decimal(rng.randint(10000000, 2000000000)).scaleb(-2) for _ in range(count)]
+        deductions = [{'loan_deduction': Decimal(rng.randint(0, 5000000)).scaleb(-2)} for _ in range(count)]
+
+        start = time.perf_counter()
+        scalar = [calculate_net_salary(g, d, DEFAULT_TAX_CONFIG) for g, d in zip(salaries, deductions)]
+        scalar_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = calculate_net_salaries(salaries, deductions, DEFAULT_TAX_CONFIG)
+        batch_seconds = time.perf_counter() - start
+
+        calculator = BatchTaxCalculator(DEFAULT_TAX_CONFIG)
+        gross_cents = [to_cents(g) for g in salaries]
+        loan_cents = [to_cents(d['loan_deduction']) for d in deductions]
+        start = time.perf_counter()
+        calculator.calculate_cents(gross_cents, {'loan_deduction': loan_cents})
+        core_seconds = time.perf_counter() - start
+
+        mismatches = sum(1 for a, b in zip(scalar, batch) if a != b)
+
+        self.stdout.write(f'Salaries:            {count}')
+        self.stdout.write(f'Scalar (Decimal):    {scalar_seconds:.3f}s')
+        self.stdout.write(f'Batch (Decimal I/O): {batch_seconds:.3f}s')
+        self.stdout.write(f'Batch (cents core):  {core_seconds:.3f}s')
+        if batch_seconds:
+            self.stdout.write(f'Speed-up:            {scalar_seconds / batch_seconds:.1f}x (core {scalar_seconds / max(core_seconds, 1e-9):.1f}x)')
+
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'{mismatches} results differ from the scalar calculation'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All results match the scalar calculation to the cent'))
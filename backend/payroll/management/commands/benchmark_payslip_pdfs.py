@@ -0,0 +1,117 @@
+"""
+Management command to benchmark payslip PDF rendering throughput.
+Run with: python manage.py benchmark_payslip_pdfs --count 5000
+"""
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+
+from payroll.services.payslip_generator import (
+    PayslipTemplate, init_render_worker, render_in_worker
+)
+
+
+def _sample_logo():
+    from PIL import Image as PILImage
+
+    buffer = BytesIO()
+    PILImage.new('RGB', (900, 300), '#2563eb').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _documents(count, seed):
+    rng = random.Random(seed)
+    documents = []
+    for i in range(count):
+        gross = Decimal(rng.randint(50000000, 500000000)).scaleb(-2)
+        paye = (gross * Decimal('0.25')).quantize(Decimal('0.01'))
+        nssf = (gross * Decimal('0.05')).quantize(Decimal('0.01'))
+        documents.append({
+            'id': i + 1,
+            'company_name': 'Benchmark Ltd',
+            'month': 6,
+            'year': 2025,
+            'employee_name': f'Employee {i + 1}',
+            'employee_number': f'EMP{i + 1:05d}',
+            'employee_last_name': f'Employee{i + 1}',
+            'payment_method': 'Bank Transfer',
+            'basic_salary': gross,
+            'allowances': Decimal('0.00'),
+            'bonus': Decimal('0.00'),
+            'paye_tax': paye,
+            'nssf_employee': nssf,
+            'other_deductions': Decimal('0.00'),
+            'gross_salary': gross,
+            'total_deductions': paye + nssf,
+            'net_salary': gross - paye - nssf,
+        })
+    return documents
+
+
+class Command(BaseCommand):
+    help = 'Measure payslip PDFs rendered per second (per-payslip setup vs cached template vs process pool)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=5000,
+            help='Number of payslips in the simulated run (default: 5000)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes for the parallel run (default: CPU count)'
+        )
+        parser.add_argument(
+            '--sample',
+            type=int,
+            default=500,
+            help='Payslips rendered for the single-process measurements (default: 500)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed for generated payslips (default: 42)'
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        workers = options['workers']
+        documents = _documents(count, options['seed'])
+        sample = documents[:min(options['sample'], count)]
+        logo = _sample_logo()
+
+        # Previous behaviour: styles and logo rebuilt for every payslip
+        start = time.perf_counter()
+        for document in sample:
+            PayslipTemplate(document['company_name'], logo).render(document)
+        uncached_rate = len(sample) / (time.perf_counter() - start)
+
+        template = PayslipTemplate('Benchmark Ltd', logo)
+        start = time.perf_counter()
+        for document in sample:
+            template.render(document)
+        cached_rate = len(sample) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker, initargs=('Benchmark Ltd', logo)) as executor:
+            chunksize = max(1, count // (workers * 4))
+            total_bytes = sum(len(pdf) for pdf in executor.map(render_in_worker, documents, chunksize=chunksize))
+        parallel_seconds = time.perf_counter() - start
+        parallel_rate = count / parallel_seconds
+
+        self.stdout.write(f'Payslips:                     {count} ({workers} workers)')
+        self.stdout.write(f'Per-payslip setup (1 proc):   {uncached_rate:.1f} PDFs/s')
+        self.stdout.write(f'Cached template (1 proc):     {cached_rate:.1f} PDFs/s')
+        self.stdout.write(f'Cached template (pool):       {parallel_rate:.1f} PDFs/s ({parallel_seconds:.1f}s, {total_bytes / 1024 / 1024:.1f} MB)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Pool throughput is {parallel_rate / uncached_rate:.1f}x the per-payslip setup'
+        ))
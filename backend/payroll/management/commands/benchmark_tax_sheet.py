@@ -0,0 +1,98 @@
+"""
+Management command to benchmark streamed tax sheet exports.
+Run with: python manage.py benchmark_tax_sheet --rows 10000
+
+Sample data is created inside a transaction that is rolled back afterwards.
+"""
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Company
+from employees.models import Employee
+from payroll.models import PayrollRun, Payslip
+from payroll.services.tax_sheets import TAX_SHEETS, stream_tax_sheet
+
+
+class Command(BaseCommand):
+    help = 'Measure time-to-first-byte, total time and peak memory of streamed tax sheet exports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='Number of payslips in the sample run (default: 10000)'
+        )
+        parser.add_argument(
+            '--sheet',
+            default='summary',
+            choices=list(TAX_SHEETS),
+            help='Sheet to export (default: summary)'
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+
+        with transaction.atomic():
+            payslips = self._sample_run(rows)
+            for file_format in ['csv', 'xlsx']:
+                self._measure(payslips, options['sheet'], file_format, rows)
+            transaction.set_rollback(True)
+
+    def _sample_run(self, rows):
+        company = Company.objects.create(name='Tax Sheet Benchmark', slug=f'tax-sheet-benchmark-{time.time_ns()}')
+        run = PayrollRun.objects.create(company=company, month=1, year=2025)
+        employees = Employee.objects.bulk_create([
+            Employee(
+                company=company, employee_number=f'BENCH{i:06d}', first_name='Bench', last_name=f'Employee{i}',
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'BENCH{i}',
+                email=f'bench{i}@example.com', phone='0700000000', job_title='Engineer',
+                join_date=date(2020, 1, 1), tin_number=f'100{i:07d}', nssf_number=f'NS{i:08d}'
+            )
+            for i in range(rows)
+        ], batch_size=1000)
+        Payslip.objects.bulk_create([
+            Payslip(
+                payroll_run=run, employee=employee, basic_salary=Decimal('1500000.00'),
+                gross_salary=Decimal('1500000.00'), paye_tax=Decimal('327000.00'),
+                nssf_employee=Decimal('75000.00'), nssf_employer=Decimal('150000.00'),
+                local_service_tax=Decimal('5000.00'), total_deductions=Decimal('407000.00'),
+                net_salary=Decimal('1093000.00')
+            )
+            for employee in employees
+        ], batch_size=1000)
+        return run.payslips.all()
+
+    def _measure(self, payslips, sheet, file_format, rows):
+        tracemalloc.start()
+        start = time.perf_counter()
+        chunks, _, _ = stream_tax_sheet(payslips, sheet, file_format)
+
+        first_byte = first_data = None
+        size = 0
+        for chunk in chunks:
+            if chunk:
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                elif first_data is None:
+                    # The first chunk is the header/package; the next one carries rows
+                    first_data = time.perf_counter() - start
+            size += len(chunk)
+        total = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(
+            f'{file_format.upper():5} {rows} rows: first byte {first_byte * 1000:.1f} ms, '
+            f'first rows {(first_data or total) * 1000:.1f} ms, '
+            f'total {total * 1000:.0f} ms, {size / 1024:.0f} KB, peak memory {peak / 1024:.0f} KB'
+        )
+        if (first_data or total) < 0.2:
+            self.stdout.write(self.style.SUCCESS(f'{file_format.upper()} time-to-first-byte under 200 ms'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{file_format.upper()} time-to-first-byte over 200 ms'))
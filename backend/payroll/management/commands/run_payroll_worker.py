@@ -0,0 +1,44 @@
+"""
+Management command that executes queued payroll jobs.
+Run with: python manage.py run_payroll_worker
+Use --once from cron to drain the queue and exit.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from payroll.jobs import default_worker_id, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Process queued payroll jobs (payslip computation for payroll runs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run all pending jobs and exit instead of polling'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty (default: 2)'
+        )
+        parser.add_argument(
+            '--worker-id',
+            default=None,
+            help='Identifier recorded on claimed jobs (default: hostname:pid)'
+        )
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or default_worker_id()
+        self.stdout.write(f'Payroll worker {worker_id} started')
+
+        while True:
+            count = run_pending_jobs(worker_id)
+            if count:
+                self.stdout.write(self.style.SUCCESS(f'Ran {count} payroll job(s)'))
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
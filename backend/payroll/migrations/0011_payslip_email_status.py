@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0010_payrolljob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payslip',
+            name='email_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='payslip',
+            name='email_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payslip',
+            name='email_status',
+            field=models.CharField(choices=[('pending', 'Not Sent'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='payrolljob',
+            name='job_type',
+            field=models.CharField(choices=[('initialize', 'Initialize Run'), ('process', 'Process Run'), ('email', 'Email Payslips')], default='process', max_length=20),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0011_payslip_email_status'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='payrolljob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('payroll_run',), name='payroll_job_one_active_per_run'),
+        ),
+    ]
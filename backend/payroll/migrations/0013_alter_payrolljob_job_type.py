@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0012_payrolljob_one_active_per_run'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payrolljob',
+            name='job_type',
+            field=models.CharField(choices=[('initialize', 'Initialize Run'), ('process', 'Process Run'), ('email', 'Email Payslips'), ('pdf', 'Generate Payslip PDFs')], default='process', max_length=20),
+        ),
+    ]
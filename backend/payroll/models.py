@@ -202,6 +202,12 @@ class Payslip(models.Model):
         ('failed', 'Failed'),
     ]
 
+    EMAIL_STATUS_CHOICES = [
+        ('pending', 'Not Sent'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
     payroll_run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name='payslips')
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='payslips')
 
@@ -235,6 +241,11 @@ class Payslip(models.Model):
     payment_reference = models.CharField(max_length=100, blank=True)
     pdf_file = models.FileField(upload_to='payslips/', null=True, blank=True)
 
+    # Email delivery
+    email_status = models.CharField(max_length=20, choices=EMAIL_STATUS_CHOICES, default='pending')
+    email_sent_at = models.DateTimeField(null=True, blank=True)
+    email_error = models.TextField(blank=True)
+
     # Audit fields
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -254,6 +265,81 @@ class Payslip(models.Model):
         return f"{self.employee.full_name} - {self.payroll_run.month:02d}/{self.payroll_run.year}"
 
 
+
+class PayrollJob(models.Model):
+    """
+    Background payroll computation job.
+    Queued by the payroll run endpoints and executed by the
+    run_payroll_worker management command (database-backed, no broker).
+    """
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    JOB_TYPE_CHOICES = [
+        ('initialize', 'Initialize Run'),
+        ('process', 'Process Run'),
+        ('email', 'Email Payslips'),
+        ('pdf', 'Generate Payslip PDFs'),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='payroll_jobs')
+    payroll_run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name='jobs')
+    job_type = models.CharField(max_length=20, choices=JOB_TYPE_CHOICES, default='process')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+
+    # Employees to process, fixed at enqueue time so a resumed job sees the same list
+    employee_ids = models.JSONField(default=list, blank=True)
+
+    # Progress
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+
+    # Worker bookkeeping
+    attempts = models.PositiveIntegerField(default=0)
+    worker_id = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    # Audit fields
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Payroll Job'
+        verbose_name_plural = 'Payroll Jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),  # Worker polling
+            models.Index(fields=['payroll_run', 'status']),  # Active job per run
+        ]
+        constraints = [
+            # At most one queued/running job per run, even under concurrent requests
+            models.UniqueConstraint(
+                fields=['payroll_run'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='payroll_job_one_active_per_run'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.payroll_run} - {self.get_job_type_display()} ({self.status})"
+
+    @property
+    def progress(self):
+        """Percentage of employees processed"""
+        if not self.total:
+            return 100 if self.status == 'completed' else 0
+        return round(self.processed * 100 / self.total)
+
 class SalaryAdvance(models.Model):
     """Salary advances and loans"""
 
@@ -2,8 +2,9 @@
 Payroll serializers for API endpoints.
 """
 from rest_framework import serializers
-from .models import SalaryStructure, PayrollRun, Payslip, SalaryAdvance, TaxSettings
-from .utils import calculate_net_salary, get_tax_bracket_info
+from .models import SalaryStructure, PayrollRun, PayrollJob, Payslip, SalaryAdvance, TaxSettings
+from .tax_tables import DEFAULT_COUNTRY
+from .utils import calculate_net_salary, get_tax_bracket_info, get_tax_config
 
 
 class SalaryStructureSerializer(serializers.ModelSerializer):
@@ -122,6 +123,21 @@ class PayrollRunSerializer(serializers.ModelSerializer):
         return obj.approved_by.get_full_name() if obj.approved_by else None
 
 
+
+class PayrollJobSerializer(serializers.ModelSerializer):
+    """Serializer for background payroll jobs (status polling)"""
+
+    progress = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = PayrollJob
+        fields = [
+            'id', 'payroll_run', 'job_type', 'status', 'total', 'processed',
+            'skipped', 'progress', 'attempts', 'error', 'created_at',
+            'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
 class PayslipSerializer(serializers.ModelSerializer):
     """Serializer for Payslip model"""
 
@@ -141,9 +157,21 @@ class PayslipSerializer(serializers.ModelSerializer):
             'gross_salary', 'paye_tax', 'nssf_employee', 'nssf_employer',
             'local_service_tax', 'loan_deduction', 'advance_deduction', 'other_deductions',
             'total_deductions', 'net_salary', 'payment_method', 'payment_status',
-            'payment_date', 'payment_reference', 'pdf_file'
+            'payment_date', 'payment_reference', 'pdf_file',
+            'email_status', 'email_sent_at', 'email_error'
         ]
-        read_only_fields = ['id', 'total_deductions', 'total_allowances', 'pdf_file']
+        read_only_fields = [
+            'id', 'total_deductions', 'total_allowances', 'pdf_file',
+            'email_status', 'email_sent_at', 'email_error'
+        ]
+        # Columns behind computed fields, for ?fields= (see config.fieldsets)
+        field_columns = {
+            'payroll_period': ['payroll_run__month', 'payroll_run__year'],
+            'total_allowances': [
+                'housing_allowance', 'transport_allowance', 'medical_allowance',
+                'lunch_allowance', 'other_allowances',
+            ],
+        }
 
     def get_payroll_period(self, obj):
         """Format payroll period as MM/YYYY"""
@@ -178,21 +206,7 @@ class PayslipSerializer(serializers.ModelSerializer):
             gross = salary_structure.gross_salary + validated_data.get('bonus', 0)
             validated_data['gross_salary'] = gross
             
-            # Fetch Tax Settings
-            try:
-                tax_settings = employee.company.tax_settings
-                tax_config = {
-                    'nssf_employee_rate': tax_settings.nssf_employee_rate / Decimal('100.00'),
-                    'nssf_employer_rate': tax_settings.nssf_employer_rate / Decimal('100.00'),
-                    'nssf_ceiling': tax_settings.nssf_ceiling,
-                    'personal_relief': tax_settings.personal_relief,
-                    'insurance_relief': tax_settings.insurance_relief,
-                    'pension_fund_relief': tax_settings.pension_fund_relief,
-                    'local_service_tax_enabled': tax_settings.local_service_tax_enabled,
-                    'local_service_tax_rate': tax_settings.local_service_tax_rate / Decimal('100.00'),
-                }
-            except Exception:
-                tax_config = {}
+            tax_config = get_tax_config(employee.company)
 
             # Calculate tax and deductions
             calculations = calculate_net_salary(
@@ -232,21 +246,7 @@ class PayslipSerializer(serializers.ModelSerializer):
         )
         instance.gross_salary = instance.basic_salary + total_allowances + instance.bonus
         
-        # Fetch Tax Settings
-        try:
-            tax_settings = instance.employee.company.tax_settings
-            tax_config = {
-                'nssf_employee_rate': tax_settings.nssf_employee_rate / Decimal('100.00'),
-                'nssf_employer_rate': tax_settings.nssf_employer_rate / Decimal('100.00'),
-                'nssf_ceiling': tax_settings.nssf_ceiling,
-                'personal_relief': tax_settings.personal_relief,
-                'insurance_relief': tax_settings.insurance_relief,
-                'pension_fund_relief': tax_settings.pension_fund_relief,
-                'local_service_tax_enabled': tax_settings.local_service_tax_enabled,
-                'local_service_tax_rate': tax_settings.local_service_tax_rate / Decimal('100.00'),
-            }
-        except Exception:
-            tax_config = {}
+        tax_config = get_tax_config(instance.employee.company)
 
         # Calculate new deductions/net
         calculations = calculate_net_salary(
@@ -280,7 +280,12 @@ class PayslipDetailSerializer(PayslipSerializer):
 
     def get_tax_bracket_info(self, obj):
         """Get tax bracket information for the gross salary"""
-        return get_tax_bracket_info(obj.gross_salary)
+        tax_config = get_tax_config(obj.payroll_run.company)
+        return get_tax_bracket_info(
+            obj.gross_salary,
+            tax_config.get('country', DEFAULT_COUNTRY),
+            tax_config.get('tax_year')
+        )
 
 
 class SalaryAdvanceSerializer(serializers.ModelSerializer):
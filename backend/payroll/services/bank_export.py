@@ -1,132 +1,249 @@
 """
 Payroll Bank Export Service
 Generates bank-compatible CSV files for salary disbursement
+
+Exports are streamed: payslips are read with a single .values() query,
+turned into rows by the registered export format and written out line by
+line, so a run of any size can be sent straight to the response.
 """
-import csv
-import io
+import inspect
+from abc import ABC, abstractmethod
 from decimal import Decimal
-from typing import List, Dict, Any
+from typing import Dict, Any, Iterator
 from django.db.models import QuerySet
 
+from .streaming import stream_csv_rows
+
+
+# Columns read for every export (one query, no model instances)
+EXPORT_VALUES = [
+    'net_salary',
+    'employee__first_name',
+    'employee__last_name',
+    'employee__bank_account_number',
+    'employee__mobile_money_number',
+    'employee__phone',
+    'payroll_run__month',
+    'payroll_run__year',
+]
+
+
+def _name(record):
+    return f"{record['employee__first_name']} {record['employee__last_name']}"
+
+
+def _mobile_number(record):
+    """Mobile money number (falling back to the phone number) without + / spaces / dashes"""
+    phone = record['employee__mobile_money_number'] or record['employee__phone']
+    return phone.replace('+', '').replace(' ', '').replace('-', '')
+
+
+class ExportFormat(ABC):
+    """
+    A disbursement file layout. Subclasses define the header and the row
+    for a payslip record (a dict of EXPORT_VALUES).
+    """
+    name = None
+    label = None
+    channel = 'bank'
+    header = []
+
+    @classmethod
+    def account(cls, record):
+        """Destination account of a record; rows without one are skipped"""
+        if cls.channel == 'mobile':
+            return _mobile_number(record)
+        return record['employee__bank_account_number']
+
+    @classmethod
+    @abstractmethod
+    def row(cls, record, account):
+        """CSV row of a record paid to account"""
+
+
+# name -> ExportFormat subclass
+EXPORT_FORMATS = {}
+
+
+def register_format(format_class):
+    """Class decorator adding an ExportFormat to EXPORT_FORMATS"""
+    # Formats are used as classes, never instantiated, so ABC alone would not catch a missing row()
+    if inspect.isabstract(format_class):
+        raise TypeError(f"{format_class.__name__} must implement {', '.join(sorted(format_class.__abstractmethods__))}")
+    EXPORT_FORMATS[format_class.name] = format_class
+    return format_class
+
+
+def get_export_format(format_type):
+    try:
+        return EXPORT_FORMATS[format_type]
+    except KeyError:
+        raise ValueError(f"Unknown format type: {format_type}")
+
+
+@register_format
+class StandardFormat(ExportFormat):
+    """Standard Uganda bank format: Account Number, Employee Name, Amount, Reference"""
+    name = 'standard'
+    label = 'Standard Bank CSV'
+    header = ['Account Number', 'Employee Name', 'Amount', 'Reference', 'Currency']
+
+    @classmethod
+    def row(cls, record, account):
+        return [
+            account,
+            _name(record),
+            float(record['net_salary']),
+            f"Salary-{record['payroll_run__month']}/{record['payroll_run__year']}",
+            'UGX'
+        ]
+
+
+@register_format
+class StanbicFormat(ExportFormat):
+    """Stanbic Bank Uganda specific format"""
+    name = 'stanbic'
+    label = 'Stanbic Bank'
+    header = ['Beneficiary Account', 'Beneficiary Name', 'Amount', 'Payment Details', 'Debit Account']
+
+    @classmethod
+    def row(cls, record, account):
+        return [
+            account,
+            _name(record).upper(),
+            f"{float(record['net_salary']):.2f}",
+            f"SALARY {record['payroll_run__month']}/{record['payroll_run__year']}",
+            ''  # Company debit account - will be filled by company
+        ]
+
+
+@register_format
+class CentenaryFormat(ExportFormat):
+    """Centenary Bank Uganda specific format"""
+    name = 'centenary'
+    label = 'Centenary Bank'
+    header = ['Account Number', 'Account Name', 'Transaction Amount', 'Narration']
+
+    @classmethod
+    def row(cls, record, account):
+        return [
+            account,
+            _name(record),
+            float(record['net_salary']),
+            f"Salary Payment {record['payroll_run__month']}/{record['payroll_run__year']}"
+        ]
+
+
+@register_format
+class MPesaFormat(ExportFormat):
+    """M-Pesa bulk payment CSV (compatible with M-Pesa Business API)"""
+    name = 'mpesa'
+    label = 'M-Pesa'
+    channel = 'mobile'
+    header = ['Phone Number', 'Employee Name', 'Amount', 'Reason', 'Reference']
+
+    @classmethod
+    def row(cls, record, account):
+        return [
+            account,
+            _name(record),
+            float(record['net_salary']),
+            'Salary Payment',
+            f"SAL{record['payroll_run__month']}{record['payroll_run__year']}"
+        ]
+
+
+@register_format
+class AirtelMoneyFormat(ExportFormat):
+    """Airtel Money bulk payment CSV"""
+    name = 'airtel'
+    label = 'Airtel Money'
+    channel = 'mobile'
+    header = ['MSISDN', 'Name', 'Amount', 'Narration']
+
+    @classmethod
+    def row(cls, record, account):
+        return [
+            account,
+            _name(record),
+            float(record['net_salary']),
+            f"Salary {record['payroll_run__month']}/{record['payroll_run__year']}"
+        ]
+
+
+def export_records(payslips: QuerySet, export_format) -> Iterator[tuple]:
+    """(record, account) of every payslip, account '' or None when it has none"""
+    records = payslips.order_by().values(*EXPORT_VALUES).iterator(chunk_size=2000)
+    for record in records:
+        yield record, export_format.account(record)
+
+
+def export_rows(payslips: QuerySet, format_type: str) -> Iterator[list]:
+    """Header and data rows of an export, read with one .values() query"""
+    export_format = get_export_format(format_type)
+    yield export_format.header
+
+    for record, account in export_records(payslips, export_format):
+        if not account:
+            continue
+        yield export_format.row(record, account)
+
+
+def stream_csv(payslips: QuerySet, format_type: str) -> Iterator[str]:
+    """CSV lines of an export, for a StreamingHttpResponse"""
+    return stream_csv_rows(export_rows(payslips, format_type))
+
 
 class UgandaBankExportService:
     """
     Uganda bank CSV export formats
     Supports major Ugandan banks: Stanbic, Centenary, DFCU, etc.
     """
-    
+
     @staticmethod
     def generate_standard_csv(payslips: QuerySet) -> str:
         """
         Generate standard Uganda bank CSV format
-        
+
         Format:
         Account Number, Employee Name, Amount, Reference
         """
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Header
-        writer.writerow(['Account Number', 'Employee Name', 'Amount', 'Reference', 'Currency'])
-        
-        # Data rows
-        for payslip in payslips:
-            employee = payslip.employee
-            
-            # Skip if no bank account
-            if not hasattr(employee, 'bank_account_number') or not employee.bank_account_number:
-                continue
-            
-            writer.writerow([
-                employee.bank_account_number,
-                f"{employee.first_name} {employee.last_name}",
-                float(payslip.net_salary),
-                f"Salary-{payslip.payroll_run.month}/{payslip.payroll_run.year}",
-                'UGX'
-            ])
-        
-        return output.getvalue()
-    
+        return ''.join(stream_csv(payslips, 'standard'))
+
     @staticmethod
     def generate_stanbic_format(payslips: QuerySet) -> str:
         """
         Stanbic Bank Uganda specific format
         """
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Stanbic header
-        writer.writerow([
-            'Beneficiary Account',
-            'Beneficiary Name',
-            'Amount',
-            'Payment Details',
-            'Debit Account'
-        ])
-        
-        for payslip in payslips:
-            employee = payslip.employee
-            
-            if not hasattr(employee, 'bank_account_number') or not employee.bank_account_number:
-                continue
-            
-            writer.writerow([
-                employee.bank_account_number,
-                f"{employee.first_name} {employee.last_name}".upper(),
-                f"{float(payslip.net_salary):.2f}",
-                f"SALARY {payslip.payroll_run.month}/{payslip.payroll_run.year}",
-                ''  # Company debit account - will be filled by company
-            ])
-        
-        return output.getvalue()
-    
+        return ''.join(stream_csv(payslips, 'stanbic'))
+
     @staticmethod
     def generate_centenary_format(payslips: QuerySet) -> str:
         """
         Centenary Bank Uganda specific format
         """
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Centenary header
-        writer.writerow([
-            'Account Number',
-            'Account Name',
-            'Transaction Amount',
-            'Narration'
-        ])
-        
-        for payslip in payslips:
-            employee = payslip.employee
-            
-            if not hasattr(employee, 'bank_account_number') or not employee.bank_account_number:
-                continue
-            
-            writer.writerow([
-                employee.bank_account_number,
-                f"{employee.first_name} {employee.last_name}",
-                float(payslip.net_salary),
-                f"Salary Payment {payslip.payroll_run.month}/{payslip.payroll_run.year}"
-            ])
-        
-        return output.getvalue()
-    
+        return ''.join(stream_csv(payslips, 'centenary'))
+
     @staticmethod
-    def generate_summary_report(payslips: QuerySet) -> Dict[str, Any]:
+    def generate_summary_report(payslips: QuerySet, format_type: str = 'standard') -> Dict[str, Any]:
         """
-        Generate summary report for the export
+        Generate summary report for the export (one query). Accounts are
+        checked with the format's account(), so the counts match the rows
+        the export writes.
         """
-        total_amount = sum(payslip.net_salary for payslip in payslips)
-        total_employees = payslips.count()
-        employees_with_accounts = sum(
-            1 for payslip in payslips 
-            if hasattr(payslip.employee, 'bank_account_number') and payslip.employee.bank_account_number
-        )
-        
+        export_format = get_export_format(format_type)
+        total_employees = with_accounts = 0
+        total_amount = Decimal('0')
+        for record, account in export_records(payslips, export_format):
+            total_employees += 1
+            total_amount += record['net_salary']
+            if account:
+                with_accounts += 1
+
         return {
             'total_employees': total_employees,
-            'employees_with_bank_accounts': employees_with_accounts,
-            'employees_without_accounts': total_employees - employees_with_accounts,
+            'employees_with_bank_accounts': with_accounts,
+            'employees_without_accounts': total_employees - with_accounts,
             'total_amount': float(total_amount),
             'currency': 'UGX'
         }
@@ -136,120 +253,57 @@ class MPesaExportService:
     """
     M-Pesa (Mobile Money) export format for salary disbursement
     """
-    
+
     @staticmethod
     def generate_mpesa_csv(payslips: QuerySet) -> str:
         """
         Generate M-Pesa bulk payment CSV
-        
+
         Format compatible with M-Pesa Business API
         """
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # M-Pesa header
-        writer.writerow([
-            'Phone Number',
-            'Employee Name',
-            'Amount',
-            'Reason',
-            'Reference'
-        ])
-        
-        for payslip in payslips:
-            employee = payslip.employee
-            
-            # Skip if no mobile number
-            if not hasattr(employee, 'phone_number') or not employee.phone_number:
-                continue
-            
-            # Format phone number (remove + and spaces)
-            phone = employee.phone_number.replace('+', '').replace(' ', '').replace('-', '')
-            
-            writer.writerow([
-                phone,
-                f"{employee.first_name} {employee.last_name}",
-                float(payslip.net_salary),
-                'Salary Payment',
-                f"SAL{payslip.payroll_run.month}{payslip.payroll_run.year}"
-            ])
-        
-        return output.getvalue()
-    
+        return ''.join(stream_csv(payslips, 'mpesa'))
+
     @staticmethod
     def generate_airtel_money_csv(payslips: QuerySet) -> str:
         """
         Generate Airtel Money bulk payment CSV
         """
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Airtel Money header
-        writer.writerow([
-            'MSISDN',
-            'Name',
-            'Amount',
-            'Narration'
-        ])
-        
-        for payslip in payslips:
-            employee = payslip.employee
-            
-            if not hasattr(employee, 'phone_number') or not employee.phone_number:
-                continue
-            
-            phone = employee.phone_number.replace('+', '').replace(' ', '').replace('-', '')
-            
-            writer.writerow([
-                phone,
-                f"{employee.first_name} {employee.last_name}",
-                float(payslip.net_salary),
-                f"Salary {payslip.payroll_run.month}/{payslip.payroll_run.year}"
-            ])
-        
-        return output.getvalue()
+        return ''.join(stream_csv(payslips, 'airtel'))
 
 
 class PayrollExportCoordinator:
     """
     Coordinates all payroll export formats
     """
-    
-    BANK_FORMATS = {
-        'standard': UgandaBankExportService.generate_standard_csv,
-        'stanbic': UgandaBankExportService.generate_stanbic_format,
-        'centenary': UgandaBankExportService.generate_centenary_format,
-    }
-    
-    MOBILE_MONEY_FORMATS = {
-        'mpesa': MPesaExportService.generate_mpesa_csv,
-        'airtel': MPesaExportService.generate_airtel_money_csv,
-    }
-    
+
+    @classmethod
+    def available_formats(cls):
+        return [
+            {'name': f.name, 'label': f.label, 'channel': f.channel}
+            for f in EXPORT_FORMATS.values()
+        ]
+
+    @classmethod
+    def stream_export(cls, payslips: QuerySet, format_type: str) -> Iterator[str]:
+        """Streamed CSV for a format (raises ValueError for unknown formats)"""
+        get_export_format(format_type)
+        return stream_csv(payslips, format_type)
+
     @classmethod
     def export_payroll(cls, payslips: QuerySet, format_type: str) -> Dict[str, Any]:
         """
         Export payroll in specified format
-        
+
         Args:
             payslips: QuerySet of Payslip objects
             format_type: 'standard', 'stanbic', 'centenary', 'mpesa', 'airtel'
-            
+
         Returns:
             dict: CSV content and summary
         """
-        # Get the appropriate generator
-        generator = cls.BANK_FORMATS.get(format_type) or cls.MOBILE_MONEY_FORMATS.get(format_type)
-        
-        if not generator:
-            raise ValueError(f"Unknown format type: {format_type}")
-        
-        # Generate CSV
-        csv_content = generator(payslips)
-        
-        # Generate summary
-        summary = UgandaBankExportService.generate_summary_report(payslips)
-        
+        csv_content = ''.join(cls.stream_export(payslips, format_type))
+        summary = UgandaBankExportService.generate_summary_report(payslips, format_type)
+
         return {
             'csv_content': csv_content,
             'summary': summary,
@@ -1,33 +1,35 @@
 import logging
-from django.core.mail import EmailMessage
+import time
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
 
 logger = logging.getLogger(__name__)
 
+
+class PayslipEmailError(Exception):
+    """Raised when a payslip email cannot be built"""
+
+
 class PayrollEmailService:
     @staticmethod
-    def send_payslip_email(payslip):
+    def build_payslip_email(payslip, connection=None):
         """
-        Send payslip PDF to employee via email
+        Build the payslip email (with PDF attached) for a payslip.
+        The PDF must already exist; raises PayslipEmailError otherwise.
         """
-        try:
-            employee = payslip.employee
-            if not employee.email:
-                logger.error(f"Employee {employee.full_name} has no email address.")
-                return False, "Employee has no email address."
+        employee = payslip.employee
+        if not employee.email:
+            raise PayslipEmailError("Employee has no email address.")
+        if not payslip.pdf_file:
+            raise PayslipEmailError("Could not generate or find payslip PDF.")
+
+        subject = f"Payslip for {payslip.payroll_run.month:02d}/{payslip.payroll_run.year} - {employee.full_name}"
 
-            subject = f"Payslip for {payslip.payroll_run.month:02d}/{payslip.payroll_run.year} - {employee.full_name}"
-            
-            context = {
-                'employee_name': employee.full_name,
-                'period': f"{payslip.payroll_run.month:02d}/{payslip.payroll_run.year}",
-                'company_name': payslip.payroll_run.company.name,
-            }
-            
-            # Simple HTML template for email body
-            html_message = f"""
+        # Simple HTML template for email body
+        html_message = f"""
             <html>
                 <body>
                     <p>Dear {employee.full_name},</p>
@@ -36,39 +38,137 @@ class PayrollEmailService:
                 </body>
             </html>
             """
-            
-            email = EmailMessage(
-                subject,
-                html_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [employee.email],
+
+        email = EmailMessage(
+            subject,
+            html_message,
+            settings.DEFAULT_FROM_EMAIL,
+            [employee.email],
+            connection=connection,
+        )
+        email.content_subtype = "html"
+
+        # Attach PDF
+        with payslip.pdf_file.open('rb') as f:
+            email.attach(
+                f"Payslip_{employee.last_name}_{payslip.payroll_run.month}_{payslip.payroll_run.year}.pdf",
+                f.read(),
+                "application/pdf"
             )
-            email.content_subtype = "html"
-            
-            # Attach PDF
-            if payslip.pdf_file:
-                email.attach(
-                    f"Payslip_{employee.last_name}_{payslip.payroll_run.month}_{payslip.payroll_run.year}.pdf",
-                    payslip.pdf_file.read(),
-                    "application/pdf"
-                )
-            else:
+        return email
+
+    @staticmethod
+    def send_payslip_email(payslip):
+        """
+        Send payslip PDF to employee via email
+        """
+        try:
+            employee = payslip.employee
+            if not employee.email:
+                logger.error(f"Employee {employee.full_name} has no email address.")
+                return False, "Employee has no email address."
+
+            if not payslip.pdf_file:
                 # Generate PDF if it doesn't exist
                 from .payslip_generator import PayslipGenerator
                 PayslipGenerator.generate_pdf(payslip)
                 payslip.refresh_from_db()
-                if payslip.pdf_file:
-                    email.attach(
-                        f"Payslip_{employee.last_name}_{payslip.payroll_run.month}_{payslip.payroll_run.year}.pdf",
-                        payslip.pdf_file.read(),
-                        "application/pdf"
-                    )
-                else:
-                    return False, "Could not generate or find payslip PDF."
 
+            email = PayrollEmailService.build_payslip_email(payslip)
             email.send()
+            PayrollEmailService._record_status([payslip], {payslip.pk: None})
             return True, "Email sent successfully."
 
         except Exception as e:
             logger.error(f"Error sending payslip email: {str(e)}")
+            PayrollEmailService._record_status([payslip], {payslip.pk: str(e)})
             return False, str(e)
+
+    @staticmethod
+    def send_bulk_emails(payslips, rate=None, batch_size=None):
+        """
+        Email many payslips, reusing one SMTP connection per batch.
+
+        PDFs must already exist (see PayslipGenerator.generate_run_pdfs).
+        Sending is throttled to `rate` messages per second, and every
+        payslip's email_status is recorded, so a retry can skip those
+        already sent.
+
+        Args:
+            payslips: iterable of Payslip (with employee and payroll_run__company loaded)
+            rate: max messages per second (default: settings.PAYSLIP_EMAIL_RATE, 0 = unthrottled)
+            batch_size: messages per connection (default: settings.PAYSLIP_EMAIL_BATCH_SIZE)
+
+        Returns:
+            Tuple of (sent, failed) counts
+        """
+        if rate is None:
+            rate = settings.PAYSLIP_EMAIL_RATE
+        if batch_size is None:
+            batch_size = settings.PAYSLIP_EMAIL_BATCH_SIZE
+
+        payslips = list(payslips)
+        interval = 1 / rate if rate else 0
+        next_send = time.monotonic()
+        sent = failed = 0
+
+        for start in range(0, len(payslips), batch_size):
+            batch = payslips[start:start + batch_size]
+            errors = {}
+            connection = get_connection()
+            try:
+                connection.open()
+                for payslip in batch:
+                    try:
+                        email = PayrollEmailService.build_payslip_email(payslip, connection=connection)
+                    except Exception as e:
+                        errors[payslip.pk] = str(e)
+                        continue
+
+                    if interval:
+                        delay = next_send - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                        next_send = max(next_send, time.monotonic()) + interval
+
+                    try:
+                        connection.send_messages([email])
+                        errors[payslip.pk] = None
+                    except Exception as e:
+                        logger.error(f"Error sending payslip {payslip.pk} email: {str(e)}")
+                        errors[payslip.pk] = str(e)
+                        # The SMTP session may be unusable after an error
+                        connection.close()
+                        connection.open()
+            except Exception as e:
+                # Connection failure: everything not yet attempted in this batch failed
+                logger.error(f"Payslip email connection failed: {str(e)}")
+                for payslip in batch:
+                    errors.setdefault(payslip.pk, str(e))
+            finally:
+                connection.close()
+
+            PayrollEmailService._record_status(batch, errors)
+            sent += sum(1 for error in errors.values() if error is None)
+            failed += sum(1 for error in errors.values() if error is not None)
+
+        return sent, failed
+
+    @staticmethod
+    def _record_status(payslips, errors):
+        """Save email_status for payslips; errors maps payslip pk -> error message (None = sent)"""
+        from payroll.models import Payslip
+
+        now = timezone.now()
+        updated = []
+        for payslip in payslips:
+            if payslip.pk not in errors:
+                continue
+            error = errors[payslip.pk]
+            payslip.email_status = 'failed' if error else 'sent'
+            payslip.email_error = error or ''
+            if not error:
+                payslip.email_sent_at = now
+            payslip.updated_at = now
+            updated.append(payslip)
+        Payslip.objects.bulk_update(updated, ['email_status', 'email_sent_at', 'email_error', 'updated_at'])
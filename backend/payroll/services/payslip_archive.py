@@ -0,0 +1,185 @@
+"""
+Streamed payroll run downloads.
+
+All payslips of a run are delivered either as one merged PDF or as a ZIP of
+individual PDFs. Both are generators meant for a StreamingHttpResponse: only
+the payslip currently being copied is held in memory. Payslips that already
+have a pdf_file are read from storage as-is; the others are rendered on the
+fly (without being saved).
+"""
+import logging
+import zipfile
+from io import BytesIO
+
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject
+
+from .payslip_generator import get_template, payslip_document, payslip_filename
+from .streaming import ZipStream
+
+logger = logging.getLogger(__name__)
+
+
+def iter_payslip_pdfs(payroll_run):
+    """
+    Yield (archive filename, PDF bytes) for every payslip in a run, in
+    payslip order.
+    """
+    payslips = payroll_run.payslips.select_related(
+        'employee', 'payroll_run__company'
+    ).order_by('employee__employee_number', 'id')
+
+    template = None
+    for payslip in payslips.iterator(chunk_size=200):
+        document = payslip_document(payslip)
+        filename = f"{document['employee_number']}_{payslip_filename(document)}"
+
+        pdf = None
+        if payslip.pdf_file:
+            try:
+                with payslip.pdf_file.open('rb') as f:
+                    pdf = f.read()
+            except OSError as e:
+                logger.warning(f"Stored PDF for payslip {payslip.id} could not be read: {str(e)}")
+
+        if pdf is None:
+            if template is None:
+                template = get_template(payroll_run.company)
+            pdf = template.render(document)
+
+        yield filename, pdf
+
+
+def stream_zip(files):
+    """
+    ZIP archive of (filename, bytes) pairs, yielded entry by entry.
+
+    The output is not seekable, so ZipFile writes data descriptors after
+    each entry instead of seeking back to patch local headers.
+    """
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, data in files:
+            archive.writestr(filename, data)
+            yield stream.pop()
+    yield stream.pop()
+
+
+class StreamingPdfMerger:
+    """
+    Concatenates PDFs into one document while writing it out sequentially.
+
+    Each source's pages, and every object they reference, are renumbered
+    and emitted as soon as the source is added; only the byte offsets are
+    kept for the cross-reference table written by finish().
+
+    Usage:
+        merger = StreamingPdfMerger()
+        yield merger.start()
+        for pdf in pdfs:
+            yield merger.add(pdf)
+        yield merger.finish()
+    """
+
+    CATALOG = 1
+    PAGES = 2
+
+    def __init__(self):
+        self.position = 0
+        self.offsets = {}
+        self.page_numbers = []
+        self.next_number = 3
+
+    def _allocate(self):
+        number = self.next_number
+        self.next_number += 1
+        return number
+
+    def _write_object(self, out, number, obj):
+        self.offsets[number] = self.position + out.tell()
+        out.write(f"{number} 0 obj\n".encode())
+        obj.write_to_stream(out)
+        out.write(b"\nendobj\n")
+
+    def _finish_chunk(self, out):
+        data = out.getvalue()
+        self.position += len(data)
+        return data
+
+    def start(self) -> bytes:
+        out = BytesIO()
+        out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        return self._finish_chunk(out)
+
+    def add(self, pdf: bytes) -> bytes:
+        """Append every page of `pdf`; returns the bytes to emit"""
+        reader = PdfReader(BytesIO(pdf))
+        out = BytesIO()
+
+        numbers = {}
+        pending = []
+
+        def renumber(obj):
+            # Rewrite references in place; the reader is discarded afterwards
+            if isinstance(obj, IndirectObject):
+                key = (obj.idnum, obj.generation)
+                if key not in numbers:
+                    numbers[key] = self._allocate()
+                    pending.append(obj)
+                return IndirectObject(numbers[key], 0, None)
+            if isinstance(obj, DictionaryObject):
+                for key, value in list(obj.items()):
+                    obj[key] = renumber(value)
+            elif isinstance(obj, ArrayObject):
+                for i, value in enumerate(obj):
+                    obj[i] = renumber(value)
+            return obj
+
+        pages = list(reader.pages)
+        for page in pages:
+            ref = page.indirect_reference
+            number = self._allocate()
+            numbers[(ref.idnum, ref.generation)] = number
+            self.page_numbers.append(number)
+
+        for page, number in zip(pages, self.page_numbers[-len(pages):]):
+            # Inherited attributes are already copied onto the page by pypdf
+            page.pop('/Parent', None)
+            renumber(page)
+            page[NameObject('/Parent')] = IndirectObject(self.PAGES, 0, None)
+            self._write_object(out, number, page)
+
+        while pending:
+            ref = pending.pop()
+            obj = renumber(ref.get_object())
+            self._write_object(out, numbers[(ref.idnum, ref.generation)], obj)
+
+        return self._finish_chunk(out)
+
+    def finish(self) -> bytes:
+        """Write the page tree, catalog, cross-reference table and trailer"""
+        out = BytesIO()
+        kids = ' '.join(f"{number} 0 R" for number in self.page_numbers)
+        self.offsets[self.PAGES] = self.position + out.tell()
+        out.write(
+            f"{self.PAGES} 0 obj\n<< /Type /Pages /Kids [ {kids} ] /Count {len(self.page_numbers)} >>\nendobj\n".encode()
+        )
+        self.offsets[self.CATALOG] = self.position + out.tell()
+        out.write(f"{self.CATALOG} 0 obj\n<< /Type /Catalog /Pages {self.PAGES} 0 R >>\nendobj\n".encode())
+
+        xref_offset = self.position + out.tell()
+        size = self.next_number
+        out.write(f"xref\n0 {size}\n0000000000 65535 f \n".encode())
+        for number in range(1, size):
+            out.write(f"{self.offsets[number]:010d} 00000 n \n".encode())
+        out.write(f"trailer\n<< /Size {size} /Root {self.CATALOG} 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        return self._finish_chunk(out)
+
+
+def stream_merged_pdf(files):
+    """One PDF containing the pages of every (filename, bytes) pair, yielded piece by piece"""
+    merger = StreamingPdfMerger()
+    yield merger.start()
+    for _, pdf in files:
+        yield merger.add(pdf)
+    yield merger.finish()
@@ -1,78 +1,212 @@
+import logging
 import os
 import qrcode
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
-from django.conf import settings
 from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from django.utils import timezone
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, Flowable
 from reportlab.lib.units import inch
 
-class PayslipGenerator:
-    @staticmethod
-    def generate_pdf(payslip):
-        """
-        Generate a professional PDF for a payslip
-        """
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-        
-        styles = getSampleStyleSheet()
-        
-        # Custom Styles
-        header_style = ParagraphStyle(
+logger = logging.getLogger(__name__)
+
+# Logo box on the payslip (points) and the resolution the cached logo is scaled to
+LOGO_WIDTH = 1.5 * inch
+LOGO_HEIGHT = 0.5 * inch
+LOGO_DPI = 150
+
+# Runs smaller than this are rendered in-process (pool start-up would dominate)
+MIN_PARALLEL_PAYSLIPS = 50
+
+QR_MASK_PATTERN = 0
+
+
+def build_styles():
+    """Paragraph styles used on every payslip"""
+    styles = getSampleStyleSheet()
+
+    normal_style = ParagraphStyle(
+        'NormalStyle',
+        parent=styles['Normal'],
+        fontSize=10,
+        leading=14
+    )
+    bold_style = ParagraphStyle(
+        'BoldStyle',
+        parent=normal_style,
+        fontName='Helvetica-Bold'
+    )
+
+    return {
+        'header': ParagraphStyle(
             'HeaderStyle',
             parent=styles['Heading1'],
             fontSize=22,
             textColor=colors.HexColor("#2563eb"),
             spaceAfter=10,
             alignment=1
-        )
-        
-        normal_style = ParagraphStyle(
-            'NormalStyle',
-            parent=styles['Normal'],
-            fontSize=10,
-            leading=14
-        )
-        
-        bold_style = ParagraphStyle(
-            'BoldStyle',
-            parent=normal_style,
-            fontName='Helvetica-Bold'
-        )
+        ),
+        'normal': normal_style,
+        'bold': bold_style,
+        'subheader': ParagraphStyle('SubHeader', parent=normal_style, alignment=1),
+        'net': ParagraphStyle('NetStyle', parent=bold_style, fontSize=14, textColor=colors.HexColor("#059669")),
+        'qr_label': ParagraphStyle('QRLabel', parent=normal_style, alignment=2, fontSize=8),
+    }
+
+
+def prepare_logo(logo_bytes):
+    """
+    Decode a company logo once and re-encode it at the size it is drawn on
+    the payslip, so each PDF embeds a small image instead of the original.
+    Returns None if the logo cannot be read.
+    """
+    if not logo_bytes:
+        return None
+    try:
+        from PIL import Image as PILImage
+
+        with PILImage.open(BytesIO(logo_bytes)) as img:
+            size = (int(LOGO_WIDTH / inch * LOGO_DPI), int(LOGO_HEIGHT / inch * LOGO_DPI))
+            if img.mode not in ('RGB', 'RGBA', 'L'):
+                img = img.convert('RGBA')
+            img = img.resize(size)
+            out = BytesIO()
+            img.save(out, format='PNG')
+            return out.getvalue()
+    except Exception as e:
+        logger.warning(f"Could not read company logo: {str(e)}")
+        return None
+
+
+class QRCodeFlowable(Flowable):
+    """
+    Verification QR code drawn as one vector path.
+
+    Drawing the modules directly avoids rasterising a PNG and re-encoding it
+    into every PDF. A fixed mask pattern skips qrcode's search for the best
+    of the eight masks (any mask yields a valid code).
+    """
+
+    def __init__(self, data, size):
+        super().__init__()
+        self.size = size
+        qr = qrcode.QRCode(version=1, box_size=1, border=5, mask_pattern=QR_MASK_PATTERN)
+        qr.add_data(data)
+        qr.make(fit=True)
+        self.matrix = qr.get_matrix()
+
+    def wrap(self, availWidth, availHeight):
+        return self.size, self.size
+
+    def draw(self):
+        # Work in module units (integer coordinates, origin at the top left)
+        size = len(self.matrix)
+        self.canv.saveState()
+        self.canv.scale(self.size / size, -self.size / size)
+        self.canv.translate(0, -size)
+        path = self.canv.beginPath()
+        for y, row in enumerate(self.matrix):
+            col = 0
+            while col < size:
+                if not row[col]:
+                    col += 1
+                    continue
+                start = col
+                while col < size and row[col]:
+                    col += 1
+                # One rectangle per horizontal run of dark modules
+                path.rect(start, y, col - start, 1)
+        self.canv.setFillColor(colors.black)
+        self.canv.drawPath(path, stroke=0, fill=1)
+        self.canv.restoreState()
+
+
+def payslip_document(payslip):
+    """
+    Plain-data snapshot of everything printed on a payslip.
+
+    Documents hold no model instances, so they can be rendered in worker
+    processes without database access.
+    """
+    employee = payslip.employee
+    payroll_run = payslip.payroll_run
+    return {
+        'id': payslip.id,
+        'company_name': payroll_run.company.name,
+        'month': payroll_run.month,
+        'year': payroll_run.year,
+        'employee_name': employee.full_name,
+        'employee_number': str(employee.employee_number),
+        'employee_last_name': employee.last_name,
+        'payment_method': payslip.get_payment_method_display(),
+        'basic_salary': payslip.basic_salary,
+        'allowances': (
+            payslip.housing_allowance + payslip.transport_allowance + payslip.medical_allowance +
+            payslip.lunch_allowance + payslip.other_allowances
+        ),
+        'bonus': payslip.bonus,
+        'paye_tax': payslip.paye_tax,
+        'nssf_employee': payslip.nssf_employee,
+        'other_deductions': payslip.other_deductions + payslip.loan_deduction + payslip.advance_deduction,
+        'gross_salary': payslip.gross_salary,
+        'total_deductions': payslip.total_deductions,
+        'net_salary': payslip.net_salary,
+    }
+
+
+def payslip_filename(document):
+    return f"Payslip_{document['employee_last_name']}_{document['month']}_{document['year']}.pdf"
+
+
+class PayslipTemplate:
+    """
+    Per-company render state: paragraph styles and the prepared logo are
+    built once and reused for every payslip rendered with the template.
+    """
+
+    def __init__(self, company_name, logo_bytes=None):
+        self.company_name = company_name
+        self.logo = prepare_logo(logo_bytes)
+        self.styles = build_styles()
+
+    def render(self, document) -> bytes:
+        """Render a payslip document (see payslip_document) to PDF bytes"""
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+
+        styles = self.styles
+        normal_style = styles['normal']
+        bold_style = styles['bold']
 
         elements = []
 
         # 1. Company Logo and Name
-        company = payslip.payroll_run.company
-        if company.logo:
-            try:
-                logo_path = company.logo.path
-                img = Image(logo_path, width=1.5*inch, height=0.5*inch)
-                img.hAlign = 'LEFT'
-                elements.append(img)
-            except:
-                pass
-        
-        elements.append(Paragraph(company.name.upper(), bold_style))
+        if self.logo:
+            img = Image(BytesIO(self.logo), width=LOGO_WIDTH, height=LOGO_HEIGHT)
+            img.hAlign = 'LEFT'
+            elements.append(img)
+
+        elements.append(Paragraph(self.company_name.upper(), bold_style))
         elements.append(Spacer(1, 0.2*inch))
 
         # 2. Header
-        elements.append(Paragraph("PAYSLIP", header_style))
-        elements.append(Paragraph(f"Period: {payslip.payroll_run.month:02d}/{payslip.payroll_run.year}", ParagraphStyle('SubHeader', parent=normal_style, alignment=1)))
+        elements.append(Paragraph("PAYSLIP", styles['header']))
+        elements.append(Paragraph(f"Period: {document['month']:02d}/{document['year']}", styles['subheader']))
         elements.append(Spacer(1, 0.4*inch))
 
         # 3. Employee Info
-        employee = payslip.employee
         info_data = [
-            [Paragraph("Employee Name:", bold_style), Paragraph(employee.full_name, normal_style), 
-             Paragraph("Employee ID:", bold_style), Paragraph(str(employee.employee_number), normal_style)],
-            [Paragraph("Bank:", bold_style), Paragraph("Bank Transfer", normal_style), 
-             Paragraph("Payment Method:", bold_style), Paragraph(payslip.get_payment_method_display(), normal_style)],
+            [Paragraph("Employee Name:", bold_style), Paragraph(document['employee_name'], normal_style),
+             Paragraph("Employee ID:", bold_style), Paragraph(document['employee_number'], normal_style)],
+            [Paragraph("Bank:", bold_style), Paragraph("Bank Transfer", normal_style),
+             Paragraph("Payment Method:", bold_style), Paragraph(document['payment_method'], normal_style)],
         ]
-        
+
         info_table = Table(info_data, colWidths=[1.2*inch, 1.8*inch, 1.2*inch, 1.8*inch])
         info_table.setStyle(TableStyle([
             ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
@@ -84,23 +218,23 @@ class PayslipGenerator:
         # 4. Earnings and Deductions Table
         earnings = [
             [Paragraph("EARNINGS", bold_style), Paragraph("AMOUNT", bold_style)],
-            ["Basic Salary", f"{payslip.basic_salary:,.2f}"],
-            ["Allowances", f"{payslip.housing_allowance + payslip.transport_allowance + payslip.medical_allowance + payslip.lunch_allowance + payslip.other_allowances:,.2f}"],
-            ["Bonus", f"{payslip.bonus:,.2f}"],
+            ["Basic Salary", f"{document['basic_salary']:,.2f}"],
+            ["Allowances", f"{document['allowances']:,.2f}"],
+            ["Bonus", f"{document['bonus']:,.2f}"],
         ]
-        
+
         deductions = [
             [Paragraph("DEDUCTIONS", bold_style), Paragraph("AMOUNT", bold_style)],
-            ["PAYE Tax", f"{payslip.paye_tax:,.2f}"],
-            ["NSSF (Employee)", f"{payslip.nssf_employee:,.2f}"],
-            ["Other Deductions", f"{payslip.other_deductions + payslip.loan_deduction + payslip.advance_deduction:,.2f}"],
+            ["PAYE Tax", f"{document['paye_tax']:,.2f}"],
+            ["NSSF (Employee)", f"{document['nssf_employee']:,.2f}"],
+            ["Other Deductions", f"{document['other_deductions']:,.2f}"],
         ]
-        
+
         # Combine into one table
         data = [
             [Table(earnings, colWidths=[1.8*inch, 1*inch]), Table(deductions, colWidths=[1.8*inch, 1*inch])]
         ]
-        
+
         main_table = Table(data, colWidths=[3*inch, 3*inch])
         main_table.setStyle(TableStyle([
             ('VALIGN', (0,0), (-1,-1), 'TOP'),
@@ -111,12 +245,11 @@ class PayslipGenerator:
 
         # 5. Net Pay Summary
         summary_data = [
-            [Paragraph("GROSS PAY", bold_style), f"{payslip.gross_salary:,.2f}"],
-            [Paragraph("TOTAL DEDUCTIONS", bold_style), f"{payslip.total_deductions:,.2f}"],
-            [Paragraph("NET PAY", ParagraphStyle('NetStyle', parent=bold_style, fontSize=14, textColor=colors.HexColor("#059669"))), 
-             f"{payslip.net_salary:,.2f}"]
+            [Paragraph("GROSS PAY", bold_style), f"{document['gross_salary']:,.2f}"],
+            [Paragraph("TOTAL DEDUCTIONS", bold_style), f"{document['total_deductions']:,.2f}"],
+            [Paragraph("NET PAY", styles['net']), f"{document['net_salary']:,.2f}"]
         ]
-        
+
         summary_table = Table(summary_data, colWidths=[4*inch, 2*inch])
         summary_table.setStyle(TableStyle([
             ('ALIGN', (1,0), (1,-1), 'RIGHT'),
@@ -127,33 +260,137 @@ class PayslipGenerator:
         elements.append(Spacer(1, 0.5*inch))
 
         # 6. QR Code for Verification
-        qr_data = f"Verifier: Lifeline HRMS\nPayslip ID: {payslip.id}\nEmployee: {employee.full_name}\nNet Pay: {payslip.net_salary:,.2f}"
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        
-        qr_buffer = BytesIO()
-        qr_img.save(qr_buffer, format='PNG')
-        qr_buffer.seek(0)
-        
-        qr_platypus_img = Image(qr_buffer, width=1*inch, height=1*inch)
-        qr_platypus_img.hAlign = 'RIGHT'
-        elements.append(qr_platypus_img)
-        elements.append(Paragraph("Scan to Verify", ParagraphStyle('QRLabel', parent=normal_style, alignment=2, fontSize=8)))
+        qr_data = f"Verifier: Lifeline HRMS\nPayslip ID: {document['id']}\nEmployee: {document['employee_name']}\nNet Pay: {document['net_salary']:,.2f}"
+        qr_flowable = QRCodeFlowable(qr_data, 1*inch)
+        qr_flowable.hAlign = 'RIGHT'
+        elements.append(qr_flowable)
+        elements.append(Paragraph("Scan to Verify", styles['qr_label']))
 
         # Build PDF
         try:
             doc.build(elements)
         except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error building PDF for payslip {payslip.id}: {str(e)}")
+            logger.error(f"Error building PDF for payslip {document['id']}: {str(e)}")
             raise e
-        
+
+        return buffer.getvalue()
+
+
+# Templates cached per process, keyed by company
+_templates = {}
+
+
+def _read_logo(company):
+    if not company.logo:
+        return None
+    try:
+        with company.logo.open('rb') as f:
+            return f.read()
+    except Exception as e:
+        logger.warning(f"Could not open logo for company {company.id}: {str(e)}")
+        return None
+
+
+def get_template(company):
+    """Cached PayslipTemplate for a company (rebuilt when its name or logo changes)"""
+    key = (company.id, company.name, company.logo.name if company.logo else None)
+    template = _templates.get(company.id)
+    if template is None or template[0] != key:
+        template = (key, PayslipTemplate(company.name, _read_logo(company)))
+        _templates[company.id] = template
+    return template[1]
+
+
+# Worker-process state for PayslipGenerator.generate_run_pdfs
+_worker_template = None
+
+
+def init_render_worker(company_name, logo_bytes):
+    global _worker_template
+    _worker_template = PayslipTemplate(company_name, logo_bytes)
+
+
+def render_in_worker(document):
+    return _worker_template.render(document)
+
+
+class PayslipGenerator:
+    @staticmethod
+    def generate_pdf(payslip):
+        """
+        Generate a professional PDF for a payslip
+        """
+        document = payslip_document(payslip)
+        pdf = get_template(payslip.payroll_run.company).render(document)
+
         # Save to FileField
-        filename = f"Payslip_{employee.last_name}_{payslip.payroll_run.month}_{payslip.payroll_run.year}.pdf"
-        payslip.pdf_file.save(filename, File(buffer), save=True)
-        buffer.close()
-        
+        payslip.pdf_file.save(payslip_filename(document), File(BytesIO(pdf)), save=True)
+
         return payslip.pdf_file.url
+
+    @staticmethod
+    def generate_run_pdfs(payroll_run, workers=None, only_missing=False, employee_ids=None):
+        """
+        Generate the PDFs of every payslip in a payroll run.
+
+        Rendering is fanned out over a process pool; each worker builds the
+        company's template once. Files are written as results come back and
+        the payslips' pdf_file columns are set with one bulk_update.
+
+        Args:
+            payroll_run: PayrollRun whose payslips are rendered
+            workers: number of worker processes (default: CPU count)
+            only_missing: only render payslips that have no pdf_file yet
+            employee_ids: only render the payslips of these employees
+
+        Returns:
+            Number of PDFs generated
+        """
+        from payroll.models import Payslip
+
+        payslips = payroll_run.payslips.select_related('employee', 'payroll_run__company').order_by('id')
+        if only_missing:
+            payslips = payslips.filter(Q(pdf_file='') | Q(pdf_file__isnull=True))
+        if employee_ids is not None:
+            payslips = payslips.filter(employee_id__in=employee_ids)
+        payslips = list(payslips)
+        if not payslips:
+            return 0
+
+        company = payroll_run.company
+        documents = [payslip_document(payslip) for payslip in payslips]
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(documents))
+
+        if workers <= 1 or len(documents) < MIN_PARALLEL_PAYSLIPS:
+            template = get_template(company)
+            pdfs = map(template.render, documents)
+            PayslipGenerator._save_pdfs(payslips, documents, pdfs)
+        else:
+            logo = get_template(company).logo
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=init_render_worker,
+                initargs=(company.name, logo)
+            ) as executor:
+                chunksize = max(1, len(documents) // (workers * 4))
+                pdfs = executor.map(render_in_worker, documents, chunksize=chunksize)
+                PayslipGenerator._save_pdfs(payslips, documents, pdfs)
+
+        now = timezone.now()
+        for payslip in payslips:
+            payslip.updated_at = now
+        Payslip.objects.bulk_update(payslips, ['pdf_file', 'updated_at'], batch_size=500)
+
+        logger.info(f"Generated {len(payslips)} payslip PDFs for payroll run {payroll_run.id} using {workers} worker(s).")
+        return len(payslips)
+
+    @staticmethod
+    def _save_pdfs(payslips, documents, pdfs):
+        """Write rendered PDFs to storage and point each payslip at its file"""
+        field = payslips[0]._meta.get_field('pdf_file')
+        for payslip, document, pdf in zip(payslips, documents, pdfs):
+            name = field.generate_filename(payslip, payslip_filename(document))
+            payslip.pdf_file.name = field.storage.save(name, ContentFile(pdf), max_length=field.max_length)
@@ -0,0 +1,147 @@
+"""
+Statutory payroll returns (PAYE return, NSSF schedule, LST schedule).
+
+Each sheet is a list of columns read with one values_list query over the
+run's payslips; the totals row is a single aggregate query. Rows are
+streamed through the shared CSV/XLSX writers in services.streaming.
+"""
+from django.db.models import F, Sum
+
+from .streaming import XLSX_CONTENT_TYPE, stream_csv_rows, stream_xlsx_rows
+
+
+# Employee columns shared by every sheet
+EMPLOYEE_FIELDS = ['employee__employee_number', 'employee__first_name', 'employee__middle_name', 'employee__last_name']
+
+# Computed payslip columns available to sheets
+ANNOTATIONS = {
+    'total_nssf': F('nssf_employee') + F('nssf_employer'),
+}
+
+
+class TaxSheet:
+    """
+    A statutory sheet layout.
+
+    columns: (header, field) pairs, where field is a payslip field, a
+    lookup through employee__, or a key of ANNOTATIONS. Fields listed in
+    `totals` are summed in the database for the closing TOTAL row.
+    """
+
+    def __init__(self, name, title, columns, totals, filename=None):
+        self.name = name
+        self.title = title
+        self.columns = columns
+        self.totals = totals
+        self.filename = filename or name
+
+    @property
+    def headers(self):
+        return ['Employee ID', 'Name'] + [header for header, _ in self.columns]
+
+    @property
+    def fields(self):
+        return [field for _, field in self.columns]
+
+    def _annotated(self, payslips):
+        used = {field: ANNOTATIONS[field] for field in self.fields + self.totals if field in ANNOTATIONS}
+        return payslips.annotate(**used) if used else payslips
+
+    def rows(self, payslips):
+        """Header, one row per payslip and the TOTAL row"""
+        yield self.headers
+
+        records = self._annotated(payslips).order_by('employee__employee_number', 'id').values_list(
+            *EMPLOYEE_FIELDS, *self.fields
+        ).iterator(chunk_size=2000)
+        for number, first_name, middle_name, last_name, *values in records:
+            if middle_name:
+                name = f"{first_name} {middle_name} {last_name}"
+            else:
+                name = f"{first_name} {last_name}"
+            yield [number, name] + values
+
+        yield ['TOTAL', ''] + self.subtotals(payslips)
+
+    def subtotals(self, payslips):
+        """Column totals (one aggregate query); blank for columns that are not summed"""
+        sums = {
+            f'sum_{i}': Sum(ANNOTATIONS.get(field, F(field)))
+            for i, field in enumerate(self.totals)
+        }
+        result = payslips.order_by().aggregate(**sums)
+        totals = {field: result[f'sum_{i}'] for i, field in enumerate(self.totals)}
+        return [totals.get(field, '') for field in self.fields]
+
+
+TAX_SHEETS = {
+    sheet.name: sheet for sheet in [
+        # Combined PAYE/NSSF sheet (the original tax sheet download)
+        TaxSheet(
+            'summary', 'Tax Sheet',
+            [
+                ('Gross Salary', 'gross_salary'),
+                ('PAYE Tax (UGX)', 'paye_tax'),
+                ('NSSF Employee (5%)', 'nssf_employee'),
+                ('NSSF Employer (10%)', 'nssf_employer'),
+                ('Total NSSF', 'total_nssf'),
+                ('Net Salary', 'net_salary'),
+            ],
+            totals=['gross_salary', 'paye_tax', 'nssf_employee', 'nssf_employer', 'total_nssf', 'net_salary'],
+            filename='uganda_tax_sheet',
+        ),
+        TaxSheet(
+            'paye', 'PAYE Return',
+            [
+                ('TIN', 'employee__tin_number'),
+                ('Gross Salary', 'gross_salary'),
+                ('PAYE Tax', 'paye_tax'),
+            ],
+            totals=['gross_salary', 'paye_tax'],
+            filename='paye_return',
+        ),
+        TaxSheet(
+            'nssf', 'NSSF Schedule',
+            [
+                ('NSSF Number', 'employee__nssf_number'),
+                ('Gross Salary', 'gross_salary'),
+                ('Employee Contribution', 'nssf_employee'),
+                ('Employer Contribution', 'nssf_employer'),
+                ('Total Contribution', 'total_nssf'),
+            ],
+            totals=['gross_salary', 'nssf_employee', 'nssf_employer', 'total_nssf'],
+            filename='nssf_schedule',
+        ),
+        TaxSheet(
+            'lst', 'LST Schedule',
+            [
+                ('Gross Salary', 'gross_salary'),
+                ('Local Service Tax', 'local_service_tax'),
+            ],
+            totals=['gross_salary', 'local_service_tax'],
+            filename='lst_schedule',
+        ),
+    ]
+}
+
+
+def stream_tax_sheet(payslips, sheet_name='summary', file_format='csv'):
+    """
+    Stream a statutory sheet.
+
+    Returns:
+        Tuple of (chunk iterator, content type, TaxSheet)
+
+    Raises:
+        ValueError for an unknown sheet or file format
+    """
+    sheet = TAX_SHEETS.get(sheet_name)
+    if sheet is None:
+        raise ValueError(f"Unknown tax sheet: {sheet_name}. Choose from {', '.join(TAX_SHEETS)}")
+
+    rows = sheet.rows(payslips)
+    if file_format == 'csv':
+        return stream_csv_rows(rows), 'text/csv', sheet
+    if file_format == 'xlsx':
+        return stream_xlsx_rows(rows, sheet_name=sheet.title), XLSX_CONTENT_TYPE, sheet
+    raise ValueError(f"Unknown file format: {file_format}. Choose csv or xlsx")
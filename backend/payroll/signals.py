@@ -1,106 +1,111 @@
+from django.db import transaction
+from django.db.models import F
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from .models import SalaryStructure, Payslip
+from django.utils import timezone
 
-@receiver(post_save, sender=SalaryStructure)
-def update_draft_payslips(sender, instance, created, **kwargs):
+from .calculator import BatchTaxCalculator
+from .engine import RUN_TOTAL_FIELDS, STRUCTURE_FIELDS
+from .models import SalaryStructure, Payslip, PayrollRun
+from .utils import get_tax_config
+
+# Payslip fields rewritten by a recalculation
+RECALCULATED_FIELDS = STRUCTURE_FIELDS + [
+    'gross_salary', 'paye_tax', 'nssf_employee', 'nssf_employer',
+    'local_service_tax', 'total_deductions', 'net_salary', 'updated_at',
+]
+
+
+def recalculate_draft_payslips(employee_ids):
     """
-    When a SalaryStructure is updated, find any 'draft' or 'processing' 
-    payroll runs and update the corresponding payslips.
+    Resync the 'draft'/'processing' payslips of the given employees with their
+    current SalaryStructure.
+
+    All affected payslips are recalculated with the batch calculator, written
+    with one bulk_update, and each run's totals are moved by the delta of its
+    changed payslips rather than re-summed.
+
+    Returns:
+        Number of payslips updated
     """
-    # Find active/draft payslips for this employee
-    payslips = Payslip.objects.filter(
-        employee=instance.employee,
+    if not employee_ids:
+        return 0
+
+    structures = {
+        s.employee_id: s
+        for s in SalaryStructure.objects.filter(employee_id__in=employee_ids)
+    }
+    payslips = list(Payslip.objects.filter(
+        employee_id__in=structures.keys(),
         payroll_run__status__in=['draft', 'processing']
-    )
-    
+    ).select_related('payroll_run__company'))
+    if not payslips:
+        return 0
+
+    # Run totals before the change, subtracted again below
+    deltas = {}
     for payslip in payslips:
-        # Sync values from new SalaryStructure
-        payslip.basic_salary = instance.basic_salary
-        payslip.housing_allowance = instance.housing_allowance
-        payslip.transport_allowance = instance.transport_allowance
-        payslip.medical_allowance = instance.medical_allowance
-        payslip.lunch_allowance = instance.lunch_allowance
-        payslip.other_allowances = instance.other_allowances
-        
-        # Save will trigger recalculation if we rely on model logic (check model save)
-        # Actually payslip model save doesn't recalculate net. 
-        # The serializer does it. 
-        # We should use a utility or trigger the serializer logic.
-        
-        from .utils import calculate_net_salary
-        from decimal import Decimal
-        
-        # Re-calculate gross
+        run_delta = deltas.setdefault(payslip.payroll_run_id, dict.fromkeys(RUN_TOTAL_FIELDS.values(), 0))
+        for field, total_field in RUN_TOTAL_FIELDS.items():
+            run_delta[total_field] -= getattr(payslip, field)
+
+        # Sync values from new SalaryStructure and re-calculate gross
+        structure = structures[payslip.employee_id]
+        for field in STRUCTURE_FIELDS:
+            setattr(payslip, field, getattr(structure, field))
         total_allowances = (
-            payslip.housing_allowance + payslip.transport_allowance + 
-            payslip.medical_allowance + payslip.lunch_allowance + 
+            payslip.housing_allowance + payslip.transport_allowance +
+            payslip.medical_allowance + payslip.lunch_allowance +
             payslip.other_allowances
         )
         payslip.gross_salary = payslip.basic_salary + total_allowances + payslip.bonus
-        
-        # Tax Config
-        tax_config = {}
-        try:
-            tax_settings = payslip.employee.company.tax_settings
-            tax_config = {
-                'nssf_employee_rate': tax_settings.nssf_employee_rate / Decimal('100.00'),
-                'nssf_employer_rate': tax_settings.nssf_employer_rate / Decimal('100.00'),
-                'nssf_ceiling': tax_settings.nssf_ceiling,
-                'personal_relief': tax_settings.personal_relief,
-                'insurance_relief': tax_settings.insurance_relief,
-                'pension_fund_relief': tax_settings.pension_fund_relief,
-                'local_service_tax_enabled': tax_settings.local_service_tax_enabled,
-                'local_service_tax_rate': tax_settings.local_service_tax_rate / Decimal('100.00'),
-            }
-        except:
-            pass
-            
-        calculations = calculate_net_salary(
-            payslip.gross_salary,
-            {
-                'loan_deduction': payslip.loan_deduction,
-                'advance_deduction': payslip.advance_deduction,
-                'other_deductions': payslip.other_deductions,
-            },
-            tax_config=tax_config
-        )
-        
-        payslip.paye_tax = calculations['paye_tax']
-        payslip.nssf_employee = calculations['nssf_employee']
-        payslip.nssf_employer = calculations['nssf_employer']
-        payslip.local_service_tax = calculations['local_service_tax']
-        payslip.total_deductions = calculations['total_deductions']
-        payslip.net_salary = calculations['net_salary']
-        
-        payslip.save()
-        
-        # Update Run Totals
-        # We should call a method on the run to update its totals
-        # payroll_run = payslip.payroll_run
-        # (Totals update usually happens after batch processing, let's trigger it)
-        from .views import PayrollRunViewSet
-        # This is a bit circular, let's just use a standalone func or model method
-        # Let's add update_totals to PayrollRun model
-    
-    # Update totals for all affected runs
-    affected_runs = set(p.payroll_run for p in payslips)
-    for run in affected_runs:
-        from django.db.models import Sum
-        agg = run.payslips.aggregate(
-            t_gross=Sum('gross_salary'),
-            t_paye=Sum('paye_tax'),
-            t_nssf_e=Sum('nssf_employee'),
-            t_nssf_r=Sum('nssf_employer'),
-            t_lst=Sum('local_service_tax'),
-            t_ded=Sum('total_deductions'),
-            t_net=Sum('net_salary')
+
+    # One batch per company (tax settings differ between tenants)
+    by_company = {}
+    for payslip in payslips:
+        by_company.setdefault(payslip.payroll_run.company, []).append(payslip)
+
+    for company, company_payslips in by_company.items():
+        results = BatchTaxCalculator(get_tax_config(company)).calculate(
+            [payslip.gross_salary for payslip in company_payslips],
+            [
+                {
+                    'loan_deduction': payslip.loan_deduction,
+                    'advance_deduction': payslip.advance_deduction,
+                    'other_deductions': payslip.other_deductions,
+                }
+                for payslip in company_payslips
+            ]
         )
-        run.total_gross = agg['t_gross'] or 0
-        run.total_paye = agg['t_paye'] or 0
-        run.total_nssf_employee = agg['t_nssf_e'] or 0
-        run.total_nssf_employer = agg['t_nssf_r'] or 0
-        run.total_lst = agg['t_lst'] or 0
-        run.total_deductions = agg['t_ded'] or 0
-        run.total_net = agg['t_net'] or 0
-        run.save()
+        for payslip, calculations in zip(company_payslips, results):
+            payslip.paye_tax = calculations['paye_tax']
+            payslip.nssf_employee = calculations['nssf_employee']
+            payslip.nssf_employer = calculations['nssf_employer']
+            payslip.local_service_tax = calculations['local_service_tax']
+            payslip.total_deductions = calculations['total_deductions']
+            payslip.net_salary = calculations['net_salary']
+
+    now = timezone.now()
+    for payslip in payslips:
+        payslip.updated_at = now
+        run_delta = deltas[payslip.payroll_run_id]
+        for field, total_field in RUN_TOTAL_FIELDS.items():
+            run_delta[total_field] += getattr(payslip, field)
+
+    with transaction.atomic():
+        Payslip.objects.bulk_update(payslips, RECALCULATED_FIELDS, batch_size=500)
+        for run_id, run_delta in deltas.items():
+            changed = {f: F(f) + value for f, value in run_delta.items() if value}
+            if changed:
+                PayrollRun.objects.filter(pk=run_id).update(**changed)
+
+    return len(payslips)
+
+
+@receiver(post_save, sender=SalaryStructure)
+def update_draft_payslips(sender, instance, created, **kwargs):
+    """
+    When a SalaryStructure is updated, find any 'draft' or 'processing'
+    payroll runs and update the corresponding payslips.
+    """
+    recalculate_draft_payslips([instance.employee_id])
@@ -0,0 +1,148 @@
+"""
+PAYE band schedules per country and tax year.
+
+Schedules are stored as plain data below. get_tax_table() compiles a
+schedule once per process into cumulative-threshold columns, so finding the
+band for a salary is a binary search instead of a chain of comparisons.
+"""
+from bisect import bisect_left
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+
+DEFAULT_COUNTRY = 'UG'
+
+# Monthly PAYE bands keyed by (country, first tax year the schedule applies to).
+# 'max' is inclusive; None marks the open-ended top band.
+PAYE_SCHEDULES = {
+    ('UG', 2024): {
+        'currency': 'UGX',
+        'bands': [
+            {'min': Decimal('0'), 'max': Decimal('235000'), 'rate': Decimal('0')},
+            {'min': Decimal('235001'), 'max': Decimal('335000'), 'rate': Decimal('0.10')},
+            {'min': Decimal('335001'), 'max': Decimal('410000'), 'rate': Decimal('0.20')},
+            {'min': Decimal('410001'), 'max': Decimal('10000000'), 'rate': Decimal('0.30')},
+            {'min': Decimal('10000001'), 'max': None, 'rate': Decimal('0.40')},
+        ],
+    },
+    ('KE', 2024): {
+        'currency': 'KES',
+        'bands': [
+            {'min': Decimal('0'), 'max': Decimal('24000'), 'rate': Decimal('0.10')},
+            {'min': Decimal('24001'), 'max': Decimal('32333'), 'rate': Decimal('0.25')},
+            {'min': Decimal('32334'), 'max': Decimal('500000'), 'rate': Decimal('0.30')},
+            {'min': Decimal('500001'), 'max': Decimal('800000'), 'rate': Decimal('0.325')},
+            {'min': Decimal('800001'), 'max': None, 'rate': Decimal('0.35')},
+        ],
+    },
+    ('TZ', 2024): {
+        'currency': 'TZS',
+        'bands': [
+            {'min': Decimal('0'), 'max': Decimal('270000'), 'rate': Decimal('0')},
+            {'min': Decimal('270001'), 'max': Decimal('520000'), 'rate': Decimal('0.08')},
+            {'min': Decimal('520001'), 'max': Decimal('760000'), 'rate': Decimal('0.20')},
+            {'min': Decimal('760001'), 'max': Decimal('1000000'), 'rate': Decimal('0.25')},
+            {'min': Decimal('1000001'), 'max': None, 'rate': Decimal('0.30')},
+        ],
+    },
+}
+
+CENT = Decimal('0.01')
+
+
+def _format_amount(amount):
+    if amount == amount.to_integral_value():
+        return f"{int(amount):,}"
+    return f"{amount:,}"
+
+
+class TaxTable:
+    """
+    A compiled PAYE schedule.
+
+    upper_bounds holds the finite band maxima (sorted, for bisect);
+    base_tax[i] is the tax due on everything below band i, so the tax on an
+    amount in band i is base_tax[i] + (amount - lower_bounds[i]) * rates[i].
+    """
+
+    def __init__(self, country, tax_year, currency, bands):
+        self.country = country
+        self.tax_year = tax_year
+        self.currency = currency
+        self.bands = bands
+
+        self.upper_bounds = []
+        self.lower_bounds = []
+        self.base_tax = []
+        self.rates = []
+
+        lower = Decimal('0')
+        accumulated = Decimal('0')
+        for band in bands:
+            self.lower_bounds.append(lower)
+            self.base_tax.append(accumulated)
+            self.rates.append(band['rate'])
+            if band['max'] is None:
+                break
+            self.upper_bounds.append(band['max'])
+            accumulated = (accumulated + (band['max'] - lower) * band['rate']).quantize(CENT, rounding=ROUND_HALF_UP)
+            lower = band['max']
+
+    def band_index(self, amount) -> int:
+        """Index of the band containing `amount` (binary search)"""
+        return bisect_left(self.upper_bounds, amount)
+
+    def calculate_paye(self, amount: Decimal) -> Decimal:
+        """Monthly PAYE due on `amount`"""
+        index = self.band_index(amount)
+        rate = self.rates[index]
+        if not rate:
+            return self.base_tax[index]
+        return (self.base_tax[index] + (amount - self.lower_bounds[index]) * rate).quantize(CENT, rounding=ROUND_HALF_UP)
+
+    def band_label(self, index) -> str:
+        band = self.bands[index]
+        if band['max'] is None:
+            return f"Above {self.currency} {_format_amount(self.upper_bounds[-1])}"
+        return f"{self.currency} {_format_amount(band['min'])} - {_format_amount(band['max'])}"
+
+    def bracket_info(self, amount: Decimal) -> dict:
+        """Band description and PAYE due for `amount`"""
+        index = self.band_index(amount)
+        rate = self.rates[index]
+        return {
+            'bracket': f"{(rate * 100).normalize():f}%",
+            'range': self.band_label(index),
+            'tax_rate': rate,
+            'tax_amount': self.calculate_paye(amount),
+        }
+
+
+def resolve_schedule_key(country=None, tax_year=None):
+    """
+    Pick the schedule for a country and tax year: the latest schedule that
+    started on or before `tax_year` (the earliest one if none did, the
+    latest one if no year is given). Unknown countries use DEFAULT_COUNTRY.
+    """
+    years = sorted(year for c, year in PAYE_SCHEDULES if c == country)
+    if not years:
+        country = DEFAULT_COUNTRY
+        years = sorted(year for c, year in PAYE_SCHEDULES if c == country)
+
+    if tax_year is None:
+        return country, years[-1]
+
+    applicable = [year for year in years if year <= tax_year]
+    return country, (applicable[-1] if applicable else years[0])
+
+
+@lru_cache(maxsize=None)
+def get_tax_table(country=None, tax_year=None) -> TaxTable:
+    """Compiled TaxTable for a country and tax year (cached per process)"""
+    key = resolve_schedule_key(country or DEFAULT_COUNTRY, tax_year)
+    if key != (country, tax_year):
+        # Share one compiled table between all aliases of a schedule
+        return get_tax_table(*key)
+
+    schedule = PAYE_SCHEDULES[key]
+    return TaxTable(key[0], key[1], schedule['currency'], schedule['bands'])
@@ -1,6 +1,26 @@
+import random
+import shutil
+import tempfile
+from datetime import date, timedelta
 from decimal import Decimal
-from django.test import SimpleTestCase
-from .utils import calculate_paye, calculate_nssf, calculate_net_salary
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from unittest.mock import patch
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import Company
+from employees.models import Employee
+from .calculator import BatchTaxCalculator, calculate_net_salaries
+from .engine import PayrollEngine
+from .jobs import STALE_AFTER, enqueue_payroll_job, run_pending_jobs
+from .models import PayrollJob, PayrollRun, SalaryStructure
+from .services import payslip_generator
+from .services.payslip_generator import PayslipGenerator
+from .signals import recalculate_draft_payslips
+from .tax_tables import get_tax_table
+from .utils import calculate_paye, calculate_nssf, calculate_net_salary, get_tax_bracket_info
 
 class PayrollCalculationTests(SimpleTestCase):
     def test_paye_bracket_1_exempt(self):
@@ -78,3 +98,786 @@ class PayrollCalculationTests(SimpleTestCase):
         result = calculate_net_salary(gross, deductions)
         self.assertEqual(result['total_deductions'], Decimal('272000.00'))
         self.assertEqual(result['net_salary'], Decimal('728000.00'))
+
+
+
+
+class TaxTableTests(SimpleTestCase):
+    def test_uganda_bracket_info(self):
+        self.assertEqual(get_tax_bracket_info(Decimal('200000')), {
+            'bracket': '0%', 'range': 'UGX 0 - 235,000',
+            'tax_rate': Decimal('0'), 'tax_amount': Decimal('0'),
+        })
+        self.assertEqual(get_tax_bracket_info(Decimal('300000')), {
+            'bracket': '10%', 'range': 'UGX 235,001 - 335,000',
+            'tax_rate': Decimal('0.10'), 'tax_amount': Decimal('6500.00'),
+        })
+        self.assertEqual(get_tax_bracket_info(Decimal('12000000')), {
+            'bracket': '40%', 'range': 'Above UGX 10,000,000',
+            'tax_rate': Decimal('0.40'), 'tax_amount': Decimal('3702000.00'),
+        })
+
+    def test_band_edges_are_inclusive(self):
+        self.assertEqual(get_tax_bracket_info(Decimal('335000'))['bracket'], '10%')
+        self.assertEqual(get_tax_bracket_info(Decimal('335000.01'))['bracket'], '20%')
+
+    def test_kenya_schedule(self):
+        # 10% of 24,000 + 25% of 8,333 + 30% of 17,667
+        self.assertEqual(calculate_paye(Decimal('50000'), 'KE', 2024), Decimal('9783.35'))
+        self.assertEqual(get_tax_bracket_info(Decimal('900000'), 'KE', 2024)['range'], 'Above KES 800,000')
+
+    def test_schedule_resolution_and_cache(self):
+        table = get_tax_table('UG', 2024)
+        self.assertIs(get_tax_table('UG', 2030), table)
+        self.assertIs(get_tax_table('XX', 2024), table)
+        self.assertIs(get_tax_table(None, None), table)
+        self.assertEqual(get_tax_table('TZ', 2020).country, 'TZ')
+
+class BatchCalculatorParityTests(SimpleTestCase):
+    TAX_CONFIGS = [
+        {},
+        {
+            'nssf_employee_rate': Decimal('0.05'),
+            'nssf_employer_rate': Decimal('0.10'),
+            'nssf_ceiling': Decimal('0.00'),
+            'personal_relief': Decimal('240000.00'),
+            'insurance_relief': Decimal('50000.00'),
+            'pension_fund_relief': Decimal('200000.00'),
+            'local_service_tax_enabled': True,
+            'local_service_tax_rate': Decimal('0.05'),
+        },
+        {
+            'nssf_employee_rate': Decimal('0.0525'),
+            'nssf_ceiling': Decimal('12345.67'),
+            'local_service_tax_enabled': True,
+            'local_service_tax_rate': Decimal('0.0075'),
+        },
+        {'country': 'KE', 'tax_year': 2024, 'personal_relief': Decimal('2400.00')},
+        {'country': 'TZ', 'tax_year': 2025},
+    ]
+
+    def _salaries(self):
+        rng = random.Random(7)
+        salaries = [Decimal(rng.randint(0, 2000000000)).scaleb(-2) for _ in range(2000)]
+        # Band edges and rounding boundaries
+        salaries += [Decimal(v) for v in ['0', '235000', '235000.01', '247368.42', '335000', '410000', '10000000', '10526315.79']]
+        return salaries
+
+    def test_matches_scalar_calculation(self):
+        salaries = self._salaries()
+        for tax_config in self.TAX_CONFIGS:
+            batch = calculate_net_salaries(salaries, tax_config=tax_config)
+            for gross, result in zip(salaries, batch):
+                self.assertEqual(result, calculate_net_salary(gross, tax_config=tax_config), msg=str(gross))
+
+    def test_matches_scalar_with_deductions(self):
+        salaries = self._salaries()
+        deductions = [
+            {'loan_deduction': Decimal('50000'), 'other_deductions': Decimal('10.05')} if i % 2 else {}
+            for i in range(len(salaries))
+        ]
+        for tax_config in self.TAX_CONFIGS:
+            batch = calculate_net_salaries(salaries, deductions, tax_config)
+            for gross, d, result in zip(salaries, deductions, batch):
+                self.assertEqual(result, calculate_net_salary(gross, d, tax_config), msg=str(gross))
+
+class PayrollEngineTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="EngineCo", slug="engineco")
+        self.run = PayrollRun.objects.create(company=self.company, month=1, year=2025)
+        for i, basic in enumerate(['500000', '1000000', '12000000']):
+            employee = Employee.objects.create(
+                company=self.company, first_name='Emp', last_name=str(i),
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'NID{i}',
+                email=f'emp{i}@engineco.test', phone='0700000000', job_title='Engineer',
+                join_date=date(2020, 1, 1)
+            )
+            SalaryStructure.objects.create(
+                employee=employee, company=self.company, basic_salary=Decimal(basic),
+                housing_allowance=Decimal('50000'), effective_date=date(2025, 1, 1)
+            )
+        # Active employee without a salary structure is skipped
+        Employee.objects.create(
+            company=self.company, first_name='No', last_name='Salary',
+            date_of_birth=date(1990, 1, 1), gender='female', national_id='NIDX',
+            email='nosalary@engineco.test', phone='0700000000', job_title='Engineer',
+            join_date=date(2020, 1, 1)
+        )
+
+    def test_process_creates_payslips_and_totals(self):
+        employees = self.company.employees.filter(employment_status='active')
+        processed = PayrollEngine(self.run).process(employees)
+
+        self.assertEqual(processed, 3)
+        self.assertEqual(self.run.payslips.count(), 3)
+        self.assertEqual(self.run.status, 'processing')
+
+        agg = self.run.payslips.aggregate(gross=Sum('gross_salary'), net=Sum('net_salary'), paye=Sum('paye_tax'))
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.total_gross, agg['gross'])
+        self.assertEqual(self.run.total_net, agg['net'])
+        self.assertEqual(self.run.total_paye, agg['paye'])
+
+    def test_process_uses_constant_queries(self):
+        employees = self.company.employees.filter(employment_status='active')
+        # tax settings, employees+structures, savepoint, delete, insert, run update, release
+        with self.assertNumQueries(7):
+            PayrollEngine(self.run).process(employees)
+
+    def test_reprocessing_replaces_payslips(self):
+        employees = self.company.employees.filter(employment_status='active')
+        PayrollEngine(self.run).process(employees)
+        PayrollEngine(self.run).process(employees)
+        self.assertEqual(self.run.payslips.count(), 3)
+
+
+class EarlyWageAccessTests(TestCase):
+    def setUp(self):
+        from .ewa_models import EarlyWageAccessConfig
+
+        self.company = Company.objects.create(name="EwaCo", slug="ewaco")
+        EarlyWageAccessConfig.objects.create(company=self.company)
+        self.employee = Employee.objects.create(
+            company=self.company, first_name='Ewa', last_name='Worker',
+            date_of_birth=date(1990, 1, 1), gender='female', national_id='ENID1',
+            email='worker@ewaco.test', phone='0700000000', job_title='Engineer',
+            join_date=date(2020, 1, 1)
+        )
+        self.structure = SalaryStructure.objects.create(
+            employee=self.employee, company=self.company, basic_salary=Decimal('1500000'),
+            housing_allowance=Decimal('200000'), effective_date=date(2025, 1, 1)
+        )
+
+    def test_net_salary_comes_from_tax_calculator(self):
+        from .ewa_models import WageAccessRequest
+        from .utils import get_tax_config
+
+        request = WageAccessRequest(company=self.company, employee=self.employee, request_type='ewa')
+        gross = self.structure.gross_salary
+        expected = calculate_net_salary(gross, tax_config=get_tax_config(self.company))['net_salary']
+
+        with patch.object(BatchTaxCalculator, 'calculate', autospec=True,
+                          side_effect=BatchTaxCalculator.calculate) as calculate:
+            self.assertEqual(request.calculate_net_salary(), expected)
+        self.assertEqual(calculate.call_count, 1)
+
+        # The cap is still the configured share of gross, limited to earnings
+        request.earned_to_date = gross
+        config = self.company.ewa_config
+        self.assertEqual(request.calculate_max_allowed(), gross * config.max_percentage_of_salary / 100)
+        request.earned_to_date = Decimal('1000')
+        self.assertEqual(request.calculate_max_allowed(), Decimal('1000'))
+
+
+class PayrollJobTests(TestCase):
+    def setUp(self):
+        from accounts.models import User
+        self.company = Company.objects.create(name="JobCo", slug="jobco")
+        self.user = User.objects.create_user(
+            username='hr', email='hr@jobco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        for i, basic in enumerate(['500000', '1000000', '2000000']):
+            employee = Employee.objects.create(
+                company=self.company, first_name='Emp', last_name=str(i),
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'JNID{i}',
+                email=f'emp{i}@jobco.test', phone='0700000000', job_title='Engineer',
+                join_date=date(2020, 1, 1)
+            )
+            SalaryStructure.objects.create(
+                employee=employee, company=self.company, basic_salary=Decimal(basic),
+                effective_date=date(2025, 1, 1)
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _expected_totals(self, run):
+        return run.payslips.aggregate(gross=Sum('gross_salary'), net=Sum('net_salary'))
+
+    def test_create_queues_job_and_worker_processes_it(self):
+        resp = self.client.post('/api/payroll/payroll-runs/', {'month': 2, 'year': 2025}, format='json')
+        self.assertEqual(resp.status_code, 201, resp.content)
+        job_id = resp.json()['job']['id']
+        run = PayrollRun.objects.get(pk=resp.json()['id'])
+        self.assertEqual(run.payslips.count(), 0)
+
+        self.assertEqual(run_pending_jobs('test-worker'), 1)
+
+        status_resp = self.client.get(f'/api/payroll/payroll-jobs/{job_id}/')
+        self.assertEqual(status_resp.json()['status'], 'completed')
+        self.assertEqual(status_resp.json()['processed'], 3)
+        self.assertEqual(status_resp.json()['total'], 3)
+
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'processing')
+        self.assertEqual(run.payslips.count(), 3)
+        self.assertEqual(run.total_gross, self._expected_totals(run)['gross'])
+
+    def test_abandoned_job_resumes_without_duplicates(self):
+        run = PayrollRun.objects.create(company=self.company, month=3, year=2025)
+        job = enqueue_payroll_job(run, self.company.employees.all(), self.user)
+
+        original_chunk = PayrollEngine.process_chunk
+        calls = []
+
+        def dying_chunk(engine, employees):
+            calls.append(1)
+            if len(calls) == 2:
+                raise KeyboardInterrupt  # Worker process killed mid-run
+            return original_chunk(engine, employees)
+
+        with patch('payroll.jobs.CHUNK_SIZE', 1), patch.object(PayrollEngine, 'process_chunk', dying_chunk):
+            with self.assertRaises(KeyboardInterrupt):
+                run_pending_jobs('worker-a')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), ('running', 1))
+
+        # Not yet stale: nothing to claim
+        self.assertEqual(run_pending_jobs('worker-b'), 0)
+
+        PayrollJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - STALE_AFTER * 2)
+        with patch('payroll.jobs.CHUNK_SIZE', 1):
+            self.assertEqual(run_pending_jobs('worker-b'), 1)
+
+        job.refresh_from_db()
+        run.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.attempts), ('completed', 3, 2))
+        self.assertEqual(run.payslips.count(), 3)
+        expected = self._expected_totals(run)
+        self.assertEqual(run.total_gross, expected['gross'])
+        self.assertEqual(run.total_net, expected['net'])
+
+    def test_run_has_at_most_one_active_job(self):
+        run = PayrollRun.objects.create(company=self.company, month=5, year=2025)
+        job = enqueue_payroll_job(run, self.company.employees.all(), self.user)
+        self.assertEqual(enqueue_payroll_job(run, self.company.employees.all(), self.user), job)
+
+        # A request that passed the active-job check concurrently is rejected by the database
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PayrollJob.objects.create(company=self.company, payroll_run=run, job_type='process')
+
+        with patch('payroll.jobs.get_active_job', side_effect=[None, job]):
+            self.assertEqual(enqueue_payroll_job(run, self.company.employees.all(), self.user), job)
+        self.assertEqual(run.jobs.count(), 1)
+
+    def test_process_refused_while_another_job_type_is_active(self):
+        run = PayrollRun.objects.create(company=self.company, month=6, year=2025)
+        pdf_job = enqueue_payroll_job(run, self.company.employees.all(), self.user, job_type='pdf')
+
+        resp = self.client.post(f'/api/payroll/payroll-runs/{run.pk}/process_payroll/')
+        self.assertEqual(resp.status_code, 400, resp.content)
+        self.assertEqual(list(run.jobs.all()), [pdf_job])
+
+        run_pending_jobs('worker-a')
+        resp = self.client.post(f'/api/payroll/payroll-runs/{run.pk}/process_payroll/')
+        self.assertEqual(resp.status_code, 202, resp.content)
+        self.assertEqual(PayrollJob.objects.get(pk=resp.json()['job_id']).job_type, 'process')
+
+        # Processing again while the process job is queued returns that job
+        again = self.client.post(f'/api/payroll/payroll-runs/{run.pk}/process_payroll/')
+        self.assertEqual(again.json()['job_id'], resp.json()['job_id'])
+
+    def test_run_with_failed_reprocessing_cannot_be_approved(self):
+        run = PayrollRun.objects.create(company=self.company, month=4, year=2025)
+        enqueue_payroll_job(run, self.company.employees.all(), self.user)
+        run_pending_jobs('worker-a')
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'processing')
+
+        job = enqueue_payroll_job(run, self.company.employees.all(), self.user)
+        original_chunk = PayrollEngine.process_chunk
+        calls = []
+
+        def failing_chunk(engine, employees):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('database went away')
+            return original_chunk(engine, employees)
+
+        with patch('payroll.jobs.CHUNK_SIZE', 1), patch.object(PayrollEngine, 'process_chunk', failing_chunk):
+            run_pending_jobs('worker-a')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), ('failed', 1))
+
+        resp = self.client.post(f'/api/payroll/payroll-runs/{run.pk}/approve_payroll/')
+        self.assertEqual(resp.status_code, 400, resp.content)
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'processing')
+
+        # Processing again successfully makes the run approvable
+        enqueue_payroll_job(run, self.company.employees.all(), self.user)
+        run_pending_jobs('worker-a')
+        resp = self.client.post(f'/api/payroll/payroll-runs/{run.pk}/approve_payroll/')
+        self.assertEqual(resp.status_code, 200, resp.content)
+
+
+class SalaryStructureSignalTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="SignalCo", slug="signalco")
+        self.run = PayrollRun.objects.create(company=self.company, month=4, year=2025)
+        self.structures = []
+        for i in range(4):
+            employee = Employee.objects.create(
+                company=self.company, first_name='Emp', last_name=str(i),
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'SNID{i}',
+                email=f'emp{i}@signalco.test', phone='0700000000', job_title='Engineer',
+                join_date=date(2020, 1, 1)
+            )
+            self.structures.append(SalaryStructure.objects.create(
+                employee=employee, company=self.company, basic_salary=Decimal('800000'),
+                effective_date=date(2025, 1, 1)
+            ))
+        PayrollEngine(self.run).process(self.company.employees.all())
+
+    def _assert_totals_match_payslips(self):
+        self.run.refresh_from_db()
+        agg = self.run.payslips.aggregate(
+            gross=Sum('gross_salary'), paye=Sum('paye_tax'), net=Sum('net_salary'),
+            deductions=Sum('total_deductions')
+        )
+        self.assertEqual(self.run.total_gross, agg['gross'])
+        self.assertEqual(self.run.total_paye, agg['paye'])
+        self.assertEqual(self.run.total_net, agg['net'])
+        self.assertEqual(self.run.total_deductions, agg['deductions'])
+
+    def test_salary_change_updates_payslip_and_run_totals(self):
+        structure = self.structures[0]
+        structure.basic_salary = Decimal('1500000')
+        structure.save()
+
+        payslip = self.run.payslips.get(employee=structure.employee)
+        self.assertEqual(payslip.gross_salary, Decimal('1500000.00'))
+        self.assertEqual(payslip.net_salary, calculate_net_salary(Decimal('1500000'))['net_salary'])
+        self._assert_totals_match_payslips()
+
+    def test_recalculation_batches_employees(self):
+        SalaryStructure.objects.filter(company=self.company).update(basic_salary=Decimal('2000000'))
+        employee_ids = [structure.employee_id for structure in self.structures]
+
+        # structures, payslips, tax settings, savepoint, bulk UPDATE, run UPDATE, release
+        with self.assertNumQueries(7):
+            self.assertEqual(recalculate_draft_payslips(employee_ids), 4)
+
+        self.assertEqual(self.run.payslips.filter(gross_salary=Decimal('2000000')).count(), 4)
+        self._assert_totals_match_payslips()
+
+
+class PayslipPdfGenerationTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.company = Company.objects.create(name="PdfCo", slug="pdfco")
+        self.run = PayrollRun.objects.create(company=self.company, month=5, year=2025)
+        for i in range(3):
+            employee = Employee.objects.create(
+                company=self.company, first_name='Emp', last_name=f'Pdf{i}',
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'PNID{i}',
+                email=f'emp{i}@pdfco.test', phone='0700000000', job_title='Engineer',
+                join_date=date(2020, 1, 1)
+            )
+            SalaryStructure.objects.create(
+                employee=employee, company=self.company, basic_salary=Decimal('900000'),
+                effective_date=date(2025, 1, 1)
+            )
+        PayrollEngine(self.run).process(self.company.employees.all())
+
+    def _assert_pdfs_written(self):
+        for payslip in self.run.payslips.all():
+            self.assertTrue(payslip.pdf_file.name.startswith('payslips/'))
+            with payslip.pdf_file.open('rb') as f:
+                self.assertEqual(f.read(5), b'%PDF-')
+
+    def test_generate_run_pdfs_in_process(self):
+        self.assertEqual(PayslipGenerator.generate_run_pdfs(self.run, workers=1), 3)
+        self._assert_pdfs_written()
+
+    def test_generate_run_pdfs_with_process_pool(self):
+        with patch.object(payslip_generator, 'MIN_PARALLEL_PAYSLIPS', 0):
+            self.assertEqual(PayslipGenerator.generate_run_pdfs(self.run, workers=2), 3)
+        self._assert_pdfs_written()
+
+    def test_single_payslip_pdf_matches_run_layout(self):
+        payslip = self.run.payslips.first()
+        PayslipGenerator.generate_pdf(payslip)
+        payslip.refresh_from_db()
+        self.assertEqual(payslip.pdf_file.name, f'payslips/Payslip_{payslip.employee.last_name}_5_2025.pdf')
+
+    def _client(self):
+        from accounts.models import User
+        user = User.objects.create_user(
+            username='hr', email='hr@pdfco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def test_generate_endpoint_queues_pdf_job(self):
+        resp = self._client().post(f'/api/payroll/payroll-runs/{self.run.id}/generate_payslip_pdfs/')
+        self.assertEqual(resp.status_code, 202, resp.content)
+        job = PayrollJob.objects.get(pk=resp.json()['job_id'])
+        self.assertEqual((job.job_type, job.status, job.total), ('pdf', 'queued', 3))
+        self.assertFalse(self.run.payslips.exclude(pdf_file='').exists())
+
+        with patch('payroll.jobs.CHUNK_SIZE', 2):
+            self.assertEqual(run_pending_jobs('test-worker'), 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.skipped), ('completed', 3, 0))
+        self._assert_pdfs_written()
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.status, 'processing')
+
+    def _download(self, archive):
+        resp = self._client().get(f'/api/payroll/payroll-runs/{self.run.id}/download_payslips/?archive={archive}')
+        self.assertEqual(resp.status_code, 200)
+        return b''.join(resp.streaming_content)
+
+    def test_download_merged_pdf_reuses_stored_files(self):
+        from io import BytesIO
+        from pypdf import PdfReader
+
+        stored = self.run.payslips.first()
+        PayslipGenerator.generate_pdf(stored)
+
+        with patch.object(payslip_generator.PayslipTemplate, 'render', autospec=True,
+                          side_effect=payslip_generator.PayslipTemplate.render) as render:
+            data = self._download('pdf')
+        # Only the two payslips without a stored PDF were rendered
+        self.assertEqual(render.call_count, 2)
+
+        reader = PdfReader(BytesIO(data), strict=True)
+        self.assertEqual(len(reader.pages), 3)
+        self.assertIn(stored.employee.last_name.upper(), reader.pages[0].extract_text().upper())
+
+    def test_download_zip(self):
+        import zipfile
+        from io import BytesIO
+
+        archive = zipfile.ZipFile(BytesIO(self._download('zip')))
+        self.assertIsNone(archive.testzip())
+        names = archive.namelist()
+        self.assertEqual(len(names), 3)
+        self.assertTrue(all(archive.read(name).startswith(b'%PDF-') for name in names))
+
+
+@override_settings(PAYSLIP_EMAIL_RATE=0)
+class PayslipBulkEmailTests(TestCase):
+    def setUp(self):
+        from accounts.models import User
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.company = Company.objects.create(name="MailCo", slug="mailco")
+        self.user = User.objects.create_user(
+            username='hr', email='hr@mailco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        for i in range(3):
+            employee = Employee.objects.create(
+                company=self.company, first_name='Emp', last_name=f'Mail{i}',
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'MNID{i}',
+                email=f'emp{i}@mailco.test', phone='0700000000', job_title='Engineer',
+                join_date=date(2020, 1, 1)
+            )
+            SalaryStructure.objects.create(
+                employee=employee, company=self.company, basic_salary=Decimal('700000'),
+                effective_date=date(2025, 1, 1)
+            )
+        self.run = PayrollRun.objects.create(company=self.company, month=6, year=2025)
+        PayrollEngine(self.run).process(self.company.employees.all())
+        self.run.status = 'approved'
+        self.run.save()
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _queue_and_run(self):
+        resp = self.client.post(f'/api/payroll/payroll-runs/{self.run.id}/email_payslips/')
+        self.assertEqual(resp.status_code, 202, resp.content)
+        run_pending_jobs(worker_id='test-worker')
+        return PayrollJob.objects.get(pk=resp.json()['job_id'])
+
+    def test_bulk_email_uses_one_connection_and_attaches_pdfs(self):
+        from django.core import mail
+        from .services import payroll_email_service
+
+        with patch.object(payroll_email_service, 'get_connection',
+                          wraps=payroll_email_service.get_connection) as get_connection:
+            job = self._queue_and_run()
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertTrue(all(m.attachments[0][1].startswith(b'%PDF-') for m in mail.outbox))
+        self.assertEqual(self.run.payslips.filter(email_status='sent', email_sent_at__isnull=False).count(), 3)
+
+    def test_job_stays_claimed_while_rendering_pdfs(self):
+        from .jobs import claim_next_job
+
+        clock = [timezone.now()]
+        generate_run_pdfs = PayslipGenerator.generate_run_pdfs
+        claims = []
+
+        def slow_render(*args, **kwargs):
+            count = generate_run_pdfs(*args, **kwargs)
+            # Each PDF takes four minutes: the whole run would outlast STALE_AFTER
+            clock[0] += timedelta(minutes=4) * count
+            claims.append(claim_next_job('worker-b'))
+            return count
+
+        with patch('payroll.jobs.CHUNK_SIZE', 1), \
+                patch('payroll.jobs.timezone.now', side_effect=lambda: clock[0]), \
+                patch.object(PayslipGenerator, 'generate_run_pdfs', side_effect=slow_render):
+            job = self._queue_and_run()
+
+        self.assertEqual(claims, [None, None, None])
+        self.assertEqual((job.status, job.attempts, job.processed), ('completed', 1, 3))
+        self.assertEqual(self.run.payslips.filter(email_status='sent').count(), 3)
+
+    def test_retry_only_resends_failures(self):
+        from django.core import mail
+        from django.core.mail.backends.locmem import EmailBackend
+
+        send_messages = EmailBackend.send_messages
+
+        def flaky_send(backend, messages):
+            if messages[0].to == ['emp1@mailco.test']:
+                raise ConnectionError('Mailbox unavailable')
+            return send_messages(backend, messages)
+
+        with patch.object(EmailBackend, 'send_messages', autospec=True, side_effect=flaky_send):
+            job = self._queue_and_run()
+
+        self.assertEqual(job.skipped, 1)
+        failed = self.run.payslips.get(email_status='failed')
+        self.assertEqual(failed.employee.email, 'emp1@mailco.test')
+        self.assertIn('Mailbox unavailable', failed.email_error)
+        self.assertEqual(len(mail.outbox), 2)
+
+        retry = self._queue_and_run()
+        self.assertEqual(retry.total, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[-1].to, ['emp1@mailco.test'])
+        self.assertFalse(self.run.payslips.exclude(email_status='sent').exists())
+
+
+class BankExportTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="BankCo", slug="bankco")
+        self.run = PayrollRun.objects.create(company=self.company, month=7, year=2025)
+        accounts = ['1000001', '1000002', '']
+        mobiles = ['', '+256 772-000001', '']
+        for i in range(3):
+            employee = Employee.objects.create(
+                company=self.company, first_name='Emp', last_name=f'Bank{i}',
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'BNID{i}',
+                email=f'emp{i}@bankco.test', phone='0700 000 00' + str(i), job_title='Engineer',
+                join_date=date(2020, 1, 1), bank_account_number=accounts[i],
+                mobile_money_number=mobiles[i]
+            )
+            SalaryStructure.objects.create(
+                employee=employee, company=self.company, basic_salary=Decimal('600000'),
+                effective_date=date(2025, 1, 1)
+            )
+        PayrollEngine(self.run).process(self.company.employees.all())
+
+    def test_stream_uses_one_query_and_skips_missing_accounts(self):
+        from .services.bank_export import stream_csv
+
+        with self.assertNumQueries(1):
+            lines = list(stream_csv(self.run.payslips.all(), 'stanbic'))
+
+        self.assertEqual(lines[0], 'Beneficiary Account,Beneficiary Name,Amount,Payment Details,Debit Account\r\n')
+        self.assertEqual(len(lines), 3)
+        net = self.run.payslips.first().net_salary
+        self.assertIn(f'EMP BANK0,{float(net):.2f},SALARY 7/2025,', ''.join(lines))
+
+    def test_mobile_money_prefers_mobile_money_number(self):
+        from .services.bank_export import MPesaExportService
+
+        content = MPesaExportService.generate_mpesa_csv(self.run.payslips.all())
+        numbers = [line.split(',')[0] for line in content.strip().split('\r\n')[1:]]
+        self.assertEqual(sorted(numbers), ['0700000000', '0700000002', '256772000001'])
+
+    def test_summary_is_one_query(self):
+        from .services.bank_export import UgandaBankExportService
+
+        with self.assertNumQueries(1):
+            summary = UgandaBankExportService.generate_summary_report(self.run.payslips.all())
+
+        self.assertEqual(summary['total_employees'], 3)
+        self.assertEqual(summary['employees_with_bank_accounts'], 2)
+        self.assertEqual(summary['employees_without_accounts'], 1)
+        self.assertEqual(summary['total_amount'], float(self.run.payslips.aggregate(t=Sum('net_salary'))['t']))
+
+    def test_summary_counts_match_exported_rows(self):
+        from .services.bank_export import EXPORT_FORMATS, UgandaBankExportService, stream_csv
+
+        # A mobile number of separators only is no account
+        Employee.objects.filter(last_name='Bank2').update(phone='+ -')
+        for format_type in EXPORT_FORMATS:
+            summary = UgandaBankExportService.generate_summary_report(self.run.payslips.all(), format_type)
+            rows = len(list(stream_csv(self.run.payslips.all(), format_type))) - 1
+            self.assertEqual(summary['employees_with_bank_accounts'], rows, format_type)
+
+    def test_format_without_row_is_rejected(self):
+        from .services.bank_export import EXPORT_FORMATS, ExportFormat, register_format
+
+        with self.assertRaises(TypeError):
+            @register_format
+            class HalfFormat(ExportFormat):
+                name = 'half'
+                header = ['Account']
+
+        self.assertNotIn('half', EXPORT_FORMATS)
+
+    def test_bank_export_endpoint_streams_csv(self):
+        from accounts.models import User
+        user = User.objects.create_user(
+            username='hr', email='hr@bankco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        resp = client.get(f'/api/payroll/payroll-runs/{self.run.id}/bank_export/?export_format=centenary')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        content = b''.join(resp.streaming_content).decode()
+        self.assertTrue(content.startswith('Account Number,Account Name,Transaction Amount,Narration'))
+
+        resp = client.get(f'/api/payroll/payroll-runs/{self.run.id}/bank_export/?export_format=unknown')
+        self.assertEqual(resp.status_code, 400)
+
+
+class TaxSheetExportTests(TestCase):
+    def setUp(self):
+        from accounts.models import User
+        self.company = Company.objects.create(name="TaxCo", slug="taxco")
+        self.user = User.objects.create_user(
+            username='hr', email='hr@taxco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        self.run = PayrollRun.objects.create(company=self.company, month=8, year=2025)
+        for i, basic in enumerate(['500000', '1500000', '3000000']):
+            employee = Employee.objects.create(
+                company=self.company, first_name='Emp', middle_name='M' if i == 0 else '', last_name=f'Tax{i}',
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'TNID{i}',
+                email=f'emp{i}@taxco.test', phone='0700000000', job_title='Engineer',
+                join_date=date(2020, 1, 1), tin_number=f'TIN{i}'
+            )
+            SalaryStructure.objects.create(
+                employee=employee, company=self.company, basic_salary=Decimal(basic),
+                effective_date=date(2025, 1, 1)
+            )
+        PayrollEngine(self.run).process(self.company.employees.all())
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_rows_and_totals_use_two_queries(self):
+        from .services.tax_sheets import stream_tax_sheet
+
+        chunks, content_type, _ = stream_tax_sheet(self.run.payslips.all(), 'paye', 'csv')
+        with self.assertNumQueries(2):
+            lines = ''.join(chunks).strip().split('\r\n')
+
+        self.assertEqual(content_type, 'text/csv')
+        self.assertEqual(lines[0], 'Employee ID,Name,TIN,Gross Salary,PAYE Tax')
+        self.assertEqual(len(lines), 5)
+        self.assertIn('Emp M Tax0,TIN0', lines[1])
+        total_paye = self.run.payslips.aggregate(t=Sum('paye_tax'))['t']
+        self.assertTrue(lines[-1].startswith('TOTAL,,,'))
+        self.assertTrue(lines[-1].endswith(f',{total_paye}'))
+
+    def test_default_download_is_streamed_combined_sheet(self):
+        resp = self.client.get(f'/api/payroll/payroll-runs/{self.run.id}/download_tax_sheet/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertIn('uganda_tax_sheet_8_2025.csv', resp['Content-Disposition'])
+        content = b''.join(resp.streaming_content).decode()
+        self.assertTrue(content.startswith(
+            'Employee ID,Name,Gross Salary,PAYE Tax (UGX),NSSF Employee (5%),NSSF Employer (10%),Total NSSF,Net Salary'
+        ))
+
+    def test_xlsx_is_a_valid_workbook(self):
+        import zipfile
+        from io import BytesIO
+        from xml.etree import ElementTree
+
+        resp = self.client.get(
+            f'/api/payroll/payroll-runs/{self.run.id}/download_tax_sheet/?sheet=nssf&export_format=xlsx'
+        )
+        self.assertEqual(resp.status_code, 200)
+        workbook = zipfile.ZipFile(BytesIO(b''.join(resp.streaming_content)))
+        self.assertIsNone(workbook.testzip())
+        sheet = ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+        ns = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        self.assertEqual(len(sheet.findall('s:sheetData/s:row', ns)), 5)
+        ElementTree.fromstring(workbook.read('xl/workbook.xml'))
+
+    def test_unknown_sheet_is_rejected(self):
+        resp = self.client.get(f'/api/payroll/payroll-runs/{self.run.id}/download_tax_sheet/?sheet=vat')
+        self.assertEqual(resp.status_code, 400)
+
+
+class PayslipListSparseFieldsetTests(TestCase):
+    def setUp(self):
+        from accounts.models import User
+        self.company = Company.objects.create(name="SlipCo", slug="slipco")
+        self.user = User.objects.create_user(
+            username='hr', email='hr@slipco.test', password='secret',
+            company=self.company, role='hr_manager'
+        )
+        self.run = PayrollRun.objects.create(company=self.company, month=9, year=2025)
+        for i in range(5):
+            employee = Employee.objects.create(
+                company=self.company, first_name='Emp', last_name=f'Slip{i}',
+                date_of_birth=date(1990, 1, 1), gender='male', national_id=f'SLNID{i}',
+                email=f'emp{i}@slipco.test', phone='0700000000', job_title='Engineer',
+                join_date=date(2020, 1, 1)
+            )
+            SalaryStructure.objects.create(
+                employee=employee, company=self.company, basic_salary=Decimal('1000000'),
+                effective_date=date(2025, 1, 1)
+            )
+        PayrollEngine(self.run).process(self.company.employees.all())
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_fields_trim_response_and_columns(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get('/api/payroll/payslips/', {'fields': 'id,employee_number,payroll_period,net_salary'})
+        self.assertEqual(resp.status_code, 200)
+        rows = resp.json()['results']
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(set(rows[0]), {'id', 'employee_number', 'payroll_period', 'net_salary'})
+        self.assertEqual(rows[0]['payroll_period'], '09/2025')
+
+        select = queries.captured_queries[-1]['sql']
+        self.assertIn('net_salary', select)
+        self.assertNotIn('paye_tax', select)
+        self.assertNotIn('national_id', select)
+
+    def test_cursor_pages(self):
+        first = self.client.get('/api/payroll/payslips/', {'cursor': '', 'page_size': 2}).json()
+        self.assertNotIn('count', first)
+        seen = [row['id'] for row in first['results']]
+        next_url = first['next']
+        while next_url:
+            page = self.client.get(next_url).json()
+            seen += [row['id'] for row in page['results']]
+            next_url = page['next']
+        self.assertEqual(seen, sorted(self.run.payslips.values_list('id', flat=True), reverse=True))
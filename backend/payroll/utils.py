@@ -1,15 +1,20 @@
 """
 Payroll calculation utilities for LahHR.
-Contains Uganda-specific tax and deduction calculations.
+Contains tax and deduction calculations (Uganda by default; PAYE bands for
+other countries come from tax_tables).
 """
 from decimal import Decimal, ROUND_HALF_UP
 
+from django.core.exceptions import ObjectDoesNotExist
 
-def calculate_paye(gross_salary: Decimal) -> Decimal:
+from .tax_tables import DEFAULT_COUNTRY, PAYE_SCHEDULES, get_tax_table
+
+
+def calculate_paye(gross_salary: Decimal, country: str = DEFAULT_COUNTRY, tax_year: int = None) -> Decimal:
     """
-    Calculate Uganda PAYE (Pay As You Earn) tax for 2024.
+    Calculate PAYE (Pay As You Earn) tax from the compiled band table.
 
-    Uganda PAYE Tax Bands (2024):
+    Uganda PAYE Tax Bands (2024, default):
     - UGX 0 - 235,000: 0%
     - UGX 235,001 - 335,000: 10%
     - UGX 335,001 - 410,000: 20%
@@ -17,25 +22,14 @@ def calculate_paye(gross_salary: Decimal) -> Decimal:
     - Above UGX 10,000,000: 40%
 
     Args:
-        gross_salary: Monthly gross salary in UGX
+        gross_salary: Monthly gross salary
+        country: TaxSettings country code (UG/KE/TZ)
+        tax_year: Tax year (latest schedule if omitted)
 
     Returns:
         Monthly PAYE tax amount
     """
-    if gross_salary <= Decimal('235000'):
-        return Decimal('0')
-    elif gross_salary <= Decimal('335000'):
-        # 10% on amount above 235,000
-        return ((gross_salary - Decimal('235000')) * Decimal('0.10')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-    elif gross_salary <= Decimal('410000'):
-        # 10,000 (from previous bracket) + 20% on amount above 335,000
-        return (Decimal('10000') + (gross_salary - Decimal('335000')) * Decimal('0.20')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-    elif gross_salary <= Decimal('10000000'):
-        # 25,000 (from previous brackets) + 30% on amount above 410,000
-        return (Decimal('25000') + (gross_salary - Decimal('410000')) * Decimal('0.30')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-    else:
-        # 2,902,000 (from previous brackets) + 40% on amount above 10,000,000
-        return (Decimal('2902000') + (gross_salary - Decimal('10000000')) * Decimal('0.40')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    return get_tax_table(country, tax_year).calculate_paye(gross_salary)
 
 
 def calculate_nssf(gross_salary: Decimal, rate: Decimal = Decimal('0.05'), ceiling: Decimal = Decimal('0')) -> Decimal:
@@ -109,7 +103,11 @@ def calculate_net_salary(gross_salary: Decimal, deductions: dict = None, tax_con
     taxable_income = gross_salary - nssf_employee
 
     # 3. Calculate PAYE on Taxable Income
-    paye_raw = calculate_paye(taxable_income)
+    paye_raw = calculate_paye(
+        taxable_income,
+        tax_config.get('country', DEFAULT_COUNTRY),
+        tax_config.get('tax_year')
+    )
     
     # 4. Apply Monthly Reliefs (Reliefs reduce the tax payable, not the taxable income)
     paye_tax = max(Decimal('0'), paye_raw - total_reliefs)
@@ -147,65 +145,54 @@ def calculate_net_salary(gross_salary: Decimal, deductions: dict = None, tax_con
     }
 
 
-def get_tax_bracket_info(gross_salary: Decimal) -> dict:
+def get_tax_config(company) -> dict:
+    """
+    Build the tax_config dictionary expected by calculate_net_salary
+    from a company's TaxSettings.
+
+    Args:
+        company: Company instance
+
+    Returns:
+        Dictionary of rates, ceilings and reliefs (empty if the company has
+        no TaxSettings, so the calculator defaults apply)
+    """
+    try:
+        tax_settings = company.tax_settings
+    except ObjectDoesNotExist:
+        return {}
+
+    return {
+        'country': tax_settings.country,
+        'tax_year': tax_settings.tax_year,
+        'nssf_employee_rate': tax_settings.nssf_employee_rate / Decimal('100.00'),
+        'nssf_employer_rate': tax_settings.nssf_employer_rate / Decimal('100.00'),
+        'nssf_ceiling': tax_settings.nssf_ceiling,
+        'personal_relief': tax_settings.personal_relief,
+        'insurance_relief': tax_settings.insurance_relief,
+        'pension_fund_relief': tax_settings.pension_fund_relief,
+        'local_service_tax_enabled': tax_settings.local_service_tax_enabled,
+        'local_service_tax_rate': tax_settings.local_service_tax_rate / Decimal('100.00'),
+    }
+
+
+def get_tax_bracket_info(gross_salary: Decimal, country: str = DEFAULT_COUNTRY, tax_year: int = None) -> dict:
     """
     Get information about which tax bracket a salary falls into.
 
     Args:
         gross_salary: Monthly gross salary
+        country: TaxSettings country code (UG/KE/TZ)
+        tax_year: Tax year (latest schedule if omitted)
 
     Returns:
         Dictionary with tax bracket information
     """
-    if gross_salary <= Decimal('235000'):
-        return {
-            'bracket': '0%',
-            'range': 'UGX 0 - 235,000',
-            'tax_rate': Decimal('0'),
-            'tax_amount': Decimal('0')
-        }
-    elif gross_salary <= Decimal('335000'):
-        tax_amount = (gross_salary - Decimal('235000')) * Decimal('0.10')
-        return {
-            'bracket': '10%',
-            'range': 'UGX 235,001 - 335,000',
-            'tax_rate': Decimal('0.10'),
-            'tax_amount': tax_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        }
-    elif gross_salary <= Decimal('410000'):
-        tax_amount = Decimal('10000') + (gross_salary - Decimal('335000')) * Decimal('0.20')
-        return {
-            'bracket': '20%',
-            'range': 'UGX 335,001 - 410,000',
-            'tax_rate': Decimal('0.20'),
-            'tax_amount': tax_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        }
-    elif gross_salary <= Decimal('10000000'):
-        tax_amount = Decimal('25000') + (gross_salary - Decimal('410000')) * Decimal('0.30')
-        return {
-            'bracket': '30%',
-            'range': 'UGX 410,001 - 10,000,000',
-            'tax_rate': Decimal('0.30'),
-            'tax_amount': tax_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        }
-    else:
-        tax_amount = Decimal('2902000') + (gross_salary - Decimal('10000000')) * Decimal('0.40')
-        return {
-            'bracket': '40%',
-            'range': 'Above UGX 10,000,000',
-            'tax_rate': Decimal('0.40'),
-            'tax_amount': tax_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        }
-
-
-# Uganda PAYE tax bands for reference
-UGANDA_PAYE_BANDS = [
-    {'min': Decimal('0'), 'max': Decimal('235000'), 'rate': Decimal('0')},
-    {'min': Decimal('235001'), 'max': Decimal('335000'), 'rate': Decimal('0.10')},
-    {'min': Decimal('335001'), 'max': Decimal('410000'), 'rate': Decimal('0.20')},
-    {'min': Decimal('410001'), 'max': Decimal('10000000'), 'rate': Decimal('0.30')},
-    {'min': Decimal('10000001'), 'max': None, 'rate': Decimal('0.40')},
-]
+    return get_tax_table(country, tax_year).bracket_info(gross_salary)
+
+
+# Uganda PAYE tax bands for reference (see tax_tables.PAYE_SCHEDULES)
+UGANDA_PAYE_BANDS = PAYE_SCHEDULES[('UG', 2024)]['bands']
 
 # NSSF constants
 NSSF_RATE = Decimal('0.10')  # 10%
@@ -12,19 +12,21 @@ from django.utils import timezone
 from django.db.models import Q
 
 from accounts.permissions import IsCompanyUser
+from config.fieldsets import SparseFieldsetMixin
+from config.pagination import OptionalCursorPagination
 from employees.models import Employee
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import IntegrityError
 import logging
-from .models import SalaryStructure, PayrollRun, Payslip, SalaryAdvance, TaxSettings
+from .models import SalaryStructure, PayrollRun, PayrollJob, Payslip, SalaryAdvance, TaxSettings
 logger = logging.getLogger(__name__)
 from .serializers import (
     SalaryStructureSerializer, PayrollRunSerializer,
     PayslipSerializer, PayslipDetailSerializer,
-    SalaryAdvanceSerializer, TaxSettingsSerializer
+    SalaryAdvanceSerializer, TaxSettingsSerializer, PayrollJobSerializer
 )
 from .services.payroll_email_service import PayrollEmailService
-from .utils import calculate_net_salary
+from .jobs import enqueue_payroll_job, get_active_job, latest_compute_job
 
 
 # ────────────────────── SALARY ADVANCES (LOANS) ──────────────────────
@@ -145,111 +147,14 @@ class PayrollRunViewSet(viewsets.ModelViewSet):
             # Process ALL active employees
             employees = instance.company.employees.filter(employment_status='active')
         
-        processed_count = self._process_employees(instance, employees)
-        logger.info(f"Payroll run {instance.id} initialized for company {instance.company.id}. Processed {processed_count} employees.")
-            
-    def _process_employees(self, payroll_run, employees):
-        """Helper to calculate and create payslips for given employees"""
-        total_gross = Decimal('0.00')
-        total_paye = Decimal('0.00')
-        total_nssf_employee = Decimal('0.00')
-        total_nssf_employer = Decimal('0.00')
-        total_net = Decimal('0.00')
-        total_deductions = Decimal('0.00')
-        
-        count = 0
-        
-        # Clear existing payslips for these employees to avoid duplicates
-        Payslip.objects.filter(payroll_run=payroll_run, employee__in=employees).delete()
+        self.payroll_job = enqueue_payroll_job(instance, employees, self.request.user, job_type='initialize')
+        logger.info(f"Payroll run {instance.id} initialized for company {instance.company.id}. Queued job {self.payroll_job.id} for {self.payroll_job.total} employees.")
 
-        # Fetch Tax Settings
-        try:
-            tax_settings = payroll_run.company.tax_settings
-            tax_config = {
-                'nssf_employee_rate': tax_settings.nssf_employee_rate / Decimal('100.00'),
-                'nssf_employer_rate': tax_settings.nssf_employer_rate / Decimal('100.00'),
-                'nssf_ceiling': tax_settings.nssf_ceiling,
-                'personal_relief': tax_settings.personal_relief,
-                'insurance_relief': tax_settings.insurance_relief,
-                'pension_fund_relief': tax_settings.pension_fund_relief,
-                'local_service_tax_enabled': tax_settings.local_service_tax_enabled,
-                'local_service_tax_rate': tax_settings.local_service_tax_rate / Decimal('100.00'),
-            }
-        except ObjectDoesNotExist:
-            tax_config = {}  # Use defaults
-
-        for employee in employees:
-            try:
-                try:
-                    structure = employee.salary_structure
-                except (ObjectDoesNotExist, AttributeError):
-                    continue
-                    
-                gross = structure.gross_salary
-                calculations = calculate_net_salary(gross, tax_config=tax_config)
-                
-                Payslip.objects.create(
-                    payroll_run=payroll_run,
-                    employee=employee,
-                    basic_salary=structure.basic_salary,
-                    housing_allowance=structure.housing_allowance,
-                    transport_allowance=structure.transport_allowance,
-                    medical_allowance=structure.medical_allowance,
-                    lunch_allowance=structure.lunch_allowance,
-                    other_allowances=structure.other_allowances,
-                    gross_salary=gross,
-                    paye_tax=calculations['paye_tax'],
-                    nssf_employee=calculations['nssf_employee'],
-                    nssf_employer=calculations['nssf_employer'],
-                    local_service_tax=calculations['local_service_tax'],
-                    total_deductions=calculations['total_deductions'],
-                    net_salary=calculations['net_salary'],
-                    payment_status='pending'
-                )
-                
-                total_gross += gross
-                total_paye += calculations['paye_tax']
-                total_nssf_employee += calculations['nssf_employee']
-                total_nssf_employer += calculations['nssf_employer']
-                total_deductions += calculations['total_deductions']
-                total_net += calculations['net_salary']
-                count += 1
-            except Exception as e:
-                logger.error(f"Error processing payroll for employee {employee.id}: {str(e)}")
-                continue
-            
-        skipped_count = employees.count() - count
-        if skipped_count > 0:
-            logger.warning(f"Payroll Run {payroll_run.id}: Skipped {skipped_count} employees due to missing SalaryStructure.")
-            
-        self._update_run_totals(payroll_run)
-        return count
-
-    def _update_run_totals(self, payroll_run):
-        """Aggregate totals from all payslips"""
-        from django.db.models import Sum
-        agg = payroll_run.payslips.aggregate(
-            t_gross=Sum('gross_salary'),
-            t_paye=Sum('paye_tax'),
-            t_nssf_e=Sum('nssf_employee'),
-            t_nssf_r=Sum('nssf_employer'),
-            t_lst=Sum('local_service_tax'),
-            t_ded=Sum('total_deductions'),
-            t_net=Sum('net_salary')
-        )
-        
-        payroll_run.total_gross = agg['t_gross'] or 0
-        payroll_run.total_paye = agg['t_paye'] or 0
-        payroll_run.total_nssf_employee = agg['t_nssf_e'] or 0
-        payroll_run.total_nssf_employer = agg['t_nssf_r'] or 0
-        payroll_run.total_lst = agg['t_lst'] or 0
-        payroll_run.total_deductions = agg['t_ded'] or 0
-        payroll_run.total_net = agg['t_net'] or 0
-        
-        if payroll_run.status == 'draft' and payroll_run.payslips.exists():
-             payroll_run.status = 'processing'
-             
-        payroll_run.save()
+    def create(self, request, *args, **kwargs):
+        """Create the run and return it together with its queued payroll job"""
+        response = super().create(request, *args, **kwargs)
+        response.data['job'] = PayrollJobSerializer(self.payroll_job).data
+        return response
 
     @action(detail=True, methods=['post'])
     def process_payroll(self, request, pk=None):
@@ -264,27 +169,30 @@ class PayrollRunViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        active = get_active_job(payroll_run)
+        if active and active.job_type != 'process':
+            return Response(
+                {'error': f'Another job is still running for this payroll run ({active.get_job_type_display()})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         reset = request.query_params.get('reset') == 'true'
         
         if reset or not payroll_run.payslips.exists():
-            if reset:
-                payroll_run.payslips.all().delete()
+            # Existing payslips are cleared by the worker before processing
             employees = payroll_run.company.employees.filter(employment_status='active')
         else:
             employees = Employee.objects.filter(payslips__payroll_run=payroll_run)
 
-        processed_count = self._process_employees(payroll_run, employees)
-        
-        payroll_run.status = 'processing'
-        payroll_run.processed_at = timezone.now()
-        payroll_run.processed_by = request.user
-        payroll_run.save()
+        job = enqueue_payroll_job(payroll_run, employees, request.user, job_type='process')
         
         serializer = self.get_serializer(payroll_run)
         return Response({
-            'message': f'Payroll processed for {processed_count} employees',
+            'message': f'Payroll processing queued for {job.total} employees',
+            'job_id': job.id,
+            'job': PayrollJobSerializer(job).data,
             'data': serializer.data
-        })
+        }, status=status.HTTP_202_ACCEPTED)
 
     @action(detail=True, methods=['post'])
     def approve_payroll(self, request, pk=None):
@@ -298,6 +206,20 @@ class PayrollRunViewSet(viewsets.ModelViewSet):
                 {'error': 'Can only approve payroll that is currently Processing'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+        if get_active_job(payroll_run):
+            return Response(
+                {'error': 'Payslips are still being computed for this payroll run'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # A failed (re)computation leaves partially rebuilt payslips behind
+        last_job = latest_compute_job(payroll_run)
+        if last_job and last_job.status != 'completed':
+            return Response(
+                {'error': 'The last payroll computation did not complete; process the payroll again before approving'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
             
         payroll_run.status = 'approved'
         payroll_run.approved_by = request.user
@@ -325,40 +247,191 @@ class PayrollRunViewSet(viewsets.ModelViewSet):
         
         return Response({'message': 'Payroll marked as Paid'})
 
+    @action(detail=True, methods=['post'])
+    def generate_payslip_pdfs(self, request, pk=None):
+        """Queue generation of the PDF of every payslip in the run"""
+        if request.user.role not in ['hr_manager', 'company_admin', 'super_admin']:
+             return Response({'error': 'Permission denied'}, status=403)
+
+        payroll_run = self.get_object()
+
+        active = get_active_job(payroll_run)
+        if active and active.job_type != 'pdf':
+            return Response(
+                {'error': 'Payroll is still being processed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        employees = Employee.objects.filter(payslips__payroll_run=payroll_run)
+        job = enqueue_payroll_job(payroll_run, employees, request.user, job_type='pdf')
+
+        return Response({
+            'message': f'Payslip PDF generation queued for {job.total} employees',
+            'job_id': job.id,
+            'job': PayrollJobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'])
+    def email_payslips(self, request, pk=None):
+        """
+        Queue emailing of every payslip in the run that has not been sent yet
+        (pending or previously failed).
+        """
+        if request.user.role not in ['hr_manager', 'company_admin', 'super_admin']:
+             return Response({'error': 'Permission denied'}, status=403)
+
+        payroll_run = self.get_object()
+
+        if payroll_run.status not in ['approved', 'paid']:
+            return Response(
+                {'error': 'Can only email payslips of Approved or Paid payroll'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        active = get_active_job(payroll_run)
+        if active and active.job_type != 'email':
+            return Response(
+                {'error': 'Payroll is still being processed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        employees = Employee.objects.filter(
+            payslips__payroll_run=payroll_run,
+            payslips__email_status__in=['pending', 'failed']
+        )
+        job = enqueue_payroll_job(payroll_run, employees, request.user, job_type='email')
+
+        return Response({
+            'message': f'Payslip emails queued for {job.total} employees',
+            'job_id': job.id,
+            'job': PayrollJobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download_payslips(self, request, pk=None):
+        """
+        Download every payslip of the run, streamed.
+        ?archive=pdf (default) gives one merged PDF, ?archive=zip a ZIP of individual PDFs.
+        """
+        from django.http import StreamingHttpResponse
+        from .services.payslip_archive import iter_payslip_pdfs, stream_merged_pdf, stream_zip
+
+        if request.user.role not in ['hr_manager', 'company_admin', 'super_admin']:
+             return Response({'error': 'Permission denied'}, status=403)
+
+        payroll_run = self.get_object()
+        archive = request.query_params.get('archive', 'pdf')
+        if archive not in ['pdf', 'zip']:
+            return Response({'error': "archive must be 'pdf' or 'zip'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not payroll_run.payslips.exists():
+            return Response({'error': 'This payroll run has no payslips'}, status=status.HTTP_400_BAD_REQUEST)
+
+        files = iter_payslip_pdfs(payroll_run)
+        basename = f"Payslips_{payroll_run.month:02d}_{payroll_run.year}"
+        if archive == 'zip':
+            response = StreamingHttpResponse(stream_zip(files), content_type='application/zip')
+            response['Content-Disposition'] = f'attachment; filename="{basename}.zip"'
+        else:
+            response = StreamingHttpResponse(stream_merged_pdf(files), content_type='application/pdf')
+            response['Content-Disposition'] = f'attachment; filename="{basename}.pdf"'
+        return response
+
+    @action(detail=True, methods=['get'])
+    def bank_export(self, request, pk=None):
+        """Stream the disbursement CSV for ?export_format=standard|stanbic|centenary|mpesa|airtel"""
+        from django.http import StreamingHttpResponse
+        from .services.bank_export import PayrollExportCoordinator
+
+        if request.user.role not in ['hr_manager', 'company_admin', 'super_admin']:
+             return Response({'error': 'Permission denied'}, status=403)
+
+        payroll_run = self.get_object()
+        format_type = request.query_params.get('export_format', 'standard')
+        try:
+            rows = PayrollExportCoordinator.stream_export(payroll_run.payslips.all(), format_type)
+        except ValueError as e:
+            return Response({
+                'error': str(e),
+                'formats': PayrollExportCoordinator.available_formats()
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(rows, content_type='text/csv')
+        response['Content-Disposition'] = (
+            f'attachment; filename="payroll_export_{format_type}_{payroll_run.month:02d}_{payroll_run.year}.csv"'
+        )
+        return response
+
+    @action(detail=True, methods=['get'])
+    def bank_export_summary(self, request, pk=None):
+        """Totals for a disbursement export (computed in the database)"""
+        from .services.bank_export import PayrollExportCoordinator, UgandaBankExportService
+
+        if request.user.role not in ['hr_manager', 'company_admin', 'super_admin']:
+             return Response({'error': 'Permission denied'}, status=403)
+
+        payroll_run = self.get_object()
+        format_type = request.query_params.get('export_format', 'standard')
+        try:
+            summary = UgandaBankExportService.generate_summary_report(payroll_run.payslips.all(), format_type)
+        except ValueError as e:
+            return Response({
+                'error': str(e),
+                'formats': PayrollExportCoordinator.available_formats()
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(summary)
+
     @action(detail=True, methods=['get'])
     def download_tax_sheet(self, request, pk=None):
-        """Export Uganda Tax Sheet (PAYE, NSSF) as CSV"""
-        import csv
-        from django.http import HttpResponse
-        
+        """
+        Export a statutory tax sheet, streamed.
+        ?sheet=summary (PAYE + NSSF, default) | paye | nssf | lst
+        ?export_format=csv (default) | xlsx
+        """
+        from django.http import StreamingHttpResponse
+        from .services.tax_sheets import stream_tax_sheet
+
         payroll_run = self.get_object()
-        payslips = payroll_run.payslips.all().select_related('employee')
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="uganda_tax_sheet_{payroll_run.month}_{payroll_run.year}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Employee ID', 'Name', 'Gross Salary', 'PAYE Tax (UGX)', 'NSSF Employee (5%)', 'NSSF Employer (10%)', 'Total NSSF', 'Net Salary'])
-        
-        for p in payslips:
-            writer.writerow([
-                p.employee.employee_id,
-                p.employee.full_name,
-                p.gross_salary,
-                p.paye_tax,
-                p.nssf_employee,
-                p.nssf_employer,
-                p.nssf_employee + p.nssf_employer,
-                p.net_salary
-            ])
-            
+        file_format = request.query_params.get('export_format', 'csv')
+        try:
+            chunks, content_type, sheet = stream_tax_sheet(
+                payroll_run.payslips.all(),
+                request.query_params.get('sheet', 'summary'),
+                file_format
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{sheet.filename}_{payroll_run.month}_{payroll_run.year}.{file_format}"'
+        )
         return response
 
 
+
+# ────────────────────── PAYROLL JOBS ──────────────────────
+class PayrollJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of background payroll jobs (processed/total counts)"""
+    queryset = PayrollJob.objects.all().select_related('payroll_run')
+    serializer_class = PayrollJobSerializer
+    permission_classes = [IsAuthenticated, IsCompanyUser]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['payroll_run', 'status']
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role not in ['hr_manager', 'company_admin', 'super_admin']:
+             return self.queryset.none()
+        return self.queryset.filter(company=user.company)
+
 # ────────────────────── PAYSLIPS ──────────────────────
-class PayslipViewSet(viewsets.ModelViewSet):
+class PayslipViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Payslip.objects.all().select_related('employee', 'payroll_run')
     permission_classes = [IsAuthenticated, IsCompanyUser]
+    pagination_class = OptionalCursorPagination
+    cursor_ordering = ('-id',)
 
     def get_serializer_class(self):
         return PayslipDetailSerializer if self.action == 'retrieve' else PayslipSerializer
@@ -419,10 +492,10 @@ class SalaryStructureViewSet(viewsets.ModelViewSet):
              else:
                  qs = qs.none()
         elif user.role == 'manager':
-             # Managers might need to see subordinates' salaries?
-             # For now, let's allow it for subordinates
+             # Managers see their own and their team's salaries
              if hasattr(user, 'employee') and user.employee:
-                 qs = qs.filter(Q(employee=user.employee) | Q(employee__manager=user.employee))
+                 from employees.hierarchy import in_team
+                 qs = qs.filter(in_team(user.employee))
         
         return qs
     
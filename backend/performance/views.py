@@ -59,8 +59,8 @@ class GoalViewSet(viewsets.ModelViewSet):
         if not hasattr(request.user, 'employee') or not request.user.employee:
             return Response({"error": "No employee record"}, status=400)
 
-        subordinates = request.user.employee.subordinates.all()
-        goals = Goal.objects.filter(employee__in=subordinates).order_by('employee')
+        from employees.hierarchy import in_team
+        goals = Goal.objects.filter(in_team(request.user.employee, include_self=False)).order_by('employee')
         serializer = self.get_serializer(goals, many=True)
         return Response(serializer.data)
 
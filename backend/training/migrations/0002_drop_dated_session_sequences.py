@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:10
+
+from django.db import migrations
+
+
+def drop_dated_session_sequences(apps, schema_editor):
+    # Session codes used one sequence per program and date; they now use one per program
+    CompanySequence = apps.get_model('accounts', 'CompanySequence')
+    CompanySequence.objects.filter(name__regex=r'^training_session:[0-9]+:[0-9]{8}$').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_companysequence'),
+        ('training', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_dated_session_sequences, migrations.RunPython.noop),
+    ]
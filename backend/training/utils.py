@@ -1,5 +1,4 @@
 import uuid
-import hashlib
 from datetime import datetime
 from django.utils import timezone
 
@@ -7,18 +6,21 @@ from django.utils import timezone
 def generate_certificate_number(enrollment):
     """
     Generate unique certificate number.
-    Format: CERT-{COMPANY_CODE}-{PROGRAM_CODE}-{YEAR}-{UNIQUE}
-    Example: CERT-ABC-TRN001-2024-A1B2
+    Format: CERT-{COMPANY_ID}-{PROGRAM_CODE}-{YEAR}-{COUNTER}
+    Example: CERT-12-TRN001-2024-0001
     """
-    company_code = enrollment.employee.company.code[:3].upper() if hasattr(enrollment.employee.company, 'code') else 'COM'
+    from accounts.services.sequence_service import SequenceService
+
+    company = enrollment.employee.company
     program_code = enrollment.session.program.code[:6].upper()
     year = enrollment.completed_at.year
-    
-    # Generate unique suffix
-    unique_string = f"{enrollment.id}{enrollment.employee.id}{timezone.now().timestamp()}"
-    unique_hash = hashlib.md5(unique_string.encode()).hexdigest()[:4].upper()
-    
-    return f"CERT-{company_code}-{program_code}-{year}-{unique_hash}"
+
+    # Numbered per company and year. certificate_number is unique across
+    # companies, and the company id keeps these apart from each other and
+    # from the older CERT-COM-... numbers with random suffixes
+    number = SequenceService.allocate(company, f'training_certificate:{year}')[0]
+
+    return f"CERT-{company.id}-{program_code}-{year}-{number:04d}"
 
 
 def generate_verification_code():
@@ -34,16 +36,24 @@ def generate_session_code(program, start_date):
     Generate session code.
     Format: {PROGRAM_CODE}-{YYYYMMDD}-{COUNTER}
     Example: TRN-001-20241215-01
+
+    The counter runs per program (one sequence row per program, not per
+    date), so it does not restart on each date.
     """
+    from accounts.services.sequence_service import SequenceService
+
     date_str = start_date.strftime('%Y%m%d')
-    
-    # Count existing sessions for this program on this date
-    from .models import TrainingSession
-    count = TrainingSession.objects.filter(
-        program=program,
-        start_date__date=start_date.date()
-    ).count() + 1
-    
+
+    def existing_sessions():
+        # Sessions created for this program before the sequence existed; no
+        # per-date counter of theirs can exceed the program's total
+        from .models import TrainingSession
+        return TrainingSession.objects.filter(program_id=program.id).count()
+
+    count = SequenceService.allocate(
+        program.company_id, f'training_session:{program.id}', seed=existing_sessions
+    )[0]
+
     return f"{program.code}-{date_str}-{count:02d}"
 
 
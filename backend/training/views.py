@@ -3,7 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count
+from django.db.models import Count
 from django.utils import timezone
 
 from .models import (
@@ -287,13 +287,8 @@ class TrainingEnrollmentViewSet(viewsets.ModelViewSet):
         elif user.role == 'manager':
             # Managers can see their team's enrollments
             if hasattr(user, 'employee') and user.employee:
-                from employees.models import Employee
-                team_employees = Employee.objects.filter(
-                    manager=user.employee
-                )
-                queryset = queryset.filter(
-                    Q(employee=user.employee) | Q(employee__in=team_employees)
-                )
+                from employees.hierarchy import in_team
+                queryset = queryset.filter(in_team(user.employee))
 
         # Handle my_training filter
         if self.request.query_params.get('my_training', 'false').lower() == 'true':
@@ -529,9 +524,8 @@ class TrainingEnrollmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        from employees.models import Employee
-        team_employees = Employee.objects.filter(manager=request.user.employee)
-        enrollments = self.get_queryset().filter(employee__in=team_employees)
+        from employees.hierarchy import in_team
+        enrollments = self.get_queryset().filter(in_team(request.user.employee, include_self=False))
         
         serializer = TrainingEnrollmentListSerializer(enrollments, many=True)
         return Response(serializer.data)
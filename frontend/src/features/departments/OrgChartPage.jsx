@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { useGetManagersQuery } from '../../store/api';
+import { useGetOrgChartQuery } from '../../store/api';
 import {
     User, Download, Maximize2, Search, Network
 } from 'lucide-react';
@@ -8,7 +8,7 @@ import { getMediaUrl } from '../../config/api';
 import { motion, AnimatePresence } from 'framer-motion';
 
 const OrgChartPage = () => {
-    const { data: managers, isLoading } = useGetManagersQuery();
+    const { data: orgChart, isLoading } = useGetOrgChartQuery();
     const [searchQuery, setSearchQuery] = useState('');
     const [expandedNodes, setExpandedNodes] = useState(new Set());
 
@@ -123,7 +123,7 @@ const OrgChartPage = () => {
         );
     };
 
-    const rootManagers = managers?.filter(m => !m.manager) || [];
+    const rootManagers = orgChart?.filter(m => m.subordinates.length > 0) || [];
 
     return (
         <div className="space-y-6 pb-12">
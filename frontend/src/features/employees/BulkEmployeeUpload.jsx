@@ -2,10 +2,8 @@ import React, { useState } from 'react';
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from '../../components/ui/Dialog';
 import { Button } from '../../components/ui/Button';
 import {
-    useCreateEmployeeMutation,
-    useGetDepartmentsQuery,
-    useCreateSalaryStructureMutation,
-    useGetEmployeesQuery
+    useBulkImportEmployeesMutation,
+    useGetDepartmentsQuery
 } from '../../store/api';
 import {
     Upload, Download, FileSpreadsheet, CheckCircle, XCircle,
@@ -21,17 +19,14 @@ const BulkEmployeeUpload = ({ isOpen, onClose, onSuccess }) => {
     const [uploading, setUploading] = useState(false);
     const [results, setResults] = useState(null);
     const [selectedDepartment, setSelectedDepartment] = useState('');
-    const [createEmployee] = useCreateEmployeeMutation();
-    const [createSalaryStructure] = useCreateSalaryStructureMutation();
+    const [bulkImportEmployees] = useBulkImportEmployeesMutation();
     const { data: departments = [], isLoading: departmentsLoading } = useGetDepartmentsQuery();
-    const { data: allEmployeesData } = useGetEmployeesQuery();
-    const allEmployees = allEmployeesData?.results || allEmployeesData || [];
 
     const handleFileChange = (e) => {
         const selectedFile = e.target.files[0];
         if (selectedFile) {
-            if (!selectedFile.name.match(/\.(xlsx|xls|csv)$/)) {
-                toast.error('Please upload an Excel or CSV file');
+            if (!selectedFile.name.match(/\.(xlsx|csv)$/i)) {
+                toast.error('Please upload an Excel (.xlsx) or CSV file');
                 return;
             }
             setFile(selectedFile);
@@ -141,249 +136,28 @@ const BulkEmployeeUpload = ({ isOpen, onClose, onSuccess }) => {
         toast.success('Comprehensive template downloaded! 🚀');
     };
 
-    const parseExcelFile = (file) => {
-        return new Promise((resolve, reject) => {
-            const reader = new FileReader();
-            reader.onload = (e) => {
-                try {
-                    const data = new Uint8Array(e.target.result);
-                    // Configure XLSX to parse dates and keep raw values for date conversion
-                    const workbook = XLSX.read(data, {
-                        type: 'array',
-                        cellDates: false, // Keep as serial numbers so we can convert them
-                        cellNF: false,
-                        cellText: false
-                    });
-                    const firstSheet = workbook.Sheets[workbook.SheetNames[0]];
-                    const jsonData = XLSX.utils.sheet_to_json(firstSheet, {
-                        raw: false, // Get formatted values where possible
-                        defval: null // Use null for empty cells
-                    });
-                    resolve(jsonData);
-                } catch (error) {
-                    reject(error);
-                }
-            };
-            reader.onerror = reject;
-            reader.readAsArrayBuffer(file);
-        });
-    };
-
-    // Helper function to convert Excel date serial number to YYYY-MM-DD format
-    const excelDateToISOString = (excelDate) => {
-        if (excelDate === null || excelDate === undefined || excelDate === '') return null;
-
-        // If it's already a string in date format, return it
-        if (typeof excelDate === 'string') {
-            // Check if it's already in YYYY-MM-DD format
-            if (/^\d{4}-\d{2}-\d{2}$/.test(excelDate)) {
-                return excelDate;
-            }
-            // Check if it's a string that looks like a number (Excel serial date as string)
-            if (/^\d+\.?\d*$/.test(excelDate.trim())) {
-                const numValue = parseFloat(excelDate);
-                if (!isNaN(numValue) && numValue > 0) {
-                    excelDate = numValue; // Convert to number and process below
-                } else {
-                    return null;
-                }
-            } else {
-                // Try to parse as date string
-                const parsed = new Date(excelDate);
-                if (!isNaN(parsed.getTime())) {
-                    return parsed.toISOString().split('T')[0];
-                }
-                return null;
-            }
-        }
-
-        // If it's a number (Excel serial date), convert it
-        if (typeof excelDate === 'number' && !isNaN(excelDate) && excelDate > 0) {
-            // Excel date serial number conversion
-            // Excel epoch: January 1, 1900 (serial number 1)
-            // Excel incorrectly treats 1900 as a leap year
-            // Serial number 60 = February 29, 1900 (doesn't exist, so we adjust)
-
-            // Convert Excel serial date to JavaScript Date
-            // Excel serial 1 = Jan 1, 1900
-            // JavaScript Date(1900, 0, 1) = Jan 1, 1900
-
-            const excelEpoch = new Date(1900, 0, 1); // January 1, 1900
-            let days = excelDate - 1; // Subtract 1 because Excel serial 1 = Jan 1, 1900
-
-            // Excel's leap year bug: it treats 1900 as a leap year
-            // Serial numbers 1-59 are correct (Jan 1 - Feb 28, 1900)
-            // Serial number 60 = Feb 29, 1900 (doesn't exist)
-            // Serial number 61 = Mar 1, 1900
-            // So for dates >= 60, we need to subtract 1 more day
-            if (excelDate >= 60) {
-                days = excelDate - 2; // Subtract 2 to account for the non-existent Feb 29, 1900
-            }
-
-            const jsDate = new Date(excelEpoch.getTime() + days * 24 * 60 * 60 * 1000);
-
-            // Format as YYYY-MM-DD
-            const year = jsDate.getFullYear();
-            const month = String(jsDate.getMonth() + 1).padStart(2, '0');
-            const day = String(jsDate.getDate()).padStart(2, '0');
-
-            return `${year}-${month}-${day}`;
-        }
-
-        return null;
-    };
-
-    // Helper function to handle Excel scientific notation for phone numbers
-    const cleanPhoneNumber = (val) => {
-        if (!val) return '';
-        const str = String(val).trim();
-        // Check if it's in scientific notation (e.g., 2.56782E+11)
-        if (str.includes('E+') || str.includes('e+')) {
-            const num = Number(str);
-            if (!isNaN(num)) {
-                return String(BigInt(Math.round(num)));
-            }
-        }
-        return str;
-    };
-
-    const mapEmployeeData = (row) => {
-        // Clean and trim all string values from the row
-        const clean = (val) => (val === null || val === undefined) ? '' : String(val).trim();
-
-        // Flexible key lookup to handle variations (First Name, First Name*, first_name)
-        const get = (keys) => {
-            for (const key of keys) {
-                if (row[key] !== undefined && row[key] !== null) return clean(row[key]);
-            }
-            return '';
-        };
-
-        // Use selected department from UI if provided, otherwise resolve from Excel
-        let departmentValue = selectedDepartment
-            ? clean(departments.find(d => d.id === parseInt(selectedDepartment))?.name)
-            : get(['Department', 'department', 'Dept']);
-
-        const dateOfBirth = excelDateToISOString(get(['Date of Birth', 'date_of_birth', 'DOB', 'Birth Date']));
-        const joinDate = excelDateToISOString(get(['Join Date', 'Hire Date', 'join_date', 'hire_date', 'Start Date']));
-        const probationEndDate = excelDateToISOString(get(['Probation End Date', 'probation_end_date']));
-
-        // Normalize gender
-        let genderValue = get(['Gender', 'gender']) || 'other';
-        const genderLower = genderValue.toLowerCase();
-        if (genderLower === 'male' || genderLower === 'm') genderValue = 'male';
-        else if (genderLower === 'female' || genderLower === 'f') genderValue = 'female';
-        else genderValue = 'other';
-
-        // Normalize Employment Type
-        let employmentType = get(['Employment Type', 'employment_type']) || 'full_time';
-        const etLower = employmentType.toLowerCase().replace(/ /g, '_');
-        if (etLower.includes('full')) employmentType = 'full_time';
-        else if (etLower.includes('part')) employmentType = 'part_time';
-        else if (etLower.includes('contract')) employmentType = 'contract';
-        else if (etLower.includes('intern')) employmentType = 'intern';
-        else if (etLower.includes('casual')) employmentType = 'casual';
-        else employmentType = 'full_time';
-
-        // Normalize Employment Status
-        let employmentStatus = get(['Employment Status', 'employment_status']) || 'active';
-        const esLower = employmentStatus.toLowerCase();
-        if (esLower.includes('active')) employmentStatus = 'active';
-        else if (esLower.includes('leave')) employmentStatus = 'on_leave';
-        else if (esLower.includes('suspend')) employmentStatus = 'suspended';
-        else if (esLower.includes('terminate')) employmentStatus = 'terminated';
-        else if (esLower.includes('resign')) employmentStatus = 'resigned';
-        else employmentStatus = 'active';
-
-        // Normalize Marital Status
-        let maritalStatus = get(['Marital Status', 'marital_status']) || 'single';
-        const msLower = maritalStatus.toLowerCase();
-        if (msLower.includes('single')) maritalStatus = 'single';
-        else if (msLower.includes('marri')) maritalStatus = 'married';
-        else if (msLower.includes('divorc')) maritalStatus = 'divorced';
-        else if (msLower.includes('widow')) maritalStatus = 'widowed';
-        else maritalStatus = 'single';
-
-        // System Access
-        const createAccount = get(['Create User Account? (Yes/No)', 'Create User', 'create_user']).toLowerCase().includes('y');
-        let accessRole = 'employee';
-        const roleInput = get(['Access Role', 'role', 'Position Role']).toLowerCase();
-        if (roleInput.includes('hr') || roleInput.includes('admin')) accessRole = 'hr_manager';
-        else if (roleInput.includes('manage')) accessRole = 'manager';
-
-        const employeeData = {
-            // Identity
-            first_name: get(['First Name*', 'First name *', 'First Name', 'first_name']),
-            middle_name: get(['Middle Name', 'Middle name', 'middle_name']),
-            last_name: get(['Last Name*', 'Last name *', 'Last Name', 'last_name']),
-            email: get(['Email*', 'Email address *', 'Email', 'email', 'Email Address']).toLowerCase(), // Always lowercase email
-            phone: cleanPhoneNumber(get(['Phone', 'Phone number *', 'phone', 'Telephone', 'Contact'])),
-            date_of_birth: dateOfBirth,
-            gender: genderValue,
-            marital_status: maritalStatus,
-
-            // Employment
-            job_title: get(['Job Title', "What's their job title? *", 'job_title', 'Designation', 'Position']) || 'Employee',
-            department: departmentValue,
-            manager_email: get(['Manager Email', 'Who do they report to?', 'manager_email']),
-            employment_type: employmentType,
-            employment_status: employmentStatus,
-            join_date: joinDate || new Date().toISOString().split('T')[0],
-            probation_end_date: probationEndDate,
-
-            // System Access
-            create_user: createAccount,
-
-            // Statutory
-            national_id: get(['National ID*', 'National ID Number (NIN) *', 'National ID', 'national_id', 'NIN']),
-            passport_number: get(['Passport Number', 'passport_number']),
-            tin_number: get(['TIN Number', 'tin_number', 'TIN']),
-            nssf_number: get(['NSSF Number', 'nssf_number', 'NSSF']),
-
-            // Finance
-            bank_name: get(['Bank Name', 'bank_name', 'Bank']),
-            bank_account_number: get(['Bank Account Number', 'Account Number', 'bank_account_number']),
-            bank_branch: get(['Bank Branch', 'bank_branch']),
-            mobile_money_number: cleanPhoneNumber(get(['Mobile Money Number', 'mobile_money_number', 'Momo'])),
-
-            // Contact
-            address: get(['Address', 'Street address', 'address']),
-            city: get(['City', 'city']),
-            district: get(['District', 'district']),
-            emergency_contact_name: get(['Emergency Contact Name', 'Contact Name', 'emergency_contact_name']),
-            emergency_contact_phone: cleanPhoneNumber(get(['Emergency Contact Phone', 'Phone Number', 'emergency_contact_phone'])),
-            emergency_contact_relationship: get(['Emergency Contact Relationship', 'Relationship', 'emergency_contact_relationship']),
-            notes: get(['Notes', 'Additional Notes', 'notes', 'Internal use only']),
-
-            // Salary
-            basic_salary: parseFloat(get(['Basic Salary', 'basic_salary', 'Salary', 'What is their basic monthly salary? *'])) || 0,
-            housing_allowance: parseFloat(get(['Housing Allowance', 'housing_allowance', 'Housing'])) || 0,
-            transport_allowance: parseFloat(get(['Transport Allowance', 'transport_allowance', 'Transport'])) || 0,
-            medical_allowance: parseFloat(get(['Medical Allowance', 'medical_allowance', 'Medical'])) || 0,
-            lunch_allowance: parseFloat(get(['Lunch Allowance', 'lunch_allowance', 'Lunch'])) || 0,
-            other_allowances: parseFloat(get(['Other Allowances', 'other_allowances', 'Other'])) || 0
-        };
-
-        // Only include user fields if create_user is true
-        if (createAccount) {
-            employeeData.username = get(['Username', 'username', 'Username (for login) *']);
-            employeeData.password = get(['Password', 'password', 'Custom Password *']);
-            employeeData.role = accessRole;
-        }
-
-        return employeeData;
-    };
-
-    const validateEmployee = (employee) => {
-        const errors = [];
-        if (!employee.first_name) errors.push('First name is required');
-        if (!employee.last_name) errors.push('Last name is required');
-        if (!employee.email) errors.push('Email is required');
-        if (employee.email && !/^[^\s@]+@[^\s@]+\.[^\s@]+$/.test(employee.email)) {
-            errors.push('Invalid email format');
-        }
-        return errors;
-    };
+    // Turn the server's per-row report into the results list shown after an upload
+    const toResults = (report) => ({
+        total: report.total,
+        successful: report.created,
+        failed: report.failed,
+        details: [
+            ...report.employees.map(employee => ({
+                row: employee.row,
+                name: employee.name,
+                status: 'success',
+                error: null
+            })),
+            ...report.errors.map(failure => ({
+                row: failure.row,
+                name: failure.name || 'Unknown',
+                status: 'failed',
+                error: Object.entries(failure.errors)
+                    .map(([field, messages]) => `${field}: ${messages.join(' ')}`)
+                    .join('; ')
+            }))
+        ].sort((a, b) => a.row - b.row)
+    });
 
     const handleUpload = async () => {
         if (!file) {
@@ -392,159 +166,33 @@ const BulkEmployeeUpload = ({ isOpen, onClose, onSuccess }) => {
         }
 
         setUploading(true);
-        const uploadResults = {
-            total: 0,
-            successful: 0,
-            failed: 0,
-            details: []
-        };
+        const formData = new FormData();
+        formData.append('file', file);
+        if (selectedDepartment) {
+            formData.append('department', selectedDepartment);
+        }
 
         try {
-            const data = await parseExcelFile(file);
-            uploadResults.total = data.length;
-
-            // Duplicate detection logic: only flag subsequent occurrences
-            const seenInBatch = new Set();
-
-            for (let i = 0; i < data.length; i++) {
-                const row = data[i];
-                const employeeData = mapEmployeeData(row);
-                const validationErrors = validateEmployee(employeeData);
-
-                // Check for batch duplicates correctly
-                if (employeeData.email) {
-                    if (seenInBatch.has(employeeData.email)) {
-                        validationErrors.push('Duplicate email later in same file');
-                    }
-                    seenInBatch.add(employeeData.email);
-                }
-
-                if (validationErrors.length > 0) {
-                    uploadResults.failed++;
-                    uploadResults.details.push({
-                        row: i + 2,
-                        name: `${employeeData.first_name || 'Unknown'} ${employeeData.last_name || ''}`,
-                        status: 'failed',
-                        error: validationErrors.join(', ')
-                    });
-                    continue;
-                }
-
-                try {
-                    // Handle Manager Email Lookup
-                    if (employeeData.manager_email) {
-                        const manager = allEmployees.find(e => e.email?.toLowerCase() === employeeData.manager_email.toLowerCase());
-                        if (manager) {
-                            employeeData.manager = manager.id;
-                        }
-                    }
-
-                    const res = await createEmployee(employeeData).unwrap();
-
-                    // Create Salary Structure if basic_salary is provided
-                    if (employeeData.basic_salary > 0) {
-                        await createSalaryStructure({
-                            employee: res.id,
-                            basic_salary: employeeData.basic_salary,
-                            housing_allowance: employeeData.housing_allowance || 0,
-                            transport_allowance: employeeData.transport_allowance || 0,
-                            medical_allowance: employeeData.medical_allowance || 0,
-                            lunch_allowance: employeeData.lunch_allowance || 0,
-                            other_allowances: employeeData.other_allowances || 0,
-                            effective_date: employeeData.join_date || new Date().toISOString().split('T')[0]
-                        }).unwrap();
-                    }
-
-                    uploadResults.successful++;
-                    uploadResults.details.push({
-                        row: i + 2,
-                        name: `${employeeData.first_name} ${employeeData.last_name}`,
-                        status: 'success',
-                        error: null
-                    });
-                } catch (error) {
-                    uploadResults.failed++;
-
-                    // Extract detailed error message with better parsing
-                    let errorMessage = 'Failed to create employee';
-
-                    // Log full error for debugging (use JSON.stringify to see full object)
-                    console.error(`Row ${i + 2} Full Error:`, JSON.stringify(error, null, 2));
-                    console.error(`Row ${i + 2} Error Data:`, JSON.stringify(error.data, null, 2));
-                    console.error(`Row ${i + 2} Employee Data Sent:`, JSON.stringify(employeeData, null, 2));
-
-                    // RTK Query error format: {status: number, data: {...}, error: string}
-                    const errorData = error.data;
-
-                    if (errorData) {
-                        // Handle different error formats
-                        if (typeof errorData === 'string') {
-                            // Check if it's HTML (backend not deployed with middleware yet)
-                            if (errorData.includes('<!doctype html>') || errorData.includes('<html')) {
-                                errorMessage = 'Backend returned HTML error. Please deploy backend changes.';
-                            } else {
-                                errorMessage = errorData;
-                            }
-                        } else if (errorData.detail) {
-                            errorMessage = errorData.detail;
-                        } else if (errorData.message) {
-                            errorMessage = errorData.message;
-                        } else if (typeof errorData === 'object' && errorData !== null) {
-                            // Extract all validation errors, not just the first
-                            const errorMessages = [];
-                            const errorKeys = Object.keys(errorData);
-
-                            errorKeys.forEach(key => {
-                                const fieldError = errorData[key];
-                                if (Array.isArray(fieldError)) {
-                                    fieldError.forEach(msg => {
-                                        errorMessages.push(`${key}: ${msg}`);
-                                    });
-                                } else if (typeof fieldError === 'string') {
-                                    errorMessages.push(`${key}: ${fieldError}`);
-                                } else if (typeof fieldError === 'object' && fieldError !== null) {
-                                    errorMessages.push(`${key}: ${JSON.stringify(fieldError)}`);
-                                }
-                            });
-
-                            if (errorMessages.length > 0) {
-                                errorMessage = errorMessages.slice(0, 3).join('; '); // Show first 3 errors
-                                if (errorMessages.length > 3) {
-                                    errorMessage += ` (+${errorMessages.length - 3} more)`;
-                                }
-                            } else {
-                                // If no specific errors found, show the whole object
-                                errorMessage = JSON.stringify(errorData);
-                            }
-                        }
-                    } else if (error.error) {
-                        errorMessage = error.error;
-                    } else if (error.status === 'PARSING_ERROR') {
-                        errorMessage = 'Server returned invalid response. Backend may need to be deployed.';
-                    } else if (error.status) {
-                        errorMessage = `Server error (${error.status}). Check console for details.`;
-                    }
-
-                    uploadResults.details.push({
-                        row: i + 2,
-                        name: `${employeeData.first_name || 'Unknown'} ${employeeData.last_name || ''}`,
-                        status: 'failed',
-                        error: errorMessage
-                    });
-                }
+            let report;
+            try {
+                report = await bulkImportEmployees(formData).unwrap();
+            } catch (error) {
+                // A file where every row failed still comes back with its report
+                if (!error.data?.errors) throw error;
+                report = error.data;
             }
 
-            setResults(uploadResults);
+            setResults(toResults(report));
 
-            if (uploadResults.successful > 0) {
-                toast.success(`🎉 Successfully uploaded ${uploadResults.successful} employee(s)!`);
+            if (report.created > 0) {
+                toast.success(`🎉 Successfully uploaded ${report.created} employee(s)!`);
                 onSuccess?.();
             }
-            if (uploadResults.failed > 0) {
-                toast.error(`❌ Failed to upload ${uploadResults.failed} employee(s)`);
+            if (report.failed > 0) {
+                toast.error(`❌ Failed to upload ${report.failed} employee(s)`);
             }
         } catch (error) {
-            toast.error('Failed to process file');
+            toast.error(error.data?.error || 'Failed to process file');
             console.error(error);
         } finally {
             setUploading(false);
@@ -683,7 +331,7 @@ const BulkEmployeeUpload = ({ isOpen, onClose, onSuccess }) => {
                                         <input
                                             type="file"
                                             id="file-upload"
-                                            accept=".xlsx,.xls,.csv"
+                                            accept=".xlsx,.csv"
                                             onChange={handleFileChange}
                                             className="hidden"
                                         />
@@ -148,6 +148,14 @@ export const api = createApi({
       }),
       invalidatesTags: [{ type: 'Employee', id: 'LIST' }]
     }),
+    bulkImportEmployees: builder.mutation({
+      query: (formData) => ({
+        url: '/employees/bulk_import/',
+        method: 'POST',
+        body: formData
+      }),
+      invalidatesTags: [{ type: 'Employee', id: 'LIST' }, { type: 'SalaryStructure', id: 'LIST' }]
+    }),
     updateEmployee: builder.mutation({
       query: ({ id, formData, ...data }) => ({
         url: `/employees/${id}/`,
@@ -364,6 +372,10 @@ export const api = createApi({
       query: () => '/employees/managers/',
       providesTags: ['Employee']
     }),
+    getOrgChart: builder.query({
+      query: (params) => ({ url: '/employees/org_chart/', params }),
+      providesTags: ['Employee']
+    }),
     // ========== SALARY ADVANCES ==========
     getSalaryAdvances: builder.query({
       query: (params) => ({
@@ -1786,6 +1798,7 @@ export const {
   useGetEmployeesQuery,
   useGetEmployeeQuery,
   useCreateEmployeeMutation,
+  useBulkImportEmployeesMutation,
   useUpdateEmployeeMutation,
   useDeleteEmployeeMutation,
   useGetDepartmentsQuery,
@@ -1941,6 +1954,7 @@ export const {
   useRejectSalaryAdvanceMutation,
   // Org Structure
   useGetManagersQuery,
+  useGetOrgChartQuery,
   // Notifications
   useGetNotificationsQuery,
   useMarkNotificationReadMutation,